@@ -0,0 +1,15 @@
+-- Migration: data_version change counters for the dashboard response
+-- cache.
+--
+-- Fresh databases get this table from schema.sql.  Until it exists the
+-- dashboard simply serves every request uncached.  No backfill: a missing
+-- counter row reads as version 0 and the writers create the rows.
+--
+-- Run once:  mysql -u root -p f1_strategy < database/migrate_data_version.sql
+
+CREATE TABLE IF NOT EXISTS `data_version` (
+  `scope` varchar(32) NOT NULL,
+  `version` bigint NOT NULL DEFAULT '0',
+  `updated_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`scope`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
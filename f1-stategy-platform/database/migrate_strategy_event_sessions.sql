@@ -0,0 +1,21 @@
+-- Migration: session link for strategy events.
+--
+-- SafetyCar / VSC / RedFlag events are session-wide and were stored with
+-- lap_id NULL and no other link, so neither a re-import nor the race
+-- simulator (race_simulation.py, per-track neutralisation frequencies)
+-- could tell which race they belong to.  Capture and import now write
+-- session_id on every event.
+--
+-- Existing rows are deliberately not backfilled: the simulator counts a
+-- race as recorded when any of its events carries session_id, and an old
+-- race whose pit stops were linked but whose Safety Cars could not be
+-- would read as a race without one.  Re-import a race (--upsert) to record
+-- all its events with the link.
+--
+-- Fresh databases get the column from schema.sql.
+--
+-- Run once:  mysql -u root -p f1_strategy < database/migrate_strategy_event_sessions.sql
+
+ALTER TABLE `strategy_events`
+  ADD COLUMN `session_id` int DEFAULT NULL AFTER `lap_id`,
+  ADD KEY `idx_events_session_type` (`session_id`, `event_type`);
@@ -0,0 +1,64 @@
+-- Migration: pre-aggregated summary tables (session_stats,
+-- lap_telemetry_stats, live_state).
+--
+-- Fresh databases get these tables from schema.sql.  Existing databases:
+-- create them here, then backfill from the raw laps with
+--
+--   python scripts/summary_tables.py rebuild
+--
+-- Until the backfill has run, sessions written before the migration are
+-- missing from the dashboard session list, and their laps carry no
+-- telemetry tooltips in the race comparison (unless the session has a
+-- columnar archive).  live_state fills itself as laps complete; the
+-- rebuild only seeds it from laps already captured.
+--
+-- Run once:  mysql -u root -p f1_strategy < database/migrate_summary_tables.sql
+
+CREATE TABLE IF NOT EXISTS `session_stats` (
+  `session_id` int NOT NULL,
+  `driver_code` varchar(3) DEFAULT NULL,
+  `session_date` date DEFAULT NULL,
+  `total_laps` int NOT NULL DEFAULT '0',
+  `valid_laps` int NOT NULL DEFAULT '0',
+  `invalid_laps` int NOT NULL DEFAULT '0',
+  `fastest_lap_ms` int DEFAULT NULL,
+  `best_timed_ms` int DEFAULT NULL,
+  `avg_lap_ms` double DEFAULT NULL,
+  `last_captured_at` datetime DEFAULT NULL,
+  `updated_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`session_id`),
+  KEY `idx_session_stats_recent` (`session_date`, `session_id`),
+  KEY `idx_session_stats_driver` (`driver_code`, `session_date`, `session_id`),
+  CONSTRAINT `fk_session_stats_session` FOREIGN KEY (`session_id`) REFERENCES `sessions` (`session_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `lap_telemetry_stats` (
+  `lap_id` int NOT NULL,
+  `samples` int NOT NULL DEFAULT '0',
+  `avg_speed` double DEFAULT NULL,
+  `top_speed` int DEFAULT NULL,
+  `avg_gear` double DEFAULT NULL,
+  `avg_rpm` double DEFAULT NULL,
+  -- What is left of the lap's raw telemetry (scripts/compact_telemetry.py);
+  -- once compacted, the row is no longer re-derived from it.
+  `retention` enum('full','downsampled','aggregated') NOT NULL DEFAULT 'full',
+  `updated_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`lap_id`),
+  CONSTRAINT `fk_lap_telemetry_stats_lap` FOREIGN KEY (`lap_id`) REFERENCES `laps` (`lap_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `live_state` (
+  `driver_code` varchar(3) NOT NULL,
+  `session_id` int NOT NULL,
+  `lap_id` int NOT NULL,
+  `track_name` varchar(50) DEFAULT NULL,
+  `lap_number` int DEFAULT NULL,
+  `lap_time_ms` int DEFAULT NULL,
+  `tyre_compound` enum('Hypersoft','Ultrasoft','Supersoft','Soft','Medium','Hard','Superhard','Intermediate','Wet') DEFAULT NULL,
+  `tyre_age` int DEFAULT NULL,
+  `captured_at` datetime NOT NULL,
+  `updated_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`driver_code`),
+  KEY `idx_live_state_lap` (`lap_id`),
+  CONSTRAINT `fk_live_state_lap` FOREIGN KEY (`lap_id`) REFERENCES `laps` (`lap_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,78 @@
+-- Migration: unique import keys for sessions and laps.
+--
+-- Fresh databases get these keys from schema.sql.  Existing databases may
+-- already hold duplicate sessions (old --allow-duplicate re-imports) or
+-- duplicate lap numbers, which would block the unique keys -- this script
+-- removes them first, keeping the same row the dashboard already picked:
+-- the session with the most timed laps (latest session_id on a tie), and
+-- per lap number the timed row (latest lap_id on a tie).
+--
+-- Run once:  mysql -u root -p f1_strategy < database/migrate_unique_import_keys.sql
+
+START TRANSACTION;
+
+-- 1. Duplicate sessions (NULL keys never collide, so game sessions stay).
+CREATE TEMPORARY TABLE _drop_sessions AS
+SELECT session_id FROM (
+    SELECT s.session_id,
+           ROW_NUMBER() OVER (
+               PARTITION BY s.track_id, s.season_id, s.driver_id, s.session_type, s.date
+               ORDER BY COUNT(l.lap_id) DESC, s.session_id DESC
+           ) AS rn
+    FROM sessions s
+    LEFT JOIN laps l ON l.session_id = s.session_id AND l.lap_time_ms > 0
+    WHERE s.track_id IS NOT NULL AND s.season_id IS NOT NULL
+      AND s.driver_id IS NOT NULL AND s.session_type IS NOT NULL
+      AND s.date IS NOT NULL
+    GROUP BY s.session_id
+) ranked
+WHERE rn > 1;
+
+DELETE t FROM telemetry t
+JOIN laps l ON t.lap_id = l.lap_id
+JOIN _drop_sessions d ON l.session_id = d.session_id;
+
+DELETE se FROM strategy_events se
+JOIN laps l ON se.lap_id = l.lap_id
+JOIN _drop_sessions d ON l.session_id = d.session_id;
+
+DELETE l FROM laps l
+JOIN _drop_sessions d ON l.session_id = d.session_id;
+
+DELETE s FROM sessions s
+JOIN _drop_sessions d ON s.session_id = d.session_id;
+
+-- 2. Duplicate lap numbers inside one session.
+CREATE TEMPORARY TABLE _drop_laps AS
+SELECT lap_id FROM (
+    SELECT l.lap_id,
+           ROW_NUMBER() OVER (
+               PARTITION BY l.session_id, l.lap_number
+               ORDER BY (l.lap_time_ms > 0) DESC, l.lap_id DESC
+           ) AS rn
+    FROM laps l
+    WHERE l.session_id IS NOT NULL AND l.lap_number IS NOT NULL
+) ranked
+WHERE rn > 1;
+
+DELETE t FROM telemetry t
+JOIN _drop_laps d ON t.lap_id = d.lap_id;
+
+DELETE se FROM strategy_events se
+JOIN _drop_laps d ON se.lap_id = d.lap_id;
+
+DELETE l FROM laps l
+JOIN _drop_laps d ON l.lap_id = d.lap_id;
+
+COMMIT;
+
+DROP TEMPORARY TABLE _drop_sessions;
+DROP TEMPORARY TABLE _drop_laps;
+
+-- 3. The keys themselves (DDL commits implicitly).
+ALTER TABLE `laps`
+  DROP INDEX `idx_laps_session_lap`,
+  ADD UNIQUE KEY `uq_laps_session_lap` (`session_id`, `lap_number`);
+
+ALTER TABLE `sessions`
+  ADD UNIQUE KEY `uq_sessions_identity` (`track_id`, `season_id`, `driver_id`, `session_type`, `date`);
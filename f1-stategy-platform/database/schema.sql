@@ -31,6 +31,24 @@ CREATE TABLE `data_sources` (
 ) ENGINE=InnoDB AUTO_INCREMENT=3 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `data_version`
+--
+
+DROP TABLE IF EXISTS `data_version`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `data_version` (
+  -- Change counters behind the dashboard response cache: scope 'all' and
+  -- 'session:<id>' are bumped by every writer of laps / strategy events in
+  -- its own transaction (scripts/summary_tables.py).
+  `scope` varchar(32) NOT NULL,
+  `version` bigint NOT NULL DEFAULT '0',
+  `updated_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`scope`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `drivers`
 --
@@ -47,6 +65,31 @@ CREATE TABLE `drivers` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `lap_telemetry_stats`
+--
+
+DROP TABLE IF EXISTS `lap_telemetry_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `lap_telemetry_stats` (
+  -- Pre-aggregated telemetry of one lap (comparison tooltips), refreshed
+  -- when the lap's telemetry is written (scripts/summary_tables.py).
+  `lap_id` int NOT NULL,
+  `samples` int NOT NULL DEFAULT '0',
+  `avg_speed` double DEFAULT NULL,
+  `top_speed` int DEFAULT NULL,
+  `avg_gear` double DEFAULT NULL,
+  `avg_rpm` double DEFAULT NULL,
+  -- What is left of the lap's raw telemetry (scripts/compact_telemetry.py);
+  -- once compacted, the row is no longer re-derived from it.
+  `retention` enum('full','downsampled','aggregated') NOT NULL DEFAULT 'full',
+  `updated_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`lap_id`),
+  CONSTRAINT `fk_lap_telemetry_stats_lap` FOREIGN KEY (`lap_id`) REFERENCES `laps` (`lap_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `laps`
 --
@@ -70,13 +113,43 @@ CREATE TABLE `laps` (
   PRIMARY KEY (`lap_id`),
   KEY `session_id` (`session_id`),
   KEY `fk_laps_driver` (`driver_id`),
-  KEY `idx_laps_session_lap` (`session_id`, `lap_number`),
+  -- One row per lap of a session: re-imports update laps in place
+  -- (INSERT ... ON DUPLICATE KEY UPDATE) instead of duplicating them.
+  UNIQUE KEY `uq_laps_session_lap` (`session_id`, `lap_number`),
   KEY `idx_laps_session_time` (`session_id`, `lap_time_ms`),
   CONSTRAINT `fk_laps_driver` FOREIGN KEY (`driver_id`) REFERENCES `drivers` (`driver_id`),
   CONSTRAINT `laps_ibfk_1` FOREIGN KEY (`session_id`) REFERENCES `sessions` (`session_id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=7674 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `live_state`
+--
+
+DROP TABLE IF EXISTS `live_state`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `live_state` (
+  -- Latest completed live lap per driver (one row per capture rig / live
+  -- import), upserted by the writers on every lap completion
+  -- (scripts/summary_tables.py).  The dashboard's live cards read it by
+  -- key instead of scanning laps by captured_at.
+  `driver_code` varchar(3) NOT NULL,
+  `session_id` int NOT NULL,
+  `lap_id` int NOT NULL,
+  `track_name` varchar(50) DEFAULT NULL,
+  `lap_number` int DEFAULT NULL,
+  `lap_time_ms` int DEFAULT NULL,
+  `tyre_compound` enum('Hypersoft','Ultrasoft','Supersoft','Soft','Medium','Hard','Superhard','Intermediate','Wet') DEFAULT NULL,
+  `tyre_age` int DEFAULT NULL,
+  `captured_at` datetime NOT NULL,
+  `updated_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`driver_code`),
+  KEY `idx_live_state_lap` (`lap_id`),
+  CONSTRAINT `fk_live_state_lap` FOREIGN KEY (`lap_id`) REFERENCES `laps` (`lap_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `regulations`
 --
@@ -111,6 +184,36 @@ CREATE TABLE `seasons` (
 ) ENGINE=InnoDB AUTO_INCREMENT=9 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `session_stats`
+--
+
+DROP TABLE IF EXISTS `session_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `session_stats` (
+  -- Pre-aggregated per-session lap summary, refreshed by the capture and
+  -- import writers (scripts/summary_tables.py); never edited by hand.
+  `session_id` int NOT NULL,
+  `driver_code` varchar(3) DEFAULT NULL,
+  `session_date` date DEFAULT NULL,
+  `total_laps` int NOT NULL DEFAULT '0',
+  `valid_laps` int NOT NULL DEFAULT '0',
+  `invalid_laps` int NOT NULL DEFAULT '0',
+  -- Fastest valid timed lap / fastest timed lap / mean timed lap (0 ms
+  -- in-progress laps excluded).
+  `fastest_lap_ms` int DEFAULT NULL,
+  `best_timed_ms` int DEFAULT NULL,
+  `avg_lap_ms` double DEFAULT NULL,
+  `last_captured_at` datetime DEFAULT NULL,
+  `updated_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`session_id`),
+  KEY `idx_session_stats_recent` (`session_date`, `session_id`),
+  KEY `idx_session_stats_driver` (`driver_code`, `session_date`, `session_id`),
+  CONSTRAINT `fk_session_stats_session` FOREIGN KEY (`session_id`) REFERENCES `sessions` (`session_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `sessions`
 --
@@ -135,6 +238,10 @@ CREATE TABLE `sessions` (
   KEY `fk_sessions_track` (`track_id`),
   KEY `fk_sessions_regulation` (`regulation_id`),
   KEY `fk_sessions_driver` (`driver_id`),
+  -- A session is unique per (track, season, driver, session_type, date);
+  -- re-imports update it in place.  Game-capture sessions have a NULL
+  -- season_id and never collide (NULLs are distinct in a unique key).
+  UNIQUE KEY `uq_sessions_identity` (`track_id`, `season_id`, `driver_id`, `session_type`, `date`),
   CONSTRAINT `fk_sessions_driver` FOREIGN KEY (`driver_id`) REFERENCES `drivers` (`driver_id`),
   CONSTRAINT `fk_sessions_regulation` FOREIGN KEY (`regulation_id`) REFERENCES `regulations` (`regulation_id`),
   CONSTRAINT `fk_sessions_season` FOREIGN KEY (`season_id`) REFERENCES `seasons` (`season_id`),
@@ -153,11 +260,13 @@ DROP TABLE IF EXISTS `strategy_events`;
 CREATE TABLE `strategy_events` (
   `event_id` int NOT NULL AUTO_INCREMENT,
   `lap_id` int DEFAULT NULL,
+  `session_id` int DEFAULT NULL,
   `event_type` enum('PitStop','SafetyCar','VSC','RedFlag') DEFAULT NULL,
   `duration_sec` float DEFAULT NULL,
   PRIMARY KEY (`event_id`),
   KEY `lap_id` (`lap_id`),
   KEY `idx_events_type_lap` (`event_type`, `lap_id`),
+  KEY `idx_events_session_type` (`session_id`, `event_type`),
   CONSTRAINT `strategy_events_ibfk_1` FOREIGN KEY (`lap_id`) REFERENCES `laps` (`lap_id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=260 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -0,0 +1,35 @@
+@echo off
+setlocal
+title F1 Strategy Platform - Driver Comparison Matrix
+cd /d "%~dp0.."
+
+set "PYTHON=python"
+if exist ".venv\Scripts\python.exe" set "PYTHON=.venv\Scripts\python.exe"
+
+cls
+echo ============================================================
+echo  F1 STRATEGY PLATFORM - ALL-PAIRS DRIVER COMPARISON MATRIX
+echo ============================================================
+echo.
+echo  Compares every per-driver model with every other (aggregate
+echo  models and each season) and stores the gap grid for the
+echo  dashboard's instant pair / ranking lookups.
+echo.
+
+if not exist "scripts\comparison_matrix.py" (
+    echo  [ERROR] scripts\comparison_matrix.py not found.
+    echo          Keep this launcher inside the f1-stategy-platform folder.
+    pause
+    exit /b 1
+)
+
+"%PYTHON%" scripts\comparison_matrix.py build %*
+if errorlevel 1 (
+    echo.
+    pause
+    exit /b 1
+)
+"%PYTHON%" scripts\comparison_matrix.py show
+
+echo.
+pause
@@ -3,26 +3,28 @@ import matplotlib.pyplot as plt
 from datetime import datetime
 import os
 
-from config import get_db_connection
+from config import get_analytics_connection
 from stint_analysis import detrend_laps
+from session_archive import open_archive, speed_distribution
 
 
 # ANALYSIS FUNCTIONS
 def get_session_summary(conn):
+    """One row per session, read from the pre-aggregated session_stats
+    table (summary_tables keeps it in step with the laps)."""
     query = """
     SELECT 
         s.session_id,
         s.track_name,
         s.date,
-        COUNT(l.lap_id) as total_laps,
-        MIN(CASE WHEN l.lap_time_ms > 0 THEN l.lap_time_ms END) / 1000 as fastest_lap,
-        AVG(CASE WHEN l.lap_time_ms > 0 THEN l.lap_time_ms END) / 1000 as avg_lap_time,
-        SUM(CASE WHEN l.is_valid = 1 THEN 1 ELSE 0 END) as valid_laps,
-        SUM(CASE WHEN l.is_valid = 0 THEN 1 ELSE 0 END) as invalid_laps
-    FROM sessions s
-    LEFT JOIN laps l ON s.session_id = l.session_id
-    GROUP BY s.session_id
-    ORDER BY s.date DESC
+        st.total_laps,
+        st.best_timed_ms / 1000 as fastest_lap,
+        st.avg_lap_ms / 1000 as avg_lap_time,
+        st.valid_laps,
+        st.invalid_laps
+    FROM session_stats st
+    JOIN sessions s ON s.session_id = st.session_id
+    ORDER BY st.session_date DESC, st.session_id DESC
     """
     return pd.read_sql(query, conn)
 
@@ -76,6 +78,15 @@ def get_lap_consistency(conn, session_id):
     return pd.read_sql(query, conn, params=(session_id,))
 
 def get_speed_distribution(conn, session_id):
+    """Speed of every moving telemetry sample, read from the session's
+    columnar archive when it is current (no per-row Python tuples)."""
+    cursor = conn.cursor()
+    try:
+        archive = open_archive(session_id, cursor=cursor)
+    finally:
+        cursor.close()
+    if archive is not None:
+        return speed_distribution(archive)
     query = """
     SELECT 
         t.speed,
@@ -187,7 +198,7 @@ def main():
     print("F1 PERFORMANCE ANALYSIS")
     print("=" * 60)
     
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     
     # Get session summary
     print("\n[1/5] Fetching session data...")
@@ -0,0 +1,175 @@
+"""Latency benchmark for the strategy advisor (/api/strategy/analyze).
+
+Times the endpoint through Flask's test client (request parsing, scenario
+pricing and JSON encoding, no network) two ways:
+
+  * per-lap   -- the original pricing: one feature row and one
+                 model.predict call per remaining lap per scenario;
+  * batched   -- the current dashboard._stint_times: every lap of every
+                 scenario in one vectorised call (compiled lookup tables
+                 for a linear model, one feature matrix + predict call
+                 otherwise -- see compiled_model).
+
+Both must return the same strategies; the largest total_time difference
+is printed as a check.  The full pit-strategy search
+(/api/strategy/optimize: every pit lap and compound choice, 0-3 stops) is
+then timed on a 70-lap race, through the endpoint and as a bare
+pit_strategy.optimal_strategies call over six slick compounds -- the
+per-lap budget is 100 ms.
+
+Uses the deployed model when ml_models/ has one, otherwise (or with
+--synthetic) a LinearRegression fitted on generated laps over --tracks
+tracks and the full compound range.
+
+Each request runs --repeat times after one warm-up; the median and p95
+are reported in milliseconds.
+
+Run:  python scripts/benchmark_advisor.py --synthetic
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+import pandas as pd
+
+import dashboard
+from feature_pipeline import construct_prediction_input
+from pit_strategy import optimal_strategies
+
+COMPOUNDS = ("Hypersoft", "Ultrasoft", "Supersoft", "Soft", "Medium", "Hard",
+             "Intermediate", "Wet")
+
+# name -> (laps remaining, event); the remaining fields come from the model.
+CASES = {
+    "10_laps_left":      (10, "None"),
+    "30_laps_left":      (30, "None"),
+    "50_laps_left":      (50, "None"),
+    "50_laps_left_rain": (50, "Rain"),
+}
+
+
+def synthetic_model(tracks=20, seed=7):
+    """(model, feature_names) fitted on generated laps: a per-track base,
+    a per-compound offset and a small positive wear slope."""
+    from sklearn.linear_model import LinearRegression
+
+    rng = np.random.default_rng(seed)
+    track_names = [f"Track {i:02d}" for i in range(tracks)]
+    feature_names = (["tyre_age"] + [f"tyre_{c}" for c in COMPOUNDS]
+                     + [f"track_{t}" for t in track_names])
+    rows, y = [], []
+    for t, track in enumerate(track_names):
+        for c, compound in enumerate(COMPOUNDS):
+            for age in range(0, 40, 3):
+                row = dict.fromkeys(feature_names, 0)
+                row.update({"tyre_age": age, f"tyre_{compound}": 1, f"track_{track}": 1})
+                rows.append(row)
+                y.append(80 + t + 0.3 * c + 0.05 * age + rng.normal(0, 0.2))
+    X = pd.DataFrame(rows)[feature_names]
+    return LinearRegression().fit(X, np.array(y)), feature_names
+
+
+def per_lap_stint_times(stints, track):
+    """The advisor's original pricing, kept as the benchmark baseline."""
+    totals = []
+    for tyre, start_age, laps in stints:
+        if (f"tyre_{tyre}" not in dashboard.feature_names
+                or f"track_{track}" not in dashboard.feature_names or laps <= 0):
+            totals.append(0.0)
+            continue
+        total = 0.0
+        for i in range(laps):
+            age = start_age + i
+            row = construct_prediction_input(tyre_age=age, lap_number=i, tyre_compound=tyre,
+                                             track_name=track,
+                                             feature_names=dashboard.feature_names)
+            total += float(dashboard.model.predict(row)[0]) - dashboard.fuel_burn_rate * age
+        totals.append(total)
+    return totals
+
+
+def request_body(feature_names, laps_left, event):
+    tyres = [f[len("tyre_"):] for f in feature_names if f.startswith("tyre_")]
+    tracks = [f[len("track_"):] for f in feature_names if f.startswith("track_")]
+    tyre = "Medium" if "Medium" in tyres else next(t for t in tyres if t not in ("age", "load"))
+    return {"current_lap": 5, "total_laps": 5 + laps_left, "current_tyre": tyre,
+            "current_age": 12, "track": tracks[0], "event_type": event}
+
+
+def time_case(client, body, repeat, url="/api/strategy/analyze"):
+    """(median ms, p95 ms, strategies) for one request body."""
+    client.post(url, json=body)       # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resp = client.post(url, json=body)
+        samples.append((time.perf_counter() - start) * 1000)
+    if resp.status_code != 200:
+        raise SystemExit(f"{url} answered {resp.status_code}: {resp.get_json()}")
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return statistics.median(samples), p95, resp.get_json()["strategies"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/strategy/analyze latency.")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per request (default 20)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="use a generated model even when a trained one is deployed")
+    parser.add_argument("--tracks", type=int, default=20,
+                        help="tracks in the synthetic model (default 20)")
+    args = parser.parse_args()
+
+    if args.synthetic or dashboard.model is None:
+        model, feature_names = synthetic_model(args.tracks)
+        patch.object(dashboard, "model", model).start()
+        patch.object(dashboard, "feature_names", feature_names).start()
+        patch.object(dashboard, "fuel_burn_rate", 0.0).start()
+        print(f"Synthetic LinearRegression | {len(feature_names)} features")
+    else:
+        print(f"Deployed {type(dashboard.model).__name__} | {len(dashboard.feature_names)} features")
+    client = dashboard.app.test_client()
+
+    print(f"{'request':<20}{'per-lap median/p95 ms':>26}{'batched median/p95 ms':>26}"
+          f"{'speedup':>10}{'max |diff| s':>14}")
+    for name, (laps_left, event) in CASES.items():
+        body = request_body(dashboard.feature_names, laps_left, event)
+        with patch.object(dashboard, "_stint_times", per_lap_stint_times):
+            before = time_case(client, body, args.repeat)
+        after = time_case(client, body, args.repeat)
+        diff = max((abs(a["total_time"] - b["total_time"])
+                    for a, b in zip(before[2], after[2])), default=0.0)
+        if [s["option"] for s in before[2]] != [s["option"] for s in after[2]]:
+            diff = float("inf")
+        print(f"{name:<20}{before[0]:>14.2f} / {before[1]:>8.2f}"
+              f"{after[0]:>14.2f} / {after[1]:>8.2f}"
+              f"{before[0] / after[0]:>9.1f}x{diff:>14.2e}")
+
+    body = request_body(dashboard.feature_names, 70, "None")
+    med, p95, plans = time_case(client, body, args.repeat, url="/api/strategy/optimize")
+    print(f"\noptimize, 70 laps left, 0-3 stops: {med:.2f} / {p95:.2f} ms median/p95 "
+          f"({len(plans)} plans)")
+
+    rng = np.random.default_rng(5)
+    tables = {c: 80 + rng.random() * 2 + np.cumsum(rng.random(100) * rng.random() * 0.8)
+              for c in COMPOUNDS[:6]}
+    samples = []
+    for _ in range(args.repeat + 1):
+        start = time.perf_counter()
+        optimal_strategies(tables, 70, "Medium", 12, 25.0, top_k=5)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples = sorted(samples[1:])         # first run is the warm-up
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    print(f"search only, 6 compounds, 70 laps: {statistics.median(samples):.2f} / {p95:.2f} ms "
+          f"median/p95 (budget 100 ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Hot-query benchmark across storage backends.
+
+Times the queries behind the dashboard's polling endpoints, the race
+comparison, the analysis report and model training on every backend that
+is available here:
+
+  * mysql   -- the configured server (skipped when DB_PASSWORD is unset or
+               the server is unreachable);
+  * sqlite  -- the DB_PATH file, or with --synthetic a throwaway database
+               seeded with generated sessions;
+  * duckdb  -- DuckDB scanning that same SQLite file (needs ``duckdb``).
+
+Each query runs --repeat times after one warm-up; the median and p95 of
+execute + fetchall are reported in milliseconds.
+
+Run:  python scripts/benchmark_backends.py --synthetic
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import config
+from benchmark_models import TRAINING_QUERY
+from db_backends import connect_duckdb_analytics, connect_sqlite
+
+# name -> (SQL, parameter names); parameters are looked up per database.
+HOT_QUERIES = {
+    "sessions_list": ("""
+        SELECT s.session_id, s.track_name, s.session_type, s.weather, s.date,
+               d.driver_code, COUNT(l.lap_id) AS total_laps,
+               MIN(CASE WHEN l.is_valid = 1 AND l.lap_time_ms > 0
+                        THEN l.lap_time_ms END) / 1000 AS fastest_lap
+        FROM sessions s
+        LEFT JOIN drivers d ON s.driver_id = d.driver_id
+        LEFT JOIN laps l ON s.session_id = l.session_id
+        GROUP BY s.session_id, s.track_name, s.session_type, s.weather,
+                 s.date, d.driver_code
+        ORDER BY s.date DESC, s.session_id DESC
+        LIMIT %s OFFSET %s
+    """, ("limit", "offset")),
+    "session_laps": ("""
+        SELECT l.lap_number, l.lap_time_ms / 1000.0 AS lap_time, l.tyre_compound,
+               l.tyre_age, l.fuel_load, l.is_valid,
+               MAX(CASE WHEN se.event_type = 'PitStop' THEN 1 ELSE 0 END) AS has_pit_stop
+        FROM laps l
+        LEFT JOIN strategy_events se ON l.lap_id = se.lap_id
+        WHERE l.session_id = %s AND l.lap_time_ms > 0
+        GROUP BY l.lap_id, l.lap_number, l.lap_time_ms, l.tyre_compound,
+                 l.tyre_age, l.fuel_load, l.is_valid
+        ORDER BY l.lap_number
+    """, ("session_id",)),
+    "latest_lap": ("""
+        SELECT l.lap_time_ms / 1000.0 AS lap_time, l.lap_number, l.tyre_compound,
+               l.tyre_age, l.session_id, s.track_name
+        FROM laps l
+        JOIN sessions s ON l.session_id = s.session_id
+        WHERE l.lap_time_ms > 0 AND l.captured_at >= %s
+        ORDER BY l.lap_id DESC
+        LIMIT 1
+    """, ("cutoff",)),
+    "comparison_years": ("""
+        SELECT DISTINCT YEAR(s.date) AS year
+        FROM sessions s
+        WHERE s.date IS NOT NULL
+        ORDER BY year DESC
+    """, ()),
+    "lap_telemetry_agg": ("""
+        SELECT t.lap_id, AVG(t.speed) AS avg_speed, MAX(t.speed) AS top_speed,
+               AVG(t.gear) AS avg_gear, AVG(t.rpm) AS avg_rpm
+        FROM telemetry t
+        JOIN laps l ON t.lap_id = l.lap_id
+        WHERE l.session_id = %s
+        GROUP BY t.lap_id
+    """, ("session_id",)),
+    "speed_distribution": ("""
+        SELECT t.speed, l.lap_number
+        FROM telemetry t
+        JOIN laps l ON t.lap_id = l.lap_id
+        WHERE l.session_id = %s AND t.speed > 0
+    """, ("session_id",)),
+    "training_extract": (TRAINING_QUERY, ()),
+}
+
+COMPOUNDS = ["Soft", "Medium", "Hard"]
+TRACKS = ["Silverstone", "Monza", "Spa", "Sakhir", "Suzuka", "Interlagos"]
+
+
+def seed_synthetic(conn, sessions=40, laps=55, samples=40, seed=7):
+    """Fill an empty database with generated sessions, laps and telemetry."""
+    rng = random.Random(seed)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO drivers (driver_id, driver_code, driver_name) VALUES (%s, %s, %s)",
+                (44, "HAM", "Lewis Hamilton"))
+    lap_id = telem_id = 0
+    now = datetime.now()
+    for sid in range(1, sessions + 1):
+        day = date(2018 + sid % 7, 3 + sid % 9, 1 + sid % 27)
+        cur.execute(
+            "INSERT INTO sessions (session_id, driver_id, track_name, session_type, weather, date) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (sid, 44, TRACKS[sid % len(TRACKS)], "Race", "Dry", day))
+        lap_rows, telem_rows, events = [], [], []
+        for n in range(1, laps + 1):
+            lap_id += 1
+            lap_rows.append((lap_id, 44, sid, n, int(rng.gauss(92000, 1500)),
+                             COMPOUNDS[n * 3 // (laps + 1)], n % 20 + 1, 100.0 - n, 1,
+                             now - timedelta(seconds=laps - n) if sid == sessions else None))
+            for _ in range(samples):
+                telem_id += 1
+                telem_rows.append((telem_id, lap_id, rng.randint(80, 330), rng.random(),
+                                   rng.random() * 0.2, rng.randint(1, 8),
+                                   rng.randint(8000, 12500), rng.randint(0, 1)))
+            if n % 20 == 0:
+                events.append((lap_id, "PitStop", 22.0))
+        cur.executemany(
+            "INSERT INTO laps (lap_id, driver_id, session_id, lap_number, lap_time_ms, "
+            "tyre_compound, tyre_age, fuel_load, is_valid, captured_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", lap_rows)
+        cur.executemany(
+            "INSERT INTO telemetry (telemetry_id, lap_id, speed, throttle, brake, gear, rpm, drs) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", telem_rows)
+        cur.executemany(
+            "INSERT INTO strategy_events (lap_id, event_type, duration_sec) VALUES (%s, %s, %s)",
+            events)
+    conn.commit()
+    cur.close()
+
+
+def query_params(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT MAX(session_id) FROM sessions")
+    session_id = cur.fetchone()[0]
+    cur.close()
+    return {
+        "limit": 50,
+        "offset": 0,
+        "session_id": session_id,
+        "cutoff": (datetime.now() - timedelta(minutes=10)).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def time_queries(conn, repeat):
+    params = query_params(conn)
+    results = {}
+    for name, (sql, names) in HOT_QUERIES.items():
+        args = tuple(params[n] for n in names)
+        samples = []
+        for i in range(repeat + 1):
+            cur = conn.cursor()
+            start = time.perf_counter()
+            cur.execute(sql, args)
+            rows = cur.fetchall()
+            elapsed = (time.perf_counter() - start) * 1000
+            cur.close()
+            if i:                       # first run is the warm-up
+                samples.append(elapsed)
+        samples.sort()
+        results[name] = (statistics.median(samples),
+                         samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+                         len(rows))
+    return results
+
+
+def open_backends(args):
+    """(name, connection) for every backend that can be opened."""
+    opened = []
+    try:
+        opened.append(("mysql", config.connect_backend("mysql")))
+    except Exception as exc:
+        print(f"[SKIP] mysql: {exc}")
+
+    if args.synthetic:
+        path = Path(tempfile.mkdtemp()) / "benchmark.sqlite3"
+        conn = connect_sqlite(path)
+        print(f"[INFO] Seeding synthetic SQLite database: {path}")
+        seed_synthetic(conn, sessions=args.sessions)
+    else:
+        path = config.DB_PATH
+        conn = connect_sqlite(path)
+    opened.append(("sqlite", conn))
+
+    try:
+        opened.append(("duckdb", connect_duckdb_analytics("sqlite", path)))
+    except Exception as exc:
+        print(f"[SKIP] duckdb: {exc}")
+    return opened
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot queries per storage backend.")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query (default 20)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="benchmark SQLite/DuckDB on a generated database instead of DB_PATH")
+    parser.add_argument("--sessions", type=int, default=40,
+                        help="sessions to generate with --synthetic (default 40)")
+    args = parser.parse_args()
+
+    backends = open_backends(args)
+    timings = {}
+    for name, conn in backends:
+        try:
+            timings[name] = time_queries(conn, args.repeat)
+        except Exception as exc:
+            print(f"[SKIP] {name}: {exc}")
+        finally:
+            conn.close()
+
+    names = list(timings)
+    print("\n" + "=" * (22 + 24 * len(names)))
+    print(f"{'query':<22}" + "".join(f"{n + ' median/p95 ms':>24}" for n in names))
+    print("=" * (22 + 24 * len(names)))
+    for query in HOT_QUERIES:
+        cells = []
+        for n in names:
+            med, p95, rows = timings[n][query]
+            cells.append(f"{med:9.2f} / {p95:7.2f} ({rows:>5})")
+        print(f"{query:<22}" + "".join(f"{c:>24}" for c in cells))
+    print("(rows returned in parentheses)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Latency benchmark for the head-to-head driver comparison (compare_drivers).
+
+Writes two synthetic per-driver models covering --tracks tracks and five
+compounds to a temporary directory and times compare_drivers with the
+models already in memory (a ModelRegistry), three ways:
+
+  * per-cell DataFrame -- the original pricing: a one-row feature
+                          DataFrame and one model.predict per (track,
+                          tyre, age) cell and driver;
+  * per-cell compiled  -- one compiled-model call per cell and driver;
+  * vectorised         -- the current driver_comparison.prediction_grid:
+                          one predict per model over the whole grid.
+
+Each variant's JSON is checked against the vectorised one.  --model forest
+uses RandomForest driver models (the generic one-matrix path) instead of
+LinearRegression.  Each variant runs --repeat times after one warm-up; the
+median and p95 are reported in milliseconds.
+
+Run:  python scripts/benchmark_comparison.py --tracks 30
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import driver_comparison as dc
+from compiled_model import compile_model
+from feature_pipeline import construct_prediction_input
+
+COMPOUNDS = ("Soft", "Medium", "Hard", "Intermediate", "Wet")
+
+
+def write_driver(root, code, pace, tracks, kind, seed):
+    """A per-driver model fitted on generated laps over ``tracks``."""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+
+    rng = np.random.default_rng(seed)
+    feature_names = (["tyre_age"] + [f"tyre_{c}" for c in COMPOUNDS]
+                     + [f"track_{t}" for t in tracks])
+    rows, y = [], []
+    for t, track in enumerate(tracks):
+        for c, compound in enumerate(COMPOUNDS):
+            for age in range(0, 30, 3):
+                row = dict.fromkeys(feature_names, 0)
+                row.update({"tyre_age": age, f"tyre_{compound}": 1, f"track_{track}": 1})
+                rows.append(row)
+                y.append(pace + t + 0.4 * c + 0.05 * age + rng.normal(0, 0.2))
+    X = pd.DataFrame(rows)[feature_names]
+    model = (RandomForestRegressor(n_estimators=50, random_state=seed) if kind == "forest"
+             else LinearRegression()).fit(X, np.array(y))
+    ddir = root / code
+    ddir.mkdir(parents=True)
+    joblib.dump(model, ddir / "best_model.pkl")
+    joblib.dump(feature_names, ddir / "feature_names.pkl")
+    (ddir / "model_info.json").write_text(json.dumps({"driver": {"code": code, "name": code}}))
+
+
+def per_cell_grid(predict_cell):
+    """A prediction_grid stand-in that predicts cell by cell."""
+    def grid(model, feature_names, tracks, tyres, ages):
+        return np.array([[[predict_cell(model, feature_names, track, tyre, age)
+                           for age in ages] for tyre in tyres] for track in tracks])
+    return grid
+
+
+def dataframe_cell(model, feature_names, track, tyre, age):
+    return float(model.predict(construct_prediction_input(age, 0, tyre, track, feature_names))[0])
+
+
+def compiled_cell(model, feature_names, track, tyre, age):
+    return float(compile_model(model, feature_names).predict(age, tyre, track))
+
+
+def time_variant(registry, repeat):
+    def run():
+        return dc.compare_drivers("AAA", "BBB", registry=registry)
+
+    result = run()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return statistics.median(samples), p95, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--tracks", type=int, default=30)
+    parser.add_argument("--model", choices=("linear", "forest"), default="linear")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tracks = [f"Track {i:02d}" for i in range(args.tracks)]
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_driver(root, "AAA", 90.0, tracks, args.model, 1)
+        write_driver(root, "BBB", 90.3, tracks, args.model, 2)
+        registry = dc.ModelRegistry(root, recheck_seconds=3600)
+        cells = args.tracks * len(COMPOUNDS) * len(dc.DEFAULT_AGES)
+        print(f"{args.model} models, {args.tracks} shared tracks x {len(COMPOUNDS)} tyres x "
+              f"{len(dc.DEFAULT_AGES)} ages = {cells} cells per driver")
+
+        fast = time_variant(registry, args.repeat)
+        variants = [("per-cell DataFrame", per_cell_grid(dataframe_cell)),
+                    ("per-cell compiled", per_cell_grid(compiled_cell))]
+        print(f"{'variant':<20}{'median ms':>11}{'p95 ms':>9}  same JSON")
+        for name, grid in variants:
+            repeat = max(3, args.repeat // 5) if name == "per-cell DataFrame" else args.repeat
+            with patch.object(dc, "prediction_grid", grid):
+                median, p95, result = time_variant(registry, repeat)
+            print(f"{name:<20}{median:>11.1f}{p95:>9.1f}  {result == fast[2]}")
+        print(f"{'vectorised':<20}{fast[0]:>11.1f}{fast[1]:>9.1f}  -")
+
+
+if __name__ == "__main__":
+    main()
@@ -29,7 +29,7 @@ from sklearn.model_selection import GroupShuffleSplit, train_test_split
 warnings.filterwarnings("ignore")
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
-from config import get_db_connection
+from config import get_analytics_connection
 
 # Mirrors ml_lap_predictions.TRAINING_QUERY (NULL-safe pit-event filter).
 TRAINING_QUERY = """
@@ -65,7 +65,7 @@ TYRE_COLS = ["tyre_Medium", "tyre_Soft", "tyre_Intermediate"]  # Hard = base
 
 def load_cleaned():
     """Same cleaning as the trainer: warm-up laps, SC/VSC/red-flag laps."""
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     df = pd.read_sql(TRAINING_QUERY, conn)
     conn.close()
 
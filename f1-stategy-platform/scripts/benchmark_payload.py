@@ -0,0 +1,112 @@
+"""Payload size / latency benchmark for the race overlay (/api/comparison/race).
+
+Builds a --drivers driver, --laps lap race (every lap with telemetry
+aggregates) in a temporary embedded SQLite database and requests the full
+overlay through Flask's test client, once per combination of
+
+  * shape     -- the default per-lap rows, or ?format=columnar;
+  * encoding  -- identity, gzip or deflate (Accept-Encoding).
+
+Reports the bytes on the wire, the median server time per request (query,
+encoding, compression) and the transfer time those bytes take on a
+--mbps link.  Each case runs --repeat times after one warm-up.
+
+Run:  python scripts/benchmark_payload.py --drivers 20 --laps 57 --mbps 5
+"""
+
+import argparse
+import datetime
+import json
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+import dashboard
+import db_backends
+
+COMPOUNDS = ("Soft", "Medium", "Hard")
+
+
+def build_race(conn, drivers, laps, seed=0):
+    """One race session per driver at Monza 2024, two stints each."""
+    rng = np.random.default_rng(seed)
+    cur = conn.cursor()
+    for d in range(drivers):
+        driver_id = 100 + d
+        cur.execute("INSERT INTO drivers (driver_id, driver_code, driver_name) "
+                    "VALUES (%s, %s, %s)", (driver_id, f"D{d:02d}", f"Driver {d:02d}"))
+        cur.execute("INSERT INTO sessions (driver_id, track_name, session_type, date) "
+                    "VALUES (%s, 'Monza', 'Race', %s)", (driver_id, datetime.date(2024, 9, 1)))
+        session_id = cur.lastrowid
+        stop = int(rng.integers(laps // 3, 2 * laps // 3))
+        for lap in range(1, laps + 1):
+            stint = 0 if lap <= stop else 1
+            age = lap if stint == 0 else lap - stop
+            cur.execute("INSERT INTO laps (driver_id, session_id, lap_number, lap_time_ms, "
+                        "tyre_compound, tyre_age, is_valid) VALUES (%s, %s, %s, %s, %s, %s, 1)",
+                        (driver_id, session_id, lap, int(81_500 + 40 * age + rng.normal(0, 300)),
+                         COMPOUNDS[(d + stint) % 3], age))
+            cur.execute("INSERT INTO lap_telemetry_stats (lap_id, samples, avg_speed, top_speed, "
+                        "avg_gear, avg_rpm) VALUES (%s, 400, %s, %s, %s, %s)",
+                        (cur.lastrowid, rng.normal(250, 3), int(rng.normal(330, 4)),
+                         rng.normal(6.4, 0.1), rng.normal(10_900, 150)))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--laps", type=int, default=57)
+    parser.add_argument("--mbps", type=float, default=5.0,
+                        help="link throughput for the transfer-time column")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "f1.sqlite3"
+        conn = db_backends.connect_sqlite(path)
+        build_race(conn, args.drivers, args.laps)
+        conn.close()
+        patch.object(dashboard, "get_db_connection",
+                     side_effect=lambda: db_backends.connect_sqlite(path)).start()
+        client = dashboard.app.test_client()
+        codes = ",".join(f"D{d:02d}" for d in range(args.drivers))
+        base = f"/api/comparison/race?year=2024&track=Monza&drivers={codes}"
+
+        reference = client.get(base).get_json()
+        assert len(reference["drivers"]) == args.drivers, reference
+        print(f"{args.drivers} drivers x {args.laps} laps, transfer at {args.mbps:g} Mbit/s")
+        print(f"{'shape':<10}{'encoding':<10}{'bytes':>10}{'vs rows':>9}"
+              f"{'server ms':>11}{'transfer ms':>13}")
+        baseline = None
+        for shape, url in (("rows", base), ("columnar", base + "&format=columnar")):
+            for encoding in ("identity", "gzip", "deflate"):
+                headers = {"Accept-Encoding": encoding}
+                resp = client.get(url, headers=headers)
+                size = len(resp.data)
+                assert resp.headers.get("Content-Encoding", "identity") == encoding
+                if shape == "rows":
+                    body = resp.data if encoding == "identity" else zlib.decompress(
+                        resp.data, 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+                    assert json.loads(body) == reference
+                samples = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    client.get(url, headers=headers)
+                    samples.append((time.perf_counter() - start) * 1000)
+                baseline = baseline or size
+                transfer = size * 8 / (args.mbps * 1e6) * 1000
+                print(f"{shape:<10}{encoding:<10}{size:>10,}{size / baseline:>9.2f}"
+                      f"{statistics.median(samples):>11.1f}{transfer:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
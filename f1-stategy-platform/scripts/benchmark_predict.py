@@ -0,0 +1,94 @@
+"""Throughput benchmark for lap-time prediction over HTTP (/api/predict).
+
+Times, through Flask's test client (JSON parsing, validation, prediction
+and encoding; no network):
+
+  * single  -- one /api/predict request per row, the way the
+               race-engineering scripts used to loop;
+  * batch   -- /api/predict/batch with --rows rows per request, sent as a
+               list of row objects and as columnar arrays.
+
+Rows are random (age, lap, compound, track) draws over the model's
+coverage.  Uses the deployed model when ml_models/ has one, otherwise (or
+with --synthetic) benchmark_advisor's synthetic LinearRegression.  Each
+case runs --repeat times after one warm-up; the median is reported as
+rows/s.
+
+Run:  python scripts/benchmark_predict.py --synthetic --rows 10000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+import dashboard
+from benchmark_advisor import synthetic_model
+from feature_pipeline import covered_tracks, covered_tyres
+
+
+def sample_rows(n, feature_names, seed=0):
+    rng = np.random.default_rng(seed)
+    tyres, tracks = covered_tyres(feature_names), covered_tracks(feature_names)
+    return [{"tyre_age": int(rng.integers(0, 40)), "lap_number": int(rng.integers(1, 70)),
+             "tyre_compound": tyres[rng.integers(len(tyres))],
+             "track_name": tracks[rng.integers(len(tracks))]} for _ in range(n)]
+
+
+def median_seconds(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--single-rows", type=int, default=500,
+                        help="rows timed one request at a time (slow path)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--synthetic", action="store_true")
+    args = parser.parse_args()
+
+    if args.synthetic or dashboard.model is None:
+        model, feature_names = synthetic_model()
+        patch.object(dashboard, "model", model).start()
+        patch.object(dashboard, "feature_names", feature_names).start()
+    patch.object(dashboard, "PREDICT_BATCH_MAX_ROWS", max(args.rows, 1)).start()
+    patch.object(dashboard, "PREDICT_BATCH_MAX_BYTES", 1 << 30).start()
+    client = dashboard.app.test_client()
+
+    rows = sample_rows(args.rows, dashboard.feature_names)
+    columns = {f: [r[f] for r in rows] for f in dashboard.PREDICT_FIELDS}
+
+    def single():
+        for row in rows[:args.single_rows]:
+            client.post("/api/predict", json=row)
+
+    def batch(body):
+        def run():
+            data = client.post("/api/predict/batch", json=body).get_json()
+            assert data["predicted"] == len(rows), data["errors"][:3]
+        return run
+
+    print(f"{type(dashboard.model).__name__}, {len(rows)} rows per batch request")
+    print(f"{'request':<22}{'median ms':>12}{'rows/s':>14}")
+    for name, fn, n in (("single (/api/predict)", single, min(args.single_rows, len(rows))),
+                        ("batch, row objects", batch(rows), len(rows)),
+                        ("batch, columnar", batch(columns), len(rows))):
+        seconds = median_seconds(fn, args.repeat)
+        print(f"{name:<22}{seconds * 1000:>12.1f}{n / seconds:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Throughput benchmark for the Monte Carlo race simulator (race_simulation).
+
+Builds lap-time tables from a synthetic linear model (benchmark_advisor's
+20-track, 8-compound fit), takes the optimizer's top --plans plans for a
+70-lap race with 50 laps to go, and simulates them under a fixed,
+illustrative neutralisation profile (0.6 Safety Cars, 0.5 VSCs and 0.05
+red flags per race).
+
+For each --workers count the simulation of --rollouts races runs --repeat
+times after one warm-up; the median wall time and the throughput in
+rollouts/s (every plan priced on every rollout) are reported.  Worker
+processes only pay off once the rollouts outweigh the pool start-up, and
+never beyond the machine's cores.
+
+Run:  python scripts/benchmark_simulation.py --rollouts 20000 --workers 1 2 4
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_advisor import synthetic_model
+from compiled_model import compile_model
+from pit_strategy import WET_COMPOUNDS, lap_time_tables, optimal_strategies
+from race_simulation import EventRates, simulate
+
+TOTAL_LAPS, LAPS_LEFT, TYRE, AGE = 70, 50, "Medium", 12
+RATES = EventRates({"SafetyCar": 0.6, "VSC": 0.5, "RedFlag": 0.05},
+                   {"SafetyCar": 4, "VSC": 2, "RedFlag": 1}, races=1, source="synthetic")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rollouts", type=int, default=20000)
+    parser.add_argument("--plans", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    model, feature_names = synthetic_model()
+    compounds = [c[len("tyre_"):] for c in feature_names
+                 if c.startswith("tyre_") and c[len("tyre_"):] not in WET_COMPOUNDS]
+    tables = lap_time_tables(compile_model(model, feature_names), compounds, "Track 03",
+                             AGE + LAPS_LEFT)
+    plans = optimal_strategies(tables, LAPS_LEFT, TYRE, AGE, pit_loss=25, top_k=args.plans)
+
+    print(f"{len(plans)} plans, {LAPS_LEFT} laps to go, {args.rollouts} rollouts, "
+          f"{os.cpu_count()} CPU(s)")
+    print(f"{'workers':>8} {'median ms':>10} {'p95 ms':>8} {'rollouts/s':>12}")
+    for workers in args.workers:
+        def run():
+            return simulate(tables, plans, LAPS_LEFT, TOTAL_LAPS, TYRE, AGE, RATES,
+                            rollouts=args.rollouts, seed=1, workers=workers)
+
+        result = run()
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        median = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+        print(f"{workers:>8} {median * 1000:>10.1f} {p95 * 1000:>8.1f} "
+              f"{args.rollouts / median:>12,.0f}")
+
+    print("\nwin probability by plan (last run):")
+    for plan in result["strategies"]:
+        print(f"  {' → '.join(plan['compounds']):<40} pit after {plan['pit_after']!s:<12} "
+              f"clean {plan['total_time']:9.1f}  mean {plan['mean']:9.1f}  "
+              f"win {plan['win_probability']:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
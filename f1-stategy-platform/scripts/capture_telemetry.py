@@ -41,6 +41,13 @@ from import_f1_race import (
     normalize_compound,
     get_or_create_track,
 )
+from session_archive import archive_session
+from summary_tables import (
+    refresh_data_version,
+    refresh_lap_telemetry_stats,
+    refresh_live_state,
+    refresh_session_stats,
+)
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -388,6 +395,7 @@ def insert_session(conn, track_id: int, track_name: str,
          datetime.now().date(), driver_id),
     )
     session_id = cursor.lastrowid
+    refresh_session_stats(cursor, session_id)
     conn.commit()
     cursor.close()
     print(f"[SESSION] Created ID={session_id}, Track={track_name}, "
@@ -404,21 +412,41 @@ def insert_lap(conn, session_id: int, lap_number: int, lap_time_ms: int,
     data (game UDP or a live feed).  Historical FastF1 imports never call
     this function, so their laps keep captured_at NULL and are never
     treated as live by the dashboard.
+
+    (session_id, lap_number) is unique: a lap number seen again (flashback,
+    capture restart) restarts that lap's row instead of failing the insert,
+    and the samples of the abandoned attempt are dropped with it.
     """
     if captured_at is None:
         captured_at = datetime.now()
     cursor = conn.cursor()
+    cursor.execute(
+        """
+        DELETE FROM telemetry WHERE lap_id IN
+          (SELECT lap_id FROM laps WHERE session_id = %s AND lap_number = %s)
+        """,
+        (session_id, lap_number),
+    )
     cursor.execute(
         """
         INSERT INTO laps
           (session_id, driver_id, lap_number, lap_time_ms,
            tyre_compound, tyre_age, fuel_load, is_valid, captured_at)
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+          lap_id        = LAST_INSERT_ID(lap_id),
+          lap_time_ms   = VALUES(lap_time_ms),
+          tyre_compound = VALUES(tyre_compound),
+          tyre_age      = VALUES(tyre_age),
+          fuel_load     = VALUES(fuel_load),
+          is_valid      = VALUES(is_valid),
+          captured_at   = VALUES(captured_at)
         """,
         (session_id, driver_id, lap_number, lap_time_ms,
          tyre_compound, tyre_age, fuel_load, 1 if is_valid else 0, captured_at),
     )
     lap_id = cursor.lastrowid
+    refresh_session_stats(cursor, session_id)
     conn.commit()
     cursor.close()
     return lap_id
@@ -426,10 +454,19 @@ def insert_lap(conn, session_id: int, lap_number: int, lap_time_ms: int,
 
 def update_lap_time(conn, lap_id: int, lap_time_ms: int, is_valid: bool) -> None:
     cursor = conn.cursor()
+    cursor.execute("SELECT session_id FROM laps WHERE lap_id = %s", (lap_id,))
+    row = cursor.fetchone()
     cursor.execute(
         "UPDATE laps SET lap_time_ms = %s, is_valid = %s WHERE lap_id = %s",
         (lap_time_ms, 1 if is_valid else 0, lap_id),
     )
+    if row:
+        refresh_session_stats(cursor, row[0])
+    # Every sample of the lap is queued before its completion, so the
+    # tooltip aggregates are final now.
+    refresh_lap_telemetry_stats(cursor, [lap_id])
+    # The completed lap is now this rig's live-card lap.
+    refresh_live_state(cursor, lap_id)
     conn.commit()
     cursor.close()
 
@@ -447,18 +484,27 @@ def insert_telemetry(conn, lap_id: int, speed: int, throttle: float,
 
 
 def insert_strategy_event(conn, lap_id: int | None,
-                          event_type: str, duration_sec: float) -> None:
+                          event_type: str, duration_sec: float,
+                          session_id: int | None = None) -> None:
     """Insert a strategy_events row.
 
     lap_id may be None for session-wide events (RedFlag, SafetyCar, VSC)
-    that should not be pinned to one driver's lap.  The schema allows NULL.
+    that should not be pinned to one driver's lap.  The schema allows NULL;
+    session_id still ties them to their race (lap-linked events take it
+    from the lap).
     """
     cursor = conn.cursor()
+    if lap_id is not None:
+        cursor.execute("SELECT session_id FROM laps WHERE lap_id = %s", (lap_id,))
+        row = cursor.fetchone()
+        session_id = row[0] if row else session_id
     cursor.execute(
-        "INSERT INTO strategy_events (lap_id, event_type, duration_sec) "
-        "VALUES (%s, %s, %s)",
-        (lap_id, event_type, duration_sec),
+        "INSERT INTO strategy_events (lap_id, session_id, event_type, duration_sec) "
+        "VALUES (%s, %s, %s, %s)",
+        (lap_id, session_id, event_type, duration_sec),
     )
+    # Pit stops are flagged in the session's lap table (dashboard cache).
+    refresh_data_version(cursor, [session_id] if session_id is not None else [])
     conn.commit()
     cursor.close()
     print(f"[EVENT] {event_type} logged "
@@ -489,7 +535,7 @@ def db_worker(db_queue: queue.Queue, stop_event: threading.Event,
                         tyre_age, fuel_load, is_valid, driver_id, res_holder)
     ('update_lap_time', lap_id, lap_time_ms, is_valid)
     ('insert_telemetry',lap_id, speed, throttle, brake, gear, rpm, drs)
-    ('insert_strategy_event', lap_id, event_type, duration_sec)
+    ('insert_strategy_event', lap_id, event_type, duration_sec, session_id)
     """
     conn = None
     try:
@@ -504,6 +550,8 @@ def db_worker(db_queue: queue.Queue, stop_event: threading.Event,
         cursor.close()
         print(f"[DB] Track resolved: '{canonical_track}' (track_id={track_id})")
 
+        session_ids = []
+        open_laps = set()       # inserted, not yet completed
         while not stop_event.is_set() or not db_queue.empty():
             try:
                 task = db_queue.get(timeout=0.1)
@@ -518,6 +566,7 @@ def db_worker(db_queue: queue.Queue, stop_event: threading.Event,
                     conn, track_id, canonical_track,
                     session_type, weather, driver_id,
                 )
+                session_ids.append(res_holder["session_id"])
             elif action == "insert_lap":
                 _, session_id, lap_number, lap_time_ms, compound, \
                     tyre_age, fuel_load, is_valid, driver_id, res_holder = task
@@ -525,18 +574,31 @@ def db_worker(db_queue: queue.Queue, stop_event: threading.Event,
                     conn, session_id, lap_number, lap_time_ms,
                     compound, tyre_age, fuel_load, is_valid, driver_id,
                 )
+                open_laps.add(res_holder["lap_id"])
             elif action == "update_lap_time":
                 _, lap_id, lap_time_ms, is_valid = task
                 update_lap_time(conn, lap_id, lap_time_ms, is_valid)
+                open_laps.discard(lap_id)
             elif action == "insert_telemetry":
                 _, lap_id, speed, throttle, brake, gear, rpm, drs = task
                 insert_telemetry(conn, lap_id, speed, throttle, brake, gear, rpm, drs)
             elif action == "insert_strategy_event":
-                _, lap_id, event_type, duration_sec = task
-                insert_strategy_event(conn, lap_id, event_type, duration_sec)
+                _, lap_id, event_type, duration_sec, session_id = task
+                insert_strategy_event(conn, lap_id, event_type, duration_sec, session_id)
 
             db_queue.task_done()
 
+        # Capture finished cleanly: aggregate the telemetry of laps cut off
+        # mid-lap, then snapshot each session's columns for the analysis
+        # scripts (see session_archive).
+        if open_laps:
+            cursor = conn.cursor()
+            refresh_lap_telemetry_stats(cursor, sorted(open_laps))
+            conn.commit()
+            cursor.close()
+        for session_id in session_ids:
+            archive_session(conn, session_id)
+
     except Exception as exc:
         print(f"[DB WORKER ERROR] {exc}")
         # Record the death so the capture loop can fail fast instead of
@@ -994,11 +1056,12 @@ def main() -> None:
                 )
                 for event_type, duration_sec in events:
                     # PitStop is driver-specific → link to lap_id.
-                    # SC / VSC / RedFlag are session-wide → store with lap_id=None.
+                    # SC / VSC / RedFlag are session-wide → store with lap_id=None
+                    # (session_id still records the race).
                     use_lap_id = current_lap_id if event_type == "PitStop" else None
                     db_queue.put((
                         "insert_strategy_event",
-                        use_lap_id, event_type, duration_sec,
+                        use_lap_id, event_type, duration_sec, current_session_id,
                     ))
 
                 # Reset lap state
@@ -31,6 +31,7 @@ from collections import defaultdict
 from typing import Any, Dict, List, Tuple
 
 from config import get_db_connection
+from summary_tables import refresh_data_version
 
 # Anything shorter than this is the known 2.3 s glitch, not a wheel change.
 PIT_MIN_DURATION_S = 15.0
@@ -180,10 +181,13 @@ def apply_fixes(conn) -> Dict[str, Any]:
     for m in inc["missing"]:
         # The stop happened; only the box duration is unknown.
         cur.execute(
-            "INSERT INTO strategy_events (lap_id, event_type, duration_sec) "
-            "VALUES (%s, 'PitStop', NULL)",
-            (m["lap_id"],),
+            "INSERT INTO strategy_events (lap_id, session_id, event_type, duration_sec) "
+            "VALUES (%s, %s, 'PitStop', NULL)",
+            (m["lap_id"], m["session_id"]),
         )
+    if inc["spurious"] or inc["phantoms"] or inc["missing"]:
+        # Pit flags changed across sessions: drop every cached answer.
+        refresh_data_version(cur)
     conn.commit()
     return inc
 
@@ -0,0 +1,321 @@
+"""Telemetry retention: downsample, then drop, the raw samples of old sessions.
+
+The telemetry table only grows, yet nothing reads old sessions at full
+resolution -- the dashboard tooltips use lap_telemetry_stats and whole-
+session analytics the columnar archive.  Sessions age through three
+retention levels (age = days since sessions.date):
+
+  full         younger than --full-days: untouched;
+  downsampled  younger than --aggregate-days: each lap keeps at most
+               --grid samples, evenly spaced over the lap;
+  aggregated   older: raw samples deleted, only the per-lap
+               lap_telemetry_stats row is kept.
+
+The telemetry table stores no timestamp or distance per sample, but
+samples are written in lap order at a fixed rate (capture: every
+TELEMETRY_SAMPLE_RATE-th packet; import: evenly strided), so keeping
+evenly spaced telemetry_ids per lap is a fixed time grid.
+
+Before any sample of a lap is deleted its lap_telemetry_stats row is
+computed from the full data and tagged with the new retention level, so
+the aggregates are never re-derived from what remains.  The batch also
+bumps its sessions' data_version, which retires their cached dashboard
+answers and columnar archives.
+
+Work runs in bounded batches -- --batch-laps laps per transaction, deletes
+of at most --delete-chunk rows per statement -- and sleeps between them so
+DB work takes at most --duty of the wall time; it can run during a live
+capture (whose session is always 'full') without stalling its writes.
+
+Run without --apply for a dry-run report of what would be reclaimed:
+
+    python scripts/compact_telemetry.py
+    python scripts/compact_telemetry.py --apply --full-days 14 --grid 20
+
+Deleted rows free pages for reuse; to return them to the filesystem run
+OPTIMIZE TABLE telemetry (MySQL) or VACUUM (SQLite) afterwards.
+"""
+
+import argparse
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from config import get_db_connection
+from summary_tables import refresh_data_version, write_lap_telemetry_stats
+
+DEFAULT_FULL_DAYS = 30
+DEFAULT_AGGREGATE_DAYS = 180
+DEFAULT_GRID = 10
+DEFAULT_BATCH_LAPS = 200
+DEFAULT_DELETE_CHUNK = 2000
+DEFAULT_DUTY = 0.5
+
+# Fallback on-disk size of one telemetry row (7 narrow columns plus the
+# lap_id index entry) when the engine cannot report an average.
+TELEMETRY_ROW_BYTES = 48
+
+LEVELS = ("full", "downsampled", "aggregated")
+
+
+# ---------------------------------------------------------------------------
+# Pure policy logic (no DB) -- unit-testable.
+# ---------------------------------------------------------------------------
+
+def retention_level(session_date, full_days: int, aggregate_days: int,
+                    today: Optional[date] = None) -> str:
+    """Retention level of a session dated ``session_date``."""
+    if session_date is None:
+        return "full"
+    if isinstance(session_date, datetime):
+        session_date = session_date.date()
+    age = ((today or date.today()) - session_date).days
+    if age >= aggregate_days:
+        return "aggregated"
+    if age >= full_days:
+        return "downsampled"
+    return "full"
+
+
+def downsample_keep(telemetry_ids: List[int], grid: int) -> List[int]:
+    """The ``grid`` evenly spaced samples (first and last included) to keep
+    out of one lap's ``telemetry_ids`` (in lap order)."""
+    n = len(telemetry_ids)
+    if n <= grid:
+        return list(telemetry_ids)
+    if grid <= 0:
+        return []
+    picks = np.unique(np.round(np.linspace(0, n - 1, grid)).astype(int))
+    return [telemetry_ids[i] for i in picks]
+
+
+class Throttle:
+    """Duty-cycle pacing: after ``work_s`` seconds of DB work, sleep long
+    enough that work takes at most ``duty`` of the wall time."""
+
+    def __init__(self, duty: float = DEFAULT_DUTY, sleep=time.sleep) -> None:
+        self.duty = min(1.0, max(0.01, duty))
+        self.slept_s = 0.0
+        self._sleep = sleep
+
+    def pace(self, work_s: float) -> None:
+        pause = work_s * (1.0 - self.duty) / self.duty
+        if pause > 0:
+            self._sleep(pause)
+            self.slept_s += pause
+
+
+# ---------------------------------------------------------------------------
+# DB work
+# ---------------------------------------------------------------------------
+
+def telemetry_row_bytes(conn) -> int:
+    """Average stored size of a telemetry row (engine estimate or fallback)."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT AVG_ROW_LENGTH FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'telemetry'"
+        )
+        row = cur.fetchone()
+        if row and row[0]:
+            return int(row[0])
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+    finally:
+        cur.close()
+    return TELEMETRY_ROW_BYTES
+
+
+def plan_laps(conn, full_days: int, aggregate_days: int, grid: int,
+              today: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Laps with raw telemetry left to compact, oldest session first.
+
+    Each entry: lap_id, session_id, level, samples, drop (rows to delete).
+    """
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute("""
+            SELECT s.session_id, s.date, l.lap_id, COUNT(t.telemetry_id) AS samples
+            FROM sessions s
+            JOIN laps l ON l.session_id = s.session_id
+            JOIN telemetry t ON t.lap_id = l.lap_id
+            WHERE s.date IS NOT NULL AND s.date <= %s
+            GROUP BY s.session_id, s.date, l.lap_id
+            ORDER BY s.date, s.session_id, l.lap_id
+        """, (_cutoff(today, full_days),))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    plan = []
+    for r in rows:
+        level = retention_level(r["date"], full_days, aggregate_days, today)
+        samples = int(r["samples"])
+        drop = samples if level == "aggregated" else max(0, samples - grid)
+        if level != "full" and drop:
+            plan.append({"lap_id": r["lap_id"], "session_id": r["session_id"],
+                         "level": level, "samples": samples, "drop": drop})
+    return plan
+
+
+def _cutoff(today: Optional[date], full_days: int) -> date:
+    return date.fromordinal((today or date.today()).toordinal() - full_days)
+
+
+def _compact_batch(conn, batch: List[Dict[str, Any]], grid: int,
+                   delete_chunk: int, throttle: Throttle) -> int:
+    """Aggregate, tag and thin one batch of laps; returns rows deleted."""
+    cur = conn.cursor()
+    try:
+        started = time.perf_counter()
+        lap_ids = [lap["lap_id"] for lap in batch]
+        write_lap_telemetry_stats(cur, lap_ids)
+        for level in ("downsampled", "aggregated"):
+            ids = [lap["lap_id"] for lap in batch if lap["level"] == level]
+            if ids:
+                cur.execute(
+                    f"UPDATE lap_telemetry_stats SET retention = %s "
+                    f"WHERE lap_id IN ({', '.join(['%s'] * len(ids))})",
+                    (level, *ids),
+                )
+        # Cached answers and session archives of these sessions are stale.
+        refresh_data_version(cur, sorted({lap["session_id"] for lap in batch}))
+        cur.execute(
+            f"SELECT telemetry_id, lap_id FROM telemetry "
+            f"WHERE lap_id IN ({', '.join(['%s'] * len(lap_ids))}) "
+            f"ORDER BY lap_id, telemetry_id",
+            tuple(lap_ids),
+        )
+        by_lap: Dict[int, List[int]] = {}
+        for telemetry_id, lap_id in cur.fetchall():
+            by_lap.setdefault(lap_id, []).append(telemetry_id)
+        conn.commit()
+        throttle.pace(time.perf_counter() - started)
+
+        doomed: List[int] = []
+        for lap in batch:
+            ids = by_lap.get(lap["lap_id"], [])
+            keep = set(downsample_keep(ids, grid)) if lap["level"] == "downsampled" else set()
+            doomed.extend(i for i in ids if i not in keep)
+
+        deleted = 0
+        for pos in range(0, len(doomed), delete_chunk):
+            chunk = doomed[pos:pos + delete_chunk]
+            started = time.perf_counter()
+            cur.execute(
+                f"DELETE FROM telemetry WHERE telemetry_id IN ({', '.join(['%s'] * len(chunk))})",
+                tuple(chunk),
+            )
+            conn.commit()
+            deleted += len(chunk)
+            throttle.pace(time.perf_counter() - started)
+        return deleted
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def compact(conn, full_days: int = DEFAULT_FULL_DAYS,
+            aggregate_days: int = DEFAULT_AGGREGATE_DAYS, grid: int = DEFAULT_GRID,
+            apply: bool = False, batch_laps: int = DEFAULT_BATCH_LAPS,
+            delete_chunk: int = DEFAULT_DELETE_CHUNK, throttle: Optional[Throttle] = None,
+            today: Optional[date] = None) -> Dict[str, Any]:
+    """Apply (or, without ``apply``, only measure) the retention policy.
+
+    Returns the report: sessions / laps per level, rows and estimated bytes
+    reclaimed, batches run and time spent throttled.
+    """
+    if aggregate_days < full_days:
+        raise ValueError("aggregate_days must not be shorter than full_days")
+    throttle = throttle or Throttle()
+    started = time.perf_counter()
+    plan = plan_laps(conn, full_days, aggregate_days, grid, today)
+    row_bytes = telemetry_row_bytes(conn)
+
+    deleted = 0
+    batches = 0
+    if apply:
+        for pos in range(0, len(plan), batch_laps):
+            deleted += _compact_batch(conn, plan[pos:pos + batch_laps], grid,
+                                      delete_chunk, throttle)
+            batches += 1
+    rows = deleted if apply else sum(lap["drop"] for lap in plan)
+
+    return {
+        "applied": apply,
+        "policy": {"full_days": full_days, "aggregate_days": aggregate_days, "grid": grid},
+        "sessions": {level: len({lap["session_id"] for lap in plan if lap["level"] == level})
+                     for level in LEVELS[1:]},
+        "laps": {level: sum(1 for lap in plan if lap["level"] == level) for level in LEVELS[1:]},
+        "rows_reclaimed": rows,
+        "bytes_reclaimed": rows * row_bytes,
+        "batches": batches,
+        "throttled_s": round(throttle.slept_s, 3),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI entry point
+# ---------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(
+        description="Downsample / drop the raw telemetry of old sessions.")
+    ap.add_argument("--apply", action="store_true",
+                    help="compact the database (default: dry run)")
+    ap.add_argument("--full-days", type=int, default=DEFAULT_FULL_DAYS,
+                    help=f"keep full resolution this many days (default {DEFAULT_FULL_DAYS})")
+    ap.add_argument("--aggregate-days", type=int, default=DEFAULT_AGGREGATE_DAYS,
+                    help=f"after this many days keep only per-lap aggregates "
+                         f"(default {DEFAULT_AGGREGATE_DAYS})")
+    ap.add_argument("--grid", type=int, default=DEFAULT_GRID,
+                    help=f"samples per lap kept when downsampling (default {DEFAULT_GRID})")
+    ap.add_argument("--batch-laps", type=int, default=DEFAULT_BATCH_LAPS,
+                    help=f"laps per transaction (default {DEFAULT_BATCH_LAPS})")
+    ap.add_argument("--delete-chunk", type=int, default=DEFAULT_DELETE_CHUNK,
+                    help=f"rows per DELETE statement (default {DEFAULT_DELETE_CHUNK})")
+    ap.add_argument("--duty", type=float, default=DEFAULT_DUTY,
+                    help=f"max share of wall time spent in DB work (default {DEFAULT_DUTY})")
+    args = ap.parse_args(argv)
+
+    conn = get_db_connection()
+    try:
+        report = compact(conn, args.full_days, args.aggregate_days, args.grid,
+                         apply=args.apply, batch_laps=max(1, args.batch_laps),
+                         delete_chunk=max(1, args.delete_chunk),
+                         throttle=Throttle(args.duty))
+    finally:
+        conn.close()
+
+    print("=" * 60)
+    print("TELEMETRY RETENTION")
+    print("=" * 60)
+    print(f"  Policy: full {args.full_days}d, downsampled to {args.grid} samples/lap "
+          f"until {args.aggregate_days}d, then aggregates only")
+    for level in LEVELS[1:]:
+        print(f"  {level:<12}: {report['sessions'][level]:>5} sessions, "
+              f"{report['laps'][level]:>7} laps")
+    verb = "Reclaimed" if args.apply else "Would reclaim"
+    print(f"  {verb}: {report['rows_reclaimed']} rows, "
+          f"~{report['bytes_reclaimed'] / 1024 / 1024:.1f} MB")
+    if args.apply:
+        print(f"  {report['batches']} batches in {report['elapsed_s']:.1f}s "
+              f"({report['throttled_s']:.1f}s throttled)")
+    else:
+        print("\nDry run -- nothing changed. Re-run with --apply to compact.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""All-pairs driver comparison: every per-driver model against every other.
+
+A head-to-head (driver_comparison.compare_drivers) predicts two models on
+their shared (track, tyre, age) cells.  Ranking a grid that way means N^2
+requests that each redo the same predictions.  Here each driver's model
+predicts ONCE over the union of everyone's cells -- a
+(drivers, tracks, tyres, ages) tensor, NaN where a model has no feature
+for the track or tyre -- and every pairwise gap falls out of NumPy
+broadcasting:
+
+    gap[a, b]          mean over shared tracks of per_track[a, b, t]
+    per_track[a, b, t] mean over shared tyres and ages of P[a] - P[b]
+
+the same definition (and sign: positive means b is faster) as
+compare_drivers, with the same per-track paired t-test for significance.
+
+``python scripts/comparison_matrix.py build`` computes the matrix for the
+aggregate models and for every season with per-driver-per-year models
+(one process per season, across cores) and stores it as a compressed
+.npz; the dashboard serves any pair or the ranked grid from it
+(/api/drivers/matrix).  field_comparison() runs the same computation live
+for any set of drivers (/api/drivers/compare-field).
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from driver_comparison import (
+    COMPARISON_DIR,
+    DEFAULT_AGES,
+    _significance,
+    list_driver_models,
+    load_driver_model,
+    prediction_grid,
+)
+from feature_pipeline import covered_tracks, covered_tyres
+
+MATRIX_PATH = COMPARISON_DIR / 'driver_matrix.npz'
+
+# Significance labels as stored in the matrix ('' = not compared).
+LABELS = ('', 'insufficient', 'inconclusive', 'suggestive', 'significant')
+
+
+def prediction_tensor(models, ages=DEFAULT_AGES):
+    """(tensor, tracks, tyres) for ``models`` ([(model, feature_names)]).
+
+    tensor[d, t, c, k] is driver d's predicted lap time on tracks[t],
+    tyres[c] at ages[k]: one vectorised predict per model over the cells
+    it covers, NaN elsewhere.
+    """
+    tracks = sorted(set().union(*(covered_tracks(f) for _, f in models))) if models else []
+    tyres = sorted(set().union(*(covered_tyres(f) for _, f in models))) if models else []
+    ages = np.asarray(ages, dtype=float)
+    tensor = np.full((len(models), len(tracks), len(tyres), len(ages)), np.nan)
+    for d, (model, feats) in enumerate(models):
+        own_tracks, own_tyres = covered_tracks(feats), covered_tyres(feats)
+        t_idx = [tracks.index(t) for t in own_tracks]
+        c_idx = [tyres.index(c) for c in own_tyres]
+        tensor[d][np.ix_(t_idx, c_idx)] = prediction_grid(model, feats, own_tracks,
+                                                          own_tyres, ages)
+    return tensor, tracks, tyres
+
+
+def pairwise_gaps(tensor):
+    """(gap, per_track, shared_tracks) for every ordered driver pair.
+
+    gap[a, b] and per_track[a, b, t] are NaN where a and b share no
+    track (per_track: not this track); shared_tracks[a, b] counts them.
+    """
+    diff = tensor[:, None] - tensor[None, :]                 # (D, D, T, C, A)
+    valid = ~np.isnan(diff)
+    cells = valid.sum(axis=(3, 4))
+    with np.errstate(invalid='ignore'):
+        per_track = np.where(valid, diff, 0.0).sum(axis=(3, 4)) / cells
+    # A driver is not compared with themselves.
+    diagonal = np.arange(len(tensor))
+    per_track[diagonal, diagonal] = np.nan
+    shared = ~np.isnan(per_track)
+    shared_tracks = shared.sum(axis=2)
+    with np.errstate(invalid='ignore'):
+        gap = np.where(shared, per_track, 0.0).sum(axis=2) / shared_tracks
+    return gap, per_track, shared_tracks
+
+
+def pair_significance(per_track, shared_tracks):
+    """_significance() for every unordered pair: (p_value, t_statistic,
+    label index into LABELS), mirrored so [b, a] matches [a, b] (t
+    negated)."""
+    n = per_track.shape[0]
+    p_value = np.full((n, n), np.nan)
+    t_stat = np.full((n, n), np.nan)
+    label = np.zeros((n, n), dtype=np.int8)
+    for a in range(n):
+        for b in range(a + 1, n):
+            if not shared_tracks[a, b]:
+                continue
+            deltas = per_track[a, b][~np.isnan(per_track[a, b])]
+            # compare_drivers tests its rounded per-track averages.
+            sig = _significance([round(float(d), 3) for d in deltas])
+            label[a, b] = label[b, a] = LABELS.index(sig['label'])
+            if sig['p_value'] is not None:
+                p_value[a, b] = p_value[b, a] = sig['p_value']
+            if sig['t_statistic'] is not None:
+                t_stat[a, b], t_stat[b, a] = sig['t_statistic'], -sig['t_statistic']
+    return p_value, t_stat, label
+
+
+def ranking_order(gap):
+    """(order, score, opponents): drivers sorted by their mean gap to every
+    driver they share a track with -- most negative (fastest) first;
+    drivers with no opponent last."""
+    compared = ~np.isnan(gap)
+    opponents = compared.sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        score = np.where(compared, gap, 0.0).sum(axis=1) / opponents
+    order = np.argsort(np.where(np.isnan(score), np.inf, score), kind='stable')
+    return order, score, opponents
+
+
+def _scope_matrix(codes, names, models, ages):
+    """Matrix arrays for one scope (aggregate or one season)."""
+    tensor, tracks, tyres = prediction_tensor(models, ages)
+    gap, per_track, shared_tracks = pairwise_gaps(tensor)
+    p_value, t_stat, label = pair_significance(per_track, shared_tracks)
+    return {
+        'codes': np.array(codes, dtype=str), 'names': np.array(names, dtype=str),
+        'tracks': np.array(tracks, dtype=str), 'tyres': np.array(tyres, dtype=str),
+        'gap': gap, 'per_track': per_track.astype(np.float32),
+        'shared_tracks': shared_tracks.astype(np.int16),
+        'p_value': p_value, 't_statistic': t_stat, 'label': label,
+    }
+
+
+def _build_scope(args):
+    """Process-pool task: load the scope's models and compute its matrix."""
+    scope, codes, names, models_dir, ages = args
+    year = None if scope == 'all' else int(scope)
+    models = []
+    for code in codes:
+        model, feats, _, _ = load_driver_model(code, year=year, models_dir=models_dir)
+        models.append((model, feats))
+    return scope, _scope_matrix(codes, names, models, ages)
+
+
+def build_matrix(models_dir=None, ages=DEFAULT_AGES, workers=None) -> dict:
+    """scope -> matrix arrays, for 'all' (aggregate models) and every season
+    with per-driver-per-year models (only drivers with that season's own
+    model take part, so seasons never mix).  Scopes are computed in
+    ``workers`` processes (default: one per core)."""
+    drivers = list_driver_models(models_dir)
+    scopes = {'all': drivers}
+    for year in sorted({y for d in drivers for y in d['years']}):
+        scopes[str(year)] = [d for d in drivers if year in d['years']]
+    tasks = [(scope, [d['code'] for d in ds], [d['name'] for d in ds], models_dir, tuple(ages))
+             for scope, ds in scopes.items() if ds]
+    workers = min(len(tasks), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return dict(map(_build_scope, tasks))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(_build_scope, tasks))
+
+
+def save_matrix(matrix: dict, path=None, ages=DEFAULT_AGES) -> Path:
+    """Write ``matrix`` as one compressed .npz (arrays keyed
+    '<scope>.<name>', plus a JSON 'meta' entry)."""
+    path = Path(path) if path else MATRIX_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {f'{scope}.{name}': value
+              for scope, arrays in matrix.items() for name, value in arrays.items()}
+    meta = {'scopes': list(matrix), 'ages': [float(a) for a in ages],
+            'built_at': datetime.datetime.now().isoformat(timespec='seconds')}
+    arrays['meta'] = np.array(json.dumps(meta))
+    tmp = path.with_name(path.stem + '.tmp.npz')
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def _round(value, digits=3):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+class ComparisonMatrix:
+    """Read side of a stored (or freshly computed) all-pairs matrix."""
+
+    def __init__(self, matrix: dict, meta: dict = None):
+        self.scopes = matrix
+        self.meta = meta or {}
+        self._index = {scope: {c: i for i, c in enumerate(arrays['codes'])}
+                       for scope, arrays in matrix.items()}
+
+    @classmethod
+    def load(cls, path=None):
+        with np.load(Path(path) if path else MATRIX_PATH) as data:
+            meta = json.loads(str(data['meta']))
+            matrix = {scope: {} for scope in meta['scopes']}
+            for key in data.files:
+                if key != 'meta':
+                    scope, name = key.split('.', 1)
+                    matrix[scope][name] = data[key]
+        return cls(matrix, meta)
+
+    def _scope(self, year):
+        scope = 'all' if year is None else str(year)
+        if scope not in self.scopes:
+            raise KeyError(f"No comparison matrix for {year} — no per-driver models "
+                           f"for that season were found when it was built.")
+        return scope, self.scopes[scope]
+
+    def pair(self, code_a, code_b, year=None) -> dict:
+        """One pair's gap, per-track breakdown and significance."""
+        scope, m = self._scope(year)
+        index = self._index[scope]
+        for code in (code_a, code_b):
+            if code not in index:
+                raise KeyError(f"'{code}' is not in the {scope} comparison matrix.")
+        a, b = index[code_a], index[code_b]
+        per_track = [{"track": str(track), "avg_delta": _round(delta)}
+                     for track, delta in zip(m['tracks'], m['per_track'][a, b])
+                     if not np.isnan(delta)]
+        return {
+            "driver_a": {"code": code_a, "name": str(m['names'][a])},
+            "driver_b": {"code": code_b, "name": str(m['names'][b])},
+            "year": year,
+            "avg_delta": _round(m['gap'][a, b]),
+            "shared_tracks": int(m['shared_tracks'][a, b]),
+            "per_track": per_track,
+            "significance": {"label": LABELS[m['label'][a, b]] or "insufficient",
+                             "p_value": _round(m['p_value'][a, b], 4),
+                             "t_statistic": _round(m['t_statistic'][a, b])},
+            "note": "delta = driver_a_time - driver_b_time; positive means "
+                    "driver B is faster",
+        }
+
+    def grid(self, year=None) -> dict:
+        """Every pair, rows and columns ordered fastest driver first."""
+        _, m = self._scope(year)
+        return ranked_grid(m, year)
+
+
+def ranked_grid(m: dict, year=None) -> dict:
+    """JSON form of one scope's matrix arrays, ranked."""
+    order, score, opponents = ranking_order(m['gap'])
+    sub = np.ix_(order, order)
+    return {
+        "year": year,
+        "drivers": [{"rank": r + 1, "code": str(m['codes'][i]), "name": str(m['names'][i]),
+                     "avg_gap": _round(score[i]), "opponents": int(opponents[i])}
+                    for r, i in enumerate(order)],
+        "gap": [[_round(v) for v in row] for row in m['gap'][sub]],
+        "shared_tracks": m['shared_tracks'][sub].tolist(),
+        "significance": [[LABELS[v] or None for v in row] for row in m['label'][sub]],
+        "p_value": [[_round(v, 4) for v in row] for row in m['p_value'][sub]],
+        "note": "gap[i][j] = driver i time - driver j time; negative means "
+                "driver i is faster.  Drivers are ranked by their average gap "
+                "to every driver they share a track with.",
+    }
+
+
+def field_comparison(codes, year=None, registry=None, models_dir=None, ages=DEFAULT_AGES) -> dict:
+    """Ranked gap grid for ``codes``, computed now from their models.
+
+    Like compare_drivers, ``year`` prefers each driver's model for that
+    season and falls back to their aggregate model; every driver's entry
+    reports the season actually used, and ``year_used`` is set only when
+    all of them had it.  Models come from ``registry`` when given.
+    Raises ValueError for fewer than two drivers, FileNotFoundError for a
+    driver without a model.
+    """
+    codes = list(dict.fromkeys(c for c in codes if c))
+    if len(codes) < 2:
+        raise ValueError("Pick at least two different drivers to compare.")
+    loaded = [registry.load(code, year) if registry is not None
+              else load_driver_model(code, year=year, models_dir=models_dir)
+              for code in codes]
+    names = [str(info.get('driver', {}).get('name', code))
+             for code, (_, _, info, _) in zip(codes, loaded)]
+    m = _scope_matrix(codes, names, [(model, feats) for model, feats, _, _ in loaded], ages)
+    payload = ranked_grid(m, year)
+    used = {code: used_year for code, (_, _, _, used_year) in zip(codes, loaded)}
+    for driver in payload['drivers']:
+        driver['year'] = used[driver['code']]
+    same_season = year is not None and all(u == year for u in used.values())
+    payload['year_used'] = year if same_season else None
+    payload['tracks'] = m['tracks'].tolist()
+    payload['tyres'] = m['tyres'].tolist()
+    return payload
+
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def load_matrix(path=None) -> ComparisonMatrix:
+    """ComparisonMatrix.load, memoised until the file changes (one stat()
+    per call).  Raises FileNotFoundError when it was never built."""
+    path = Path(path) if path else MATRIX_PATH
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        raise FileNotFoundError(
+            f"No driver comparison matrix at {path} — run "
+            f"scripts/comparison_matrix.py build first.") from None
+    with _loaded_lock:
+        hit = _loaded.get(path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+    matrix = ComparisonMatrix.load(path)
+    with _loaded_lock:
+        _loaded[path] = (mtime, matrix)
+    return matrix
+
+
+def main():
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+    parser = argparse.ArgumentParser(description='All-pairs driver comparison matrix.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='compute and store the matrix')
+    build.add_argument('--workers', type=int, help='processes (default: one per core)')
+    build.add_argument('--out', help=f'output .npz (default {MATRIX_PATH})')
+    show = sub.add_parser('show', help='print the ranking from the stored matrix')
+    show.add_argument('--year', type=int, help='season (default: aggregate models)')
+    show.add_argument('--path', help=f'matrix .npz (default {MATRIX_PATH})')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = datetime.datetime.now()
+        matrix = build_matrix(workers=args.workers)
+        if not matrix:
+            print("[ERROR] No per-driver models found — run scripts/ml_lap_predictions.py first.")
+            sys.exit(1)
+        path = save_matrix(matrix, args.out)
+        took = (datetime.datetime.now() - start).total_seconds()
+        for scope, m in matrix.items():
+            print(f"  {scope:>5}: {len(m['codes'])} drivers, {len(m['tracks'])} tracks")
+        print(f"[OK] Saved {path} ({path.stat().st_size / 1024:.0f} KB) in {took:.1f}s")
+        return
+
+    try:
+        grid = load_matrix(args.path).grid(args.year)
+    except (FileNotFoundError, KeyError) as exc:
+        print(f"[ERROR] {exc}")
+        sys.exit(1)
+    print(f"\n  {'#':>3}  {'Code':<5}{'Name':<26}{'avg gap (s)':>12}{'opponents':>11}")
+    for d in grid['drivers']:
+        gap = f"{d['avg_gap']:+.3f}" if d['avg_gap'] is not None else '—'
+        print(f"  {d['rank']:>3}  {d['code']:<5}{d['name']:<26}{gap:>12}{d['opponents']:>11}")
+
+
+if __name__ == '__main__':
+    main()
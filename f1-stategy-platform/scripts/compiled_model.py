@@ -0,0 +1,127 @@
+"""Fast lap-time prediction for the deployed (linear) models.
+
+A LinearRegression over the one-hot features is just
+
+    intercept + coef[tyre_age] * age + coef[tyre_<X>] + coef[track_<Y>]
+
+yet every prediction used to build a full DataFrame with one column per
+track and compound and go through sklearn's input validation.
+compile_model() turns a linear model plus its feature_names into three
+lookups (a float and two dicts) once, and predicts in microseconds for a
+scalar or a whole NumPy array of ages.  Anything without a flat coef_
+(tree ensembles, pipelines) gets a wrapper with the same interface that
+builds the aligned feature matrix and calls model.predict once.
+
+Either way an unseen tyre or track contributes nothing, exactly like the
+all-zero one-hot columns construct_prediction_input produces for it;
+callers validate coverage first (validate_model_inputs).
+
+Compiled wrappers are memoised per model object, so callers can simply
+call compile_model(model, feature_names) per request.
+"""
+
+import threading
+import weakref
+
+import numpy as np
+
+from feature_pipeline import _normalise_track_name, construct_prediction_matrix
+
+_memo = weakref.WeakKeyDictionary()
+_memo_lock = threading.Lock()
+
+
+def _lookup(coef: dict, values, normalise):
+    """coef[normalise(v)] (0 when absent) for each of ``values``, looked
+    up once per distinct value."""
+    distinct, index = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return np.array([coef.get(normalise(v), 0.0) for v in distinct])[index]
+
+
+class CompiledLinearModel:
+    """Lookup-table form of a linear model over tyre_age + tyre / track
+    one-hot features.  Feature columns that construct_prediction_input
+    never sets are always zero and drop out."""
+
+    is_compiled = True
+
+    def __init__(self, model, feature_names: list):
+        coef = np.asarray(model.coef_, dtype=float)
+        self.intercept = float(np.ravel(model.intercept_)[0])
+        self.age_coef = 0.0
+        self.tyre_coef = {}
+        self.track_coef = {}
+        for name, c in zip(feature_names, coef):
+            if name == 'tyre_age':
+                self.age_coef = float(c)
+            elif name == 'tyre_load':
+                continue
+            elif name.startswith('tyre_'):
+                self.tyre_coef[name[len('tyre_'):]] = float(c)
+            elif name.startswith('track_'):
+                self.track_coef[name[len('track_'):]] = float(c)
+
+    def predict(self, tyre_age, tyre_compound, track_name):
+        """Lap time(s) in seconds.  ``tyre_age`` is a scalar (returns a
+        float) or an array; ``tyre_compound`` and ``track_name`` are one
+        value or one per age."""
+        if isinstance(track_name, str):
+            base = self.intercept + self.track_coef.get(_normalise_track_name(track_name), 0.0)
+        else:
+            base = self.intercept + _lookup(self.track_coef, track_name, _normalise_track_name)
+        if isinstance(tyre_compound, str):
+            base += self.tyre_coef.get(tyre_compound.strip(), 0.0)
+        else:
+            base = base + _lookup(self.tyre_coef, tyre_compound, str.strip)
+        if np.ndim(tyre_age) == 0 and np.ndim(base) == 0:
+            return base + self.age_coef * float(tyre_age)
+        return base + self.age_coef * np.asarray(tyre_age, dtype=float)
+
+
+class MatrixModel:
+    """Generic path with the CompiledLinearModel interface: one aligned
+    feature matrix, one model.predict call."""
+
+    is_compiled = False
+
+    def __init__(self, model, feature_names: list):
+        self.model = model
+        self.feature_names = feature_names
+
+    def predict(self, tyre_age, tyre_compound, track_name):
+        scalar = np.ndim(tyre_age) == 0 and isinstance(tyre_compound, str)
+        ages = np.atleast_1d(np.asarray(tyre_age, dtype=float))
+        if isinstance(tyre_compound, str):
+            compounds = [tyre_compound] * len(ages)
+        else:
+            compounds = list(tyre_compound)
+        predicted = np.asarray(self.model.predict(construct_prediction_matrix(
+            ages, compounds, track_name, self.feature_names)), dtype=float)
+        return float(predicted[0]) if scalar else predicted
+
+
+def _is_linear(model, feature_names) -> bool:
+    coef = getattr(model, 'coef_', None)
+    return (coef is not None and hasattr(model, 'intercept_')
+            and np.ndim(coef) == 1 and len(coef) == len(feature_names)
+            and np.size(model.intercept_) == 1)
+
+
+def compile_model(model, feature_names: list):
+    """CompiledLinearModel for a linear model, MatrixModel otherwise."""
+    try:
+        with _memo_lock:
+            entry = _memo.get(model)
+        if entry is not None and (entry[0] is feature_names
+                                  or entry[0] == list(feature_names)):
+            return entry[1]
+    except TypeError:
+        pass        # not weak-referenceable: compile without memoising
+    compiled = (CompiledLinearModel if _is_linear(model, feature_names)
+                else MatrixModel)(model, feature_names)
+    try:
+        with _memo_lock:
+            _memo[model] = (feature_names, compiled)
+    except TypeError:
+        pass
+    return compiled
@@ -4,11 +4,40 @@ Never commit real credentials.  Every value is read from environment
 variables (DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_PORT); the defaults
 below are structural placeholders only.  Set DB_PASSWORD (and the others
 if they differ from the defaults) before running anything.
+
+Connections are pooled per process.  ``get_db_connection()`` checks one
+out of the pool and ``conn.close()`` hands it back, so existing callers
+need no changes; new code should prefer the context managers:
+
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute(...)
+
+Pool sizing: DB_POOL_SIZE (default 5, 0 disables pooling) and
+DB_POOL_TIMEOUT (seconds to wait for a free connection, default 10).
+``pool_stats()`` reports utilization and checkout wait times.
+
+Storage backend: DB_BACKEND=mysql (default) or sqlite (file at DB_PATH),
+plus DB_ANALYTICS_BACKEND=duckdb for ``get_analytics_connection()``; see
+db_backends.py.
 """
 
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
 import mysql.connector
 
+from db_backends import (
+    ANALYTICS_BACKENDS,
+    BACKENDS,
+    DEFAULT_SQLITE_PATH,
+    connect_duckdb_analytics,
+    connect_sqlite,
+)
+
 # Placeholder default -- replace it via the DB_PASSWORD environment variable.
 # The app refuses to connect while this placeholder is in effect, so a
 # forgotten setup fails loudly instead of guessing a password.
@@ -22,18 +51,324 @@ DB_CONFIG = {
     'port': int(os.environ.get('DB_PORT', 3306)),
 }
 
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql').strip().lower() or 'mysql'
+DB_PATH = Path(os.environ.get('DB_PATH') or DEFAULT_SQLITE_PATH)
+DB_ANALYTICS_BACKEND = os.environ.get('DB_ANALYTICS_BACKEND', '').strip().lower()
 
-def get_db_connection():
-    """Return a MySQL database connection using DB_CONFIG.
 
-    Raises RuntimeError while the password is still the placeholder, so
-    real credentials can never be silently replaced by a guess.
-    """
+def _require_password():
     if DB_CONFIG['password'] == _PLACEHOLDER_PASSWORD:
         raise RuntimeError(
             "MySQL password is still the placeholder 'CHANGE_ME' -- set the "
             "DB_PASSWORD environment variable before running. "
             "(Other values can be overridden with DB_HOST / DB_USER / "
-            "DB_NAME / DB_PORT; see the README.)"
+            "DB_NAME / DB_PORT; see the README.  For a local database "
+            "without a MySQL server, set DB_BACKEND=sqlite.)"
         )
+
+
+def connect_backend(backend=None):
+    """Open a new, unpooled connection to ``backend`` (default DB_BACKEND).
+
+    Raises RuntimeError for an unknown backend, and for MySQL while the
+    password is still the placeholder, so real credentials can never be
+    silently replaced by a guess.
+    """
+    backend = backend or DB_BACKEND
+    if backend == 'sqlite':
+        return connect_sqlite(DB_PATH)
+    if backend != 'mysql':
+        raise RuntimeError(
+            f"Unknown DB_BACKEND={backend!r} -- expected one of {', '.join(BACKENDS)}"
+        )
+    _require_password()
     return mysql.connector.connect(**DB_CONFIG)
+
+
+def get_db_connection():
+    """Return a database connection for DB_BACKEND (MySQL by default).
+
+    The connection comes from the process pool; ``close()`` returns it.
+    Raises RuntimeError while the MySQL password is still the placeholder.
+    """
+    if DB_BACKEND == 'mysql':
+        _require_password()
+    pool = get_pool()
+    if pool is None:
+        return _connect()
+    return pool.acquire()
+
+
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+
+def env_number(name, default, cast):
+    """Non-negative number from the environment; unset or blank gives
+    ``default``, anything invalid warns and gives ``default`` too."""
+    raw = os.environ.get(name)
+    if raw is None or raw.strip() == '':
+        return default
+    try:
+        value = cast(raw)
+        if value < 0:
+            raise ValueError('must not be negative')
+        return value
+    except (TypeError, ValueError):
+        print(f"[WARNING] Invalid {name}={raw!r} — using default {default}")
+        return default
+
+
+DB_POOL_SIZE = env_number('DB_POOL_SIZE', 5, int)
+DB_POOL_TIMEOUT = env_number('DB_POOL_TIMEOUT', 10.0, float)
+# An idle connection is pinged on checkout once it has sat unused this
+# long; connections handed back moments ago are trusted as-is, so the hot
+# dashboard polls do not pay an extra round trip per request.
+DB_POOL_PING_AFTER = 5.0
+
+
+class PoolTimeout(RuntimeError):
+    """No pooled connection became free within the pool timeout."""
+
+
+class PooledConnection:
+    """A checked-out connection; ``close()`` returns it to the pool.
+
+    Everything else is delegated to the underlying mysql-connector
+    connection, so it is a drop-in for the object ``get_db_connection``
+    used to return.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise AttributeError(f"connection already returned to the pool ({name})")
+        return getattr(raw, name)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self._raw is not None:
+            try:
+                self._raw.rollback()
+            except Exception:
+                pass
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """Fixed-size, thread-safe pool of DB connections with usage metrics.
+
+    ``acquire()`` blocks up to ``timeout`` seconds for a free slot (raising
+    PoolTimeout) and reuses the most recently returned connection, pinging
+    it first when it has been idle for ``ping_after`` seconds; a dead one
+    is dropped and replaced.  Returned connections have any open
+    transaction rolled back so the next borrower starts clean.
+    """
+
+    def __init__(self, connect, size=None, timeout=None, ping_after=DB_POOL_PING_AFTER):
+        size = DB_POOL_SIZE if size is None else size
+        if size < 1:
+            raise ValueError('pool size must be at least 1')
+        self._connect = connect
+        self.size = size
+        self.timeout = DB_POOL_TIMEOUT if timeout is None else timeout
+        self.ping_after = ping_after
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = deque()          # (raw connection, returned_at)
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.created = 0
+        self.timeouts = 0
+        self.health_failures = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    def acquire(self):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(
+                f"no database connection free after {self.timeout:g}s "
+                f"(pool size {self.size}; raise DB_POOL_SIZE or DB_POOL_TIMEOUT)"
+            )
+        waited = time.perf_counter() - started
+        try:
+            raw = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.wait_total_s += waited
+            self.wait_max_s = max(self.wait_max_s, waited)
+        return PooledConnection(self, raw)
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                raw = self._connect()
+                with self._lock:
+                    self.created += 1
+                return raw
+            raw, returned_at = entry
+            if time.monotonic() - returned_at < self.ping_after or self._healthy(raw):
+                return raw
+            with self._lock:
+                self.health_failures += 1
+            _close_quietly(raw)
+
+    @staticmethod
+    def _healthy(raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def release(self, raw):
+        keep = True
+        try:
+            if getattr(raw, 'in_transaction', False):
+                raw.rollback()
+        except Exception:
+            keep = False
+        if keep:
+            with self._lock:
+                self._idle.append((raw, time.monotonic()))
+        else:
+            _close_quietly(raw)
+        with self._lock:
+            self.in_use -= 1
+        self._slots.release()
+
+    def close_idle(self):
+        """Close every idle connection (e.g. at shutdown)."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for raw, _ in idle:
+            _close_quietly(raw)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'peak_in_use': self.peak_in_use,
+                'utilization': round(self.in_use / self.size, 3),
+                'peak_utilization': round(self.peak_in_use / self.size, 3),
+                'checkouts': self.checkouts,
+                'created': self.created,
+                'timeouts': self.timeouts,
+                'health_failures': self.health_failures,
+                'wait_avg_ms': round(1000 * self.wait_total_s / self.checkouts, 3)
+                               if self.checkouts else 0.0,
+                'wait_max_ms': round(1000 * self.wait_max_s, 3),
+            }
+
+
+def _close_quietly(raw):
+    try:
+        raw.close()
+    except Exception:
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _connect():
+    return connect_backend(DB_BACKEND)
+
+
+def get_pool():
+    """The process-wide pool (None when DB_POOL_SIZE is 0)."""
+    global _pool
+    if DB_POOL_SIZE <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(_connect)
+        return _pool
+
+
+def pool_stats():
+    """Utilization / wait metrics of the process pool (None if disabled)."""
+    pool = get_pool()
+    return pool.stats() if pool is not None else None
+
+
+@contextmanager
+def db_connection(connect=None):
+    """Connection for the duration of a ``with`` block.
+
+    Rolled back if the block raises and always closed (returned to the
+    pool) on exit -- commit explicitly.  ``connect`` overrides the
+    connection factory (default ``get_db_connection``).
+    """
+    conn = (connect or get_db_connection)()
+    try:
+        yield conn
+    except BaseException:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+@contextmanager
+def db_cursor(dictionary=False, connect=None):
+    """Cursor on a pooled connection; both are closed when the block exits."""
+    with db_connection(connect) as conn:
+        cursor = conn.cursor(dictionary=dictionary)
+        try:
+            yield cursor
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+
+def get_analytics_connection():
+    """Connection for read-only analytical queries (training, reports).
+
+    DuckDB over the primary database when DB_ANALYTICS_BACKEND=duckdb,
+    otherwise an ordinary ``get_db_connection()``.  Close it when done.
+    """
+    if DB_ANALYTICS_BACKEND in ANALYTICS_BACKENDS:
+        try:
+            return connect_duckdb_analytics(DB_BACKEND, DB_PATH, DB_CONFIG)
+        except Exception as exc:
+            print(f"[WARNING] DuckDB analytics unavailable ({exc}) — "
+                  f"using the {DB_BACKEND} connection")
+    elif DB_ANALYTICS_BACKEND:
+        print(f"[WARNING] Unknown DB_ANALYTICS_BACKEND={DB_ANALYTICS_BACKEND!r} — "
+              f"using the {DB_BACKEND} connection")
+    return get_db_connection()
@@ -1,20 +1,31 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, make_response, request
+import functools
+import gzip
+import hashlib
 import os
 import sys
 import joblib
 import json
+import numpy as np
 import traceback
 import datetime
+import zlib
 from pathlib import Path
 from fuel_estimation import estimate_fuel_load
-from config import get_db_connection
+from config import db_cursor, env_number, get_db_connection, pool_stats
+from live_stream import LiveWatcher
+from pit_strategy import WET_COMPOUNDS, lap_time_tables, optimal_strategies
+from race_simulation import EventRates, load_event_rates, simulate
+from response_cache import ResponseCache
 from stint_analysis import detrend_laps
+from session_archive import lap_telemetry_aggregates, open_archive
+from compiled_model import compile_model
 from feature_pipeline import (
-    construct_prediction_input,
     covered_tracks,
     covered_tyres,
     validate_model_inputs,
 )
+import comparison_matrix
 import driver_comparison
 
 app = Flask(__name__)
@@ -49,6 +60,8 @@ if MODEL_PATH.exists() and FEATURES_PATH.exists():
     print(f"[INFO] Model loaded: {type(model).__name__} | {len(feature_names)} features")
     print(f"[INFO] Covers {len(covered_tracks(feature_names))} tracks, "
           f"{len(covered_tyres(feature_names))} tyres")
+    if compile_model(model, feature_names).is_compiled:
+        print("[INFO] Linear model compiled to lookup tables for fast prediction")
     if MODEL_INFO_PATH.exists():
         try:
             info = json.loads(MODEL_INFO_PATH.read_text(encoding='utf-8'))
@@ -67,153 +80,324 @@ def index():
     return render_template('dashboard.html')
 
 
+def _db_cursor():
+    """Dictionary cursor on a pooled connection, released when the
+    ``with`` block exits (see config.db_cursor)."""
+    return db_cursor(dictionary=True, connect=get_db_connection)
+
+
+@app.route('/api/db/pool')
+def get_db_pool():
+    """Connection-pool utilization and checkout wait metrics."""
+    stats = pool_stats()
+    if stats is None:
+        return jsonify({"pooled": False})
+    return jsonify({"pooled": True, **stats})
+
+
+# RESPONSE CACHE
+#
+# Read-only answers that are identical for every tab and poll are served
+# from memory while the data-version token they were computed under is
+# current.  Writers bump data_version (scope 'all', and 'session:<id>' for
+# the session they touched) in their own transaction, so a historical
+# session's lap table stays cached while a live one refreshes lap by lap.
+# The token includes updated_at, so a restored / recreated database whose
+# counters restart never matches old entries.
+# Sized via DASHBOARD_CACHE_ENTRIES (0 disables) and DASHBOARD_CACHE_TTL
+# (seconds; bounds staleness after edits that bypass the writers).  The
+# session endpoints also carry ETags from the same token, so a browser
+# re-checking an unchanged session gets an empty 304.
+response_cache = ResponseCache(
+    max_entries=env_number('DASHBOARD_CACHE_ENTRIES', 256, int),
+    ttl=env_number('DASHBOARD_CACHE_TTL', 300.0, float),
+)
+_data_version_warned = False
+
+
+def _data_version(scope):
+    """Token of a data_version scope, or None when it cannot be read (table
+    not migrated, database down) -- the caller then serves uncached."""
+    global _data_version_warned
+    try:
+        with _db_cursor() as cursor:
+            cursor.execute(
+                "SELECT version, updated_at FROM data_version WHERE scope = %s", (scope,))
+            row = cursor.fetchone()
+    except Exception as e:
+        if not _data_version_warned:
+            _data_version_warned = True
+            print(f"[WARNING] data_version unavailable ({e}) — responses served "
+                  f"uncached; run database/migrate_data_version.sql")
+        return None
+    return (row['version'], row['updated_at']) if row else (0, None)
+
+
+def cached(scope='all', etag=False):
+    """Serve the view from response_cache, keyed by path + query args.
+
+    ``scope`` names the data_version scope the answer depends on (a
+    callable gets the view's URL arguments), or None for answers that
+    never change while the process runs.  Only 200 responses are stored.
+
+    ``etag=True`` also tags the answer with a strong ETag derived from the
+    same token: a matching If-None-Match is answered 304 before the view
+    (its query, the detrend) runs at all.  compress_response weakens the
+    tag of an answer it encodes.
+    """
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if not (response_cache.enabled or etag):
+                return view(**kwargs)
+            token = None
+            if scope is not None:
+                token = _data_version(scope(**kwargs) if callable(scope) else scope)
+                if token is None:
+                    return view(**kwargs)
+            # Per query string: ?format=columnar is a different entity.
+            tag = _etag(request.full_path, token) if etag else None
+            # Weak comparison: a gzip-encoded answer carries the tag weak.
+            if tag and request.if_none_match.contains_weak(tag):
+                resp = app.response_class(status=304)
+                resp.set_etag(tag)
+                resp.headers['Cache-Control'] = 'no-cache'
+                return resp
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            hit = response_cache.get(key, token) if response_cache.enabled else None
+            if hit is not None:
+                body, status, headers = hit
+                resp = app.response_class(body, status=status, headers=headers)
+                resp.headers['X-Cache'] = 'HIT'
+            else:
+                resp = make_response(view(**kwargs))
+                if resp.status_code == 200:
+                    response_cache.put(key, token, (resp.get_data(), resp.status_code,
+                                                    list(resp.headers)))
+                resp.headers['X-Cache'] = 'MISS'
+            if tag and resp.status_code == 200:
+                resp.set_etag(tag)
+                # Revalidate on every use: the browser sends If-None-Match
+                # and gets an empty 304 while the session is unchanged.
+                resp.headers['Cache-Control'] = 'no-cache'
+            return resp
+        return wrapper
+    return decorate
+
+
+# Salted per process: a restart (new code, retrained model, new fuel-burn
+# rate) must never let a browser revalidate an answer computed by the old
+# process.
+_ETAG_SALT = f"{os.getpid()}-{datetime.datetime.now().timestamp()}"
+
+
+def _etag(path, token):
+    return hashlib.sha1(f"{_ETAG_SALT}|{path}|{token!r}".encode()).hexdigest()[:20]
+
+
+def _session_scope(session_id):
+    return f"session:{session_id}"
+
+
+@app.route('/api/cache')
+def get_cache_stats():
+    """Response-cache size and hit / miss counters."""
+    return jsonify(response_cache.stats())
+
+
+# Payload size.  Lap tables repeat every key on every lap; the lap
+# endpoints take ?format=columnar to answer with one array per field
+# instead.  Independently, a JSON answer of COMPRESS_MIN_BYTES or more is
+# gzip- or deflate-encoded when the client's Accept-Encoding allows it
+# (COMPRESS_LEVEL 1-9; 0 turns compression off).
+COMPRESS_MIN_BYTES = env_number('COMPRESS_MIN_BYTES', 1024, int)
+COMPRESS_LEVEL = min(env_number('COMPRESS_LEVEL', 6, int), 9)
+_ENCODERS = {
+    # mtime=0: identical answers compress to identical bytes.
+    'gzip': lambda data, level: gzip.compress(data, compresslevel=level, mtime=0),
+    'deflate': zlib.compress,
+}
+SESSION_LAP_FIELDS = ('lap_number', 'lap_time', 'tyre_compound', 'tyre_age',
+                      'fuel_load', 'is_valid', 'has_pit_stop')
+RACE_LAP_FIELDS = ('lap_number', 'lap_time', 'tyre_compound', 'tyre_age',
+                   'is_valid', 'has_pit_stop')
+
+
+def _columnar_requested():
+    """True for ?format=columnar, False for the default per-lap rows."""
+    fmt = request.args.get('format', 'rows')
+    if fmt not in ('rows', 'columnar'):
+        raise ValueError("format must be 'rows' or 'columnar'")
+    return fmt == 'columnar'
+
+
+def _columnar(rows, fields=()):
+    """Rows of dicts as parallel lists, ``{"lap_number": [1, 2], ...}``.
+
+    The columns are ``fields`` (so an empty table still names them) plus
+    any other key a row has; a row without a field holds None there.  A
+    field holding dicts (a lap's telemetry) is split the same way.
+    """
+    names = dict.fromkeys(fields)
+    for row in rows:
+        names.update(dict.fromkeys(row))
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        if isinstance(next((v for v in values if v is not None), None), dict):
+            values = _columnar([v or {} for v in values])
+        columns[name] = values
+    return columns
+
+
+@app.after_request
+def compress_response(resp):
+    """gzip / deflate a large JSON answer the client accepts encoded."""
+    if (not COMPRESS_LEVEL or resp.status_code != 200 or resp.mimetype != 'application/json'
+            or resp.is_streamed or 'Content-Encoding' in resp.headers):
+        return resp
+    data = resp.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return resp
+    resp.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(tuple(_ENCODERS))
+    if encoding is None:
+        return resp
+    resp.set_data(_ENCODERS[encoding](data, COMPRESS_LEVEL))
+    resp.headers['Content-Encoding'] = encoding
+    tag, weak = resp.get_etag()
+    if tag and not weak:
+        # Same JSON, different bytes: the tag only holds as a weak one.
+        resp.set_etag(tag, weak=True)
+    return resp
+
+
 # SESSION / TELEMETRY API
 @app.route('/api/sessions')
 def get_sessions():
-    conn = None
-    cursor = None
     try:
         # Pagination: ?limit=&offset= (defaults keep the historical 50-row cap;
         # limit is clamped to [1, 500]).  Optional ?driver=<CODE> filters to
         # one driver's sessions (used by the dashboard driver selector).
+        # Rows come pre-aggregated from session_stats (see summary_tables),
+        # walked in index order, so the cost is O(limit) whatever the
+        # history size.
         limit = max(1, min(request.args.get('limit', default=50, type=int), 500))
         offset = max(0, request.args.get('offset', default=0, type=int))
         driver = request.args.get('driver', '').strip().upper()
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        base_sql = """
-            SELECT
-                s.session_id,
-                s.track_name,
-                s.session_type,
-                s.weather,
-                s.date,
-                d.driver_code,
-                COUNT(l.lap_id) AS total_laps,
-                MIN(CASE WHEN l.is_valid = 1 AND l.lap_time_ms > 0
-                         THEN l.lap_time_ms END) / 1000 AS fastest_lap
-            FROM sessions s
-            LEFT JOIN drivers d ON s.driver_id = d.driver_id
-            LEFT JOIN laps l ON s.session_id = l.session_id
-        """
-        if driver:
-            cursor.execute(base_sql + """
-                WHERE d.driver_code = %s
-                GROUP BY s.session_id, s.track_name, s.session_type, s.weather,
-                         s.date, d.driver_code
-                ORDER BY s.date DESC, s.session_id DESC
-                LIMIT %s OFFSET %s
-            """, (driver, limit, offset))
-        else:
-            cursor.execute(base_sql + """
-                GROUP BY s.session_id, s.track_name, s.session_type, s.weather,
-                         s.date, d.driver_code
-                ORDER BY s.date DESC, s.session_id DESC
-                LIMIT %s OFFSET %s
-            """, (limit, offset))
-        sessions = cursor.fetchall()
-
-        for s in sessions:
-            if s['date']:
-                s['date'] = s['date'].strftime('%Y-%m-%d')
-            s['fastest_lap'] = float(s['fastest_lap']) if s['fastest_lap'] else None
-
-        return jsonify(sessions)
+        with _db_cursor() as cursor:
+            base_sql = """
+                SELECT
+                    s.session_id,
+                    s.track_name,
+                    s.session_type,
+                    s.weather,
+                    s.date,
+                    st.driver_code,
+                    st.total_laps,
+                    st.fastest_lap_ms / 1000 AS fastest_lap
+                FROM session_stats st
+                JOIN sessions s ON s.session_id = st.session_id
+            """
+            if driver:
+                cursor.execute(base_sql + """
+                    WHERE st.driver_code = %s
+                    ORDER BY st.session_date DESC, st.session_id DESC
+                    LIMIT %s OFFSET %s
+                """, (driver, limit, offset))
+            else:
+                cursor.execute(base_sql + """
+                    ORDER BY st.session_date DESC, st.session_id DESC
+                    LIMIT %s OFFSET %s
+                """, (limit, offset))
+            sessions = cursor.fetchall()
+
+            for s in sessions:
+                if s['date']:
+                    s['date'] = s['date'].strftime('%Y-%m-%d')
+                s['fastest_lap'] = float(s['fastest_lap']) if s['fastest_lap'] else None
+
+            return jsonify(sessions)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            try: cursor.close()
-            except: pass
-        if conn:
-            try: conn.close()
-            except: pass
 
 
 @app.route('/api/session/<int:session_id>/laps')
+@cached(_session_scope, etag=True)
 def get_session_laps(session_id):
-    conn = None
-    cursor = None
+    """A session's timed laps; ?format=columnar for one array per field."""
+    try:
+        columnar = _columnar_requested()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT
-                l.lap_number,
-                l.lap_time_ms / 1000.0 AS lap_time,
-                l.tyre_compound,
-                l.tyre_age,
-                l.fuel_load,
-                l.is_valid,
-                MAX(CASE WHEN se.event_type = 'PitStop' THEN 1 ELSE 0 END) AS has_pit_stop
-            FROM laps l
-            LEFT JOIN strategy_events se ON l.lap_id = se.lap_id
-            WHERE l.session_id = %s AND l.lap_time_ms > 0
-            GROUP BY l.lap_id, l.lap_number, l.lap_time_ms, l.tyre_compound, l.tyre_age, l.fuel_load, l.is_valid
-            ORDER BY l.lap_number
-        """, (session_id,))
-        laps = cursor.fetchall()
-
-        for lap in laps:
-            lap['lap_time'] = float(lap['lap_time']) if lap['lap_time'] is not None else None
-            lap['fuel_load'] = float(lap['fuel_load']) if lap['fuel_load'] is not None else 0.0
-
-        return jsonify(laps)
+        with _db_cursor() as cursor:
+            laps = _session_lap_rows(cursor, session_id)
+            return jsonify(_columnar(laps, SESSION_LAP_FIELDS) if columnar else laps)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            try: cursor.close()
-            except: pass
-        if conn:
-            try: conn.close()
-            except: pass
+
+
+def _session_lap_rows(cursor, session_id):
+    """A session's timed laps as /api/session/<id>/laps (and the live
+    stream's ``laps`` deltas) return them."""
+    cursor.execute("""
+        SELECT
+            l.lap_number,
+            l.lap_time_ms / 1000.0 AS lap_time,
+            l.tyre_compound,
+            l.tyre_age,
+            l.fuel_load,
+            l.is_valid,
+            MAX(CASE WHEN se.event_type = 'PitStop' THEN 1 ELSE 0 END) AS has_pit_stop
+        FROM laps l
+        LEFT JOIN strategy_events se ON l.lap_id = se.lap_id
+        WHERE l.session_id = %s AND l.lap_time_ms > 0
+        GROUP BY l.lap_id, l.lap_number, l.lap_time_ms, l.tyre_compound, l.tyre_age, l.fuel_load, l.is_valid
+        ORDER BY l.lap_number
+    """, (session_id,))
+    laps = cursor.fetchall()
+    for lap in laps:
+        lap['lap_time'] = float(lap['lap_time']) if lap['lap_time'] is not None else None
+        lap['fuel_load'] = float(lap['fuel_load']) if lap['fuel_load'] is not None else 0.0
+    return laps
 
 
 @app.route('/api/session/<int:session_id>/tyre-degradation')
+@cached(_session_scope, etag=True)
 def get_tyre_degradation(session_id):
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                l.lap_number,
-                l.lap_time_ms / 1000.0 AS lap_time,
-                l.lap_time_ms / 1000.0 AS avg_lap_time,
-                l.tyre_compound,
-                l.tyre_age,
-                l.is_valid,
-                MAX(CASE WHEN se.event_type = 'PitStop' THEN 1 ELSE 0 END) AS has_pit_stop
-            FROM laps l
-            LEFT JOIN strategy_events se ON l.lap_id = se.lap_id
-                AND se.event_type = 'PitStop'
-                AND (se.duration_sec IS NULL OR se.duration_sec >= 15)
-            WHERE l.session_id = %s AND l.lap_time_ms > 0
-            GROUP BY l.lap_id, l.lap_number, l.lap_time_ms, l.tyre_compound, l.tyre_age, l.is_valid
-            ORDER BY l.lap_number
-        """, (session_id,))
-        deg = cursor.fetchall()
-        for d in deg:
-            d['lap_time'] = float(d['lap_time']) if d.get('lap_time') is not None else None
-            d['avg_lap_time'] = float(d['avg_lap_time']) if d.get('avg_lap_time') is not None else d['lap_time']
-        # Fuel-adjusted degradation: stint_delta is each lap's time relative
-        # to its own stint's pace line (fuel burn removed).
-        deg = detrend_laps(deg)
-        return jsonify(deg)
+        with _db_cursor() as cursor:
+            cursor.execute("""
+                SELECT 
+                    l.lap_number,
+                    l.lap_time_ms / 1000.0 AS lap_time,
+                    l.lap_time_ms / 1000.0 AS avg_lap_time,
+                    l.tyre_compound,
+                    l.tyre_age,
+                    l.is_valid,
+                    MAX(CASE WHEN se.event_type = 'PitStop' THEN 1 ELSE 0 END) AS has_pit_stop
+                FROM laps l
+                LEFT JOIN strategy_events se ON l.lap_id = se.lap_id
+                    AND se.event_type = 'PitStop'
+                    AND (se.duration_sec IS NULL OR se.duration_sec >= 15)
+                WHERE l.session_id = %s AND l.lap_time_ms > 0
+                GROUP BY l.lap_id, l.lap_number, l.lap_time_ms, l.tyre_compound, l.tyre_age, l.is_valid
+                ORDER BY l.lap_number
+            """, (session_id,))
+            deg = cursor.fetchall()
+            for d in deg:
+                d['lap_time'] = float(d['lap_time']) if d.get('lap_time') is not None else None
+                d['avg_lap_time'] = float(d['avg_lap_time']) if d.get('avg_lap_time') is not None else d['lap_time']
+            # Fuel-adjusted degradation: stint_delta is each lap's time relative
+            # to its own stint's pace line (fuel burn removed).
+            deg = detrend_laps(deg)
+            return jsonify(deg)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            try: cursor.close()
-            except: pass
-        if conn:
-            try: conn.close()
-            except: pass
 
 
 
@@ -243,111 +427,146 @@ LIVE_WINDOW = _live_window()
 def get_latest_lap():
     # Optional ?driver=<CODE> shows that driver's latest live lap instead of
     # the most recent live lap in the whole database (dashboard selector).
+    # Both read live_state (one row per driver, upserted by the capture /
+    # same-day import writers as each lap completes) -- a primary-key
+    # lookup, or a pick from a handful of rows, never a scan of laps.
     driver = request.args.get('driver', '').strip().upper()
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cutoff = (datetime.datetime.now() - LIVE_WINDOW).strftime('%Y-%m-%d %H:%M:%S')
-        base_sql = """
-            SELECT 
-                l.lap_time_ms / 1000.0 AS lap_time,
-                l.lap_number,
-                l.tyre_compound,
-                l.tyre_age,
-                l.session_id,
-                s.track_name
-            FROM laps l
-            JOIN sessions s ON l.session_id = s.session_id
-        """
-        if driver:
-            cursor.execute(base_sql + """
-                JOIN drivers d ON l.driver_id = d.driver_id
-                WHERE d.driver_code = %s AND l.lap_time_ms > 0
-                  AND l.captured_at >= %s
-                ORDER BY l.lap_id DESC
-                LIMIT 1
-            """, (driver, cutoff))
-        else:
-            cursor.execute(base_sql + """
-                WHERE l.lap_time_ms > 0 AND l.captured_at >= %s
-                ORDER BY l.lap_id DESC
-                LIMIT 1
-            """, (cutoff,))
-        lap = cursor.fetchone()
-        if lap:
-            lap['lap_time'] = float(lap['lap_time']) if lap['lap_time'] else None
-            lap['live'] = True
-            return jsonify(lap)
-        # No lap captured in the live window: the frontend shows dashes.
-        return jsonify({})
+        with _db_cursor() as cursor:
+            cutoff = (datetime.datetime.now() - LIVE_WINDOW).strftime('%Y-%m-%d %H:%M:%S')
+            base_sql = """
+                SELECT 
+                    ls.lap_time_ms / 1000.0 AS lap_time,
+                    ls.lap_number,
+                    ls.tyre_compound,
+                    ls.tyre_age,
+                    ls.session_id,
+                    ls.track_name
+                FROM live_state ls
+            """
+            if driver:
+                cursor.execute(base_sql + """
+                    WHERE ls.driver_code = %s AND ls.captured_at >= %s
+                """, (driver, cutoff))
+            else:
+                cursor.execute(base_sql + """
+                    WHERE ls.captured_at >= %s
+                    ORDER BY ls.lap_id DESC
+                    LIMIT 1
+                """, (cutoff,))
+            lap = cursor.fetchone()
+            if lap:
+                lap['lap_time'] = float(lap['lap_time']) if lap['lap_time'] else None
+                lap['live'] = True
+                return jsonify(lap)
+            # No lap captured in the live window: the frontend shows dashes.
+            return jsonify({})
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            try: cursor.close()
-            except: pass
-        if conn:
-            try: conn.close()
-            except: pass
+
+
+# LIVE STREAM (Server-Sent Events)
+#
+# /api/stream replaces the page's 2 s latest-lap poll and 5 s session
+# reload: one LiveWatcher thread polls live_state and the data_version
+# tokens for every subscriber and pushes only what changed (see
+# live_stream).  Each open stream holds a server thread, so the number of
+# streams is capped via LIVE_STREAM_MAX (default 8); past the cap, or
+# without data_version, the endpoint answers 503 and the page keeps
+# polling.
+def _live_cards(cursor):
+    """Every driver's live card inside LIVE_WINDOW, newest lap first."""
+    cutoff = (datetime.datetime.now() - LIVE_WINDOW).strftime('%Y-%m-%d %H:%M:%S')
+    cursor.execute("""
+        SELECT
+            ls.driver_code,
+            ls.lap_id,
+            ls.lap_time_ms / 1000.0 AS lap_time,
+            ls.lap_number,
+            ls.tyre_compound,
+            ls.tyre_age,
+            ls.session_id,
+            ls.track_name
+        FROM live_state ls
+        WHERE ls.captured_at >= %s
+        ORDER BY ls.lap_id DESC
+    """, (cutoff,))
+    cards = cursor.fetchall()
+    for card in cards:
+        card['lap_time'] = float(card['lap_time']) if card['lap_time'] else None
+        card['live'] = True
+    return cards
+
+
+live_watcher = LiveWatcher(
+    _db_cursor, _live_cards, _session_lap_rows,
+    max_subscribers=env_number('LIVE_STREAM_MAX', 8, int),
+)
+
+
+@app.route('/api/stream')
+def live_stream():
+    """SSE: ``live`` (cards), ``laps`` (new / changed lap rows of a session)
+    and ``events`` (new strategy events)."""
+    if _data_version('all') is None:
+        return jsonify({"error": "live stream unavailable — poll instead"}), 503
+    q = live_watcher.subscribe()
+    if q is None:
+        return jsonify({"error": "too many live streams — poll instead"}), 503
+    resp = app.response_class(live_watcher.stream(q), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-store'
+    # Tell reverse proxies (nginx) not to buffer the stream.
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
 
 
 # DASHBOARD DRIVER LIST
 @app.route('/api/drivers/list')
+@cached()
 def get_drivers_list():
     """Distinct drivers that have sessions in the database.
 
     Feeds the dashboard driver selector; returns per-driver session/lap
     counts and the most recent session date.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT
-                d.driver_id,
-                d.driver_code,
-                d.driver_name,
-                COUNT(DISTINCT s.session_id) AS sessions,
-                COUNT(l.lap_id) AS laps,
-                MAX(s.date) AS last_seen
-            FROM drivers d
-            JOIN sessions s ON s.driver_id = d.driver_id
-            LEFT JOIN laps l ON l.session_id = s.session_id
-            GROUP BY d.driver_id, d.driver_code, d.driver_name
-            ORDER BY d.driver_code
-        """)
-        drivers = []
-        for r in cursor.fetchall():
-            drivers.append({
-                "driver_id": r['driver_id'],
-                "code": r['driver_code'],
-                "name": r['driver_name'],
-                "sessions": r['sessions'],
-                "laps": r['laps'],
-                "last_seen": r['last_seen'].strftime('%Y-%m-%d') if r['last_seen'] else None,
-            })
-        resp = jsonify({"drivers": drivers})
-        resp.headers['Cache-Control'] = 'no-store'
-        return resp
+        with _db_cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    d.driver_id,
+                    d.driver_code,
+                    d.driver_name,
+                    COUNT(DISTINCT s.session_id) AS sessions,
+                    COUNT(l.lap_id) AS laps,
+                    MAX(s.date) AS last_seen
+                FROM drivers d
+                JOIN sessions s ON s.driver_id = d.driver_id
+                LEFT JOIN laps l ON l.session_id = s.session_id
+                GROUP BY d.driver_id, d.driver_code, d.driver_name
+                ORDER BY d.driver_code
+            """)
+            drivers = []
+            for r in cursor.fetchall():
+                drivers.append({
+                    "driver_id": r['driver_id'],
+                    "code": r['driver_code'],
+                    "name": r['driver_name'],
+                    "sessions": r['sessions'],
+                    "laps": r['laps'],
+                    "last_seen": r['last_seen'].strftime('%Y-%m-%d') if r['last_seen'] else None,
+                })
+            resp = jsonify({"drivers": drivers})
+            resp.headers['Cache-Control'] = 'no-store'
+            return resp
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            try: cursor.close()
-            except: pass
-        if conn:
-            try: conn.close()
-            except: pass
 
 
 # PREDICTOR API
 @app.route('/api/predict/options')
+@cached(scope=None)
 def get_predict_options():
     if not feature_names:
         return jsonify({"error": "Model not loaded"}), 500
@@ -386,15 +605,8 @@ def predict_lap():
         except ValueError as exc:
             return jsonify({"error": str(exc)}), 400
 
-        input_data = construct_prediction_input(
-            tyre_age=tyre_age,
-            lap_number=lap_number,
-            tyre_compound=tyre_compound,
-            track_name=track_name,
-            feature_names=feature_names
-        )
-
-        predicted_time = float(model.predict(input_data)[0])
+        predicted_time = float(compile_model(model, feature_names).predict(
+            tyre_age, tyre_compound, track_name))
         minutes = int(predicted_time // 60)
         seconds = predicted_time % 60
 
@@ -416,9 +628,138 @@ def predict_lap():
         return jsonify({"error": str(e)}), 500
 
 
+# Batch prediction: scripts sweeping thousands of (age, tyre, track)
+# combinations send them in one request instead of one /api/predict each.
+# Bounded so one request cannot tie up a worker or its memory.
+PREDICT_BATCH_MAX_ROWS = env_number('PREDICT_BATCH_MAX_ROWS', 10000, int)
+PREDICT_BATCH_MAX_BYTES = env_number('PREDICT_BATCH_MAX_BYTES', 4 * 1024 * 1024, int)
+PREDICT_FIELDS = ('tyre_age', 'lap_number', 'tyre_compound', 'track_name')
+
+
+def _batch_columns(body):
+    """(columns, row count) of a /api/predict/batch body.
+
+    Accepts a list of /api/predict bodies (bare or as ``{"rows": [...]}``)
+    or columnar ``{"tyre_age": [...], ...}``, where a scalar column
+    applies to every row.  Missing values are None.
+    """
+    if isinstance(body, dict) and 'rows' in body:
+        body = body['rows']
+    if isinstance(body, list):
+        return {f: [row.get(f) if isinstance(row, dict) else None for row in body]
+                for f in PREDICT_FIELDS}, len(body)
+    if not isinstance(body, dict):
+        raise ValueError("Expected a list of rows or an object of columns")
+    lengths = {len(body[f]) for f in PREDICT_FIELDS if isinstance(body.get(f), list)}
+    if len(lengths) > 1:
+        raise ValueError("Columns must all have the same length")
+    n = lengths.pop() if lengths else 1
+    return {f: body.get(f) if isinstance(body.get(f), list) else [body.get(f)] * n
+            for f in PREDICT_FIELDS}, n
+
+
+def _read_body(limit):
+    """The raw request body, or None once it passes ``limit`` bytes.
+
+    Counted while reading, so a chunked body (no Content-Length) is cut
+    off at the limit instead of being buffered whole by get_json().
+    """
+    chunks, size = [], 0
+    while True:
+        chunk = request.stream.read(min(64 * 1024, limit + 1 - size))
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return None
+
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """/api/predict for many rows in one vectorised model call.
+
+    Coverage is checked once per distinct (tyre, track); a row that fails
+    parsing or coverage gets a null prediction and an entry in ``errors``
+    while the rest are still predicted.  Bodies over
+    PREDICT_BATCH_MAX_BYTES or PREDICT_BATCH_MAX_ROWS rows get a 413.
+    """
+    if model is None:
+        return jsonify({"error": "Model not loaded"}), 500
+    too_large = jsonify({"error": f"Request body over {PREDICT_BATCH_MAX_BYTES} bytes"}), 413
+    if (request.content_length or 0) > PREDICT_BATCH_MAX_BYTES:
+        return too_large
+    raw = _read_body(PREDICT_BATCH_MAX_BYTES)
+    if raw is None:
+        return too_large
+    try:
+        columns, n = _batch_columns(json.loads(raw))
+        if n > PREDICT_BATCH_MAX_ROWS:
+            return jsonify({"error": f"{n} rows; at most {PREDICT_BATCH_MAX_ROWS} per request"}), 413
+
+        coverage = {}           # (tyre, track) -> error message or None
+        rows, ages, tyres, tracks = [], [], [], []
+        fuel_loads = [None] * n
+        errors = []
+        for i, values in enumerate(zip(*(columns[f] for f in PREDICT_FIELDS))):
+            try:
+                missing = [f for f, v in zip(PREDICT_FIELDS, values) if v is None]
+                if missing:
+                    raise KeyError(missing[0])
+                tyre_age, lap_number, tyre, track = values
+                tyre_age = float(tyre_age)
+                fuel_load = estimate_fuel_load(int(lap_number))
+                key = (str(tyre), str(track))
+                if key not in coverage:
+                    try:
+                        validate_model_inputs(key[0], key[1], feature_names)
+                        coverage[key] = None
+                    except ValueError as exc:
+                        coverage[key] = str(exc)
+                if coverage[key]:
+                    raise ValueError(coverage[key])
+            except KeyError as e:
+                errors.append({"row": i, "error": f"Missing field: {e}"})
+            except (TypeError, ValueError) as e:
+                errors.append({"row": i, "error": str(e)})
+            else:
+                rows.append(i)
+                ages.append(tyre_age)
+                tyres.append(key[0])
+                tracks.append(key[1])
+                fuel_loads[i] = fuel_load
+
+        predicted = [None] * n
+        if rows:
+            times = compile_model(model, feature_names).predict(np.array(ages), tyres, tracks)
+            for i, t in zip(rows, np.asarray(times, dtype=float).tolist()):
+                predicted[i] = t
+
+        return jsonify({
+            "count":          n,
+            "predicted":      len(rows),
+            "predicted_time": predicted,
+            "fuel_load":      fuel_loads,
+            "errors":         errors,
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
 # STRATEGY ADVISOR API
-def _stint_time(tyre, start_age, laps, track, start_lap_number):
-    """Sum predicted lap times across a full stint.
+def _stint_times(stints, track):
+    """Summed predicted lap times for each ``(tyre, start_age, laps)`` stint.
+
+    Every lap of every stint is priced in one vectorised call -- the
+    compiled lookup for a linear model, otherwise one feature matrix and
+    one model.predict (see compiled_model) -- and the per-lap predictions
+    are then summed per stint with np.add.reduceat.  (The advisor used to build a one-row DataFrame
+    and call predict once per remaining lap per scenario -- ~300 calls for
+    a 50-laps-remaining query.)  A stint whose tyre or track the model
+    does not cover, or with no laps, totals 0.0.
 
     Predictions are detrended by the fuel-burn rate before summing so every
     scenario is evaluated on equal fuel footing.  The model's tyre_age
@@ -431,24 +772,24 @@ def _stint_time(tyre, start_age, laps, track, start_lap_number):
     |fuel_burn_rate| * age back to each prediction, since fuel_burn_rate <= 0)
     leaves only compound differences, pit loss and any genuine wear.
     """
-    tf = f'tyre_{tyre}'
-    tkf = f'track_{track}'
-    if tf not in feature_names or tkf not in feature_names or laps <= 0:
-        return 0.0
-    total = 0.0
-    for i in range(laps):
-        age = start_age + i
-        row = construct_prediction_input(
-            tyre_age=age,
-            lap_number=start_lap_number + i,
-            tyre_compound=tyre,
-            track_name=track,
-            feature_names=feature_names
-        )
-        predicted = float(model.predict(row)[0])
-        # Remove the fuel (non-wear) component of the age effect.
-        total += predicted - fuel_burn_rate * age
-    return total
+    totals = [0.0] * len(stints)
+    covered = [i for i, (tyre, _, laps) in enumerate(stints)
+               if f'tyre_{tyre}' in feature_names and f'track_{track}' in feature_names
+               and laps > 0]
+    if not covered:
+        return totals
+    lengths = [stints[i][2] for i in covered]
+    ages = np.concatenate([np.arange(stints[i][1], stints[i][1] + stints[i][2], dtype=float)
+                           for i in covered])
+    tyres = np.repeat([stints[i][0] for i in covered], lengths)
+    predicted = np.array(compile_model(model, feature_names).predict(ages, tyres, track),
+                         dtype=float)
+    # Remove the fuel (non-wear) component of the age effect.
+    predicted -= fuel_burn_rate * ages
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    for i, total in zip(covered, np.add.reduceat(predicted, starts)):
+        totals[i] = float(total)
+    return totals
 
 
 def _reason(event, strategy, laps_rem, tyre_age, tyre, pit_loss):
@@ -500,29 +841,25 @@ def analyze_strategy():
         laps_rem  = max(1, total_laps - cur_lap)
         pit_loss  = 15 if event in ['VSC', 'SafetyCar'] else 25
 
-        strategies = []
+        # Every scenario is one stint over the remaining laps: collect them
+        # all first, then price them with a single batched prediction.
+        candidates = []
 
         # Stay out
-        t = _stint_time(cur_tyre, cur_age, laps_rem, track, cur_lap)
-        if t > 0:
-            strategies.append({
-                "option":      "Stay Out",
-                "description": f"Continue on {cur_tyre} (age {cur_age})",
-                "total_time":  t,
-                "pit_stops":   0,
-                "risk":        "Medium" if cur_age > 15 else "Low"
-            })
+        candidates.append((cur_tyre, cur_age, {
+            "option":      "Stay Out",
+            "description": f"Continue on {cur_tyre} (age {cur_age})",
+            "pit_stops":   0,
+            "risk":        "Medium" if cur_age > 15 else "Low"
+        }))
 
         # Pit — same compound
-        t = _stint_time(cur_tyre, 0, laps_rem, track, cur_lap) + pit_loss
-        if t > pit_loss:
-            strategies.append({
-                "option":      f"Pit — Fresh {cur_tyre}",
-                "description": f"New {cur_tyre} tyres (+{pit_loss}s pit)",
-                "total_time":  t,
-                "pit_stops":   1,
-                "risk":        "Low"
-            })
+        candidates.append((cur_tyre, 0, {
+            "option":      f"Pit — Fresh {cur_tyre}",
+            "description": f"New {cur_tyre} tyres (+{pit_loss}s pit)",
+            "pit_stops":   1,
+            "risk":        "Low"
+        }))
 
         # Pit — harder compound (Supports both Modern F1 and Legacy compound progressions)
         #
@@ -542,15 +879,12 @@ def analyze_strategy():
         if cur_tyre in harder and fuel_burn_rate == 0.0:
             alt = harder[cur_tyre]
             if f'tyre_{alt}' in feature_names and laps_rem > 8:
-                t = _stint_time(alt, 0, laps_rem, track, cur_lap) + pit_loss
-                if t > pit_loss:
-                    strategies.append({
-                        "option":      f"Pit — Switch to {alt}",
-                        "description": f"More durable compound (+{pit_loss}s pit estimate)",
-                        "total_time":  t,
-                        "pit_stops":   1,
-                        "risk":        "Medium"
-                    })
+                candidates.append((alt, 0, {
+                    "option":      f"Pit — Switch to {alt}",
+                    "description": f"More durable compound (+{pit_loss}s pit estimate)",
+                    "pit_stops":   1,
+                    "risk":        "Medium"
+                }))
 
         # Pit — softer compound
         softer = {
@@ -564,30 +898,31 @@ def analyze_strategy():
             alt = softer[cur_tyre]
             # Only recommend if compound exists in the trained model's feature set
             if f'tyre_{alt}' in feature_names:
-                t = _stint_time(alt, 0, laps_rem, track, cur_lap) + pit_loss
-                if t > pit_loss:
-                    strategies.append({
-                        "option":      f"Pit — Switch to {alt}",
-                        "description": f"Attack mode — softer compound (+{pit_loss}s pit estimate)",
-                        "total_time":  t,
-                        "pit_stops":   1,
-                        "risk":        "High"
-                    })
-
+                candidates.append((alt, 0, {
+                    "option":      f"Pit — Switch to {alt}",
+                    "description": f"Attack mode — softer compound (+{pit_loss}s pit estimate)",
+                    "pit_stops":   1,
+                    "risk":        "High"
+                }))
 
         # Rain tyres
         if event == 'Rain':
             for rain in ['Intermediate', 'Wet']:
                 if f'tyre_{rain}' in feature_names:
-                    t = _stint_time(rain, 0, laps_rem, track, cur_lap) + pit_loss
-                    if t > pit_loss:
-                        strategies.append({
-                            "option":      f"Pit — {rain}",
-                            "description": f"Switch to {rain} for wet conditions",
-                            "total_time":  t,
-                            "pit_stops":   1,
-                            "risk":        "Low"
-                        })
+                    candidates.append((rain, 0, {
+                        "option":      f"Pit — {rain}",
+                        "description": f"Switch to {rain} for wet conditions",
+                        "pit_stops":   1,
+                        "risk":        "Low"
+                    }))
+
+        totals = _stint_times([(tyre, age, laps_rem) for tyre, age, _ in candidates], track)
+        strategies = []
+        for (_, _, strategy), t in zip(candidates, totals):
+            # 0.0 means the model could not price the stint.
+            if t > 0:
+                strategy["total_time"] = t + pit_loss * strategy["pit_stops"]
+                strategies.append(strategy)
 
         strategies.sort(key=lambda x: x['total_time'])
 
@@ -611,137 +946,261 @@ def analyze_strategy():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+def _plan_search(body):
+    """Parse an optimize / simulate body and run the pit-plan search.
+
+    Returns the parsed situation plus the lap-time tables and plans;
+    raises KeyError / ValueError on bad input."""
+    cur_lap    = int(body['current_lap'])
+    total_laps = int(body['total_laps'])
+    cur_tyre   = body['current_tyre']
+    cur_age    = int(body['current_age'])
+    track      = body['track']
+    event      = body.get('event_type', 'None')
+    used       = [str(c) for c in body.get('used_compounds') or []]
+    max_stops  = min(3, max(0, int(body.get('max_stops', 3))))
+    top_k      = min(20, max(1, int(body.get('top_k', 5))))
+
+    validate_model_inputs(cur_tyre, track, feature_names)
+
+    laps_rem = max(1, total_laps - cur_lap)
+    # Only a stop this lap gets the VSC / Safety Car discount.
+    neutral_now = event in ['VSC', 'SafetyCar']
+    # Rain tyres are only fitted when it is (or has been) wet.
+    wet = event == 'Rain' or any(c in WET_COMPOUNDS for c in used + [cur_tyre])
+    compounds = [c for c in covered_tyres(feature_names)
+                 if wet or c not in WET_COMPOUNDS or c == cur_tyre]
+
+    tables = lap_time_tables(compile_model(model, feature_names), compounds, track,
+                             cur_age + laps_rem, fuel_burn_rate)
+    plans = optimal_strategies(tables, laps_rem, cur_tyre, cur_age, pit_loss=25,
+                               pit_loss_now=15 if neutral_now else 25, max_stops=max_stops,
+                               top_k=top_k, used_compounds=used)
+    return {
+        "cur_lap": cur_lap, "total_laps": total_laps, "laps_rem": laps_rem,
+        "cur_tyre": cur_tyre, "cur_age": cur_age, "track": track, "event": event,
+        "neutral_now": neutral_now, "tables": tables, "plans": plans,
+    }
+
+
+def _plan_summary(plan, search):
+    """A pit plan as the dashboard shows it: option text, pit laps, stints."""
+    cur_lap, cur_tyre = search['cur_lap'], search['cur_tyre']
+    pit_laps = [cur_lap + p for p in plan['pit_after']]
+    bounds = [0] + plan['pit_after'] + [search['laps_rem']]
+    stops = ' → '.join(f"{c} (L{lap})" for c, lap in
+                       zip(plan['compounds'][1:], pit_laps))
+    return {
+        "option":     (f"{plan['stops']}-stop: {cur_tyre} → {stops}" if plan['stops']
+                       else f"No stop: {cur_tyre} to the flag"),
+        "total_time": plan['total_time'],
+        "pit_stops":  plan['stops'],
+        "pit_laps":   pit_laps,
+        "stints":     [{"compound": c, "laps": bounds[i + 1] - bounds[i]}
+                       for i, c in enumerate(plan['compounds'])],
+    }
+
+
+def _situation(search):
+    return {"lap": search['cur_lap'], "laps_remaining": search['laps_rem'],
+            "tyre": search['cur_tyre'], "tyre_age": search['cur_age']}
+
+
+@app.route('/api/strategy/optimize', methods=['POST'])
+def optimize_strategy():
+    """Top-K pit plans over every pit lap, compound choice and 0-3 stops
+    (see pit_strategy).  Same body as /api/strategy/analyze, plus optional
+    ``used_compounds`` (run earlier in the race), ``max_stops`` and
+    ``top_k``."""
+    if model is None:
+        return jsonify({"error": "Model not loaded"}), 500
+    try:
+        search = _plan_search(request.get_json())
+        return jsonify({
+            "event":             search['event'],
+            "current_situation": _situation(search),
+            "strategies":        [_plan_summary(plan, search) for plan in search['plans']],
+            "fuel_burn_rate":    fuel_burn_rate
+        })
+
+    except KeyError as e:
+        return jsonify({"error": f"Missing field: {e}"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# Rollouts per simulate request; a few thousand give win probabilities to
+# about +-1 %.
+SIMULATION_ROLLOUTS = env_number('SIMULATION_ROLLOUTS', 2000, int)
+SIMULATION_MAX_ROLLOUTS = env_number('SIMULATION_MAX_ROLLOUTS', 20000, int)
+
+
+@app.route('/api/strategy/simulate', methods=['POST'])
+def simulate_strategy():
+    """Monte Carlo rollouts of the optimizer's top plans under historical
+    Safety Car / VSC / red-flag risk at this track (see race_simulation).
+    Same body as /api/strategy/optimize, plus optional ``rollouts``,
+    ``window`` (laps a stop may be brought forward onto a neutralisation)
+    and ``seed``."""
+    if model is None:
+        return jsonify({"error": "Model not loaded"}), 500
+    try:
+        body     = request.get_json()
+        rollouts = min(SIMULATION_MAX_ROLLOUTS,
+                       max(1, int(body.get('rollouts', SIMULATION_ROLLOUTS))))
+        window   = min(10, max(0, int(body.get('window', 3))))
+        seed     = body.get('seed')
+        seed     = None if seed is None else int(seed)
+        search   = _plan_search(body)
+
+        tables, tyre = search['tables'], search['cur_tyre']
+        # Typical lap, to turn recorded neutralisation lengths into laps.
+        lap_time = float(np.median(tables[tyre]))
+        try:
+            with _db_cursor() as cursor:
+                rates = load_event_rates(cursor, search['track'], lap_time)
+        except Exception:
+            traceback.print_exc()
+            rates = EventRates({}, {}, source='unavailable')
+
+        result = simulate(tables, search['plans'], search['laps_rem'], search['total_laps'],
+                          tyre, search['cur_age'], rates, rollouts=rollouts,
+                          neutral_now=search['neutral_now'], window=window, seed=seed)
+        strategies = []
+        for plan, stats in zip(search['plans'], result['strategies']):
+            summary = _plan_summary(plan, search)
+            summary.update({k: stats[k] for k in ('mean', 'std', 'p5', 'p50', 'p95',
+                                                  'win_probability', 'discounted_stop_rate')})
+            strategies.append(summary)
+
+        return jsonify({
+            "event":             search['event'],
+            "current_situation": _situation(search),
+            "rollouts":          result['rollouts'],
+            "event_rates":       rates.to_dict(),
+            "neutralisation_probability": result['neutralisation_probability'],
+            "strategies":        strategies,
+        })
+
+    except KeyError as e:
+        return jsonify({"error": f"Missing field: {e}"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
 # DRIVER COMPARISON API (race data)
 #
 # The user flow: pick a season -> pick a track raced that season -> pick
 # two or more drivers -> overlay their actual race laps on one chart.
 
 def _sessions_on_track(cursor, year, track):
-    """Best session per driver for (year, track) from the database.
-
-    A driver can have several sessions on the same track in one season
-    (re-imports create duplicate sessions).  For each driver we keep the
-    session with the most timed laps, tie-broken by latest date, so the
-    comparison always uses one well-defined race per driver.
+    """The session each driver is compared on for (year, track).
+
+    Re-imports update sessions in place (unique import key), so what is
+    left to choose between are distinct sessions: a race plus qualifying /
+    practice, or a double-header at one circuit.  The database picks one
+    per driver -- a session with timed laps first, then Race over
+    Qualifying over Practice, then the latest date -- and the lap count
+    comes from session_stats rather than a scan of laps.
     """
     cursor.execute("""
-        SELECT d.driver_code, d.driver_name, s.session_id,
-               s.session_type, s.date,
-               COUNT(l.lap_id) AS laps
-        FROM sessions s
-        JOIN drivers d ON s.driver_id = d.driver_id
-        LEFT JOIN laps l ON l.session_id = s.session_id AND l.lap_time_ms > 0
-        WHERE YEAR(s.date) = %s AND s.track_name = %s
-        GROUP BY d.driver_code, d.driver_name, s.session_id, s.session_type, s.date
-        ORDER BY d.driver_code, s.date DESC
+        SELECT driver_code, driver_name, session_id, session_type, date, laps
+        FROM (
+            SELECT d.driver_code, d.driver_name, s.session_id, s.session_type,
+                   s.date, COALESCE(st.total_laps, 0) AS laps,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY d.driver_code
+                       ORDER BY CASE WHEN st.best_timed_ms IS NULL THEN 1 ELSE 0 END,
+                                CASE s.session_type WHEN 'Race' THEN 0
+                                                    WHEN 'Qualifying' THEN 1 ELSE 2 END,
+                                s.date DESC, s.session_id DESC
+                   ) AS pick
+            FROM sessions s
+            JOIN drivers d ON s.driver_id = d.driver_id
+            LEFT JOIN session_stats st ON st.session_id = s.session_id
+            WHERE YEAR(s.date) = %s AND s.track_name = %s
+        ) ranked
+        WHERE pick = 1
+        ORDER BY driver_code
     """, (year, track))
-    best = {}
-    for row in cursor.fetchall():
-        code = row['driver_code']
-        key = (row['laps'], row['date'] or datetime.date.min, row['session_id'])
-        cur = best.get(code)
-        if cur is None or key > cur[0]:
-            best[code] = (key, row)
-    return {code: row for code, (_, row) in best.items()}
+    return {row['driver_code']: row for row in cursor.fetchall()}
 
 
 @app.route('/api/comparison/years')
+@cached()
 def comparison_years():
     """Seasons that have timed laps in the database (newest first)."""
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT DISTINCT YEAR(s.date) AS year
-            FROM sessions s
-            JOIN laps l ON l.session_id = s.session_id
-            WHERE s.date IS NOT NULL AND l.lap_time_ms > 0
-            ORDER BY year DESC
-        """)
-        years = [r['year'] for r in cursor.fetchall()]
-        return jsonify({"years": years})
+        with _db_cursor() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT YEAR(s.date) AS year
+                FROM sessions s
+                JOIN laps l ON l.session_id = s.session_id
+                WHERE s.date IS NOT NULL AND l.lap_time_ms > 0
+                ORDER BY year DESC
+            """)
+            years = [r['year'] for r in cursor.fetchall()]
+            return jsonify({"years": years})
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            try: cursor.close()
-            except: pass
-        if conn:
-            try: conn.close()
-            except: pass
 
 
 @app.route('/api/comparison/tracks')
+@cached()
 def comparison_tracks():
     """Tracks with timed laps in a given season."""
     year = request.args.get('year', type=int)
     if not year:
         return jsonify({"error": "year query param required"}), 400
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT DISTINCT s.track_name
-            FROM sessions s
-            JOIN laps l ON l.session_id = s.session_id
-            WHERE YEAR(s.date) = %s AND s.track_name IS NOT NULL
-              AND l.lap_time_ms > 0
-            ORDER BY s.track_name
-        """, (year,))
-        tracks = [r['track_name'] for r in cursor.fetchall()]
-        return jsonify({"tracks": tracks})
+        with _db_cursor() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT s.track_name
+                FROM sessions s
+                JOIN laps l ON l.session_id = s.session_id
+                WHERE YEAR(s.date) = %s AND s.track_name IS NOT NULL
+                  AND l.lap_time_ms > 0
+                ORDER BY s.track_name
+            """, (year,))
+            tracks = [r['track_name'] for r in cursor.fetchall()]
+            return jsonify({"tracks": tracks})
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            try: cursor.close()
-            except: pass
-        if conn:
-            try: conn.close()
-            except: pass
 
 
 @app.route('/api/comparison/drivers')
+@cached()
 def comparison_drivers():
     """Drivers (best session each) that raced a track in a season."""
     year = request.args.get('year', type=int)
     track = request.args.get('track', '').strip()
     if not year or not track:
         return jsonify({"error": "year and track query params required"}), 400
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        best = _sessions_on_track(cursor, year, track)
-        drivers = []
-        for code in sorted(best):
-            row = best[code]
-            drivers.append({
-                "code": code,
-                "name": row['driver_name'],
-                "session_id": row['session_id'],
-                "session_type": row['session_type'],
-                "date": row['date'].strftime('%Y-%m-%d') if row['date'] else None,
-                "laps": row['laps'],
-            })
-        return jsonify({"drivers": drivers})
+        with _db_cursor() as cursor:
+            best = _sessions_on_track(cursor, year, track)
+            drivers = []
+            for code in sorted(best):
+                row = best[code]
+                drivers.append({
+                    "code": code,
+                    "name": row['driver_name'],
+                    "session_id": row['session_id'],
+                    "session_type": row['session_type'],
+                    "date": row['date'].strftime('%Y-%m-%d') if row['date'] else None,
+                    "laps": row['laps'],
+                })
+            return jsonify({"drivers": drivers})
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            try: cursor.close()
-            except: pass
-        if conn:
-            try: conn.close()
-            except: pass
 
 
 @app.route('/api/comparison/race')
@@ -749,117 +1208,124 @@ def comparison_race():
     """Actual race laps for two or more drivers on a track in a season.
 
     drivers is a comma-separated list of driver codes (e.g. VER,LEC).
-    Each driver's laps come from their best session on that track/season.
+    Each driver's laps come from their best session on that track/season;
+    with format=columnar they are one array per field (telemetry split the
+    same way, None on laps without it).
     """
     year = request.args.get('year', type=int)
     track = request.args.get('track', '').strip()
     codes = [c.strip().upper() for c in request.args.get('drivers', '').split(',') if c.strip()]
     if not year or not track or not codes:
         return jsonify({"error": "year, track and drivers query params required"}), 400
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        best = _sessions_on_track(cursor, year, track)
-        result = {}
-        missing = []
-        for code in codes:
-            if code not in best:
-                missing.append(code)
-                continue
-            row = best[code]
-            cursor.execute("""
-                SELECT
-                    l.lap_id,
-                    l.lap_number,
-                    l.lap_time_ms / 1000.0 AS lap_time,
-                    l.tyre_compound,
-                    l.tyre_age,
-                    l.is_valid,
-                    MAX(CASE WHEN se.event_type = 'PitStop' THEN 1 ELSE 0 END) AS has_pit_stop
-                FROM laps l
-                LEFT JOIN strategy_events se ON l.lap_id = se.lap_id
-                WHERE l.session_id = %s AND l.lap_time_ms > 0
-                GROUP BY l.lap_id, l.lap_number, l.lap_time_ms, l.tyre_compound,
-                         l.tyre_age, l.is_valid
-                ORDER BY l.lap_number
-            """, (row['session_id'],))
-            laps = []
-            lap_ids = []
-            for lap in cursor.fetchall():
-                lap_ids.append(lap['lap_id'])
-                laps.append({
-                    "lap_id": lap['lap_id'],
-                    "lap_number": int(lap['lap_number']),
-                    "lap_time": float(lap['lap_time']),
-                    "tyre_compound": lap['tyre_compound'],
-                    "tyre_age": int(lap['tyre_age']) if lap['tyre_age'] is not None else None,
-                    "is_valid": bool(lap['is_valid']),
-                    "has_pit_stop": bool(lap['has_pit_stop']),
-                })
+        columnar = _columnar_requested()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        with _db_cursor() as cursor:
+            best = _sessions_on_track(cursor, year, track)
+            result = {}
+            missing = []
+            for code in codes:
+                if code not in best:
+                    missing.append(code)
+                    continue
+                row = best[code]
+                cursor.execute("""
+                    SELECT
+                        l.lap_id,
+                        l.lap_number,
+                        l.lap_time_ms / 1000.0 AS lap_time,
+                        l.tyre_compound,
+                        l.tyre_age,
+                        l.is_valid,
+                        MAX(CASE WHEN se.event_type = 'PitStop' THEN 1 ELSE 0 END) AS has_pit_stop
+                    FROM laps l
+                    LEFT JOIN strategy_events se ON l.lap_id = se.lap_id
+                    WHERE l.session_id = %s AND l.lap_time_ms > 0
+                    GROUP BY l.lap_id, l.lap_number, l.lap_time_ms, l.tyre_compound,
+                             l.tyre_age, l.is_valid
+                    ORDER BY l.lap_number
+                """, (row['session_id'],))
+                laps = []
+                lap_ids = []
+                for lap in cursor.fetchall():
+                    lap_ids.append(lap['lap_id'])
+                    laps.append({
+                        "lap_id": lap['lap_id'],
+                        "lap_number": int(lap['lap_number']),
+                        "lap_time": float(lap['lap_time']),
+                        "tyre_compound": lap['tyre_compound'],
+                        "tyre_age": int(lap['tyre_age']) if lap['tyre_age'] is not None else None,
+                        "is_valid": bool(lap['is_valid']),
+                        "has_pit_stop": bool(lap['has_pit_stop']),
+                    })
 
-            # Per-lap telemetry aggregates (speed / gear / RPM) for the
-            # chart tooltip.  Both live capture and FastF1 imports (sampled
-            # telemetry) populate the table; laps without rows simply carry
-            # no 'telemetry' key.
-            telemetry = {}
-            if lap_ids:
-                placeholders = ','.join(['%s'] * len(lap_ids))
-                cursor.execute(f"""
-                    SELECT t.lap_id,
-                           AVG(t.speed) AS avg_speed,
-                           MAX(t.speed) AS top_speed,
-                           AVG(t.gear) AS avg_gear,
-                           AVG(t.rpm) AS avg_rpm
-                    FROM telemetry t
-                    WHERE t.lap_id IN ({placeholders})
-                    GROUP BY t.lap_id
-                """, lap_ids)
-                for t in cursor.fetchall():
-                    telemetry[t['lap_id']] = t
-
-            for lap in laps:
-                lap_id = lap.pop('lap_id')
-                agg = telemetry.get(lap_id)
-                if agg is not None:
-                    lap['telemetry'] = {
-                        "avg_speed": int(round(float(agg['avg_speed']))) if agg['avg_speed'] is not None else None,
-                        "top_speed": int(round(float(agg['top_speed']))) if agg['top_speed'] is not None else None,
-                        "avg_gear": round(float(agg['avg_gear']), 1) if agg['avg_gear'] is not None else None,
-                        "avg_rpm": int(round(float(agg['avg_rpm']))) if agg['avg_rpm'] is not None else None,
-                    }
-            result[code] = {
-                "name": row['driver_name'],
-                "session_id": row['session_id'],
-                "session_type": row['session_type'],
-                "date": row['date'].strftime('%Y-%m-%d') if row['date'] else None,
-                "laps": laps,
-            }
-        payload = {"drivers": result, "year": year, "track": track}
-        if missing:
-            payload["missing"] = missing
-        return jsonify(payload)
+                # Per-lap telemetry aggregates (speed / gear / RPM) for the
+                # chart tooltip, precomputed in lap_telemetry_stats by the
+                # capture and import writers (see summary_tables) -- a key
+                # lookup, never a scan of the raw telemetry table.  Laps
+                # without a row simply carry no 'telemetry' key; a session
+                # not yet backfilled falls back to its columnar archive
+                # while that is still current.
+                telemetry = {}
+                if lap_ids:
+                    placeholders = ','.join(['%s'] * len(lap_ids))
+                    cursor.execute(f"""
+                        SELECT lap_id, avg_speed, top_speed, avg_gear, avg_rpm
+                        FROM lap_telemetry_stats
+                        WHERE lap_id IN ({placeholders})
+                    """, lap_ids)
+                    for t in cursor.fetchall():
+                        telemetry[t['lap_id']] = t
+                    if not telemetry:
+                        archive = open_archive(row['session_id'], cursor=cursor)
+                        if archive is not None:
+                            telemetry = lap_telemetry_aggregates(archive)
+
+                for lap in laps:
+                    lap_id = lap.pop('lap_id')
+                    agg = telemetry.get(lap_id)
+                    if agg is not None:
+                        lap['telemetry'] = {
+                            "avg_speed": int(round(float(agg['avg_speed']))) if agg['avg_speed'] is not None else None,
+                            "top_speed": int(round(float(agg['top_speed']))) if agg['top_speed'] is not None else None,
+                            "avg_gear": round(float(agg['avg_gear']), 1) if agg['avg_gear'] is not None else None,
+                            "avg_rpm": int(round(float(agg['avg_rpm']))) if agg['avg_rpm'] is not None else None,
+                        }
+                result[code] = {
+                    "name": row['driver_name'],
+                    "session_id": row['session_id'],
+                    "session_type": row['session_type'],
+                    "date": row['date'].strftime('%Y-%m-%d') if row['date'] else None,
+                    "laps": _columnar(laps, RACE_LAP_FIELDS) if columnar else laps,
+                }
+            payload = {"drivers": result, "year": year, "track": track}
+            if missing:
+                payload["missing"] = missing
+            return jsonify(payload)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if cursor:
-            try: cursor.close()
-            except: pass
-        if conn:
-            try: conn.close()
-            except: pass
 
 
 # DRIVER COMPARISON API (models)
+#
+# Per-driver models stay loaded between requests (LRU by driver and season;
+# a retrained model is picked up within DRIVER_MODEL_RECHECK seconds).
+driver_models = driver_comparison.ModelRegistry(
+    max_entries=env_number('DRIVER_MODEL_CACHE', 16, int),
+    recheck_seconds=env_number('DRIVER_MODEL_RECHECK', 2.0, float),
+)
+
+
 @app.route('/api/drivers')
 def get_drivers():
     """List per-driver models available for head-to-head comparison."""
     try:
         # no-store: a retrain adds year models, and a browser must never
         # reuse a stale model list across page loads.
-        resp = jsonify(driver_comparison.list_driver_models())
+        resp = jsonify(driver_models.list_drivers())
         resp.headers['Cache-Control'] = 'no-store'
         return resp
     except Exception as e:
@@ -884,7 +1350,8 @@ def compare_drivers_api():
         year = request.args.get('year', type=int)
         if 'year' in request.args and year is None:
             return jsonify({"error": "year must be an integer season (e.g. 2021)"}), 400
-        resp = jsonify(driver_comparison.compare_drivers(code_a, code_b, year=year))
+        resp = jsonify(driver_comparison.compare_drivers(code_a, code_b, year=year,
+                                                          registry=driver_models))
         resp.headers['Cache-Control'] = 'no-store'
         return resp
     except FileNotFoundError as e:
@@ -896,6 +1363,67 @@ def compare_drivers_api():
         return jsonify({"error": str(e)}), 500
 
 
+# Drivers per /api/drivers/compare-field request (a full grid is ~20).
+FIELD_MAX_DRIVERS = env_number('FIELD_MAX_DRIVERS', 30, int)
+
+
+@app.route('/api/drivers/compare-field')
+def compare_field_api():
+    """Every requested driver against every other in one request:
+    ?codes=HAM,VER,LEC[&year=<SEASON>].  Each model predicts once over the
+    union of the drivers' (track, tyre, age) cells; the answer is the
+    ranked gap grid with pairwise significance (see comparison_matrix)."""
+    try:
+        codes = [c.strip() for value in request.args.getlist('codes')
+                 for c in value.split(',') if c.strip()]
+        if len(set(codes)) < 2:
+            return jsonify({"error": "codes must name at least two drivers"}), 400
+        if len(set(codes)) > FIELD_MAX_DRIVERS:
+            return jsonify({"error": f"At most {FIELD_MAX_DRIVERS} drivers per request"}), 400
+        year = request.args.get('year', type=int)
+        if 'year' in request.args and year is None:
+            return jsonify({"error": "year must be an integer season (e.g. 2021)"}), 400
+        resp = jsonify(comparison_matrix.field_comparison(codes, year=year,
+                                                          registry=driver_models))
+        resp.headers['Cache-Control'] = 'no-store'
+        return resp
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/drivers/matrix')
+def driver_matrix_api():
+    """Ranked all-pairs gap grid from the precomputed comparison matrix
+    (scripts/comparison_matrix.py build).  Optional ?year=<SEASON> uses
+    that season's per-driver-per-year models; ?driver_a=&driver_b=
+    returns just that pair, with its per-track gaps and significance."""
+    try:
+        year = request.args.get('year', type=int)
+        if 'year' in request.args and year is None:
+            return jsonify({"error": "year must be an integer season (e.g. 2021)"}), 400
+        matrix = comparison_matrix.load_matrix()
+        code_a = request.args.get('driver_a', '').strip()
+        code_b = request.args.get('driver_b', '').strip()
+        if code_a or code_b:
+            if not code_a or not code_b or code_a == code_b:
+                return jsonify({"error": "driver_a and driver_b must name two different drivers"}), 400
+            payload = matrix.pair(code_a, code_b, year=year)
+        else:
+            payload = matrix.grid(year=year)
+        payload["built_at"] = matrix.meta.get('built_at')
+        return jsonify(payload)
+    except (FileNotFoundError, KeyError) as e:
+        return jsonify({"error": str(e.args[0] if e.args else e)}), 404
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
 def clickable(url, text=None):
     if text is None:
         text = url
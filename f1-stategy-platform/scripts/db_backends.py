@@ -0,0 +1,484 @@
+"""Embedded storage backends behind ``config.get_db_connection``.
+
+The platform is written against MySQL through mysql-connector.  For a pit
+wall laptop or an offline analysis box without a MySQL server, DB_BACKEND
+selects an embedded engine that runs the same schema and the same queries:
+
+    DB_BACKEND=mysql    (default) MySQL server from DB_HOST / DB_USER / ...
+    DB_BACKEND=sqlite   single file at DB_PATH (default f1_strategy.sqlite3)
+
+and, for read-only analytics (training extracts, analysis reports),
+DB_ANALYTICS_BACKEND=duckdb attaches the primary database to an in-process
+DuckDB engine (needs the ``duckdb`` package plus its sqlite / mysql
+extension).
+
+The embedded connections mimic the slice of the mysql-connector API the
+code base uses -- ``cursor(dictionary=True)``, ``lastrowid``, ``commit`` /
+``rollback`` / ``ping`` / ``in_transaction`` -- and translate each
+statement on the fly (``translate_sql``):
+
+    %s placeholders                        -> ?
+    YEAR(expr)                             -> CAST(strftime('%Y', expr) AS INTEGER)
+    a / 1000                               -> a / 1000.0   (MySQL '/' never truncates)
+    DELETE t FROM tbl t JOIN ... WHERE ... -> DELETE FROM tbl WHERE rowid IN (SELECT t.rowid ...)
+    ON DUPLICATE KEY UPDATE c = VALUES(c)  -> ON CONFLICT DO UPDATE SET c = excluded.c
+    pk = LAST_INSERT_ID(pk)                -> RETURNING pk  (read back into lastrowid)
+
+The schema is generated from database/schema.sql by ``sqlite_schema``
+(ENUM -> TEXT + CHECK, AUTO_INCREMENT -> INTEGER PRIMARY KEY AUTOINCREMENT,
+KEY / UNIQUE KEY -> CREATE [UNIQUE] INDEX), so there is one schema to
+maintain.
+
+    python scripts/db_backends.py init              # create the SQLite schema
+    python scripts/db_backends.py copy-from-mysql   # copy every table from MySQL
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sqlite3
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCHEMA_PATH = PROJECT_ROOT / "database" / "schema.sql"
+DEFAULT_SQLITE_PATH = PROJECT_ROOT / "f1_strategy.sqlite3"
+
+BACKENDS = ("mysql", "sqlite")
+ANALYTICS_BACKENDS = ("duckdb",)
+
+# Tables in foreign-key order (parents first) -- used by copy_database.
+# session_stats is left out: it is derived, and rebuilt after a copy.
+TABLE_ORDER = (
+    "regulations", "seasons", "data_sources", "tracks", "track_aliases",
+    "drivers", "sessions", "laps", "telemetry", "strategy_events",
+    "lap_telemetry_stats", "live_state", "data_version",
+)
+# Added by database/migrate_*.sql: a source that predates them is copied
+# without them.  lap_telemetry_stats is copied, not rebuilt, because for
+# laps compacted to retention 'aggregated' it is the only data left.
+MIGRATED_TABLES = ("lap_telemetry_stats", "live_state", "data_version")
+
+
+# ---------------------------------------------------------------------------
+# Date handling: store ISO text, read DATE / TIMESTAMP columns back as
+# date / datetime like mysql-connector does.
+# ---------------------------------------------------------------------------
+
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(sep=" "))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+
+# Expressions (MAX(s.date), ...) carry no declared type, so SQLite hands
+# them back as text; rows are scanned for ISO dates to match MySQL.  No
+# text column of the schema holds a value of this shape.
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_ISO_DATETIME = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d+)?$")
+
+
+def _sqlite_value(value):
+    if isinstance(value, str) and 10 <= len(value) <= 26:
+        if _ISO_DATE.match(value):
+            return date.fromisoformat(value)
+        if _ISO_DATETIME.match(value):
+            return datetime.fromisoformat(value)
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Statement translation
+# ---------------------------------------------------------------------------
+
+_YEAR = re.compile(r"\bYEAR\s*\(([^()]+)\)", re.IGNORECASE)
+_INT_DIVISOR = re.compile(r"/\s*(\d+)(?![\d.])")
+_MULTI_DELETE = re.compile(
+    r"^\s*DELETE\s+(\w+)\s+FROM\s+(\w+)\s+(\w+)\s+(.*)$", re.IGNORECASE | re.DOTALL)
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b(.*)$", re.IGNORECASE | re.DOTALL)
+_VALUES_REF = re.compile(r"\bVALUES\s*\(\s*`?(\w+)`?\s*\)", re.IGNORECASE)
+_LAST_INSERT_ID = re.compile(
+    r"^\s*`?(\w+)`?\s*=\s*LAST_INSERT_ID\s*\(\s*`?(\w+)`?\s*\)\s*$", re.IGNORECASE)
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas that are not inside parentheses."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def translate_sql(sql: str, dialect: str, many: bool = False) -> Tuple[str, Optional[str]]:
+    """MySQL statement -> (``dialect`` statement, RETURNING column or None).
+
+    ``many`` marks an executemany statement: SQLite cannot return rows from
+    one, so a LAST_INSERT_ID assignment is simply dropped there (callers
+    re-select ids after bulk upserts anyway).
+    """
+    if dialect == "mysql":
+        return sql, None
+    returning = None
+    out = sql.replace("%s", "?")
+
+    if dialect == "sqlite":
+        out = _YEAR.sub(r"CAST(strftime('%Y', \1) AS INTEGER)", out)
+        out = _INT_DIVISOR.sub(r"/ \1.0", out)
+
+        m = _MULTI_DELETE.match(out)
+        if m and m.group(1).lower() == m.group(3).lower():
+            alias, table, rest = m.group(1), m.group(2), m.group(4)
+            out = (f"DELETE FROM {table} WHERE rowid IN "
+                   f"(SELECT {alias}.rowid FROM {table} {alias} {rest.strip()})")
+
+        m = _ON_DUPLICATE.search(out)
+        if m:
+            assignments = []
+            for part in _split_top_level(m.group(1)):
+                lid = _LAST_INSERT_ID.match(part)
+                if lid:
+                    returning = lid.group(2)
+                    continue
+                assignments.append(_VALUES_REF.sub(r"excluded.\1", part.strip()))
+            clause = "ON CONFLICT DO UPDATE SET " + ", ".join(assignments) if assignments \
+                else "ON CONFLICT DO NOTHING"
+            out = out[:m.start()] + clause
+            if returning and not many:
+                out += f" RETURNING {returning}"
+            else:
+                returning = None
+    return out, returning
+
+
+# ---------------------------------------------------------------------------
+# Schema: database/schema.sql (MySQL dump) -> SQLite DDL
+# ---------------------------------------------------------------------------
+
+_CREATE = re.compile(r"CREATE TABLE `(\w+)` \((.*)\)[^)]*$", re.DOTALL)
+_COLUMN = re.compile(r"^`(\w+)`\s+(\w+)(\([^)]*\))?(.*)$")
+
+
+def _sqlite_type(name: str, base: str, args: Optional[str]) -> str:
+    base = base.lower()
+    if base == "enum":
+        return f"TEXT CHECK (`{name}` IN {args})"
+    if base in ("int", "tinyint", "smallint", "bigint"):
+        return "INTEGER"
+    if base in ("float", "double", "decimal"):
+        return "REAL"
+    if base == "date":
+        return "DATE"
+    if base in ("datetime", "timestamp"):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def sqlite_schema(mysql_ddl: str) -> List[str]:
+    """SQLite statements equivalent to the CREATE TABLEs of a MySQL dump."""
+    text = re.sub(r"/\*!.*?\*/;?", "", mysql_ddl, flags=re.DOTALL)
+    text = "\n".join(line.split("--", 1)[0] for line in text.splitlines())
+    statements = []
+    for stmt in text.split(";"):
+        m = _CREATE.search(stmt.strip())
+        if not m:
+            continue
+        table, body = m.group(1), m.group(2)
+        lines = [l.strip().rstrip(",") for l in body.splitlines()]
+        lines = [l for l in lines if l]
+
+        auto_inc = None
+        columns, constraints, indexes = [], [], []
+        for line in lines:
+            if line.startswith("`"):
+                cm = _COLUMN.match(line)
+                name, base, args, rest = cm.group(1), cm.group(2), cm.group(3), cm.group(4)
+                if "AUTO_INCREMENT" in rest.upper():
+                    auto_inc = name
+                    columns.append(f"`{name}` INTEGER PRIMARY KEY AUTOINCREMENT")
+                    continue
+                rest = re.sub(r"\s+", " ", rest).strip()
+                columns.append(f"`{name}` {_sqlite_type(name, base, args)} {rest}".rstrip())
+            elif line.upper().startswith("PRIMARY KEY"):
+                if auto_inc is None or f"(`{auto_inc}`)" not in line:
+                    constraints.append(line)
+            elif line.upper().startswith(("UNIQUE KEY", "KEY")):
+                km = re.match(r"(UNIQUE\s+)?KEY `(\w+)` (\(.*\))", line, re.IGNORECASE)
+                unique = "UNIQUE " if km.group(1) else ""
+                indexes.append(
+                    f"CREATE {unique}INDEX `{table}__{km.group(2)}` ON `{table}` {km.group(3)}")
+            elif line.upper().startswith("CONSTRAINT"):
+                constraints.append(line)
+        statements.append(f"DROP TABLE IF EXISTS `{table}`")
+        statements.append(
+            f"CREATE TABLE `{table}` (\n  " + ",\n  ".join(columns + constraints) + "\n)")
+        statements.extend(indexes)
+    return statements
+
+
+# ---------------------------------------------------------------------------
+# mysql-connector-shaped wrappers
+# ---------------------------------------------------------------------------
+
+class EmbeddedCursor:
+    """Cursor that translates MySQL statements for the embedded dialect."""
+
+    def __init__(self, raw, dialect: str, dictionary: bool = False) -> None:
+        self._raw = raw
+        self._dialect = dialect
+        self._dictionary = dictionary
+        self._drained = False     # RETURNING row already consumed
+        self.lastrowid: Optional[int] = None
+        self.rowcount = -1
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    def _convert(self, row):
+        if row is None:
+            return row
+        if self._dialect == "sqlite":
+            row = tuple(_sqlite_value(v) for v in row)
+        if not self._dictionary:
+            return row
+        names = [d[0] for d in self._raw.description]
+        return dict(zip(names, row))
+
+    def execute(self, sql: str, params: Sequence[Any] | None = None):
+        stmt, returning = translate_sql(sql, self._dialect)
+        self._raw.execute(stmt, tuple(params or ()))
+        self._drained = bool(returning)
+        if returning:
+            row = self._raw.fetchone()
+            self.lastrowid = row[0] if row else None
+        else:
+            self.lastrowid = getattr(self._raw, "lastrowid", None)
+        self.rowcount = getattr(self._raw, "rowcount", -1)
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        stmt, _ = translate_sql(sql, self._dialect, many=True)
+        self._drained = False
+        self._raw.executemany(stmt, [tuple(p) for p in seq_of_params])
+        self.lastrowid = getattr(self._raw, "lastrowid", None)
+        self.rowcount = getattr(self._raw, "rowcount", -1)
+        return self
+
+    def fetchone(self):
+        if self._drained:
+            return None
+        return self._convert(self._raw.fetchone())
+
+    def fetchall(self):
+        if self._drained:
+            return []
+        return [self._convert(r) for r in self._raw.fetchall()]
+
+    def fetchmany(self, size: int = 1):
+        if self._drained:
+            return []
+        return [self._convert(r) for r in self._raw.fetchmany(size)]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self) -> None:
+        try:
+            self._raw.close()
+        except Exception:
+            pass
+
+
+class EmbeddedConnection:
+    """SQLite / DuckDB connection with the mysql-connector surface we use."""
+
+    def __init__(self, raw, dialect: str) -> None:
+        self._raw = raw
+        self.dialect = dialect
+
+    def cursor(self, dictionary: bool = False, **_ignored) -> EmbeddedCursor:
+        return EmbeddedCursor(self._raw.cursor(), self.dialect, dictionary)
+
+    def commit(self) -> None:
+        self._raw.commit()
+
+    def rollback(self) -> None:
+        try:
+            self._raw.rollback()
+        except Exception:
+            # DuckDB raises when no transaction is open; MySQL does not.
+            if self.dialect != "duckdb":
+                raise
+
+    @property
+    def in_transaction(self) -> bool:
+        return bool(getattr(self._raw, "in_transaction", False))
+
+    def ping(self, reconnect: bool = False, **_ignored) -> None:
+        self._raw.execute("SELECT 1").fetchall()
+
+    def is_connected(self) -> bool:
+        try:
+            self.ping()
+            return True
+        except Exception:
+            return False
+
+    def close(self) -> None:
+        self._raw.close()
+
+
+def connect_sqlite(path: Path | str | None = None) -> EmbeddedConnection:
+    """Open (creating if needed) the SQLite database, schema included.
+
+    WAL journaling lets the dashboard read while capture/import write; the
+    busy timeout makes concurrent writers wait instead of failing.
+    """
+    path = Path(path) if path is not None else DEFAULT_SQLITE_PATH
+    fresh = not path.exists() or path.stat().st_size == 0
+    raw = sqlite3.connect(
+        str(path), timeout=30, check_same_thread=False,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+    )
+    raw.execute("PRAGMA foreign_keys = ON")
+    raw.execute("PRAGMA journal_mode = WAL")
+    conn = EmbeddedConnection(raw, "sqlite")
+    if fresh:
+        init_schema(conn)
+    return conn
+
+
+def init_schema(conn: EmbeddedConnection, schema_path: Path | None = None) -> None:
+    """(Re)create every table of database/schema.sql on an SQLite connection."""
+    ddl = Path(schema_path or SCHEMA_PATH).read_text(encoding="utf-8")
+    raw = conn._raw
+    raw.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for stmt in sqlite_schema(ddl):
+            raw.execute(stmt)
+        raw.commit()
+    finally:
+        raw.execute("PRAGMA foreign_keys = ON")
+
+
+def connect_duckdb_analytics(primary: str, sqlite_path: Path | str | None = None,
+                             mysql_config: Optional[Dict[str, Any]] = None) -> EmbeddedConnection:
+    """Read-only DuckDB engine over the primary database.
+
+    DuckDB scans the SQLite file (or the MySQL server) through its
+    ``sqlite`` / ``mysql`` extension, running the analytical queries with
+    its vectorised executor instead of the row-at-a-time primary engine.
+    """
+    if duckdb is None:
+        raise RuntimeError("duckdb is not installed (pip install duckdb)")
+    raw = duckdb.connect()
+    if primary == "sqlite":
+        path = Path(sqlite_path) if sqlite_path is not None else DEFAULT_SQLITE_PATH
+        raw.execute("INSTALL sqlite; LOAD sqlite;")
+        raw.execute(f"ATTACH '{path.as_posix()}' AS f1 (TYPE sqlite, READ_ONLY)")
+    else:
+        cfg = mysql_config or {}
+        dsn = " ".join(f"{k}={cfg[k]}" for k in ("host", "user", "password", "port")
+                       if cfg.get(k) is not None)
+        raw.execute("INSTALL mysql; LOAD mysql;")
+        raw.execute(f"ATTACH '{dsn} database={cfg.get('database', '')}' "
+                    f"AS f1 (TYPE mysql, READ_ONLY)")
+    raw.execute("USE f1")
+    return EmbeddedConnection(raw, "duckdb")
+
+
+# ---------------------------------------------------------------------------
+# Copy MySQL -> SQLite
+# ---------------------------------------------------------------------------
+
+def copy_database(src, dst: EmbeddedConnection, tables: Sequence[str] = TABLE_ORDER,
+                  batch: int = 5000) -> Dict[str, int]:
+    """Copy every row of ``tables`` from ``src`` into ``dst`` (emptied first).
+
+    Returns rows copied per table; a MIGRATED_TABLES table the source does
+    not have maps to None.
+    """
+    counts: Dict[str, Optional[int]] = {}
+    src_cur = src.cursor()
+    dst_cur = dst.cursor()
+    dst._raw.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for table in reversed(tables):
+            dst_cur.execute(f"DELETE FROM `{table}`")
+        for table in tables:
+            try:
+                src_cur.execute(f"SELECT * FROM `{table}`")
+            except Exception:
+                if table not in MIGRATED_TABLES:
+                    raise
+                counts[table] = None
+                continue
+            names = [d[0] for d in src_cur.description]
+            insert = (f"INSERT INTO `{table}` ({', '.join(f'`{n}`' for n in names)}) "
+                      f"VALUES ({', '.join(['%s'] * len(names))})")
+            counts[table] = 0
+            while True:
+                rows = src_cur.fetchmany(batch)
+                if not rows:
+                    break
+                dst_cur.executemany(insert, rows)
+                counts[table] += len(rows)
+        dst.commit()
+    finally:
+        dst._raw.execute("PRAGMA foreign_keys = ON")
+        src_cur.close()
+        dst_cur.close()
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the embedded SQLite database.")
+    parser.add_argument("command", choices=["init", "copy-from-mysql"])
+    parser.add_argument("--path", default=None, help=f"SQLite file (default: DB_PATH or {DEFAULT_SQLITE_PATH.name})")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import config
+
+    path = Path(args.path) if args.path else config.DB_PATH
+    dst = connect_sqlite(path)
+    try:
+        if args.command == "init":
+            init_schema(dst)
+            print(f"SQLite schema created: {path}")
+        else:
+            src = config.connect_backend("mysql")
+            try:
+                counts = copy_database(src, dst)
+            finally:
+                src.close()
+            for table, n in counts.items():
+                print(f"  {table:<20} {'not in source' if n is None else f'{n:>9} rows'}")
+            # session_stats is derived -- rebuilt from the copied rows rather
+            # than copied (the source may predate it); the rebuild also bumps
+            # data_version, seeding it when the source had none.
+            from summary_tables import rebuild_lap_telemetry_stats, rebuild_session_stats
+            if counts["lap_telemetry_stats"] is None:
+                print(f"  {'lap_telemetry_stats':<20} {rebuild_lap_telemetry_stats(dst):>9} rows (rebuilt)")
+            print(f"  {'session_stats':<20} {rebuild_session_stats(dst):>9} rows (rebuilt)")
+            print(f"Copied MySQL -> {path}")
+    finally:
+        dst.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -25,13 +25,18 @@ Fairness caveats (also returned in the payload)
 
 import sys
 import json
+import time
 import joblib
 import argparse
-import pandas as pd
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
+import numpy as np
+
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+from compiled_model import compile_model
 from feature_pipeline import covered_tracks, covered_tyres
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -151,6 +156,108 @@ def load_driver_model(code, year=None, models_dir=None):
     return model, feature_names, info, None
 
 
+def _mtime(path):
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class ModelRegistry:
+    """In-process cache of per-driver models and the driver list.
+
+    load_driver_model runs joblib.load twice and parses JSON, and
+    list_driver_models walks every directory and reads every
+    model_info.json; the dashboard did both on every request.  The
+    registry keeps up to ``max_entries`` loaded models in an LRU keyed by
+    (code, year), plus the last driver list.
+
+    Each entry remembers the mtimes of the files it was built from (for a
+    model: the year and the aggregate model files, so a year model that
+    appears later replaces the fallback; for the list: every driver and
+    year directory and their model files).  An entry is re-validated with
+    a few stat() calls at most every ``recheck_seconds`` and rebuilt when
+    anything changed -- so a retrain is picked up without a restart, and a
+    warm comparison in between does no disk I/O at all.
+    """
+
+    MODEL_FILES = ('best_model.pkl', 'feature_names.pkl', 'model_info.json')
+
+    def __init__(self, models_dir=None, max_entries=16, recheck_seconds=2.0):
+        self.models_dir = Path(models_dir) if models_dir else None
+        self.max_entries = max(1, int(max_entries))
+        self.recheck_seconds = float(recheck_seconds)
+        self._models = OrderedDict()    # (code, year) -> [value, watched, signature, checked]
+        self._drivers = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @property
+    def base(self):
+        return self.models_dir or DRIVER_MODELS_DIR
+
+    def _fresh(self, entry):
+        """True when ``entry`` may be served; re-stats its files when the
+        recheck interval has passed."""
+        now = time.monotonic()
+        if now - entry[3] < self.recheck_seconds:
+            return True
+        if tuple(_mtime(p) for p in entry[1]) != entry[2]:
+            return False
+        entry[3] = now
+        return True
+
+    def load(self, code, year=None):
+        """load_driver_model(code, year), cached."""
+        key = (code, year)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and self._fresh(entry):
+                self._models.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        dirs = [self.base / code] + ([self.base / code / str(year)] if year is not None else [])
+        watched = [d / name for d in dirs for name in self.MODEL_FILES]
+        signature = tuple(_mtime(p) for p in watched)
+        value = load_driver_model(code, year=year, models_dir=self.models_dir)
+        with self._lock:
+            self._models[key] = [value, watched, signature, time.monotonic()]
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_entries:
+                self._models.popitem(last=False)
+        return value
+
+    def list_drivers(self):
+        """list_driver_models(), cached."""
+        base = self.base
+        with self._lock:
+            entry = self._drivers
+            if entry is not None and self._fresh(entry):
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Adding or removing a directory entry changes the parent's
+        # mtime; rewritten model files change their own.
+        drivers = [d for d in base.iterdir() if d.is_dir()] if base.is_dir() else []
+        years = [y for d in drivers for y in d.iterdir() if y.is_dir()]
+        watched = ([base] + drivers + years
+                   + [d / name for d in drivers for name in self.MODEL_FILES]
+                   + [y / 'best_model.pkl' for y in years])
+        signature = tuple(_mtime(p) for p in watched)
+        value = list_driver_models(base)
+        with self._lock:
+            self._drivers = [value, watched, signature, time.monotonic()]
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._drivers = None
+
+
 def _significance(deltas):
     """Paired t-test on the per-track deltas: is the observed gap
     distinguishable from zero given the spread across tracks?
@@ -213,26 +320,28 @@ def _significance(deltas):
             "label": label, "note": note}
 
 
-def _predict(model, feature_names, track, tyre, age):
-    """Predict one lap time with a driver's model on an aligned feature row."""
-    row = pd.DataFrame(0, index=[0], columns=feature_names)
-    if 'tyre_age' in row.columns:
-        row['tyre_age'] = age
-    tyre_feature = f'tyre_{tyre}'
-    track_feature = f'track_{track}'
-    if tyre_feature in row.columns:
-        row[tyre_feature] = 1
-    if track_feature in row.columns:
-        row[track_feature] = 1
-    return float(model.predict(row)[0])
+def prediction_grid(model, feature_names, tracks, tyres, ages):
+    """(tracks, tyres, ages) array of a driver model's lap times on every
+    combination, from ONE vectorised predict (compiled lookup for a linear
+    model, one aligned feature matrix otherwise)."""
+    shape = (len(tracks), len(tyres), len(ages))
+    if not all(shape):
+        return np.empty(shape)
+    track_col = np.repeat(np.asarray(tracks, dtype=str), len(tyres) * len(ages))
+    tyre_col = np.tile(np.repeat(np.asarray(tyres, dtype=str), len(ages)), len(tracks))
+    age_col = np.tile(np.asarray(ages, dtype=float), len(tracks) * len(tyres))
+    predicted = compile_model(model, feature_names).predict(age_col, tyre_col, track_col)
+    return np.asarray(predicted, dtype=float).reshape(shape)
 
 
-def compare_drivers(code_a, code_b, ages=DEFAULT_AGES, models_dir=None, year=None):
+def compare_drivers(code_a, code_b, ages=DEFAULT_AGES, models_dir=None, year=None,
+                    registry=None):
     """Predict both drivers on every shared (track, tyre) at several ages.
 
     If year is provided, attempts to use per-driver-per-year models for
     that season (same-year = apples-to-apples comparison).  Falls back
     to aggregate per-driver models when year-specific models are not available.
+    Models come from ``registry`` (a ModelRegistry) when given.
 
     delta is defined as driver_a_time - driver_b_time, so a POSITIVE delta
     means driver B is faster (lower time) and a NEGATIVE delta means
@@ -240,24 +349,30 @@ def compare_drivers(code_a, code_b, ages=DEFAULT_AGES, models_dir=None, year=Non
     """
     if code_a == code_b:
         raise ValueError("Pick two different drivers to compare.")
-    model_a, feats_a, info_a, used_year_a = load_driver_model(
-        code_a, year=year, models_dir=models_dir)
-    model_b, feats_b, info_b, used_year_b = load_driver_model(
-        code_b, year=year, models_dir=models_dir)
+    if registry is not None:
+        model_a, feats_a, info_a, used_year_a = registry.load(code_a, year)
+        model_b, feats_b, info_b, used_year_b = registry.load(code_b, year)
+    else:
+        model_a, feats_a, info_a, used_year_a = load_driver_model(
+            code_a, year=year, models_dir=models_dir)
+        model_b, feats_b, info_b, used_year_b = load_driver_model(
+            code_b, year=year, models_dir=models_dir)
 
     tracks_a, tracks_b = covered_tracks(feats_a), covered_tracks(feats_b)
     tyres_a, tyres_b = covered_tyres(feats_a), covered_tyres(feats_b)
     shared_tracks = sorted(set(tracks_a) & set(tracks_b))
     shared_tyres = sorted(set(tyres_a) & set(tyres_b))
 
+    # Both models predicted once over the whole shared grid.
+    grid_a = prediction_grid(model_a, feats_a, shared_tracks, shared_tyres, ages).tolist()
+    grid_b = prediction_grid(model_b, feats_b, shared_tracks, shared_tyres, ages).tolist()
+
     per_track = []
-    for track in shared_tracks:
+    for ti, track in enumerate(shared_tracks):
         per_tyre = []
-        for tyre in shared_tyres:
+        for ci, tyre in enumerate(shared_tyres):
             rows = []
-            for age in ages:
-                ta = _predict(model_a, feats_a, track, tyre, age)
-                tb = _predict(model_b, feats_b, track, tyre, age)
+            for age, ta, tb in zip(ages, grid_a[ti][ci], grid_b[ti][ci]):
                 rows.append({
                     "age": int(age),
                     "driver_a": round(ta, 3),
@@ -0,0 +1,404 @@
+"""Offline Parquet extract of the FastF1 frames the importer uses.
+
+``session.load()`` re-parses FastF1's own HTTP cache (json/zip blobs) every
+time, which makes re-running imports after a schema or cleaning change
+slow.  The importer only ever reads a handful of columns from five frames,
+so after the first load those frames are written to a Parquet extract
+keyed by the resolved event -- (year, round number, session_type) -- so
+"Bahrain" and "Bahrain Grand Prix" share one extract:
+
+    f1_extract/<year>/index.json   race name -> round, for offline lookups
+    f1_extract/<year>/round-<NN>_<session_type>/
+        manifest.json              format version, event info, columns
+        laps.parquet
+        car_data/<driver>.parquet  one file per driver number
+        pos_data/<driver>.parquet  position timestamps only, per driver
+        track_status.parquet
+        race_control_messages.parquet
+        weather.parquet
+
+Later imports get an ``ExtractSession`` built straight from those files
+with column projection -- no FastF1 session object is constructed at all
+(FastF1 does not even need to be installed).  It exposes exactly the
+attributes ``import_race`` reads: ``laps``, ``car_data[driver]``,
+``pos_data[driver]``, ``track_status``, ``race_control_messages``,
+``weather_data`` and ``event``.  Its laps are plain DataFrames (no
+``Lap.get_telemetry()``): telemetry comes from ``car_data``, put back on
+get_telemetry()'s car + position timebase with the ``pos_data`` times.
+
+pyarrow is optional: without it (or with ``refresh=True``) every import
+goes through FastF1 as before.  Bump ``EXTRACT_VERSION`` whenever the
+column lists change so stale extracts are rebuilt.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import shutil
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+try:
+    import fastf1
+except ImportError:
+    fastf1 = None
+
+try:
+    import pyarrow  # noqa: F401  (pandas' Parquet engine)
+except ImportError:
+    pyarrow = None
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+EXTRACT_DIR = PROJECT_ROOT / "f1_extract"
+EXTRACT_VERSION = 3
+
+# Column projection: only what import_race / classify_weather /
+# extract_race_control_events actually read.
+LAP_COLUMNS = [
+    "DriverNumber", "Driver", "LapNumber", "LapTime", "Compound", "TyreLife",
+    "Deleted", "PitInTime", "PitOutTime", "LapStartTime", "Time",
+]
+CAR_COLUMNS = ["SessionTime", "Speed", "Throttle", "Brake", "nGear", "RPM", "DRS"]
+POS_COLUMNS = ["SessionTime"]
+TRACK_STATUS_COLUMNS = ["Time", "Status", "Message"]
+RCM_COLUMNS = ["Time", "Date", "Message"]
+WEATHER_COLUMNS = ["Time", "Rainfall"]
+EVENT_FIELDS = ["Location", "Country", "EventDate", "EventName", "RoundNumber"]
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", str(text).strip().lower()).strip("-")
+
+
+def extract_path(year: int, round_number: int, session_type: str,
+                 root: Path | None = None) -> Path:
+    """Directory of the extract for (year, round, session_type)."""
+    root = Path(root) if root is not None else EXTRACT_DIR
+    return root / str(year) / f"round-{int(round_number):02d}_{session_type.upper()}"
+
+
+def _index_path(year: int, root: Path | None) -> Path:
+    return (Path(root) if root is not None else EXTRACT_DIR) / str(year) / "index.json"
+
+
+def _read_index(year: int, root: Path | None) -> Dict[str, int]:
+    try:
+        return json.loads(_index_path(year, root).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def resolve_round(year: int, race_name: str, root: Path | None = None) -> Optional[int]:
+    """Round number of the event ``race_name`` names in ``year``, or None.
+
+    FastF1's event schedule resolves any name it accepts (fuzzy matching
+    included).  Without FastF1 -- or when the schedule is unavailable --
+    the names earlier extracts were written under (the typed name and the
+    official EventName) are looked up in the year's index.
+    """
+    if fastf1 is not None:
+        try:
+            return int(fastf1.get_event(year, race_name)["RoundNumber"])
+        except Exception as exc:
+            logging.warning(f"Could not resolve {race_name!r} {year} with FastF1 ({exc})")
+    return _read_index(year, root).get(_slug(race_name))
+
+
+def _project(df, columns: List[str]) -> Optional[pd.DataFrame]:
+    """Plain DataFrame with the wanted columns that exist (None if no frame)."""
+    if df is None or not hasattr(df, "columns"):
+        return None
+    keep = [c for c in columns if c in df.columns]
+    return pd.DataFrame(df[keep]).reset_index(drop=True)
+
+
+def _write_frame(df: Optional[pd.DataFrame], path: Path) -> Optional[List[str]]:
+    if df is None:
+        return None
+    # Object columns with mixed types (e.g. Deleted = True/False/None) are
+    # not Parquet-typable as-is; strings are, and the readers coerce back.
+    for col in df.columns:
+        if df[col].dtype == object:
+            if df[col].dropna().map(type).nunique() > 1:
+                df[col] = df[col].astype("string")
+    df.to_parquet(path, index=False)
+    return list(df.columns)
+
+
+def write_extract(session, year: int, race_name: str, session_type: str,
+                  root: Path | None = None) -> Optional[Path]:
+    """Write the importer's frames of a loaded FastF1 session.
+
+    The extract is built in a temp directory and renamed into place, so a
+    crash never leaves a half-written extract behind.  Returns the extract
+    directory, or None when pyarrow is missing or the write failed (the
+    import itself carries on either way).
+    """
+    if pyarrow is None:
+        return None
+    round_number = (session.event.get("RoundNumber") if hasattr(session.event, "get") else None)
+    if round_number is None or pd.isna(round_number):
+        round_number = resolve_round(year, race_name, root)
+    if round_number is None:
+        logging.warning(f"No round number for {race_name!r} {year}; extract not written")
+        return None
+    target = extract_path(year, round_number, session_type, root)
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        shutil.rmtree(tmp, ignore_errors=True)
+        (tmp / "car_data").mkdir(parents=True)
+        (tmp / "pos_data").mkdir()
+
+        columns: Dict[str, Any] = {
+            "laps": _write_frame(_project(session.laps, LAP_COLUMNS), tmp / "laps.parquet"),
+            "track_status": _write_frame(
+                _project(getattr(session, "track_status", None), TRACK_STATUS_COLUMNS),
+                tmp / "track_status.parquet"),
+            "race_control_messages": _write_frame(
+                _project(getattr(session, "race_control_messages", None), RCM_COLUMNS),
+                tmp / "race_control_messages.parquet"),
+            "weather": _write_frame(
+                _project(getattr(session, "weather_data", None), WEATHER_COLUMNS),
+                tmp / "weather.parquet"),
+        }
+
+        drivers = []
+        car_data = getattr(session, "car_data", None) or {}
+        for drv in list(car_data.keys()):
+            frame = _project(car_data[drv], CAR_COLUMNS)
+            if frame is not None and not frame.empty:
+                columns["car_data"] = _write_frame(frame, tmp / "car_data" / f"{drv}.parquet")
+                drivers.append(str(drv))
+
+        pos_drivers = []
+        pos_data = getattr(session, "pos_data", None) or {}
+        for drv in list(pos_data.keys()):
+            frame = _project(pos_data[drv], POS_COLUMNS)
+            if frame is not None and not frame.empty:
+                columns["pos_data"] = _write_frame(frame, tmp / "pos_data" / f"{drv}.parquet")
+                pos_drivers.append(str(drv))
+
+        event = {}
+        for field in EVENT_FIELDS:
+            value = session.event.get(field) if hasattr(session.event, "get") else None
+            if value is not None and pd.notna(value):
+                if field == "EventDate":
+                    event[field] = pd.Timestamp(value).isoformat()
+                elif field == "RoundNumber":
+                    event[field] = int(value)
+                else:
+                    event[field] = str(value)
+
+        manifest = {
+            "version": EXTRACT_VERSION,
+            "year": year,
+            "race": race_name,
+            "session_type": session_type.upper(),
+            "event": event,
+            "columns": columns,
+            "drivers": sorted(drivers),
+            "pos_drivers": sorted(pos_drivers),
+        }
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        shutil.rmtree(target, ignore_errors=True)
+        tmp.rename(target)
+
+        index = _read_index(year, root)
+        for name in (race_name, event.get("EventName")):
+            if name:
+                index[_slug(name)] = int(round_number)
+        _index_path(year, root).write_text(json.dumps(index, indent=2, sort_keys=True),
+                                           encoding="utf-8")
+        logging.info(f"FastF1 extract written: {target}")
+        return target
+    except Exception as exc:
+        shutil.rmtree(tmp, ignore_errors=True)
+        logging.warning(f"Could not write FastF1 extract ({exc}); continuing without it")
+        return None
+
+
+class _CarDataStore:
+    """``session.car_data``-style mapping that reads one driver on demand
+    (``pos_data`` uses it too)."""
+
+    def __init__(self, directory: Path, drivers: List[str],
+                 columns: Optional[List[str]]) -> None:
+        self._dir = directory
+        self._drivers = list(drivers)
+        self._columns = columns
+
+    def __getitem__(self, driver: str) -> pd.DataFrame:
+        driver = str(driver)
+        if driver not in self._drivers:
+            raise KeyError(driver)
+        return pd.read_parquet(self._dir / f"{driver}.parquet", columns=self._columns)
+
+    def __contains__(self, driver) -> bool:
+        return str(driver) in self._drivers
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._drivers)
+
+    def keys(self) -> List[str]:
+        return list(self._drivers)
+
+
+class ExtractSession:
+    """Read-only stand-in for a loaded FastF1 session, backed by Parquet."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / "manifest.json").read_text(encoding="utf-8"))
+        cols = self.manifest["columns"]
+
+        event = dict(self.manifest.get("event", {}))
+        if "EventDate" in event:
+            event["EventDate"] = pd.Timestamp(event["EventDate"])
+        self.event = event
+
+        self.laps = self._read("laps.parquet", cols.get("laps"))
+        self.track_status = self._read("track_status.parquet", cols.get("track_status"))
+        self.race_control_messages = self._read(
+            "race_control_messages.parquet", cols.get("race_control_messages"))
+        self.weather_data = self._read("weather.parquet", cols.get("weather"))
+        self.car_data = _CarDataStore(self.directory / "car_data",
+                                      self.manifest.get("drivers", []), cols.get("car_data"))
+        self.pos_data = _CarDataStore(self.directory / "pos_data",
+                                      self.manifest.get("pos_drivers", []), cols.get("pos_data"))
+
+        if self.laps is not None and "Deleted" in self.laps.columns \
+                and str(self.laps["Deleted"].dtype) == "string":
+            self.laps["Deleted"] = self.laps["Deleted"].map(
+                lambda v: None if pd.isna(v) else str(v) == "True")
+
+    def _read(self, name: str, columns: Optional[List[str]]) -> Optional[pd.DataFrame]:
+        if columns is None:
+            return None
+        return pd.read_parquet(self.directory / name, columns=columns)
+
+
+def read_extract(year: int, race_name: str, session_type: str,
+                 root: Path | None = None, today=None) -> Optional[ExtractSession]:
+    """The cached extract of the event ``race_name`` resolves to, or None
+    when absent / stale / the event cannot be resolved.
+
+    Extracts of a session held today are never trusted: a live import must
+    see the newest laps, exactly like ``is_live_import`` in the importer.
+    """
+    if pyarrow is None:
+        return None
+    round_number = resolve_round(year, race_name, root)
+    if round_number is None:
+        return None
+    directory = extract_path(year, round_number, session_type, root)
+    manifest = directory / "manifest.json"
+    if not manifest.exists():
+        return None
+    try:
+        meta = json.loads(manifest.read_text(encoding="utf-8"))
+        if meta.get("version") != EXTRACT_VERSION:
+            logging.info(f"Stale FastF1 extract (v{meta.get('version')}) at {directory} - rebuilding")
+            return None
+        event_date = meta.get("event", {}).get("EventDate")
+        if event_date and pd.Timestamp(event_date).date() == (today or date.today()):
+            # Same-day (live) session: the extract may predate the finish.
+            logging.info(f"FastF1 extract at {directory} is from a live session - reloading")
+            return None
+        return ExtractSession(directory)
+    except Exception as exc:
+        logging.warning(f"Unreadable FastF1 extract at {directory} ({exc}) - rebuilding")
+        return None
+
+
+# Frame-holding attributes of a loaded FastF1 Session (private) and of an
+# ExtractSession (public).
+_SESSION_FRAMES = (
+    "_laps", "_car_data", "_pos_data", "_weather_data", "_track_status",
+    "_race_control_messages", "_session_status", "_results",
+    "laps", "car_data", "pos_data", "track_status", "race_control_messages", "weather_data",
+)
+
+
+def release_session(session) -> None:
+    """Drop the frames a loaded session holds, right now.
+
+    A FastF1 ``Laps`` frame points back at its session, so a finished
+    session is only freed when the cycle collector gets round to it -- in
+    a long batch that is several sessions' worth of telemetry alive at
+    once.  Popping the frames breaks the cycle and frees them immediately.
+    The session must not be used afterwards.
+    """
+    if session is None:
+        return
+    try:
+        attrs = vars(session)
+    except TypeError:
+        return
+    for name in _SESSION_FRAMES:
+        attrs.pop(name, None)
+
+
+# Per-driver frame maps: ``{driver number: frame}`` dicts on a loaded FastF1
+# Session (private) or a plain session object.  An ExtractSession's
+# car_data / pos_data are not -- they read a driver's frame on demand.
+_DRIVER_FRAMES = ("_car_data", "_pos_data", "car_data", "pos_data")
+
+
+def _driver_frame_maps(session) -> Iterator[dict]:
+    try:
+        attrs = vars(session)
+    except TypeError:
+        return
+    for name in _DRIVER_FRAMES:
+        frames = attrs.get(name)
+        if isinstance(frames, dict):
+            yield frames
+
+
+def keep_driver_frames(session, driver) -> None:
+    """Drop every other driver's car / position data from ``session``.
+
+    FastF1 loads the whole field's telemetry; an import of one driver
+    never reads the rest, so it need not hold it for the whole race.
+    """
+    for frames in _driver_frame_maps(session):
+        for key in [k for k in frames if str(k) != str(driver)]:
+            del frames[key]
+
+
+def release_driver_frames(session, driver) -> None:
+    """Drop ``driver``'s car / position data once its laps are written."""
+    for frames in _driver_frame_maps(session):
+        for key in [k for k in frames if str(k) == str(driver)]:
+            del frames[key]
+
+
+def load_session(year: int, race_name: str, session_type: str,
+                 refresh: bool = False, root: Path | None = None):
+    """The importer's session: the Parquet extract if present, else FastF1.
+
+    A FastF1 load writes the extract for next time.  ``refresh=True``
+    ignores (and rewrites) an existing extract.  Raises RuntimeError when
+    neither an extract nor FastF1 is available.
+    """
+    if not refresh:
+        cached = read_extract(year, race_name, session_type, root)
+        if cached is not None:
+            logging.info(f"Using FastF1 extract: {cached.directory}")
+            return cached
+
+    if fastf1 is None:
+        raise RuntimeError(
+            "fastf1 is not installed and no extract exists for this session — "
+            "run `pip install fastf1` to import historical race data."
+        )
+    session = fastf1.get_session(year, race_name, session_type)
+    session.load(telemetry=True, laps=True, weather=True, messages=True)
+    write_extract(session, year, race_name, session_type, root)
+    return session
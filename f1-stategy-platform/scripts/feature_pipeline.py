@@ -1,5 +1,6 @@
 """Shared feature engineering and vector alignment pipeline for F1 Telemetry Platform."""
 
+import numpy as np
 import pandas as pd
 
 
@@ -99,3 +100,36 @@ def construct_prediction_input(tyre_age: float, lap_number: int, tyre_compound:
         input_data[track_feature] = 1
 
     return input_data
+
+
+def construct_prediction_matrix(tyre_ages, tyre_compounds, track_name, feature_names: list) -> pd.DataFrame:
+    """Many-row counterpart of construct_prediction_input.
+
+    Row i carries tyre_ages[i] on tyre_compounds[i] at ``track_name`` (one
+    track for every row, or one per row); every row is one-hot encoded
+    exactly as construct_prediction_input would encode it, so a single
+    model.predict call over the result matches the per-row calls.
+    """
+    tyre_ages = np.asarray(tyre_ages, dtype=float)
+    compounds = np.array([str(c).strip() for c in tyre_compounds])
+    column = {f: j for j, f in enumerate(feature_names)}
+
+    values = np.zeros((len(tyre_ages), len(feature_names)))
+    if 'tyre_age' in column:
+        values[:, column['tyre_age']] = tyre_ages
+    for compound in np.unique(compounds):
+        j = column.get(f'tyre_{compound}')
+        if j is not None:
+            values[compounds == compound, j] = 1
+    if isinstance(track_name, str):
+        j = column.get(f'track_{_normalise_track_name(track_name)}')
+        if j is not None:
+            values[:, j] = 1
+    else:
+        tracks = np.array([str(t) for t in track_name])
+        for track in np.unique(tracks):
+            j = column.get(f'track_{_normalise_track_name(track)}')
+            if j is not None:
+                values[tracks == track, j] = 1
+
+    return pd.DataFrame(values, columns=feature_names)
@@ -8,6 +8,7 @@ resolution behaviour in both scripts.
 """
 
 import argparse
+import gc
 import sys
 import logging
 from pathlib import Path
@@ -24,6 +25,13 @@ from import_f1_race import (
     print_track_menu,
     RACE_CALENDAR,
 )
+from import_profiling import (
+    ImportProfile,
+    MemoryBudget,
+    log_summary,
+    start_run_log,
+    write_report,
+)
 
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(asctime)s - %(message)s")
 
@@ -37,8 +45,11 @@ def import_dataset(
     races: list[str] | None,
     driver_id: int,
     session_type: str = "R",
-    allow_duplicate: bool = False,
-) -> None:
+    upsert: bool = False,
+    log_path: Path | None = None,
+    refresh_extract: bool = False,
+    memory_budget_mb: float | None = None,
+) -> list[ImportProfile]:
     """
     Import one driver across multiple seasons and races.
 
@@ -48,7 +59,17 @@ def import_dataset(
     races          : Explicit race-name list, or None to use RACE_CALENDAR.
     driver_id      : Real F1 driver number (= drivers.driver_id in the DB).
     session_type   : "R", "Q", "FP1", "FP2", or "FP3".
-    allow_duplicate: If False, skip sessions already in the DB.
+    upsert         : If False, skip sessions already in the DB; if True,
+                     re-import them in place.
+    refresh_extract: Reload every race from FastF1 instead of its Parquet
+                     extract (after a FastF1 upgrade, say).
+    memory_budget_mb: RSS ceiling for the batch; over it, imports write
+                     smaller lap chunks.  None = IMPORT_MEMORY_BUDGET_MB
+                     from the environment (unset = unlimited).
+    log_path       : Run log of this batch; when set, the per-stage timing
+                     report is written next to it (``<log>.timing.json``).
+
+    Returns one ImportProfile per race attempted.
     """
     logging.info("=" * 60)
     logging.info("BATCH F1 DATASET INGESTION")
@@ -57,19 +78,35 @@ def import_dataset(
     successful = 0
     failed     = 0
     skipped    = 0
+    profiles: list[ImportProfile] = []
+    # One budget for the whole batch: a race that forced the lap chunk down
+    # hands the next one that chunk, which grows back once RSS allows.
+    budget = (MemoryBudget(memory_budget_mb) if memory_budget_mb is not None
+              else MemoryBudget.from_env())
+    if budget.budget_mb is not None:
+        logging.info(f"Memory budget: {budget.budget_mb:.0f} MB "
+                     f"(lap chunk {budget.chunk})")
 
     for year in seasons:
         race_list = races if races else RACE_CALENDAR.get(year, ["Bahrain", "Monaco"])
         logging.info(f"\n--- Season {year}: {len(race_list)} race(s), driver #{driver_id} ---")
 
         for race_name in race_list:
+            profile = ImportProfile(
+                f"{year} {race_name} {session_type} #{driver_id}",
+                year=year, race=race_name, driver_id=driver_id,
+            )
+            profiles.append(profile)
             try:
                 session_id = import_race(
                     year=year,
                     race_name=race_name,
                     driver_id=driver_id,
                     session_type=session_type,
-                    allow_duplicate=allow_duplicate,
+                    upsert=upsert,
+                    profile=profile,
+                    refresh_extract=refresh_extract,
+                    memory_budget=budget,
                 )
                 if session_id is not None:
                     successful += 1
@@ -77,8 +114,19 @@ def import_dataset(
                     failed += 1
             except Exception as exc:
                 logging.error(f"  Batch error for {year} {race_name}: {exc}")
+                profile.finish("failed")
                 failed += 1
 
+            # import_race has released its session; collect the leftovers so
+            # each race starts from the same baseline.
+            gc.collect()
+            rss = profile.max_rss_mb
+            logging.info(
+                f"  {year} {race_name}: {profile.status}, {profile.wall_s:.1f}s, "
+                f"max RSS {f'{rss:.0f} MB' if rss is not None else 'n/a'}, "
+                f"lap chunk {budget.chunk}"
+            )
+
     print("\n" + "=" * 60)
     print("BATCH COMPLETE")
     print("=" * 60)
@@ -86,6 +134,12 @@ def import_dataset(
     print(f"  Failed                       : {failed}")
     print("=" * 60 + "\n")
 
+    log_summary(profiles)
+    if log_path is not None:
+        report_path = write_report(log_path, profiles)
+        print(f"Run log: {log_path}\nTiming report: {report_path}")
+    return profiles
+
 
 # ---------------------------------------------------------------------------
 # Interactive prompt (identical resolution logic to import_f1_race)
@@ -157,15 +211,15 @@ def _interactive_prompt() -> dict:
     session_type = session_raw if session_raw else "R"
 
     # Duplicates
-    dup_raw = input("Allow duplicate import if session already exists? (y/N): ").strip().lower()
-    allow_duplicate = dup_raw in ("y", "yes")
+    dup_raw = input("Re-import in place if session already exists? (y/N): ").strip().lower()
+    upsert = dup_raw in ("y", "yes")
 
     return dict(
         seasons=seasons,
         races=races,
         driver_id=db_driver["driver_id"],
         session_type=session_type,
-        allow_duplicate=allow_duplicate,
+        upsert=upsert,
     )
 
 
@@ -179,7 +233,15 @@ if __name__ == "__main__":
     parser.add_argument("--races",    type=str, nargs="+", default=None, help="Race names (e.g. Bahrain Monaco)")
     parser.add_argument("--driver",   type=str, default=None,            help="Driver F1 number or 3-letter code")
     parser.add_argument("--session-type", type=str, default=None,        help="Session type: R, Q, FP1, FP2, FP3")
-    parser.add_argument("--allow-duplicate", action="store_true",        help="Re-import even if session exists")
+    # --allow-duplicate is the old name: duplicates are now rejected by the
+    # sessions unique key, so a re-import always updates in place.
+    parser.add_argument("--upsert", "--allow-duplicate", dest="upsert", action="store_true",
+                        help="Re-import in place (update rows) if the session exists")
+    parser.add_argument("--memory-budget-mb", type=float, default=None,
+                        help="RSS budget in MB; imports degrade to smaller lap chunks above it "
+                             "(default: IMPORT_MEMORY_BUDGET_MB, unset = unlimited)")
+    parser.add_argument("--refresh-extract", action="store_true",
+                        help="Reload from FastF1 even if a Parquet extract exists (and rewrite it)")
     parser.add_argument("--interactive", "-i", action="store_true",      help="Force interactive prompt")
     args = parser.parse_args()
 
@@ -202,7 +264,9 @@ if __name__ == "__main__":
             races=args.races,
             driver_id=db_driver["driver_id"],
             session_type=args.session_type or "R",
-            allow_duplicate=args.allow_duplicate,
+            upsert=args.upsert,
         )
+    params["refresh_extract"] = args.refresh_extract
+    params["memory_budget_mb"] = args.memory_budget_mb
 
-    import_dataset(**params)
+    import_dataset(**params, log_path=start_run_log("import_dataset"))
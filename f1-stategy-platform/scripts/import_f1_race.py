@@ -17,9 +17,24 @@ try:
 except ImportError:
     fastf1 = None
 
+import numpy as np
 import pandas as pd
 from fuel_estimation import estimate_fuel_load
 from config import get_db_connection
+from fastf1_extract import (
+    ExtractSession,
+    keep_driver_frames,
+    load_session,
+    release_driver_frames,
+    release_session,
+)
+from import_profiling import ImportProfile, MemoryBudget, start_run_log, write_report
+from session_archive import archive_session
+from summary_tables import (
+    refresh_lap_telemetry_stats,
+    refresh_live_state,
+    refresh_session_stats,
+)
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -299,6 +314,116 @@ def check_existing_session(cursor, track_id: int, season_id: int, driver_id: int
     return row[0] if row else None
 
 
+def upsert_session(cursor, track_name: str, session_type: str, weather: str,
+                   event_date, season_id: int, source_id: int, track_id: int,
+                   regulation_id: int, driver_id: int) -> int:
+    """
+    Insert the session, or update it in place on its unique key
+    (track, season, driver, session_type, date).  Returns the session_id
+    either way: LAST_INSERT_ID(session_id) makes lastrowid report the
+    existing row on the update path.
+    """
+    cursor.execute(
+        """
+        INSERT INTO sessions
+          (track_name, session_type, weather, date,
+           season_id, source_id, track_id, regulation_id, driver_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+          session_id    = LAST_INSERT_ID(session_id),
+          track_name    = VALUES(track_name),
+          weather       = VALUES(weather),
+          source_id     = VALUES(source_id),
+          regulation_id = VALUES(regulation_id)
+        """,
+        (track_name, session_type, weather, event_date,
+         season_id, source_id, track_id, regulation_id, driver_id),
+    )
+    return cursor.lastrowid
+
+
+def upsert_laps(cursor, session_id: int, lap_rows: list[tuple]) -> dict[int, int]:
+    """
+    Bulk insert-or-update laps on their unique (session_id, lap_number) key.
+
+    ``lap_rows`` are ``(session_id, driver_id, lap_number, lap_time_ms,
+    tyre_compound, tyre_age, fuel_load, is_valid, captured_at)`` tuples.
+    Returns ``{lap_number: lap_id}`` for the rows written -- existing laps
+    keep their lap_id, so nothing that references them is orphaned.
+    """
+    if not lap_rows:
+        return {}
+    cursor.executemany(
+        """
+        INSERT INTO laps
+          (session_id, driver_id, lap_number, lap_time_ms,
+           tyre_compound, tyre_age, fuel_load, is_valid, captured_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+          driver_id     = VALUES(driver_id),
+          lap_time_ms   = VALUES(lap_time_ms),
+          tyre_compound = VALUES(tyre_compound),
+          tyre_age      = VALUES(tyre_age),
+          fuel_load     = VALUES(fuel_load),
+          is_valid      = VALUES(is_valid),
+          captured_at   = VALUES(captured_at)
+        """,
+        lap_rows,
+    )
+    cursor.execute(
+        "SELECT lap_number, lap_id FROM laps WHERE session_id = %s", (session_id,)
+    )
+    wanted = {row[2] for row in lap_rows}
+    return {int(num): int(lap_id) for num, lap_id in cursor.fetchall() if num in wanted}
+
+
+def clear_session_children(cursor, session_id: int) -> None:
+    """
+    Delete the telemetry and strategy events (lap-linked and session-wide)
+    of a session that is about to be re-imported.  Neither table has a
+    natural key to upsert on, so they are replaced wholesale; the laps
+    themselves are kept.
+    """
+    cursor.execute(
+        """
+        DELETE t FROM telemetry t
+        JOIN laps l ON t.lap_id = l.lap_id
+        WHERE l.session_id = %s
+        """,
+        (session_id,),
+    )
+    cursor.execute(
+        """
+        DELETE se FROM strategy_events se
+        JOIN laps l ON se.lap_id = l.lap_id
+        WHERE l.session_id = %s
+        """,
+        (session_id,),
+    )
+    cursor.execute(
+        "DELETE FROM strategy_events WHERE session_id = %s AND lap_id IS NULL",
+        (session_id,),
+    )
+
+
+def delete_stale_laps(cursor, session_id: int, lap_numbers) -> None:
+    """
+    Delete the laps of a re-imported session that the new data no longer
+    has (a corrected feed, a lap now without a time).  Run after
+    clear_session_children, so no telemetry or event still points at them;
+    their tooltip aggregates and live-card rows cascade.
+    """
+    keep = sorted(lap_numbers)
+    if not keep:
+        cursor.execute("DELETE FROM laps WHERE session_id = %s", (session_id,))
+        return
+    placeholders = ",".join(["%s"] * len(keep))
+    cursor.execute(
+        f"DELETE FROM laps WHERE session_id = %s AND lap_number NOT IN ({placeholders})",
+        (session_id, *keep),
+    )
+
+
 def is_live_import(event_date, today=None) -> bool:
     """
     True when a FastF1 import is "live" data: the race ran the same day it
@@ -560,12 +685,151 @@ def extract_race_control_events(session) -> list[tuple[str, float | None]]:
     return []
 
 
+# ---------------------------------------------------------------------------
+# Telemetry slicing
+#
+# Lap.get_telemetry() re-merges car + position data and recomputes derived
+# channels (distance, driver ahead, ...) on EVERY call -- by far the most
+# expensive part of an import, and none of those extra channels are stored.
+# Every column we keep (Speed, Throttle, Brake, nGear, RPM, DRS) lives in the
+# driver's car data, so it is fetched once per session and cut into laps by
+# binary search on SessionTime, with the same inclusive [LapStartTime, Time]
+# window FastF1's Lap.get_car_data() uses (padded by one sample each side).
+#
+# Sampling keeps the original policy -- every (len // 5)-th row of the lap's
+# get_telemetry() frame -- so rows stored before and after this change are
+# sampled alike.  get_telemetry() resamples the car data onto the merged car
+# + position timebase (about twice as many rows, edges interpolated), and a
+# row stride over the raw car data would pick different samples, so the
+# slice is first put back onto that timebase (merge_lap_telemetry).
+# ---------------------------------------------------------------------------
+
+# ~5 evenly spaced samples per lap (step = len // 5) -- the dashboard only
+# needs a coarse per-lap profile, not the full ~4 Hz stream.
+TELEMETRY_SAMPLES_PER_LAP = 5
+# How FastF1's merge fills car channels at position timestamps.
+CONTINUOUS_CHANNELS = ("Speed", "Throttle", "RPM")
+DISCRETE_CHANNELS = ("Brake", "nGear", "DRS")
+
+
+def load_driver_car_data(session, driver_id: int) -> pd.DataFrame | None:
+    """Whole-session car data for one driver, sorted by SessionTime.
+
+    Returns None when the session has no car data for the driver (the
+    caller then falls back to per-lap ``get_telemetry()``).
+    """
+    try:
+        car = session.car_data[str(driver_id)]
+    except Exception:
+        return None
+    if car is None or car.empty or "SessionTime" not in car.columns:
+        return None
+    if not car["SessionTime"].is_monotonic_increasing:
+        car = car.sort_values("SessionTime", kind="stable")
+    return car.reset_index(drop=True)
+
+
+def lap_telemetry_bounds(session_time, lap_starts, lap_ends):
+    """Vectorized ``[lo, hi)`` row bounds of each lap inside the car data.
+
+    ``session_time`` must be sorted.  A sample belongs to a lap when
+    ``start <= SessionTime <= end`` (inclusive on both sides, as in
+    FastF1's ``slice_by_lap``).  Laps with a missing start or end get an
+    empty ``lo == hi == 0`` window.
+    """
+    times  = np.asarray(session_time, dtype="timedelta64[ns]")
+    starts = np.asarray(lap_starts, dtype="timedelta64[ns]")
+    ends   = np.asarray(lap_ends, dtype="timedelta64[ns]")
+
+    lo = np.searchsorted(times, starts, side="left")
+    hi = np.searchsorted(times, ends, side="right")
+
+    missing = np.isnat(starts) | np.isnat(ends) | (hi < lo)
+    lo[missing] = 0
+    hi[missing] = 0
+    return lo, hi
+
+
+def load_driver_pos_times(session, driver_id: int) -> np.ndarray | None:
+    """Sorted SessionTime (ns) of one driver's position data, or None.
+
+    Only the timestamps matter: get_telemetry() takes every stored channel
+    from the car data, the position stream just adds rows to its timebase.
+    """
+    try:
+        pos = session.pos_data[str(driver_id)]
+    except Exception:
+        return None
+    if pos is None or pos.empty or "SessionTime" not in pos.columns:
+        return None
+    return np.sort(pos["SessionTime"].to_numpy(dtype="timedelta64[ns]").astype(np.int64))
+
+
+def merge_lap_telemetry(car: pd.DataFrame, pos_times: np.ndarray | None,
+                        start, end) -> pd.DataFrame:
+    """Lap.get_telemetry()'s rows, rebuilt from a slice of car data.
+
+    ``car`` is the lap padded by one sample each side.  The timebase is
+    every car and position timestamp inside ``[start, end]`` plus the two
+    edges; continuous channels are interpolated onto it and discrete ones
+    take the last sample at or before each row, as FastF1's merge does.
+    Without position data (or lap times) the timebase is the car data's.
+    """
+    car_t = car["SessionTime"].to_numpy(dtype="timedelta64[ns]").astype(np.int64)
+    if pd.isna(start) or pd.isna(end):
+        return car
+    start, end = pd.Timedelta(start).value, pd.Timedelta(end).value
+    t = car_t if pos_times is None else np.union1d(car_t, pos_times)
+    t = np.union1d(t[(t > start) & (t < end)], [start, end])
+    prev = np.clip(np.searchsorted(car_t, t, side="right") - 1, 0, len(car_t) - 1)
+    merged = {"SessionTime": pd.to_timedelta(t)}
+    for col in CONTINUOUS_CHANNELS:
+        merged[col] = np.interp(t, car_t, car[col].to_numpy(dtype=float))
+    for col in DISCRETE_CHANNELS:
+        merged[col] = car[col].to_numpy()[prev]
+    return pd.DataFrame(merged)
+
+
+def sample_lap_telemetry(telem: pd.DataFrame) -> pd.DataFrame:
+    """Every (len // TELEMETRY_SAMPLES_PER_LAP)-th row of one lap's
+    get_telemetry()-shaped frame."""
+    step = max(1, len(telem) // TELEMETRY_SAMPLES_PER_LAP)
+    return telem.iloc[::step]
+
+
+def telemetry_rows(sampled: pd.DataFrame, lap_id: int) -> list[tuple]:
+    """Convert sampled FastF1 channels to ``telemetry`` table rows.
+
+    Throttle/brake are stored as 0..1 fractions; DRS is open only for the
+    FastF1 "open" codes 10/12/14.  Missing values become 0.
+    """
+    rows = []
+    for speed, throttle, brake, gear, rpm, drs in zip(
+        sampled["Speed"].to_numpy(), sampled["Throttle"].to_numpy(),
+        sampled["Brake"].to_numpy(), sampled["nGear"].to_numpy(),
+        sampled["RPM"].to_numpy(), sampled["DRS"].to_numpy(),
+    ):
+        rows.append((
+            lap_id,
+            int(speed) if pd.notna(speed) else 0,
+            round(float(throttle) / 100.0, 2) if pd.notna(throttle) else 0.0,
+            round(float(brake) / 100.0, 2) if pd.notna(brake) else 0.0,
+            int(gear) if pd.notna(gear) else 0,
+            int(rpm) if pd.notna(rpm) else 0,
+            1 if (pd.notna(drs) and int(drs) in (10, 12, 14)) else 0,
+        ))
+    return rows
+
+
 # ---------------------------------------------------------------------------
 # Core importer
 # ---------------------------------------------------------------------------
 
 def import_race(year: int, race_name: str, driver_id: int,
-                session_type: str = "R", allow_duplicate: bool = False) -> int | None:
+                session_type: str = "R", upsert: bool = False,
+                profile: ImportProfile | None = None,
+                refresh_extract: bool = False,
+                memory_budget: MemoryBudget | None = None) -> int | None:
     """
     Import laps + telemetry for ONE driver from a FastF1 session into MySQL.
 
@@ -575,11 +839,24 @@ def import_race(year: int, race_name: str, driver_id: int,
     race_name     : FastF1 race name or partial match (e.g. "Bahrain", "Monaco").
     driver_id     : Real F1 driver number (= drivers.driver_id in the DB).
     session_type  : "R" (Race), "Q" (Qualifying), "FP1", "FP2", "FP3".
-    allow_duplicate : If False (default) skip if session already in DB.
+    upsert        : If False (default) skip if session already in DB.  If
+                    True, re-import it IN PLACE: the session and its laps
+                    are updated on their unique keys, and the session's
+                    telemetry and pit events are replaced.
+    profile       : Optional ImportProfile that receives per-stage wall/CPU
+                    time and RSS (see import_profiling.IMPORT_STAGES).
+    refresh_extract : Reload from FastF1 even when a Parquet extract of the
+                    session exists, and rewrite the extract.
+    memory_budget : Lap-chunk size / RSS budget for the lap + telemetry
+                    writes (default: IMPORT_MEMORY_BUDGET_MB from the env).
 
     Returns the new (or existing) session_id, or None on failure.
     """
     mapped_type = {"R": "Race", "Q": "Qualifying"}.get(session_type.upper(), "Practice")
+    if profile is None:
+        profile = ImportProfile(f"{year} {race_name} {session_type} #{driver_id}")
+    if memory_budget is None:
+        memory_budget = MemoryBudget.from_env()
 
     # ------------------------------------------------------------------
     # 1. Load FastF1 session
@@ -588,24 +865,21 @@ def import_race(year: int, race_name: str, driver_id: int,
     logging.info(f"F1 IMPORT  |  {year} {race_name}  |  {session_type}  |  driver #{driver_id}")
     logging.info("=" * 60)
 
-    if fastf1 is None:
-        logging.error(
-            "fastf1 is not installed — run `pip install fastf1` to import "
-            "historical race data."
-        )
-        return None
-
+    # The Parquet extract of an earlier load is used when present; FastF1 is
+    # only needed (and only parsed) the first time a session is imported.
+    profile.begin("fastf1_load")
     try:
-        session = fastf1.get_session(year, race_name, session_type)
-        session.load(telemetry=True, laps=True, weather=True, messages=True)
+        session = load_session(year, race_name, session_type, refresh=refresh_extract)
     except Exception as exc:
         logging.error(f"FastF1 could not load session: {exc}")
+        profile.finish("failed")
         return None
 
     # ------------------------------------------------------------------
     # 2. Identify the driver inside this FastF1 session
     # ------------------------------------------------------------------
     # FastF1 DriverNumber column is the real F1 number — same as driver_id.
+    profile.begin("driver_filter")
     session_laps = session.laps
     driver_laps = session_laps[session_laps["DriverNumber"].astype(str) == str(driver_id)]
 
@@ -615,7 +889,11 @@ def import_race(year: int, race_name: str, driver_id: int,
             f"(drivers present: {sorted(session_laps['DriverNumber'].dropna().unique().tolist())}). "
             f"Aborting."
         )
+        release_session(session)
+        profile.finish("failed")
         return None
+    # Only this driver's telemetry is ever read: free the rest of the field.
+    keep_driver_frames(session, driver_id)
 
     # Resolve 3-letter code and best available name from FastF1
     fastf1_code = str(driver_laps.iloc[0]["Driver"]).strip().upper()[:3]
@@ -629,6 +907,7 @@ def import_race(year: int, race_name: str, driver_id: int,
     # ------------------------------------------------------------------
     # 3. Database operations (single transaction)
     # ------------------------------------------------------------------
+    profile.begin("dimension_lookups")
     conn = get_db_connection()
     cursor = conn.cursor()
 
@@ -669,29 +948,26 @@ def import_race(year: int, race_name: str, driver_id: int,
         existing_id = check_existing_session(
             cursor, track_id, season_id, driver_id, mapped_type, event_date
         )
-        if existing_id and not allow_duplicate:
+        if existing_id and not upsert:
             logging.info(
                 f"Session already exists (ID={existing_id}) for driver #{driver_id} "
-                f"at {track_name}. Use --allow-duplicate to re-import."
+                f"at {track_name}. Use --upsert to re-import it in place."
             )
+            profile.finish("skipped_existing")
             return existing_id
 
         # ------------------------------------------------------------------
-        # 4. Create session row
+        # 4. Create (or update) session row
         # ------------------------------------------------------------------
-        cursor.execute(
-            """
-            INSERT INTO sessions
-              (track_name, session_type, weather, date,
-               season_id, source_id, track_id, regulation_id, driver_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (track_name, mapped_type, weather_label, event_date,
-             season_id, source_id, track_id, regulation_id, driver_id),
+        session_id = upsert_session(
+            cursor, track_name, mapped_type, weather_label, event_date,
+            season_id, source_id, track_id, regulation_id, driver_id,
         )
-        session_id = cursor.lastrowid
+        if existing_id:
+            # Telemetry and pit events have no natural key -- replace them.
+            clear_session_children(cursor, session_id)
         logging.info(
-            f"Session created: ID={session_id}  "
+            f"Session {'updated' if existing_id else 'created'}: ID={session_id}  "
             f"Driver={driver_id} - {db_driver_name} ({fastf1_code})  "
             f"Track={track_name}  Date={event_date}  Weather={weather_label}"
         )
@@ -709,8 +985,12 @@ def import_race(year: int, race_name: str, driver_id: int,
         # rows so we can do a forward-look after the loop.
         lap_id_by_number: dict[int, int] = {}
         pit_in_rows: list[tuple] = []  # (lap_number, lap_id, PitInTime, PitOutTime_same_row)
+        lap_rows: list[tuple] = []
+        lap_index_by_number: dict[int, object] = {}  # lap_number -> driver_laps row label
 
-        for _, lap in driver_laps.iterrows():
+        profile.begin("lap_inserts")
+        captured_at = datetime.now() if live_import else None
+        for idx, lap in driver_laps.iterrows():
             try:
                 lap_num = int(lap["LapNumber"])
                 if not pd.notna(lap["LapTime"]):
@@ -731,20 +1011,61 @@ def import_race(year: int, race_name: str, driver_id: int,
                 is_valid  = 0 if ("Deleted" in lap and pd.notna(lap["Deleted"]) and bool(lap["Deleted"])) else 1
                 fuel_load = estimate_fuel_load(lap_num)
 
-                cursor.execute(
-                    """
-                    INSERT INTO laps
-                      (session_id, driver_id, lap_number, lap_time_ms,
-                       tyre_compound, tyre_age, fuel_load, is_valid, captured_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """,
+                lap_rows.append(
                     (session_id, driver_id, lap_num, lap_time_ms,
-                     compound, tyre_age, fuel_load, is_valid,
-                     datetime.now() if live_import else None),
+                     compound, tyre_age, fuel_load, is_valid, captured_at)
                 )
-                lap_id = cursor.lastrowid
-                lap_count += 1
-                lap_id_by_number[lap_num] = lap_id
+                lap_index_by_number[lap_num] = idx
+
+            except Exception as lap_err:
+                logging.error(f"Error on lap row: {lap_err}")
+
+        # Car data is fetched once for the whole session and sliced per lap;
+        # bounds are keyed by the driver_laps row label.
+        profile.begin("telemetry_conversion")
+        car_data = load_driver_car_data(session, driver_id)
+        pos_times = load_driver_pos_times(session, driver_id) if car_data is not None else None
+        telem_bounds: dict = {}
+        if car_data is not None:
+            lo, hi = lap_telemetry_bounds(
+                car_data["SessionTime"], driver_laps["LapStartTime"], driver_laps["Time"]
+            )
+            telem_bounds = dict(zip(driver_laps.index, zip(lo.tolist(), hi.tolist())))
+        elif isinstance(session, ExtractSession):
+            # Extract laps are plain frames: there is nothing to fall back to.
+            logging.warning(
+                f"No car data for driver #{driver_id} in the extract - "
+                f"laps imported without telemetry"
+            )
+        else:
+            logging.warning(
+                f"No session car data for driver #{driver_id} - "
+                f"falling back to per-lap get_telemetry()"
+            )
+
+        # Laps are written in chunks: one multi-row upsert per chunk (ids
+        # read back, so a re-import keeps existing lap_ids), then that
+        # chunk's telemetry is converted, inserted and dropped.  Only one
+        # chunk of telemetry rows is ever alive; the chunk shrinks when the
+        # process goes over its memory budget.
+        pos = 0
+        while pos < len(lap_rows):
+            chunk = lap_rows[pos:pos + memory_budget.chunk]
+            pos += len(chunk)
+
+            profile.begin("lap_inserts")
+            chunk_ids = upsert_laps(cursor, session_id, chunk)
+            lap_id_by_number.update(chunk_ids)
+
+            profile.begin("telemetry_conversion")
+            telem_rows: list[tuple] = []
+            for row in chunk:
+                lap_num = row[2]
+                lap_id = chunk_ids.get(lap_num)
+                if lap_id is None:
+                    continue
+                idx = lap_index_by_number[lap_num]
+                lap = driver_laps.loc[idx]
 
                 # Collect pit-in rows for post-loop processing
                 pit_in_time = lap.get("PitInTime")
@@ -754,31 +1075,43 @@ def import_race(year: int, race_name: str, driver_id: int,
 
                 # Telemetry — log failures, do not silently swallow them
                 try:
-                    telem = lap.get_telemetry()
+                    if car_data is not None:
+                        t_lo, t_hi = telem_bounds[idx]
+                        telem = (merge_lap_telemetry(car_data.iloc[max(t_lo - 1, 0):t_hi + 1],
+                                                     pos_times, lap["LapStartTime"], lap["Time"])
+                                 if t_hi > t_lo else None)
+                    elif isinstance(session, ExtractSession):
+                        telem = None
+                    else:
+                        telem = lap.get_telemetry()
                     if telem is not None and not telem.empty:
-                        step    = max(1, len(telem) // 5)
-                        sampled = telem.iloc[::step]
-                        for _, row in sampled.iterrows():
-                            speed    = int(row["Speed"])    if pd.notna(row["Speed"])    else 0
-                            throttle = round(float(row["Throttle"]) / 100.0, 2) if pd.notna(row["Throttle"]) else 0.0
-                            brake    = round(float(row["Brake"])    / 100.0, 2) if pd.notna(row["Brake"])    else 0.0
-                            gear     = int(row["nGear"])    if pd.notna(row["nGear"])    else 0
-                            rpm      = int(row["RPM"])      if pd.notna(row["RPM"])      else 0
-                            drs      = 1 if (pd.notna(row["DRS"]) and int(row["DRS"]) in (10, 12, 14)) else 0
-                            cursor.execute(
-                                "INSERT INTO telemetry (lap_id, speed, throttle, brake, gear, rpm, drs) VALUES (%s,%s,%s,%s,%s,%s,%s)",
-                                (lap_id, speed, throttle, brake, gear, rpm, drs),
-                            )
-                            telem_count += 1
+                        telem_rows.extend(telemetry_rows(sample_lap_telemetry(telem), lap_id))
                 except Exception as telem_err:
                     telem_failures += 1
                     logging.warning(f"Telemetry failed on lap {lap_num}: {telem_err}")
 
-                if lap_count % 20 == 0:
-                    logging.info(f"  ... {lap_count} laps, {telem_count} telem samples so far")
-
-            except Exception as lap_err:
-                logging.error(f"Error on lap row: {lap_err}")
+            profile.begin("telemetry_inserts")
+            if telem_rows:
+                cursor.executemany(
+                    "INSERT INTO telemetry (lap_id, speed, throttle, brake, gear, rpm, drs) VALUES (%s,%s,%s,%s,%s,%s,%s)",
+                    telem_rows,
+                )
+                telem_count += len(telem_rows)
+            del telem_rows
+
+            # Tooltip aggregates of this chunk's laps (replaced telemetry
+            # on a re-import included), in the import transaction.
+            profile.begin("summary_tables")
+            refresh_lap_telemetry_stats(cursor, chunk_ids.values())
+            memory_budget.check()
+
+        # The driver's car data is done with: nothing after this reads it.
+        del car_data, pos_times, telem_bounds
+        release_driver_frames(session, driver_id)
+        if existing_id:
+            delete_stale_laps(cursor, session_id, lap_id_by_number)
+        lap_count = len(lap_id_by_number)
+        logging.info(f"  {lap_count} laps, {telem_count} telem samples written")
 
         # ------------------------------------------------------------------
         # 5b. Pit-stop strategy events
@@ -791,6 +1124,7 @@ def import_race(year: int, race_name: str, driver_id: int,
         # the event is still recorded -- the stop happened -- but with a NULL
         # duration instead of a meaningless estimate.
         # ------------------------------------------------------------------
+        profile.begin("pit_reconciliation")
         pit_stop_count = 0
 
         # Build a lookup of lap_number -> PitOutTime from the driver_laps frame
@@ -831,8 +1165,9 @@ def import_race(year: int, race_name: str, driver_id: int,
                 logging.info(f"  PitStop on lap {lap_num}: {duration_sec:.2f}s (lap_id={lap_id})")
 
             cursor.execute(
-                "INSERT INTO strategy_events (lap_id, event_type, duration_sec) VALUES (%s, 'PitStop', %s)",
-                (lap_id, duration_sec),
+                "INSERT INTO strategy_events (lap_id, session_id, event_type, duration_sec) "
+                "VALUES (%s, %s, 'PitStop', %s)",
+                (lap_id, session_id, duration_sec),
             )
             pit_stop_count += 1
 
@@ -841,21 +1176,24 @@ def import_race(year: int, race_name: str, driver_id: int,
         #
         # Session-wide events are stored with lap_id = NULL because they
         # affect every driver — pinning them to one driver's lap would be
-        # misleading.
+        # misleading.  session_id ties them to the race, so a re-import
+        # replaces them (clear_session_children) like the lap-linked ones.
         #
         # Derived primarily from the structured session.track_status feed
         # (FastF1 Status codes: 4=SCDeployed, 5=Red, 6=VSCDeployed,
         # 7=VSCEnding, 1=AllClear, 2=Yellow), with the text
         # race_control_messages feed as a fallback.
         # ------------------------------------------------------------------
+        profile.begin("race_control")
         rc_event_count = 0
 
         try:
             rc_events = extract_race_control_events(session)
             for event_type, duration_sec in rc_events:
                 cursor.execute(
-                    "INSERT INTO strategy_events (lap_id, event_type, duration_sec) VALUES (NULL, %s, %s)",
-                    (event_type, duration_sec),
+                    "INSERT INTO strategy_events (lap_id, session_id, event_type, duration_sec) "
+                    "VALUES (NULL, %s, %s, %s)",
+                    (session_id, event_type, duration_sec),
                 )
                 rc_event_count += 1
                 dur_str = f"{duration_sec:.1f}s" if duration_sec is not None else "unknown"
@@ -865,8 +1203,21 @@ def import_race(year: int, race_name: str, driver_id: int,
         except Exception as rc_err:
             logging.warning(f"Race-control event processing failed (non-fatal): {rc_err}")
 
+        # Sidebar / report summary row, committed with the laps it sums.
+        profile.begin("summary_tables")
+        refresh_session_stats(cursor, session_id)
+        if live_import and lap_id_by_number:
+            # Same-day race: its last lap feeds the live cards.
+            refresh_live_state(cursor, lap_id_by_number[max(lap_id_by_number)])
+
+        profile.begin("commit")
         conn.commit()
 
+        # Columnar snapshot for whole-session analytics (non-fatal).
+        profile.begin("archive")
+        archive_session(conn, session_id)
+        profile.finish("imported")
+
         # ------------------------------------------------------------------
         # 6. Final report
         # ------------------------------------------------------------------
@@ -881,6 +1232,7 @@ def import_race(year: int, race_name: str, driver_id: int,
         print(f"  SC/VSC/RF events: {rc_event_count}")
         print(f"  Telemetry       : {telem_count} samples")
         print(f"  Telem fails     : {telem_failures}")
+        print(f"  Import time     : {profile.wall_s:.1f}s wall, {profile.cpu_s:.1f}s CPU")
         print("=" * 60 + "\n")
 
         return session_id
@@ -888,10 +1240,14 @@ def import_race(year: int, race_name: str, driver_id: int,
     except Exception as fatal:
         conn.rollback()
         logging.error(f"Fatal error — transaction rolled back: {fatal}")
+        profile.finish("failed")
         return None
     finally:
         cursor.close()
         conn.close()
+        # Free this session's telemetry now, not whenever the cycle
+        # collector runs -- a batch would otherwise hold several at once.
+        release_session(session)
 
 
 # ---------------------------------------------------------------------------
@@ -951,15 +1307,15 @@ def _interactive_prompt() -> dict:
         f"{db_driver['driver_name']} ({db_driver['driver_code']})"
     )
 
-    dup_raw = input("Allow duplicate import if session already exists? (y/N): ").strip().lower()
-    allow_duplicate = dup_raw in ("y", "yes")
+    dup_raw = input("Re-import in place if session already exists? (y/N): ").strip().lower()
+    upsert = dup_raw in ("y", "yes")
 
     return dict(
         year=year,
         race_name=race,
         session_type=session_type,
         driver_id=db_driver["driver_id"],
-        allow_duplicate=allow_duplicate,
+        upsert=upsert,
     )
 
 
@@ -969,7 +1325,12 @@ if __name__ == "__main__":
     parser.add_argument("--race",       type=str,  default=None, help="Race name (e.g. Bahrain, Monaco)")
     parser.add_argument("--session",    type=str,  default=None, help="Session type: R, Q, FP1, FP2, FP3")
     parser.add_argument("--driver",     type=str,  default=None, help="Driver F1 number (e.g. 16) or code (e.g. LEC)")
-    parser.add_argument("--allow-duplicate", action="store_true", help="Re-import even if session exists")
+    # --allow-duplicate is the old name: duplicates are now rejected by the
+    # sessions unique key, so a re-import always updates in place.
+    parser.add_argument("--upsert", "--allow-duplicate", dest="upsert", action="store_true",
+                        help="Re-import in place (update rows) if the session exists")
+    parser.add_argument("--refresh-extract", action="store_true",
+                        help="Reload from FastF1 even if a Parquet extract exists (and rewrite it)")
     parser.add_argument("--interactive", "-i", action="store_true", help="Force interactive prompt")
     args = parser.parse_args()
 
@@ -993,7 +1354,15 @@ if __name__ == "__main__":
             race_name=args.race,
             session_type=args.session or "R",
             driver_id=db_driver["driver_id"],
-            allow_duplicate=args.allow_duplicate,
+            upsert=args.upsert,
         )
+    params["refresh_extract"] = args.refresh_extract
 
-    import_race(**params)
+    log_path = start_run_log("import_race")
+    profile = ImportProfile(
+        f"{params['year']} {params['race_name']} {params['session_type']} #{params['driver_id']}",
+        year=params["year"], race=params["race_name"], driver_id=params["driver_id"],
+    )
+    import_race(**params, profile=profile)
+    report_path = write_report(log_path, [profile])
+    print(f"Run log: {log_path}\nTiming report: {report_path}")
@@ -0,0 +1,354 @@
+"""Per-stage timing and memory profile for FastF1 imports.
+
+A 20-minute batch import is one opaque number unless it is broken down.
+``import_race`` walks a fixed sequence of stages (FastF1 load, driver
+filtering, dimension lookups, lap inserts, telemetry conversion, telemetry
+inserts, pit reconciliation, race-control extraction, commit, session
+archive) and marks each one on an ``ImportProfile``:
+
+    profile.begin("fastf1_load")   # ends the previous stage, if any
+    ...
+    profile.end()                  # ends the last stage
+
+For every stage we record wall time, CPU time (process time -- FastF1
+parsing is CPU bound, DB round-trips are not), the RSS at its end and the
+largest RSS sampled at its boundaries (``max_rss_mb``).  A race's
+``max_rss_mb`` is the largest of its stages, so in a batch every race
+reports its own figure -- flat across the batch when memory is constant.
+The process high-water mark (``ru_maxrss``) only ever rises and is
+reported once, as the batch total ``peak_rss_mb``.
+
+The CLIs write the profiles as JSON next to the run log
+(``import_logs/<run>.log`` -> ``import_logs/<run>.timing.json``), with
+per-stage totals and the slowest races of a batch.
+
+psutil is optional: without it, the current RSS comes from /proc (Linux;
+None elsewhere) and peak RSS from ``resource`` (Linux / macOS); on Windows
+without psutil both memory figures are None.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+LOG_DIR = PROJECT_ROOT / "import_logs"
+
+# Stage order of import_race -- also the order of the report.
+IMPORT_STAGES = (
+    "fastf1_load",
+    "driver_filter",
+    "dimension_lookups",
+    "lap_inserts",
+    "telemetry_conversion",
+    "telemetry_inserts",
+    "pit_reconciliation",
+    "race_control",
+    "summary_tables",
+    "commit",
+    "archive",
+)
+
+# How many of the slowest races a batch report lists.
+SLOWEST_RACES = 5
+
+_MB = 1024 * 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process in MB, or None when unknown.
+
+    psutil when installed, else ``/proc/self/statm`` (Linux).
+    """
+    if psutil is not None:
+        try:
+            return psutil.Process().memory_info().rss / _MB
+        except Exception:
+            return None
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / _MB
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB.
+
+    psutil exposes the peak only on Windows (``peak_wset``); elsewhere the
+    kernel's ``ru_maxrss`` is used (KB on Linux, bytes on macOS).
+    """
+    if psutil is not None:
+        try:
+            peak = getattr(psutil.Process().memory_info(), "peak_wset", None)
+            if peak is not None:
+                return peak / _MB
+        except Exception:
+            pass
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / _MB if sys.platform == "darwin" else maxrss / 1024
+    return current_rss_mb()
+
+
+# Laps written per chunk by import_race when memory is not tight.
+DEFAULT_LAP_CHUNK = 20
+
+
+class MemoryBudget:
+    """Lap-chunk size that follows the process RSS against a budget.
+
+    ``check()`` runs after every chunk: over budget, it first collects
+    garbage (dropped frames are often just waiting for the cycle
+    collector); if RSS is still over, the chunk size is halved, down to a
+    single lap.  Back under budget, it doubles again up to its initial
+    size, so one peak (a FastF1 session load) does not slow the rest of a
+    batch.
+
+    The chunk bounds the telemetry one import converts at a time; the
+    frames behind it are bounded by import_race itself, which keeps only
+    its driver's car data and releases that once the laps are written.
+
+    The budget needs the *current* RSS (psutil, or /proc on Linux).
+    Without it the budget is switched off with a warning -- the process
+    peak only ever rises and would pin the chunk at its minimum.
+    """
+
+    def __init__(self, budget_mb: Optional[float] = None,
+                 chunk: int = DEFAULT_LAP_CHUNK, min_chunk: int = 1) -> None:
+        if budget_mb is not None and current_rss_mb() is None:
+            logging.warning(f"Current RSS unavailable (install psutil) — "
+                            f"{budget_mb:.0f} MB import memory budget ignored")
+            budget_mb = None
+        self.budget_mb = budget_mb
+        self.chunk = max(min_chunk, chunk)
+        self.initial_chunk = self.chunk
+        self.min_chunk = min_chunk
+        self.degradations = 0
+
+    @classmethod
+    def from_env(cls) -> "MemoryBudget":
+        """Budget from IMPORT_MEMORY_BUDGET_MB (unset/0 = unlimited)."""
+        raw = os.environ.get("IMPORT_MEMORY_BUDGET_MB", "").strip()
+        if not raw:
+            return cls()
+        try:
+            budget = float(raw)
+            if budget < 0:
+                raise ValueError("must not be negative")
+        except ValueError:
+            logging.warning(f"Invalid IMPORT_MEMORY_BUDGET_MB={raw!r} — no memory budget")
+            return cls()
+        return cls(budget or None)
+
+    def check(self) -> None:
+        if self.budget_mb is None:
+            return
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        if rss <= self.budget_mb:
+            self.chunk = min(self.initial_chunk, self.chunk * 2)
+            return
+        gc.collect()
+        rss = current_rss_mb()
+        if rss is None or rss <= self.budget_mb or self.chunk <= self.min_chunk:
+            return
+        self.chunk = max(self.min_chunk, self.chunk // 2)
+        self.degradations += 1
+        logging.warning(
+            f"RSS {rss:.0f} MB over the {self.budget_mb:.0f} MB import budget "
+            f"— lap chunk reduced to {self.chunk}"
+        )
+
+
+def _round(value: Optional[float], ndigits: int = 3) -> Optional[float]:
+    return None if value is None else round(value, ndigits)
+
+
+class ImportProfile:
+    """Wall/CPU/RSS figures for the stages of one race import."""
+
+    def __init__(self, label: str, **meta: Any) -> None:
+        self.label = label
+        self.meta = dict(meta)
+        self.status = "running"
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.max_rss_mb: Optional[float] = None
+        self._current: Optional[str] = None
+        self._rss0: Optional[float] = None
+        self._wall0 = 0.0
+        self._cpu0 = 0.0
+
+    def _sample_rss(self) -> Optional[float]:
+        rss = current_rss_mb()
+        if rss is not None and (self.max_rss_mb is None or rss > self.max_rss_mb):
+            self.max_rss_mb = rss
+        return rss
+
+    def begin(self, stage: str) -> None:
+        """Start ``stage``, ending the one in progress."""
+        self.end()
+        self._rss0 = self._sample_rss()
+        self._current = stage
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+
+    def end(self) -> None:
+        """End the stage in progress (no-op when none is running).
+
+        A stage entered twice accumulates its time.
+        """
+        if self._current is None:
+            return
+        wall = time.perf_counter() - self._wall0
+        cpu = time.process_time() - self._cpu0
+        entry = self.stages.setdefault(
+            self._current, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0}
+        )
+        entry["wall_s"] += wall
+        entry["cpu_s"] += cpu
+        entry["calls"] += 1
+        rss = entry["rss_mb"] = self._sample_rss()
+        samples = [v for v in (entry.get("max_rss_mb"), self._rss0, rss) if v is not None]
+        entry["max_rss_mb"] = max(samples) if samples else None
+        self._current = None
+
+    def finish(self, status: str) -> None:
+        """End the last stage and record how the import ended."""
+        self.end()
+        self.status = status
+
+    @property
+    def wall_s(self) -> float:
+        return sum(s["wall_s"] for s in self.stages.values())
+
+    @property
+    def cpu_s(self) -> float:
+        return sum(s["cpu_s"] for s in self.stages.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(
+            self.stages,
+            key=lambda n: (IMPORT_STAGES.index(n) if n in IMPORT_STAGES
+                           else len(IMPORT_STAGES)),
+        )
+        return {
+            "label": self.label,
+            **self.meta,
+            "status": self.status,
+            "wall_s": _round(self.wall_s),
+            "cpu_s": _round(self.cpu_s),
+            "max_rss_mb": _round(self.max_rss_mb, 1),
+            "stages": {
+                name: {
+                    "wall_s": _round(self.stages[name]["wall_s"]),
+                    "cpu_s": _round(self.stages[name]["cpu_s"]),
+                    "calls": self.stages[name]["calls"],
+                    "rss_mb": _round(self.stages[name].get("rss_mb"), 1),
+                    "max_rss_mb": _round(self.stages[name].get("max_rss_mb"), 1),
+                }
+                for name in ordered
+            },
+        }
+
+
+def summarize(profiles: List[ImportProfile]) -> Dict[str, Any]:
+    """Batch report: every race, per-stage totals and the slowest races.
+
+    ``max_race_rss_mb`` is the largest per-race RSS; ``peak_rss_mb`` the
+    process's lifetime high-water mark.
+    """
+    totals: Dict[str, Dict[str, float]] = {}
+    for p in profiles:
+        for name, s in p.stages.items():
+            t = totals.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0})
+            t["wall_s"] += s["wall_s"]
+            t["cpu_s"] += s["cpu_s"]
+
+    wall = sum(p.wall_s for p in profiles)
+    maxima = [p.max_rss_mb for p in profiles if p.max_rss_mb is not None]
+    slowest = sorted(profiles, key=lambda p: p.wall_s, reverse=True)[:SLOWEST_RACES]
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "races": [p.to_dict() for p in profiles],
+        "totals": {
+            "races": len(profiles),
+            "wall_s": _round(wall),
+            "cpu_s": _round(sum(p.cpu_s for p in profiles)),
+            "max_race_rss_mb": _round(max(maxima), 1) if maxima else None,
+            "peak_rss_mb": _round(peak_rss_mb(), 1),
+            "stages": {
+                name: {
+                    "wall_s": _round(t["wall_s"]),
+                    "cpu_s": _round(t["cpu_s"]),
+                    "share": _round(t["wall_s"] / wall, 3) if wall else None,
+                }
+                for name, t in sorted(
+                    totals.items(), key=lambda kv: kv[1]["wall_s"], reverse=True
+                )
+            },
+        },
+        "slowest_races": [
+            {"label": p.label, "wall_s": _round(p.wall_s),
+             "slowest_stage": max(p.stages, key=lambda n: p.stages[n]["wall_s"])
+             if p.stages else None}
+            for p in slowest
+        ],
+    }
+
+
+def start_run_log(prefix: str, log_dir: Path | None = None) -> Path:
+    """Attach a file handler for this run; returns the log path.
+
+    The timing report for the run is written next to it by
+    ``write_report`` (same stem, ``.timing.json``).
+    """
+    log_dir = Path(log_dir) if log_dir is not None else LOG_DIR
+    log_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_path = log_dir / f"{prefix}_{stamp}.log"
+    handler = logging.FileHandler(log_path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("[%(levelname)s] %(asctime)s - %(message)s"))
+    logging.getLogger().addHandler(handler)
+    return log_path
+
+
+def write_report(log_path: Path, profiles: List[ImportProfile]) -> Path:
+    """Write the batch timing report next to ``log_path``; returns its path."""
+    report = summarize(profiles)
+    report["log"] = str(log_path)
+    out = Path(log_path).with_suffix(".timing.json")
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return out
+
+
+def log_summary(profiles: List[ImportProfile]) -> None:
+    """Log the per-stage totals, slowest stage first."""
+    report = summarize(profiles)
+    logging.info("Import timing (wall / cpu, share of wall):")
+    for name, t in report["totals"]["stages"].items():
+        share = f"{t['share'] * 100:5.1f}%" if t["share"] is not None else "   n/a"
+        logging.info(f"  {name:<22} {t['wall_s']:8.2f}s / {t['cpu_s']:8.2f}s  {share}")
+    peak = report["totals"]["peak_rss_mb"]
+    if peak is not None:
+        logging.info(f"  process peak RSS: {peak:.0f} MB")
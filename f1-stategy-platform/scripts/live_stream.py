@@ -0,0 +1,219 @@
+"""Server-Sent Events fan-out for the dashboard's live cards and open session.
+
+Every open dashboard tab used to poll /api/latest-lap every 2 s and reload
+its whole session every 5 s -- the same queries once per tab.  One
+LiveWatcher thread now does the polling for all of them, against the two
+cheap change tokens the writers maintain:
+
+  * live_state (a handful of rows, see summary_tables) -> ``live`` events
+    carrying the live cards, sent whenever a card changes or ages out of
+    the live window;
+  * data_version (scope 'all', then the per-session scopes that moved)
+    -> ``laps`` events with only the lap rows that are new or changed in
+    a touched session, and ``events`` with strategy events written since
+    the last tick.
+
+Subscribers get a bounded queue each; a subscriber that stops draining it
+is dropped (its EventSource reconnects and refetches).  The thread runs
+only while someone is subscribed.
+"""
+
+import json
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+SUBSCRIBER_QUEUE = 256
+HEARTBEAT_S = 15.0
+
+_UNSET = object()
+
+
+def format_sse(event: str, data) -> str:
+    """One SSE frame (``event:`` + single-line JSON ``data:``)."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class LiveWatcher:
+    """Single poller fanning live deltas out to every stream subscriber.
+
+    ``cursor_factory()`` is a context manager yielding a dictionary cursor;
+    ``live_cards(cursor)`` returns the live-card rows and
+    ``session_laps(cursor, session_id)`` a session's lap rows (keyed by
+    lap_number), both exactly as the matching REST endpoints shape them.
+    """
+
+    def __init__(self, cursor_factory, live_cards, session_laps, interval: float = 1.0,
+                 max_subscribers: int = 8, snapshot_sessions: int = 32):
+        self._cursor_factory = cursor_factory
+        self._live_cards = live_cards
+        self._session_laps = session_laps
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self._snapshot_sessions = snapshot_sessions
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._reset()
+
+    def _reset(self):
+        self._live = _UNSET
+        self._token = _UNSET
+        self._scopes = {}
+        self._last_event_id = 0
+        self._snapshots = OrderedDict()
+        self._failing = False
+
+    # -- subscribers ----------------------------------------------------
+
+    def subscribe(self):
+        """A new subscriber queue, or None when the stream is at capacity."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            q = queue.Queue(maxsize=SUBSCRIBER_QUEUE)
+            if self._live is not _UNSET:
+                q.put_nowait(("live", {"cards": self._live}))
+            self._subscribers.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-stream",
+                                                daemon=True)
+                self._thread.start()
+            return q
+
+    def unsubscribe(self, q) -> None:
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event: str, data) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                # Too slow to keep up: drop it rather than buffer forever.
+                self.unsubscribe(q)
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+                q.put_nowait(None)
+
+    def stream(self, q, heartbeat: float = HEARTBEAT_S):
+        """SSE body for one subscriber; unsubscribes when the client goes."""
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    item = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comment frame: keeps proxies open, surfaces disconnects.
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                yield format_sse(*item)
+        finally:
+            self.unsubscribe(q)
+
+    # -- polling --------------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    self._reset()
+                    return
+            try:
+                self.poll()
+                self._failing = False
+            except Exception:
+                if not self._failing:
+                    self._failing = True
+                    traceback.print_exc()
+            time.sleep(self.interval)
+
+    def poll(self) -> list:
+        """One tick: detect changes, publish them, and return them.
+
+        The first tick only records where the data stands (plus the live
+        cards); deltas are reported from then on.
+        """
+        out = []
+        with self._cursor_factory() as cursor:
+            cards = self._live_cards(cursor)
+            if cards != self._live:
+                self._live = cards
+                out.append(("live", {"cards": cards}))
+
+            cursor.execute(
+                "SELECT version, updated_at FROM data_version WHERE scope = %s", ("all",))
+            row = cursor.fetchone()
+            token = (row["version"], row["updated_at"]) if row else (0, None)
+            if token != self._token:
+                first = self._token is _UNSET
+                self._token = token
+                out.extend(self._changed_sessions(cursor, report=not first))
+                out.extend(self._new_events(cursor, report=not first))
+        for event, data in out:
+            self.publish(event, data)
+        return out
+
+    def _changed_sessions(self, cursor, report: bool) -> list:
+        cursor.execute("SELECT scope, version, updated_at FROM data_version "
+                       "WHERE scope LIKE %s", ("session:%",))
+        scopes = {r["scope"]: (r["version"], r["updated_at"]) for r in cursor.fetchall()}
+        changed = [int(scope.split(":", 1)[1]) for scope, token in scopes.items()
+                   if self._scopes.get(scope) != token]
+        self._scopes = scopes
+        if not report:
+            return []
+        out = []
+        for session_id in sorted(changed):
+            rows = self._session_laps(cursor, session_id)
+            before = self._snapshots.pop(session_id, None)
+            self._snapshots[session_id] = {r["lap_number"]: r for r in rows}
+            while len(self._snapshots) > self._snapshot_sessions:
+                self._snapshots.popitem(last=False)
+            # A session not seen since the watcher started sends every row;
+            # the client upserts by lap_number either way.
+            delta = rows if before is None else [
+                r for r in rows if before.get(r["lap_number"]) != r]
+            if delta:
+                out.append(("laps", {"session_id": session_id, "laps": delta}))
+        return out
+
+    def _new_events(self, cursor, report: bool) -> list:
+        if not report:
+            cursor.execute("SELECT MAX(event_id) AS last_id FROM strategy_events")
+            row = cursor.fetchone()
+            self._last_event_id = (row["last_id"] if row else None) or 0
+            return []
+        # Race-control events (SC / VSC / red flag) carry no lap_id, only
+        # strategy_events.session_id; rows from before that column take
+        # the session of their lap.
+        cursor.execute("""
+            SELECT se.event_id, se.lap_id,
+                   COALESCE(se.session_id, l.session_id) AS session_id, l.lap_number,
+                   se.event_type, se.duration_sec
+            FROM strategy_events se
+            LEFT JOIN laps l ON se.lap_id = l.lap_id
+            WHERE se.event_id > %s
+            ORDER BY se.event_id
+        """, (self._last_event_id,))
+        events = cursor.fetchall()
+        if not events:
+            return []
+        self._last_event_id = events[-1]["event_id"]
+        for e in events:
+            e["duration_sec"] = float(e["duration_sec"]) if e["duration_sec"] is not None else None
+        return [("events", {"events": events})]
@@ -11,7 +11,8 @@ import json
 from datetime import datetime
 from pathlib import Path
 
-from config import get_db_connection
+from config import get_analytics_connection
+from session_archive import open_archive, training_laps
 
 # ---------------------------------------------------------------------------
 # Model artifacts always live in <project root>/ml_models — never relative to
@@ -77,6 +78,20 @@ WHERE l.is_valid = 1
   )
 """
 
+# Sessions with a current columnar archive (scripts/session_archive.py) are
+# read from its memory-mapped lap / event columns -- the same filters as
+# TRAINING_QUERY, applied with numpy -- and only take their track, date and
+# driver names from these small dimension queries.  Sessions without one go
+# through TRAINING_QUERY.
+SESSIONS_QUERY = "SELECT session_id, track_name, date AS session_date FROM sessions"
+DRIVERS_QUERY = """
+SELECT driver_id, driver_code, COALESCE(driver_name, driver_code) AS driver_name
+FROM drivers
+"""
+
+TRAINING_COLUMNS = ['lap_time', 'lap_number', 'tyre_age', 'tyre_compound', 'session_id',
+                    'track_name', 'session_date', 'driver_id', 'driver_code', 'driver_name']
+
 # Laps slower than this multiple of their session's median lap time are
 # treated as SC / VSC / red-flag / formation laps and excluded.
 SC_VSC_REDFLAG_RATIO = 1.30
@@ -89,6 +104,38 @@ STINT_WARMUP_LAPS = 2
 MIN_DRIVER_LAPS = 60
 
 
+def load_training_data(conn):
+    """TRAINING_QUERY's rows, archived sessions read from their archive."""
+    sessions = pd.read_sql(SESSIONS_QUERY, conn)
+    cursor = conn.cursor()
+    archived, missing = [], []
+    try:
+        for session_id in sessions['session_id']:
+            archive = open_archive(session_id, cursor=cursor)
+            if archive is None:
+                missing.append(int(session_id))
+            else:
+                archived.append(training_laps(archive).assign(session_id=session_id))
+    finally:
+        cursor.close()
+
+    frames = []
+    if archived:
+        drivers = pd.read_sql(DRIVERS_QUERY, conn).astype({'driver_id': 'Int64'})
+        frames.append(pd.concat(archived, ignore_index=True)
+                      .merge(sessions, on='session_id')
+                      .merge(drivers, on='driver_id', how='left'))
+        print(f"[INFO] {len(archived)} session(s) read from their columnar archive")
+    if missing:
+        query = TRAINING_QUERY
+        if archived:
+            query += f"  AND l.session_id IN ({', '.join(['%s'] * len(missing))})\n"
+        frames.append(pd.read_sql(query, conn, params=tuple(missing) if archived else None))
+    if not frames:
+        return pd.DataFrame(columns=TRAINING_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[TRAINING_COLUMNS]
+
+
 def clean_training_data(df, verbose=True, label="Training data"):
     """Return the cleaned training DataFrame for a driver subset (or all).
 
@@ -143,10 +190,10 @@ print("=" * 60)
 print("F1 LAP TIME PREDICTION - MODEL TRAINING")
 print("=" * 60)
 
-conn = get_db_connection()
+conn = get_analytics_connection()
 
 print("\n[DATABASE] Loading training data...")
-df = pd.read_sql(TRAINING_QUERY, conn)
+df = load_training_data(conn)
 conn.close()
 
 if df.empty:
@@ -0,0 +1,133 @@
+"""Optimal pit strategy search for the rest of a race.
+
+The advisor's fixed scenarios (stay out / one stop now onto the same, a
+harder or a softer compound) miss most real plans: stopping in a few
+laps, two-stoppers, or the stop the two-compound rule still demands.
+optimal_strategies() searches every pit lap, every compound sequence and
+0 .. max_stops stops.
+
+It works on precomputed lap-time tables, one per compound, indexed by
+tyre age (lap_time_tables() builds them with one vectorised model call).
+For a fixed compound sequence, placing the stops is a dynamic programme
+over stint boundaries.  ``best_k(q)`` is the cheapest way to cover the
+first q remaining laps with k stops, the last stint on the k-th compound:
+
+    best_k(q) = min over p < q of  best_(k-1)(p) + pit_loss(p)
+                                   + fresh_stint_cost[compound_k][q - p]
+
+Each stage is one (laps+1) x (laps+1) min-plus step in NumPy.  A fresh
+stint's cost depends only on its compound and length, not on when it is
+run (fuel is detrended), so reordering the stints after the current one
+never changes the total: each multiset of compounds is searched once.
+Sequences sharing a prefix share those stages, and all the children of a
+prefix are computed in one batched step.  A 70-lap race with six dry
+compounds and up to three stops therefore takes 28 array operations.
+
+The result is the best placement of each distinct compound choice,
+ranked -- the top-K *plans*, rather than K near-copies of one plan a lap
+apart or the same stints in a different order.
+"""
+
+import numpy as np
+
+WET_COMPOUNDS = ('Intermediate', 'Wet')
+
+
+def lap_time_tables(predictor, compounds, track, max_age, fuel_burn_rate=0.0) -> dict:
+    """compound -> NumPy array of predicted lap times for tyre ages
+    0 .. max_age - 1, detrended by the fuel-burn rate like the advisor's
+    scenarios.  ``predictor`` is a compiled_model wrapper."""
+    compounds = list(compounds)
+    ages = np.tile(np.arange(max_age, dtype=float), len(compounds))
+    tyres = np.repeat(compounds, max_age)
+    predicted = np.array(predictor.predict(ages, tyres, track), dtype=float)
+    predicted -= fuel_burn_rate * ages
+    return {c: predicted[i * max_age:(i + 1) * max_age] for i, c in enumerate(compounds)}
+
+
+def satisfies_compound_rule(compounds) -> bool:
+    """At least two different dry compounds, unless a wet tyre was used."""
+    compounds = set(compounds)
+    return bool(compounds & set(WET_COMPOUNDS)) or len(compounds - set(WET_COMPOUNDS)) >= 2
+
+
+def optimal_strategies(tables: dict, laps_remaining: int, current_tyre: str, current_age: int,
+                       pit_loss: float, pit_loss_now: float = None, max_stops: int = 3,
+                       top_k: int = 5, used_compounds=(), require_two_compounds: bool = True,
+                       min_stint: int = 1) -> list:
+    """Top-K pit plans for the remaining laps, fastest first.
+
+    ``tables`` must cover tyre ages up to current_age + laps_remaining on
+    the current tyre and laps_remaining on every compound; compounds not
+    in ``tables`` are never fitted.  A stop at boundary 0 means boxing at
+    the end of the current lap and costs ``pit_loss_now`` (a VSC / Safety
+    Car discount); later stops cost ``pit_loss``.  ``used_compounds`` are
+    the compounds already run earlier in the race (the current tyre
+    always counts), for the two-compound rule.
+
+    Each plan is ``{"total_time", "stops", "compounds", "pit_after"}``,
+    where pit_after[i] is the number of remaining laps completed before
+    stop i.
+    """
+    n = int(laps_remaining)
+    if n <= 0 or current_tyre not in tables:
+        return []
+    if pit_loss_now is None:
+        pit_loss_now = pit_loss
+    min_stint = max(1, int(min_stint))
+    used = set(used_compounds) | {current_tyre}
+
+    # first[q]: first q laps on the current tyre, ages current_age upwards.
+    current = tables[current_tyre][current_age:current_age + n]
+    if len(current) < n:
+        raise ValueError(f"lap-time table for {current_tyre} stops before age {current_age + n}")
+    first = np.concatenate(([0.0], np.cumsum(current)))
+
+    # fresh[c][L]: a stint of L laps on new tyres; inf below min_stint.
+    fresh = {}
+    for compound, table in tables.items():
+        if len(table) < n:
+            raise ValueError(f"lap-time table for {compound} stops before age {n}")
+        cost = np.concatenate(([np.inf], np.cumsum(table[:n])))
+        cost[:min_stint] = np.inf
+        fresh[compound] = np.concatenate((cost, [np.inf]))   # [-1]: q <= p
+
+    compounds = list(tables)
+    boundary = np.arange(n + 1)
+    length = boundary[None, :] - boundary[:, None]          # [p, q] = q - p
+    length = np.where(length > 0, length, -1)
+    stint = np.stack([fresh[c][length] for c in compounds])  # [compound, p, q]
+    loss = np.full(n + 1, float(pit_loss))
+    loss[0] = pit_loss_now
+
+    plans = []
+
+    def finish(sequence, cost, back):
+        total = float(cost[n])
+        if not np.isfinite(total):
+            return
+        if require_two_compounds and not satisfies_compound_rule(used | set(sequence)):
+            return
+        stops, q = [], n
+        for args in reversed(back):
+            q = int(args[q])
+            stops.append(q)
+        plans.append({"total_time": total, "stops": len(back),
+                      "compounds": list(sequence), "pit_after": stops[::-1]})
+
+    def extend(sequence, cost, back, lowest):
+        finish(sequence, cost, back)
+        if len(back) >= max_stops:
+            return
+        # step[i, p, q]: stop at p, then compounds[lowest + i] up to q.
+        step = (cost + loss)[None, :, None] + stint[lowest:]
+        args = step.argmin(axis=1)
+        best = np.take_along_axis(step, args[:, None, :], axis=1)[:, 0, :]
+        for i in range(len(compounds) - lowest):
+            extend(sequence + (compounds[lowest + i],), best[i], back + [args[i]], lowest + i)
+
+    # With no stop the first stint must run to the flag; after a stop it
+    # may end at any boundary, including 0 (box now).
+    extend((current_tyre,), first, [], 0)
+    plans.sort(key=lambda plan: plan["total_time"])
+    return plans[:top_k]
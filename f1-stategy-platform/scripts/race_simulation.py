@@ -0,0 +1,257 @@
+"""Monte Carlo race rollouts: how do pit plans fare once SC / VSC risk is in?
+
+The optimizer (pit_strategy) ranks plans on a clean race.  Real calls hinge
+on neutralisations: a Safety Car, VSC or red flag cuts the pit loss (15 s
+instead of 25 s, as in the advisor), so a plan whose stop can slide onto
+one is worth more than its clean-race time says.  simulate() runs
+thousands of rollouts of the rest of the race as NumPy arrays:
+
+  * each rollout samples which laps are neutralised, from per-track
+    historical frequencies (load_event_rates: deployments per recorded
+    race and their typical length in laps, from strategy_events);
+  * each plan reacts the way a pit wall would: a stop due within
+    ``window`` laps is brought forward onto the first neutralised lap in
+    that window;
+  * race time is the plan's stint costs on the lap-time tables plus each
+    stop's loss -- neutralised laps themselves cost every plan the same and
+    are left out.
+
+All plans see the same sampled races, so "win probability" (share of
+rollouts where a plan is fastest) compares them fairly.  Rollouts can be
+spread across a process pool (``workers``); each chunk draws from its own
+spawned seed, so a given (seed, workers) is reproducible.
+"""
+
+import concurrent.futures
+
+import numpy as np
+
+NEUTRALISATIONS = ('SafetyCar', 'VSC', 'RedFlag')
+
+# Typical length in laps when no duration was recorded for a type.
+DEFAULT_DURATION_LAPS = {'SafetyCar': 4, 'VSC': 2, 'RedFlag': 1}
+
+# Neutralisation rows in write order.  Imports write one row per
+# deployment; live capture (sessions whose laps carry captured_at)
+# writes one per slow lap, with that lap's time as duration -- see
+# deployments().
+NEUTRALISATION_EVENTS_QUERY = """
+    SELECT s.track_name, se.session_id,
+           EXISTS (SELECT 1 FROM laps l WHERE l.session_id = se.session_id
+                   AND l.captured_at IS NOT NULL) AS captured,
+           se.event_type, se.duration_sec
+    FROM strategy_events se
+    JOIN sessions s ON se.session_id = s.session_id
+    WHERE se.event_type IN ('SafetyCar', 'VSC', 'RedFlag')
+    ORDER BY se.session_id, se.event_id
+"""
+
+# Races whose events were recorded with their session link (every import
+# and capture since strategy_events.session_id exists).
+RECORDED_RACES_QUERY = """
+    SELECT s.track_name, COUNT(DISTINCT se.session_id) AS races
+    FROM strategy_events se
+    JOIN sessions s ON se.session_id = s.session_id
+    GROUP BY s.track_name
+"""
+
+
+class EventRates:
+    """Neutralisations per race and their length in laps, by type.
+
+    ``source`` says where they came from: 'track', 'all tracks' (too few
+    recorded races at this track) or 'none'.
+    """
+
+    def __init__(self, per_race: dict, duration_laps: dict, races: int = 0,
+                 source: str = 'none'):
+        self.per_race = {t: float(per_race.get(t, 0.0)) for t in NEUTRALISATIONS}
+        self.duration_laps = {t: max(1, int(duration_laps.get(t, DEFAULT_DURATION_LAPS[t])))
+                              for t in NEUTRALISATIONS}
+        self.races = races
+        self.source = source
+
+    def to_dict(self) -> dict:
+        return {"source": self.source, "races": self.races,
+                "per_race": {t: round(v, 3) for t, v in self.per_race.items()},
+                "duration_laps": dict(self.duration_laps)}
+
+
+def deployments(rows) -> list:
+    """(track_name, event_type, duration_sec) per deployment.
+
+    ``rows`` are NEUTRALISATION_EVENTS_QUERY rows.  In a captured session
+    consecutive rows of one type are the laps of one deployment (a 4-lap
+    Safety Car is four rows) and become one, their lap times summed.
+    """
+    out, run = [], None
+    for row in rows:
+        key = (row['session_id'], row['event_type'])
+        duration = float(row['duration_sec']) if row['duration_sec'] is not None else None
+        if run is not None and row['captured'] and run[0] == key:
+            run[3] = None if run[3] is None or duration is None else run[3] + duration
+            continue
+        run = [key, row['track_name'], row['event_type'], duration]
+        out.append(run)
+    return [(track, kind, duration) for _, track, kind, duration in out]
+
+
+def load_event_rates(cursor, track: str, lap_time_s: float, min_races: int = 3) -> EventRates:
+    """Historical neutralisation rates for ``track`` (dictionary cursor).
+
+    Falls back to all tracks pooled when the track has fewer than
+    ``min_races`` recorded races.  Durations (seconds) are converted to
+    laps with ``lap_time_s``.
+    """
+    def _key(name):
+        return str(name or '').strip().title()
+
+    cursor.execute(RECORDED_RACES_QUERY)
+    races = {}
+    for row in cursor.fetchall():
+        races[_key(row['track_name'])] = races.get(_key(row['track_name']), 0) + int(row['races'])
+    cursor.execute(NEUTRALISATION_EVENTS_QUERY)
+    deployed = deployments(cursor.fetchall())
+
+    track = _key(track)
+    if races.get(track, 0) >= min_races:
+        source, n = 'track', races[track]
+        deployed = [d for d in deployed if _key(d[0]) == track]
+    elif sum(races.values()):
+        source, n = 'all tracks', sum(races.values())
+    else:
+        return EventRates({}, {})
+
+    events, seconds = {}, {}
+    for _, kind, duration in deployed:
+        events[kind] = events.get(kind, 0) + 1
+        if duration is not None:
+            seconds.setdefault(kind, []).append(duration)
+    durations = {}
+    for kind, values in seconds.items():
+        mean = sum(values) / len(values)
+        durations[kind] = round(mean / lap_time_s) if lap_time_s > 0 else None
+    durations = {k: v for k, v in durations.items() if v}
+    return EventRates({k: v / n for k, v in events.items()}, durations, races=n, source=source)
+
+
+def sample_neutralisations(rng, rates: EventRates, laps_remaining: int, total_laps: int,
+                           rollouts: int):
+    """(discounted, occurred) for ``rollouts`` sampled race remainders.
+
+    ``discounted[r, b]`` is True when a stop after b of the remaining laps
+    falls under a neutralisation; ``occurred[r, k]`` whether type k was
+    deployed at all.  Deployments start on any lap with probability
+    per_race / total_laps.
+    """
+    n = laps_remaining
+    discounted = np.zeros((rollouts, n + 1), dtype=bool)
+    occurred = np.zeros((rollouts, len(NEUTRALISATIONS)), dtype=bool)
+    for k, kind in enumerate(NEUTRALISATIONS):
+        hazard = rates.per_race[kind] / max(1, total_laps)
+        if hazard <= 0:
+            continue
+        starts = rng.random((rollouts, n)) < min(1.0, hazard)
+        occurred[:, k] = starts.any(axis=1)
+        # Deployed during lap j: stops at boundaries j+1 .. j+duration.
+        for offset in range(min(rates.duration_laps[kind], n)):
+            discounted[:, 1 + offset:] |= starts[:, :n - offset]
+    return discounted, occurred
+
+
+def _plan_times(plan, discounted, first_cum, fresh_cum, pit_loss, neutral_pit_loss, window):
+    """(race time, any stop discounted) per rollout for one plan."""
+    rollouts, n = discounted.shape[0], discounted.shape[1] - 1
+    stops = plan['pit_after']
+    if not stops:
+        return np.full(rollouts, first_cum[n]), np.zeros(rollouts, dtype=bool)
+
+    boundary = np.arange(n + 1)
+    moved = np.empty((rollouts, len(stops)), dtype=int)
+    previous = np.full(rollouts, -1)
+    for i, planned in enumerate(stops):
+        lowest = np.maximum(planned - window, previous + 1)
+        eligible = (discounted & (boundary >= lowest[:, None]) & (boundary <= planned))
+        moved[:, i] = np.where(eligible.any(axis=1), eligible.argmax(axis=1), planned)
+        previous = moved[:, i]
+
+    rows = np.arange(rollouts)
+    cheap = discounted[rows[:, None], moved]
+    total = first_cum[moved[:, 0]]
+    ends = np.column_stack((moved[:, 1:], np.full(rollouts, n)))
+    for i, compound in enumerate(plan['compounds'][1:]):
+        total = total + fresh_cum[compound][ends[:, i] - moved[:, i]]
+    total = total + np.where(cheap, neutral_pit_loss, pit_loss).sum(axis=1)
+    return total, cheap.any(axis=1)
+
+
+def _rollout_chunk(args):
+    (seed, rollouts, plans, tables, laps_remaining, total_laps, current_tyre, current_age,
+     rates, pit_loss, neutral_pit_loss, neutral_now, window) = args
+    rng = np.random.default_rng(seed)
+    n = laps_remaining
+    discounted, occurred = sample_neutralisations(rng, rates, n, total_laps, rollouts)
+    if neutral_now:
+        discounted[:, 0] = True
+    first_cum = np.concatenate(([0.0], np.cumsum(tables[current_tyre][current_age:current_age + n])))
+    fresh_cum = {c: np.concatenate(([0.0], np.cumsum(t[:n]))) for c, t in tables.items()}
+    times = np.empty((rollouts, len(plans)))
+    cheap = np.empty((rollouts, len(plans)), dtype=bool)
+    for p, plan in enumerate(plans):
+        times[:, p], cheap[:, p] = _plan_times(plan, discounted, first_cum, fresh_cum,
+                                               pit_loss, neutral_pit_loss, window)
+    return times, cheap, occurred
+
+
+def simulate(tables: dict, plans: list, laps_remaining: int, total_laps: int,
+             current_tyre: str, current_age: int, rates: EventRates, rollouts: int = 2000,
+             pit_loss: float = 25.0, neutral_pit_loss: float = 15.0, neutral_now: bool = False,
+             window: int = 3, seed=None, workers: int = 1) -> dict:
+    """Race-time distributions and win probabilities for ``plans``
+    (optimal_strategies output) over ``rollouts`` sampled races.
+
+    ``neutral_now`` marks the current lap as neutralised (a VSC / Safety
+    Car is out right now).  ``workers`` > 1 spreads the rollouts over a
+    process pool.  No plans (e.g. no stops allowed and the compound rule
+    still open) is nothing to race: no strategies, nothing sampled.
+    """
+    workers = max(1, int(workers))
+    rollouts = max(workers, int(rollouts))
+    if not plans:
+        return {"rollouts": rollouts, "strategies": [],
+                "neutralisation_probability": {kind: 0.0 for kind in NEUTRALISATIONS}}
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    sizes = [rollouts // workers + (i < rollouts % workers) for i in range(workers)]
+    chunks = [(s, size, plans, tables, laps_remaining, total_laps, current_tyre, current_age,
+               rates, pit_loss, neutral_pit_loss, neutral_now, window)
+              for s, size in zip(seeds, sizes)]
+    if workers == 1:
+        results = [_rollout_chunk(chunks[0])]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_rollout_chunk, chunks))
+    times = np.concatenate([r[0] for r in results])
+    cheap = np.concatenate([r[1] for r in results])
+    occurred = np.concatenate([r[2] for r in results])
+
+    wins = np.bincount(times.argmin(axis=1), minlength=len(plans)) / rollouts
+    strategies = []
+    for p, plan in enumerate(plans):
+        t = times[:, p]
+        p5, p50, p95 = np.percentile(t, [5, 50, 95])
+        strategies.append({
+            **plan,
+            "mean":                float(t.mean()),
+            "std":                 float(t.std()),
+            "p5":                  float(p5),
+            "p50":                 float(p50),
+            "p95":                 float(p95),
+            "win_probability":     float(wins[p]),
+            "discounted_stop_rate": float(cheap[:, p].mean()),
+        })
+    return {
+        "rollouts":   rollouts,
+        "strategies": strategies,
+        "neutralisation_probability": {kind: float(occurred[:, k].mean())
+                                       for k, kind in enumerate(NEUTRALISATIONS)},
+    }
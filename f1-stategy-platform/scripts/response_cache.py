@@ -0,0 +1,67 @@
+"""In-process LRU / TTL cache for the dashboard's read-only JSON answers.
+
+Several endpoints (comparison years / tracks, the driver list, predictor
+options, a session's lap table) recompute the same answer for every
+browser tab and poll.  Entries are keyed by route + query arguments and
+carry the data-version token they were computed under (see
+summary_tables.bump_data_version): a lookup under a different token is a
+miss, so writers invalidate entries simply by committing.  The TTL only
+bounds staleness after out-of-band edits that bypass the writers.
+
+Thread-safe -- Waitress serves requests from a thread pool.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Bounded mapping key -> (token, value) with least-recently-used
+    eviction and a per-entry time to live.  ``max_entries=0`` disables it.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key, token):
+        """Value stored for ``key`` under ``token``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_token, expires, value = entry
+                if entry_token == token and self._clock() < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, token, value) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (token, self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "ttl_s": self.ttl, "hits": self.hits, "misses": self.misses}
@@ -27,7 +27,9 @@ def run():
         print(f"F1 DIGITAL PIT WALL — Production Server (Waitress WSGI)")
         print(f"Listening on {url}")
         print("=" * 60)
-        serve(app, host=host, port=port)
+        # Each open /api/stream (live dashboard tab) holds a worker thread
+        # for as long as the tab stays open, on top of regular requests.
+        serve(app, host=host, port=port, threads=int(os.environ.get('THREADS', 16)))
     except ImportError:
         print("=" * 60)
         print(f"F1 DIGITAL PIT WALL — Development Server (Flask)")
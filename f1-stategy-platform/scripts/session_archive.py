@@ -0,0 +1,404 @@
+"""Per-session columnar archive of laps, telemetry and strategy events.
+
+Analysis paths that read a whole session (speed distributions, per-lap
+telemetry aggregates, the lap-time model's training laps) otherwise pull
+every row through mysql-connector as a Python tuple.  After an import commits -- and when a live capture ends --
+the session is exported once to a directory of NumPy ``.npy`` files, one
+per column:
+
+    session_archive/<session_id>/
+        manifest.json                 format version, session info, row counts
+        laps/<column>.npy
+        telemetry/<column>.npy        sorted by (lap_id, telemetry_id)
+        events/<column>.npy           lap-linked strategy events only
+
+``open_archive`` memory-maps the columns (``np.load(mmap_mode="r")``), so
+a full season of telemetry is read straight from the page cache without
+materialising a Python object per sample.  NULLs are NaN in the numeric
+columns and "" in the string columns.
+
+The archive is a snapshot: anything that rewrites a session (re-import with
+``--upsert``) rewrites its archive, and ``python scripts/session_archive.py
+--session N`` (or ``--all``) rebuilds one by hand.  The manifest records the
+session's ``data_version`` at export time; every writer bumps it (pit-event
+cleanup, telemetry compaction, a re-import that stops before its archive
+step), so ``open_archive(..., cursor=...)`` treats an archive whose version
+no longer matches the DB as stale.  Readers fall back to SQL whenever a
+session has no current archive.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+ARCHIVE_DIR = PROJECT_ROOT / "session_archive"
+ARCHIVE_VERSION = 2
+
+# Column name -> on-disk dtype.  Nullable integers are stored as floats
+# (NaN = NULL); telemetry uses float32 since it is by far the largest table.
+LAP_COLUMNS = {
+    "lap_id": "int64",
+    "lap_number": "float64",
+    "lap_time_ms": "float64",
+    "tyre_compound": "U12",
+    "tyre_age": "float64",
+    "fuel_load": "float64",
+    "is_valid": "float64",
+    "driver_id": "float64",
+}
+TELEMETRY_COLUMNS = {
+    "lap_id": "int64",
+    "lap_number": "float64",
+    "speed": "float32",
+    "throttle": "float32",
+    "brake": "float32",
+    "gear": "float32",
+    "rpm": "float32",
+    "drs": "float32",
+}
+EVENT_COLUMNS = {
+    "lap_id": "int64",
+    "lap_number": "float64",
+    "event_type": "U10",
+    "duration_sec": "float64",
+}
+TABLES = {"laps": LAP_COLUMNS, "telemetry": TELEMETRY_COLUMNS, "events": EVENT_COLUMNS}
+
+_QUERIES = {
+    "laps": """
+        SELECT lap_id, lap_number, lap_time_ms, tyre_compound, tyre_age,
+               fuel_load, is_valid, driver_id
+        FROM laps
+        WHERE session_id = %s
+        ORDER BY lap_number, lap_id
+    """,
+    "telemetry": """
+        SELECT t.lap_id, l.lap_number, t.speed, t.throttle, t.brake,
+               t.gear, t.rpm, t.drs
+        FROM telemetry t
+        JOIN laps l ON t.lap_id = l.lap_id
+        WHERE l.session_id = %s
+        ORDER BY t.lap_id, t.telemetry_id
+    """,
+    "events": """
+        SELECT se.lap_id, l.lap_number, se.event_type, se.duration_sec
+        FROM strategy_events se
+        JOIN laps l ON se.lap_id = l.lap_id
+        WHERE l.session_id = %s
+        ORDER BY l.lap_number, se.event_id
+    """,
+}
+
+
+def archive_path(session_id: int, root: Path | None = None) -> Path:
+    """Directory of the archive for ``session_id``."""
+    root = Path(root) if root is not None else ARCHIVE_DIR
+    return root / str(int(session_id))
+
+
+def _to_array(values: Sequence[Any], dtype: str) -> np.ndarray:
+    """One column of DB values as a typed array (None -> NaN / "")."""
+    if dtype.startswith("U"):
+        return np.array(["" if v is None else str(v) for v in values], dtype=dtype)
+    if dtype.startswith("float"):
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=dtype)
+    return np.array(values, dtype=dtype)
+
+
+def rows_to_columns(rows: Sequence[Sequence[Any]], columns: Dict[str, str]) -> Dict[str, np.ndarray]:
+    """Row tuples (in ``columns`` order) as a dict of typed column arrays."""
+    names = list(columns)
+    if not rows:
+        return {name: np.empty(0, dtype=columns[name]) for name in names}
+    transposed = list(zip(*rows))
+    return {name: _to_array(transposed[i], columns[name]) for i, name in enumerate(names)}
+
+
+def data_version_token(cursor, session_id: int) -> Optional[List[Any]]:
+    """The session's ``data_version`` row as ``[version, updated_at]``
+    (JSON-ready), or None when it has none or the table is not migrated."""
+    try:
+        cursor.execute("SELECT version, updated_at FROM data_version WHERE scope = %s",
+                       (f"session:{int(session_id)}",))
+        row = cursor.fetchone()
+    except Exception:
+        return None
+    if row is None:
+        return None
+    if isinstance(row, dict):
+        row = (row["version"], row["updated_at"])
+    version, updated_at = row
+    return [int(version),
+            updated_at.isoformat() if hasattr(updated_at, "isoformat") else updated_at]
+
+
+def write_archive(session_id: int, tables: Dict[str, Dict[str, np.ndarray]],
+                  session: Optional[Dict[str, Any]] = None,
+                  root: Path | None = None,
+                  data_version: Optional[List[Any]] = None) -> Path:
+    """Write column arrays for one session; returns the archive directory.
+
+    Built in a temp directory and renamed into place, so readers never see
+    a half-written archive.
+    """
+    target = archive_path(session_id, root)
+    tmp = target.with_name(target.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    try:
+        rows = {}
+        for table, spec in TABLES.items():
+            (tmp / table).mkdir(parents=True)
+            cols = tables.get(table) or rows_to_columns([], spec)
+            lengths = {len(a) for a in cols.values()}
+            if len(lengths) > 1:
+                raise ValueError(f"ragged columns in {table}: {sorted(lengths)}")
+            for name, dtype in spec.items():
+                np.save(tmp / table / f"{name}.npy", np.asarray(cols[name], dtype=dtype))
+            rows[table] = lengths.pop() if lengths else 0
+
+        manifest = {
+            "version": ARCHIVE_VERSION,
+            "session_id": int(session_id),
+            "written_at": datetime.now().isoformat(timespec="seconds"),
+            "session": {k: (v.isoformat() if hasattr(v, "isoformat") else v)
+                        for k, v in (session or {}).items()},
+            "data_version": data_version,
+            "rows": rows,
+            "columns": {table: dict(spec) for table, spec in TABLES.items()},
+        }
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        shutil.rmtree(target, ignore_errors=True)
+        tmp.rename(target)
+        return target
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def archive_session(conn, session_id: int, root: Path | None = None) -> Optional[Path]:
+    """Export one committed session from the DB to its archive.
+
+    Non-fatal by design: the DB stays the source of truth, so a failed
+    export is logged and None returned.
+    """
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT track_name, session_type, date, driver_id, season_id "
+            "FROM sessions WHERE session_id = %s",
+            (session_id,),
+        )
+        srow = cursor.fetchone()
+        if srow is None:
+            logging.warning(f"Session {session_id} not found - archive not written")
+            return None
+        session = dict(zip(("track_name", "session_type", "date", "driver_id", "season_id"), srow))
+
+        # Read before the tables: a write landing in between leaves an
+        # older token, so the archive reads as stale rather than current.
+        version = data_version_token(cursor, session_id)
+        tables = {}
+        for table, spec in TABLES.items():
+            cursor.execute(_QUERIES[table], (session_id,))
+            tables[table] = rows_to_columns(cursor.fetchall(), spec)
+
+        target = write_archive(session_id, tables, session, root, data_version=version)
+        logging.info(f"Session archive written: {target} "
+                     f"({len(tables['laps']['lap_id'])} laps, "
+                     f"{len(tables['telemetry']['lap_id'])} telemetry rows)")
+        return target
+    except Exception as exc:
+        logging.warning(f"Could not write session archive for {session_id} ({exc})")
+        return None
+    finally:
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+
+class SessionArchive:
+    """Read-only, memory-mapped view of one session's archive."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / "manifest.json").read_text(encoding="utf-8"))
+        self.session_id = self.manifest["session_id"]
+        self._cache: Dict[str, Dict[str, np.ndarray]] = {}
+
+    def rows(self, table: str) -> int:
+        return int(self.manifest["rows"].get(table, 0))
+
+    def table(self, table: str) -> Dict[str, np.ndarray]:
+        """All columns of ``table`` as memory-mapped arrays."""
+        if table not in self._cache:
+            names = self.manifest["columns"][table]
+            self._cache[table] = {name: self.column(table, name) for name in names}
+        return self._cache[table]
+
+    def column(self, table: str, name: str) -> np.ndarray:
+        path = self.directory / table / f"{name}.npy"
+        # Zero-length arrays cannot be mapped; they are tiny anyway.
+        if self.rows(table) == 0:
+            return np.load(path)
+        return np.load(path, mmap_mode="r")
+
+    def frame(self, table: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """``table`` (or a column subset) as a DataFrame -- this copies."""
+        cols = self.table(table)
+        return pd.DataFrame({name: np.asarray(cols[name]) for name in (columns or cols)})
+
+
+def open_archive(session_id: int, root: Path | None = None,
+                 cursor=None) -> Optional[SessionArchive]:
+    """The archive of ``session_id``, or None when absent / unreadable.
+
+    With a ``cursor`` the archive must also still match the session's
+    ``data_version``; one written before the latest change is None too.
+    """
+    directory = archive_path(session_id, root)
+    manifest = directory / "manifest.json"
+    if not manifest.exists():
+        return None
+    try:
+        archive = SessionArchive(directory)
+        if archive.manifest.get("version") != ARCHIVE_VERSION:
+            logging.info(f"Stale session archive at {directory} - ignoring")
+            return None
+        if cursor is not None:
+            current = data_version_token(cursor, session_id)
+            if archive.manifest.get("data_version") != current:
+                logging.info(f"Session {session_id} changed since its archive was "
+                             f"written - reading from the database")
+                return None
+        return archive
+    except Exception as exc:
+        logging.warning(f"Unreadable session archive at {directory} ({exc})")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Vectorised analytics over an archive
+# ---------------------------------------------------------------------------
+
+def speed_distribution(archive: SessionArchive) -> pd.DataFrame:
+    """``speed`` / ``lap_number`` of every moving telemetry sample.
+
+    Same rows as analyze_performance.get_speed_distribution's SQL.
+    """
+    tel = archive.table("telemetry")
+    speed = tel["speed"]
+    moving = speed > 0          # NaN compares False, like SQL NULL
+    return pd.DataFrame({
+        "speed": speed[moving].astype(np.int64),
+        "lap_number": tel["lap_number"][moving].astype(np.int64),
+    })
+
+
+def lap_telemetry_aggregates(archive: SessionArchive) -> Dict[int, Dict[str, Optional[float]]]:
+    """Per-lap AVG(speed), MAX(speed), AVG(gear), AVG(rpm), keyed by lap_id.
+
+    Matches the SQL GROUP BY: NULL samples are ignored, and an aggregate
+    over only NULLs is None.  Relies on telemetry being sorted by lap_id.
+    """
+    tel = archive.table("telemetry")
+    lap_ids = np.asarray(tel["lap_id"])
+    if lap_ids.size == 0:
+        return {}
+    uniq, starts = np.unique(lap_ids, return_index=True)
+    seg = np.repeat(np.arange(len(uniq)), np.diff(np.append(starts, lap_ids.size)))
+
+    def mean(col: np.ndarray) -> np.ndarray:
+        values = np.asarray(col, dtype=np.float64)
+        ok = ~np.isnan(values)
+        total = np.bincount(seg[ok], weights=values[ok], minlength=len(uniq))
+        count = np.bincount(seg[ok], minlength=len(uniq))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+    with np.errstate(invalid="ignore"):
+        top = np.fmax.reduceat(np.asarray(tel["speed"], dtype=np.float64), starts)
+    columns = {
+        "avg_speed": mean(tel["speed"]),
+        "top_speed": top,
+        "avg_gear": mean(tel["gear"]),
+        "avg_rpm": mean(tel["rpm"]),
+    }
+    return {
+        int(lap_id): {name: (None if np.isnan(values[i]) else float(values[i]))
+                      for name, values in columns.items()}
+        for i, lap_id in enumerate(uniq)
+    }
+
+
+def training_laps(archive: SessionArchive) -> pd.DataFrame:
+    """``lap_time`` (s), ``lap_number``, ``tyre_age``, ``tyre_compound`` and
+    ``driver_id`` of the session's candidate training laps.
+
+    Same rows as ml_lap_predictions.TRAINING_QUERY: valid laps of 60-180 s
+    that are not the in-lap of a real pit stop (>= 15 s or unknown
+    duration).  The query's out-lap subquery selects the in-lap's own
+    lap_id, so it never drops a lap; neither does this.
+    """
+    laps = archive.table("laps")
+    events = archive.table("events")
+    pit = (events["event_type"] == "PitStop") & ~(events["duration_sec"] < 15.0)
+    lap_time = np.asarray(laps["lap_time_ms"])
+    keep = ((laps["is_valid"] == 1) & (lap_time >= 60000) & (lap_time <= 180000)
+            & ~np.isin(laps["lap_id"], events["lap_id"][pit]))
+    compound = laps["tyre_compound"][keep]
+    return pd.DataFrame({
+        "lap_time": lap_time[keep] / 1000.0,
+        "lap_number": laps["lap_number"][keep],
+        "tyre_age": laps["tyre_age"][keep],
+        "tyre_compound": np.where(compound == "", None, compound.astype(object)),
+        "driver_id": pd.array(laps["driver_id"][keep], dtype="Int64"),
+    })
+
+
+# ---------------------------------------------------------------------------
+# CLI: (re)build archives from the DB
+# ---------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(asctime)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Write columnar session archives from the database.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--session", type=int, action="append", help="session_id to archive (repeatable)")
+    group.add_argument("--all", action="store_true", help="archive every session")
+    args = parser.parse_args(argv)
+
+    from config import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        session_ids = args.session
+        if args.all:
+            cursor = conn.cursor()
+            cursor.execute("SELECT session_id FROM sessions ORDER BY session_id")
+            session_ids = [r[0] for r in cursor.fetchall()]
+            cursor.close()
+        written = sum(archive_session(conn, sid) is not None for sid in session_ids)
+        print(f"Archived {written}/{len(session_ids)} session(s) to {ARCHIVE_DIR}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""Pre-aggregated summary tables kept next to the raw lap data.
+
+The dashboard sidebar, the analysis report and the race comparison used
+to aggregate raw rows on each request (COUNT / MIN / AVG over every lap,
+AVG / MAX over every telemetry sample), so their cost grew with history.
+Summary tables hold the results instead, refreshed by the writers:
+
+  session_stats        one row per session; capture refreshes it after
+                       each lap insert / lap-time update, the importer
+                       once per import inside the import transaction.
+  lap_telemetry_stats  one row per lap with telemetry; capture refreshes
+                       it when a lap completes, the importer after each
+                       chunk of telemetry rows.
+  live_state           one row per driver: the latest completed live lap.
+                       Capture upserts it on every lap completion, a
+                       same-day import with its last lap; the live cards
+                       read it by primary key instead of searching laps
+                       for the newest captured_at.
+
+Every session_stats write also bumps the data_version counters (scope
+'all' and 'session:<id>') that key the dashboard's response cache, so a
+writer that touches laps invalidates cached answers in the same
+transaction.
+
+A refresh re-aggregates only the touched session / laps (index ranges on
+laps.session_id and telemetry.lap_id), so it stays correct when a lap is
+upserted or its telemetry replaced rather than appended.  Readers look
+rows up by key (session_stats in (session_date, session_id) order) and
+never touch the raw tables.
+
+Existing databases: create the tables (database/migrate_summary_tables.sql)
+and backfill them:
+
+    python scripts/summary_tables.py rebuild              # every session
+    python scripts/summary_tables.py rebuild --session 42
+    python scripts/summary_tables.py rebuild --table lap_telemetry_stats
+    python scripts/summary_tables.py rebuild --table live_state
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# One row per session, from the session's laps.  fastest_lap_ms matches the
+# dashboard (valid, timed laps); best_timed_ms / avg_lap_ms match the
+# analysis report (any timed lap).  In-progress 0 ms laps never count.
+SESSION_STATS_QUERY = """
+    SELECT
+        s.session_id,
+        d.driver_code,
+        s.date AS session_date,
+        COUNT(l.lap_id) AS total_laps,
+        COALESCE(SUM(CASE WHEN l.is_valid = 1 THEN 1 ELSE 0 END), 0) AS valid_laps,
+        COALESCE(SUM(CASE WHEN l.is_valid = 0 THEN 1 ELSE 0 END), 0) AS invalid_laps,
+        MIN(CASE WHEN l.is_valid = 1 AND l.lap_time_ms > 0
+                 THEN l.lap_time_ms END) AS fastest_lap_ms,
+        MIN(CASE WHEN l.lap_time_ms > 0 THEN l.lap_time_ms END) AS best_timed_ms,
+        AVG(CASE WHEN l.lap_time_ms > 0 THEN l.lap_time_ms END) AS avg_lap_ms,
+        MAX(l.captured_at) AS last_captured_at
+    FROM sessions s
+    LEFT JOIN drivers d ON s.driver_id = d.driver_id
+    LEFT JOIN laps l ON s.session_id = l.session_id
+    WHERE s.session_id IN ({ids})
+    GROUP BY s.session_id, d.driver_code, s.date
+"""
+
+SESSION_STATS_UPSERT = """
+    INSERT INTO session_stats
+      (session_id, driver_code, session_date, total_laps, valid_laps,
+       invalid_laps, fastest_lap_ms, best_timed_ms, avg_lap_ms,
+       last_captured_at, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      driver_code      = VALUES(driver_code),
+      session_date     = VALUES(session_date),
+      total_laps       = VALUES(total_laps),
+      valid_laps       = VALUES(valid_laps),
+      invalid_laps     = VALUES(invalid_laps),
+      fastest_lap_ms   = VALUES(fastest_lap_ms),
+      best_timed_ms    = VALUES(best_timed_ms),
+      avg_lap_ms       = VALUES(avg_lap_ms),
+      last_captured_at = VALUES(last_captured_at),
+      updated_at       = VALUES(updated_at)
+"""
+
+# Per-lap telemetry aggregates for the comparison tooltips.  Rebuilt with
+# a delete + INSERT ... SELECT so a lap whose telemetry is gone loses its
+# row too; NULL samples are ignored as in any SQL aggregate.  Rows of laps
+# whose raw telemetry was compacted (retention != 'full') were taken from
+# the full-resolution data and are kept as they are.
+LAP_TELEMETRY_STATS_INSERT = """
+    INSERT INTO lap_telemetry_stats
+      (lap_id, samples, avg_speed, top_speed, avg_gear, avg_rpm, updated_at)
+    SELECT t.lap_id, COUNT(*), AVG(t.speed), MAX(t.speed), AVG(t.gear),
+           AVG(t.rpm), %s
+    FROM telemetry t
+    WHERE t.lap_id IN ({ids})
+      AND t.lap_id NOT IN (SELECT lap_id FROM lap_telemetry_stats WHERE lap_id IN ({ids}))
+    GROUP BY t.lap_id
+"""
+
+DATA_VERSION_BUMP = """
+    INSERT INTO data_version (scope, version, updated_at)
+    VALUES (%s, 1, %s)
+    ON DUPLICATE KEY UPDATE
+      version    = version + 1,
+      updated_at = VALUES(updated_at)
+"""
+
+# The lap behind a live card: timed, stamped by a live writer, and
+# attributed to a driver with a code (the live_state key).
+LIVE_LAP_QUERY = """
+    SELECT d.driver_code, l.session_id, l.lap_id, s.track_name, l.lap_number,
+           l.lap_time_ms, l.tyre_compound, l.tyre_age, l.captured_at
+    FROM laps l
+    JOIN sessions s ON l.session_id = s.session_id
+    JOIN drivers d ON l.driver_id = d.driver_id
+    WHERE l.lap_id = %s AND l.lap_time_ms > 0
+      AND l.captured_at IS NOT NULL AND d.driver_code IS NOT NULL
+"""
+
+LIVE_STATE_UPSERT = """
+    INSERT INTO live_state
+      (driver_code, session_id, lap_id, track_name, lap_number, lap_time_ms,
+       tyre_compound, tyre_age, captured_at, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      session_id    = VALUES(session_id),
+      lap_id        = VALUES(lap_id),
+      track_name    = VALUES(track_name),
+      lap_number    = VALUES(lap_number),
+      lap_time_ms   = VALUES(lap_time_ms),
+      tyre_compound = VALUES(tyre_compound),
+      tyre_age      = VALUES(tyre_age),
+      captured_at   = VALUES(captured_at),
+      updated_at    = VALUES(updated_at)
+"""
+
+SUMMARY_TABLES = ("session_stats", "lap_telemetry_stats", "live_state")
+
+REBUILD_BATCH = 500
+
+_warned = set()
+
+
+def _warn_once(table, exc, fix=None):
+    if table not in _warned:
+        _warned.add(table)
+        fix = fix or ("database/migrate_summary_tables.sql, then "
+                      "python scripts/summary_tables.py rebuild")
+        print(f"[WARNING] {table} not updated ({exc}) — run {fix}")
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+def write_session_stats(cursor, session_ids) -> int:
+    """Re-aggregate ``session_ids`` into session_stats; returns rows written.
+
+    Runs on the caller's cursor and transaction -- the caller commits.
+    """
+    session_ids = list(session_ids)
+    if not session_ids:
+        return 0
+    cursor.execute(
+        SESSION_STATS_QUERY.format(ids=", ".join(["%s"] * len(session_ids))),
+        tuple(session_ids),
+    )
+    now = datetime.now()
+    rows = [
+        (sid, code, day, int(total or 0), int(valid or 0), int(invalid or 0),
+         fastest, best, _float(avg), last, now)
+        for sid, code, day, total, valid, invalid, fastest, best, avg, last
+        in cursor.fetchall()
+    ]
+    if rows:
+        cursor.executemany(SESSION_STATS_UPSERT, rows)
+        refresh_data_version(cursor, [row[0] for row in rows])
+    return len(rows)
+
+
+def bump_data_version(cursor, session_ids=None) -> None:
+    """Mark cached dashboard answers stale: scope 'all' plus each session
+    in ``session_ids``; ``None`` bumps every scope (bulk maintenance).
+
+    Runs on the caller's cursor and transaction -- the caller commits.
+    """
+    now = datetime.now()
+    if session_ids is None:
+        cursor.execute("UPDATE data_version SET version = version + 1, updated_at = %s",
+                       (now,))
+        session_ids = []
+    cursor.executemany(DATA_VERSION_BUMP,
+                       [("all", now)] + [(f"session:{sid}", now) for sid in session_ids])
+
+
+def refresh_data_version(cursor, session_ids=None) -> bool:
+    """bump_data_version for writers: a missing table (not migrated yet)
+    only leaves the dashboard uncached, so it is reported once, never
+    raised."""
+    try:
+        bump_data_version(cursor, session_ids)
+        return True
+    except Exception as exc:
+        _warn_once("data_version", exc, "database/migrate_data_version.sql")
+        return False
+
+
+def refresh_session_stats(cursor, session_id) -> bool:
+    """Bring one session's summary row up to date (non-fatal).
+
+    Called by the writers after they touch a session's laps; a failure
+    (e.g. the table has not been migrated yet) is reported once and never
+    aborts the lap write itself.
+    """
+    try:
+        write_session_stats(cursor, [session_id])
+        return True
+    except Exception as exc:
+        _warn_once("session_stats", exc)
+        return False
+
+
+def write_lap_telemetry_stats(cursor, lap_ids) -> int:
+    """Re-aggregate the telemetry of ``lap_ids``; returns rows written.
+
+    Runs on the caller's cursor and transaction -- the caller commits.
+    """
+    lap_ids = [lap_id for lap_id in lap_ids if lap_id is not None]
+    if not lap_ids:
+        return 0
+    ids = ", ".join(["%s"] * len(lap_ids))
+    cursor.execute(
+        f"DELETE FROM lap_telemetry_stats WHERE lap_id IN ({ids}) AND retention = 'full'",
+        tuple(lap_ids),
+    )
+    cursor.execute(LAP_TELEMETRY_STATS_INSERT.format(ids=ids),
+                   (datetime.now(), *lap_ids, *lap_ids))
+    return max(cursor.rowcount, 0)
+
+
+def refresh_lap_telemetry_stats(cursor, lap_ids) -> bool:
+    """Bring the telemetry aggregates of ``lap_ids`` up to date (non-fatal)."""
+    try:
+        write_lap_telemetry_stats(cursor, lap_ids)
+        return True
+    except Exception as exc:
+        _warn_once("lap_telemetry_stats", exc)
+        return False
+
+
+def write_live_state(cursor, lap_id) -> bool:
+    """Make ``lap_id`` its driver's live_state row; returns whether it
+    qualified (timed, captured live, driver with a code).
+
+    The caller passes the lap that just completed -- the newest one -- and
+    commits.
+    """
+    cursor.execute(LIVE_LAP_QUERY, (lap_id,))
+    row = cursor.fetchone()
+    if not row:
+        return False
+    cursor.execute(LIVE_STATE_UPSERT, (*row, datetime.now()))
+    return True
+
+
+def refresh_live_state(cursor, lap_id) -> bool:
+    """Publish a completed lap to the live cards (non-fatal)."""
+    try:
+        return write_live_state(cursor, lap_id)
+    except Exception as exc:
+        _warn_once("live_state", exc)
+        return False
+
+
+def rebuild_session_stats(conn, session_ids=None, batch: int = REBUILD_BATCH) -> int:
+    """Backfill session_stats for ``session_ids`` (default: every session).
+
+    Commits after each batch so a rebuild of a large history never holds
+    one long transaction; a full rebuild also drops rows of sessions that
+    no longer exist.
+    """
+    cursor = conn.cursor()
+    try:
+        full = session_ids is None
+        if full:
+            cursor.execute("SELECT session_id FROM sessions ORDER BY session_id")
+            session_ids = [row[0] for row in cursor.fetchall()]
+        written = 0
+        for pos in range(0, len(session_ids), batch):
+            written += write_session_stats(cursor, session_ids[pos:pos + batch])
+            conn.commit()
+        if full:
+            cursor.execute(
+                "DELETE FROM session_stats WHERE session_id NOT IN "
+                "(SELECT session_id FROM sessions)"
+            )
+            conn.commit()
+        return written
+    finally:
+        cursor.close()
+
+
+def rebuild_lap_telemetry_stats(conn, session_ids=None, batch: int = REBUILD_BATCH) -> int:
+    """Backfill lap_telemetry_stats for the laps of ``session_ids``
+    (default: every lap), committing after each batch of laps."""
+    cursor = conn.cursor()
+    try:
+        if session_ids is None:
+            cursor.execute("SELECT lap_id FROM laps ORDER BY lap_id")
+        else:
+            session_ids = list(session_ids)
+            if not session_ids:
+                return 0
+            cursor.execute(
+                f"SELECT lap_id FROM laps WHERE session_id IN "
+                f"({', '.join(['%s'] * len(session_ids))}) ORDER BY lap_id",
+                tuple(session_ids),
+            )
+        lap_ids = [row[0] for row in cursor.fetchall()]
+        written = 0
+        for pos in range(0, len(lap_ids), batch):
+            written += write_lap_telemetry_stats(cursor, lap_ids[pos:pos + batch])
+            conn.commit()
+        return written
+    finally:
+        cursor.close()
+
+
+def rebuild_live_state(conn) -> int:
+    """Seed live_state with each driver's newest live lap already stored.
+
+    One scan of the captured laps; afterwards the writers keep the table
+    current lap by lap.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT MAX(l.lap_id)
+            FROM laps l
+            JOIN drivers d ON l.driver_id = d.driver_id
+            WHERE l.lap_time_ms > 0 AND l.captured_at IS NOT NULL
+              AND d.driver_code IS NOT NULL
+            GROUP BY d.driver_code
+        """)
+        lap_ids = [row[0] for row in cursor.fetchall()]
+        written = sum(write_live_state(cursor, lap_id) for lap_id in lap_ids)
+        conn.commit()
+        return written
+    finally:
+        cursor.close()
+
+
+# ---------------------------------------------------------------------------
+# CLI entry point
+# ---------------------------------------------------------------------------
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the pre-aggregated summary tables.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--session", type=int, action="append", dest="sessions",
+                        help="only this session id (repeatable; default: all sessions)")
+    parser.add_argument("--table", choices=SUMMARY_TABLES, action="append", dest="tables",
+                        help="only this table (repeatable; default: all summary tables)")
+    args = parser.parse_args(argv)
+    tables = args.tables or SUMMARY_TABLES
+
+    from config import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        if "session_stats" in tables:
+            n = rebuild_session_stats(conn, args.sessions)
+            print(f"session_stats: {n} session(s) rebuilt")
+        if "lap_telemetry_stats" in tables:
+            n = rebuild_lap_telemetry_stats(conn, args.sessions)
+            print(f"lap_telemetry_stats: {n} lap(s) with telemetry rebuilt")
+        if "live_state" in tables and not args.sessions:
+            n = rebuild_live_state(conn)
+            print(f"live_state: {n} driver(s) seeded")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
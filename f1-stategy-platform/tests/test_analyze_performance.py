@@ -42,10 +42,14 @@ class AnalyzePerformanceQueryTests(unittest.TestCase):
         patcher, captured = self._query_captor(df)
         with patcher:
             get_session_summary(MagicMock())
-        self.assertIn('lap_time_ms > 0', captured['query'])
-        # Both MIN and AVG must be guarded, not just the fastest lap
-        # (the query also has 2 CASE WHENs for the is_valid lap counts)
-        self.assertEqual(captured['query'].count('CASE WHEN l.lap_time_ms > 0'), 2)
+        # The summary reads the pre-aggregated rows ...
+        self.assertIn('FROM session_stats st', captured['query'])
+        self.assertNotIn('FROM laps', captured['query'])
+        # ... whose MIN and AVG are both guarded, not just the fastest lap
+        # (the fastest valid lap adds a third, is_valid-qualified guard).
+        from summary_tables import SESSION_STATS_QUERY
+        self.assertEqual(SESSION_STATS_QUERY.count('CASE WHEN l.lap_time_ms > 0'), 2)
+        self.assertIn('l.is_valid = 1 AND l.lap_time_ms > 0', SESSION_STATS_QUERY)
 
     def test_tyre_degradation_excludes_zero_ms_laps(self):
         df = pd.DataFrame(
@@ -0,0 +1,123 @@
+"""Telemetry retention must only ever thin old sessions, never lose the
+per-lap aggregates the dashboard reads."""
+
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import MagicMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import db_backends as dbb
+from compact_telemetry import Throttle, compact, downsample_keep, retention_level
+from summary_tables import rebuild_lap_telemetry_stats
+
+TODAY = date(2026, 6, 1)
+
+
+class RetentionPolicyTests(unittest.TestCase):
+    def test_levels_by_age(self):
+        level = lambda d: retention_level(d, 30, 180, today=TODAY)
+        self.assertEqual(level(date(2026, 5, 20)), "full")
+        self.assertEqual(level(date(2026, 5, 2)), "downsampled")     # 30 days
+        self.assertEqual(level(date(2025, 12, 3)), "aggregated")     # 180 days
+        self.assertEqual(level(None), "full")
+
+    def test_downsample_keeps_evenly_spaced_samples(self):
+        ids = list(range(100, 191))
+        kept = downsample_keep(ids, 10)
+        self.assertEqual(len(kept), 10)
+        self.assertEqual((kept[0], kept[-1]), (100, 190))
+        self.assertEqual(kept, sorted(kept))
+        self.assertEqual(downsample_keep(ids[:4], 10), ids[:4])
+        self.assertEqual(downsample_keep(ids, 0), [])
+
+    def test_throttle_bounds_the_duty_cycle(self):
+        sleep = MagicMock()
+        throttle = Throttle(duty=0.25, sleep=sleep)
+        throttle.pace(0.1)
+        sleep.assert_called_once()
+        self.assertAlmostEqual(sleep.call_args[0][0], 0.3)
+        Throttle(duty=1.0, sleep=sleep).pace(0.1)
+        self.assertEqual(sleep.call_count, 1)
+
+
+class CompactTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.conn = dbb.connect_sqlite(Path(self._tmp.name) / "f1.sqlite3")
+        self.addCleanup(self.conn.close)
+        cur = self.conn.cursor()
+        # One session per retention level, two laps of 30 samples each.
+        for sid, day in ((1, date(2026, 5, 25)), (2, date(2026, 3, 1)), (3, date(2025, 1, 1))):
+            cur.execute("INSERT INTO sessions (session_id, track_name, date) VALUES (%s, 'Spa', %s)",
+                        (sid, day))
+            for n in (1, 2):
+                cur.execute("INSERT INTO laps (session_id, lap_number) VALUES (%s, %s)", (sid, n))
+                lap_id = cur.lastrowid
+                cur.executemany(
+                    "INSERT INTO telemetry (lap_id, speed, gear, rpm) VALUES (%s, %s, %s, %s)",
+                    [(lap_id, 100 + 5 * i, 1 + i % 8, 9000 + 10 * i) for i in range(30)])
+        self.conn.commit()
+        rebuild_lap_telemetry_stats(self.conn)
+        self.before = self.stats()
+
+    def stats(self):
+        cur = self.conn.cursor()
+        cur.execute("SELECT lap_id, samples, avg_speed, top_speed, avg_gear, avg_rpm "
+                    "FROM lap_telemetry_stats ORDER BY lap_id")
+        return cur.fetchall()
+
+    def samples(self, session_id):
+        cur = self.conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM telemetry t JOIN laps l ON t.lap_id = l.lap_id "
+                    "WHERE l.session_id = %s", (session_id,))
+        return cur.fetchone()[0]
+
+    def run_compact(self, **kw):
+        return compact(self.conn, 30, 180, grid=10, today=TODAY,
+                       throttle=Throttle(1.0), **kw)
+
+    def test_dry_run_reports_without_deleting(self):
+        report = self.run_compact()
+        self.assertFalse(report["applied"])
+        self.assertEqual(report["laps"], {"downsampled": 2, "aggregated": 2})
+        self.assertEqual(report["rows_reclaimed"], 2 * 20 + 2 * 30)
+        self.assertEqual(report["bytes_reclaimed"], 100 * 48)
+        self.assertEqual([self.samples(s) for s in (1, 2, 3)], [60, 60, 60])
+
+    def test_apply_thins_old_sessions_and_keeps_aggregates(self):
+        report = self.run_compact(apply=True, batch_laps=1, delete_chunk=7)
+        self.assertEqual(report["rows_reclaimed"], 100)
+        self.assertEqual(report["batches"], 4)
+        self.assertEqual([self.samples(s) for s in (1, 2, 3)], [60, 20, 0])
+        # Aggregates still describe the full-resolution laps ...
+        self.assertEqual(self.stats(), self.before)
+        cur = self.conn.cursor()
+        cur.execute("SELECT retention, COUNT(*) FROM lap_telemetry_stats "
+                    "GROUP BY retention ORDER BY retention")
+        self.assertEqual(cur.fetchall(), [("aggregated", 2), ("downsampled", 2), ("full", 2)])
+        # ... even after a rebuild, and a second pass has nothing left to do.
+        rebuild_lap_telemetry_stats(self.conn)
+        self.assertEqual(self.stats(), self.before)
+        self.assertEqual(self.run_compact(apply=True)["rows_reclaimed"], 0)
+
+    def test_downsampled_laps_age_into_aggregates(self):
+        self.run_compact(apply=True)
+        report = compact(self.conn, 30, 180, grid=10, apply=True, throttle=Throttle(1.0),
+                         today=date(2026, 12, 1))
+        # Session 2's thinned laps and session 1's full ones (now 190 days old).
+        self.assertEqual(report["rows_reclaimed"], 20 + 60)
+        self.assertEqual([self.samples(s) for s in (1, 2, 3)], [0, 0, 0])
+        self.assertEqual(self.stats(), self.before)
+
+    def test_policy_must_be_ordered(self):
+        with self.assertRaises(ValueError):
+            compact(self.conn, 60, 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+"""The all-pairs matrix must agree with the head-to-head comparison for
+every pair, rank drivers fastest first, and round-trip through its .npz."""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import comparison_matrix as cm
+import driver_comparison as dc
+from test_driver_comparison import _write_driver
+
+
+class ComparisonMatrixTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.root = Path(cls._tmp.name) / 'drivers'
+        # CCC fastest, then AAA, then BBB; BBB has tracks / tyres nobody
+        # else has, DDD shares no track with anyone.
+        _write_driver(cls.root, 'AAA', 'Alice', 90.0, 0.05, ['Spa', 'Monaco'], ['Soft', 'Medium'])
+        _write_driver(cls.root, 'BBB', 'Bob', 92.0, 0.03,
+                      ['Spa', 'Monaco', 'Imola'], ['Soft', 'Medium', 'Hard'])
+        _write_driver(cls.root, 'CCC', 'Carol', 89.5, 0.08, ['Spa', 'Imola'], ['Medium', 'Hard'])
+        _write_driver(cls.root, 'DDD', 'Dan', 80.0, 0.0, ['Bahrain'], ['Soft'])
+        _write_driver(cls.root, 'AAA', 'Alice', 91.0, 0.05, ['Spa', 'Monaco'], ['Soft'], year=2021)
+        _write_driver(cls.root, 'BBB', 'Bob', 90.5, 0.05, ['Spa', 'Monaco'], ['Soft'], year=2021)
+        cls.matrix = cm.build_matrix(cls.root, workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_pairs_match_head_to_head(self):
+        view = cm.ComparisonMatrix(self.matrix)
+        for year, codes in ((None, ['AAA', 'BBB', 'CCC']), (2021, ['AAA', 'BBB'])):
+            for a in codes:
+                for b in codes:
+                    if a == b:
+                        continue
+                    want = dc.compare_drivers(a, b, models_dir=self.root, year=year)
+                    got = view.pair(a, b, year=year)
+                    self.assertAlmostEqual(got['avg_delta'], want['summary']['avg_delta'], delta=1e-3)
+                    self.assertEqual(got['shared_tracks'], want['summary']['shared_tracks'])
+                    self.assertEqual(got['significance']['label'],
+                                     want['summary']['significance']['label'])
+                    self.assertEqual([t['track'] for t in got['per_track']],
+                                     [t['track'] for t in want['per_track']])
+        self.assertEqual(view.pair('AAA', 'DDD')['significance']['label'], 'insufficient')
+        self.assertIsNone(view.pair('AAA', 'DDD')['avg_delta'])
+
+    def test_ranked_grid(self):
+        grid = cm.ComparisonMatrix(self.matrix).grid()
+        self.assertEqual([d['code'] for d in grid['drivers']], ['CCC', 'AAA', 'BBB', 'DDD'])
+        self.assertEqual(grid['drivers'][-1]['opponents'], 0)
+        gap = np.array(grid['gap'], dtype=float)
+        np.testing.assert_allclose(gap, -gap.T, atol=1e-3)
+        self.assertTrue(all(grid['gap'][i][i] is None for i in range(4)))
+        self.assertLess(grid['gap'][0][1], 0)          # CCC faster than AAA
+        self.assertEqual(grid['significance'][0][0], None)
+
+    def test_round_trip_and_reload_on_change(self):
+        path = Path(self._tmp.name) / 'matrix.npz'
+        cm.save_matrix(self.matrix, path)
+        loaded = cm.load_matrix(path)
+        self.assertIs(cm.load_matrix(path), loaded)
+        self.assertEqual(loaded.grid(2021), cm.ComparisonMatrix(self.matrix).grid(2021))
+        self.assertEqual(loaded.pair('BBB', 'AAA'), cm.ComparisonMatrix(self.matrix).pair('BBB', 'AAA'))
+
+        cm.save_matrix({'all': self.matrix['all']}, path)
+        stamp = path.stat().st_mtime + 5
+        os.utime(path, (stamp, stamp))
+        with self.assertRaises(KeyError):
+            cm.load_matrix(path).grid(2021)
+        with self.assertRaises(FileNotFoundError):
+            cm.load_matrix(Path(self._tmp.name) / 'missing.npz')
+
+    def test_process_pool_build_matches(self):
+        pooled = cm.build_matrix(self.root, workers=2)
+        self.assertEqual(sorted(pooled), ['2021', 'all'])
+        for scope in pooled:
+            np.testing.assert_array_equal(pooled[scope]['gap'], self.matrix[scope]['gap'])
+            np.testing.assert_array_equal(pooled[scope]['label'], self.matrix[scope]['label'])
+
+
+class FieldComparisonTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.root = Path(cls._tmp.name)
+        rng = np.random.default_rng(4)
+        tracks = [f'Track {i:02d}' for i in range(24)]
+        cls.codes = [f'D{i:02d}' for i in range(20)]
+        for i, code in enumerate(cls.codes):
+            own = sorted(rng.choice(tracks, 16, replace=False))
+            _write_driver(cls.root, code, f'Driver {i}', 88 + 0.1 * i, 0.05, own,
+                          ['Soft', 'Medium', 'Hard'])
+            if i < 10:
+                _write_driver(cls.root, code, f'Driver {i}', 89 + 0.1 * i, 0.05, own,
+                              ['Soft', 'Medium'], year=2021)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_matches_the_precomputed_matrix(self):
+        field = cm.field_comparison(self.codes, models_dir=self.root)
+        grid = cm.ComparisonMatrix(cm.build_matrix(self.root, workers=1)).grid()
+        for key in ('drivers', 'gap', 'significance', 'p_value', 'shared_tracks'):
+            want = grid[key]
+            if key == 'drivers':
+                want = [{**d, 'year': None} for d in want]
+            self.assertEqual(field[key], want)
+        # Driver i is 0.1 s/lap slower than driver i - 1.
+        self.assertEqual([d['code'] for d in field['drivers']], self.codes)
+
+    def test_season_with_fallback(self):
+        field = cm.field_comparison(['D00', 'D01'], year=2021, models_dir=self.root)
+        self.assertEqual(field['year_used'], 2021)
+        self.assertEqual(field['tyres'], ['Medium', 'Soft'])
+        field = cm.field_comparison(['D00', 'D15'], year=2021, models_dir=self.root)
+        self.assertIsNone(field['year_used'])
+        self.assertEqual({d['code']: d['year'] for d in field['drivers']},
+                         {'D00': 2021, 'D15': None})
+
+    def test_twenty_drivers_in_one_request(self):
+        from dashboard import app
+        registry = dc.ModelRegistry(self.root)
+        with patch('dashboard.driver_models', registry), \
+             patch.object(registry, 'load', wraps=registry.load) as load:
+            client = app.test_client()
+            resp = client.get('/api/drivers/compare-field?codes=' + ','.join(self.codes))
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(load.call_count, 20)
+            start = time.perf_counter()
+            data = client.get('/api/drivers/compare-field?codes=' + ','.join(self.codes)).get_json()
+            self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(data['gap']), 20)
+        self.assertEqual(data['drivers'][0]['code'], 'D00')
+
+    def test_endpoint_errors(self):
+        from dashboard import app
+        client = app.test_client()
+        with patch('dashboard.driver_models', dc.ModelRegistry(self.root)):
+            self.assertEqual(client.get('/api/drivers/compare-field?codes=D00').status_code, 400)
+            self.assertEqual(
+                client.get('/api/drivers/compare-field?codes=D00,ZZZ').status_code, 404)
+            self.assertEqual(
+                client.get('/api/drivers/compare-field?codes=D00,D01&year=x').status_code, 400)
+            with patch('dashboard.FIELD_MAX_DRIVERS', 2):
+                resp = client.get('/api/drivers/compare-field?codes=D00&codes=D01,D02')
+            self.assertEqual(resp.status_code, 400)
+
+
+class MatrixApiTests(unittest.TestCase):
+    def setUp(self):
+        from dashboard import app
+        self.client = app.test_client()
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        root = Path(self._tmp.name)
+        _write_driver(root, 'AAA', 'Alice', 90.0, 0.05, ['Spa', 'Monaco'], ['Soft'])
+        _write_driver(root, 'BBB', 'Bob', 91.0, 0.05, ['Spa', 'Monaco'], ['Soft'])
+        self.path = cm.save_matrix(cm.build_matrix(root, workers=1), root / 'm.npz')
+        patch.object(cm, 'MATRIX_PATH', self.path).start()
+        self.addCleanup(patch.stopall)
+
+    def test_grid_and_pair(self):
+        grid = self.client.get('/api/drivers/matrix').get_json()
+        self.assertEqual([d['code'] for d in grid['drivers']], ['AAA', 'BBB'])
+        self.assertIsNotNone(grid['built_at'])
+        pair = self.client.get('/api/drivers/matrix?driver_a=BBB&driver_b=AAA').get_json()
+        self.assertAlmostEqual(pair['avg_delta'], 1.0, places=3)
+        self.assertEqual(pair['significance']['label'], 'significant')
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/drivers/matrix?year=2021').status_code, 404)
+        self.assertEqual(self.client.get('/api/drivers/matrix?year=x').status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/drivers/matrix?driver_a=AAA&driver_b=ZZZ').status_code, 404)
+        self.assertEqual(self.client.get('/api/drivers/matrix?driver_a=AAA').status_code, 400)
+        with patch.object(cm, 'MATRIX_PATH', self.path.with_name('none.npz')):
+            resp = self.client.get('/api/drivers/matrix')
+        self.assertEqual(resp.status_code, 404)
+        self.assertIn('comparison_matrix.py build', resp.get_json()['error'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""The compiled fast path must predict exactly what the model would on the
+aligned feature rows, and only ever be used for linear models."""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from compiled_model import compile_model
+from feature_pipeline import construct_prediction_input
+
+FEATURES = ['tyre_age', 'tyre_Soft', 'tyre_Medium', 'tyre_Hard',
+            'track_Spa', 'track_Circuit De Barcelona-Catalunya']
+
+
+def _training_data():
+    rng = np.random.default_rng(3)
+    rows, y = [], []
+    for track, base in (('Spa', 105.0), ('Circuit De Barcelona-Catalunya', 80.0)):
+        for tyre, offset in (('Soft', 0.0), ('Medium', 0.4), ('Hard', 0.9)):
+            for age in range(30):
+                rows.append(construct_prediction_input(age, 0, tyre, track, FEATURES).iloc[0])
+                y.append(base + offset + 0.04 * age + rng.normal(0, 0.1))
+    return pd.DataFrame(rows)[FEATURES], np.array(y)
+
+
+class CompiledModelTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.X, cls.y = _training_data()
+
+    def reference(self, model, age, tyre, track):
+        return float(model.predict(construct_prediction_input(age, 0, tyre, track, FEATURES))[0])
+
+    def test_linear_models_match_sklearn(self):
+        for estimator in (LinearRegression(), Ridge(alpha=0.5)):
+            model = estimator.fit(self.X, self.y)
+            fast = compile_model(model, FEATURES)
+            self.assertTrue(fast.is_compiled)
+            for age, tyre, track in ((0, 'Soft', 'Spa'), (17.5, 'Hard', 'Spa'),
+                                     (8, 'Medium', 'Circuit de Barcelona-Catalunya'),
+                                     # Uncovered tyre: all-zero tyre columns, as before.
+                                     (4, 'Wet', 'Spa')):
+                got = fast.predict(age, tyre, track)
+                self.assertIsInstance(got, float)
+                self.assertAlmostEqual(got, self.reference(model, age, tyre, track), places=9)
+
+    def test_array_inputs(self):
+        model = LinearRegression().fit(self.X, self.y)
+        fast = compile_model(model, FEATURES)
+        ages = np.arange(10)
+        tyres = ['Soft'] * 5 + ['Hard'] * 5
+        want = [self.reference(model, a, t, 'Spa') for a, t in zip(ages, tyres)]
+        np.testing.assert_allclose(fast.predict(ages, tyres, 'Spa'), want, atol=1e-9)
+        np.testing.assert_allclose(fast.predict(ages, 'Soft', 'Spa'),
+                                   [self.reference(model, a, 'Soft', 'Spa') for a in ages],
+                                   atol=1e-9)
+
+    def test_per_row_tracks(self):
+        tracks = ['Spa', 'circuit de barcelona-catalunya', 'Spa']
+        for model in (LinearRegression().fit(self.X, self.y),
+                      RandomForestRegressor(n_estimators=5, random_state=0).fit(self.X, self.y)):
+            got = compile_model(model, FEATURES).predict(np.array([2, 9, 20]), 'Medium', tracks)
+            want = [self.reference(model, a, 'Medium', t) for a, t in zip((2, 9, 20), tracks)]
+            np.testing.assert_allclose(got, want, atol=1e-9)
+
+    def test_tree_models_fall_back_to_the_model(self):
+        model = RandomForestRegressor(n_estimators=5, random_state=0).fit(self.X, self.y)
+        slow = compile_model(model, FEATURES)
+        self.assertFalse(slow.is_compiled)
+        self.assertEqual(slow.predict(12, 'Medium', 'Spa'),
+                         self.reference(model, 12, 'Medium', 'Spa'))
+        np.testing.assert_array_equal(
+            slow.predict(np.array([3, 12]), ['Soft', 'Hard'], 'Spa'),
+            [self.reference(model, 3, 'Soft', 'Spa'), self.reference(model, 12, 'Hard', 'Spa')])
+
+    def test_wrappers_are_memoised_per_model(self):
+        model = LinearRegression().fit(self.X, self.y)
+        fast = compile_model(model, FEATURES)
+        self.assertIs(compile_model(model, list(FEATURES)), fast)
+        self.assertIsNot(compile_model(model, FEATURES[::-1]), fast)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,5 @@
+import io
+import json
 import sys
 import unittest
 from unittest.mock import patch, MagicMock
@@ -162,7 +164,7 @@ class DashboardApiTests(unittest.TestCase):
         response = self.client.get('/api/sessions?driver=HAM')
         self.assertEqual(response.status_code, 200)
         sql, params = mock_cursor.execute.call_args[0]
-        self.assertIn('WHERE d.driver_code = %s', sql)
+        self.assertIn('WHERE st.driver_code = %s', sql)
         self.assertEqual(params, ('HAM', 50, 0))
 
     @patch('dashboard.get_db_connection')
@@ -182,7 +184,10 @@ class DashboardApiTests(unittest.TestCase):
         data = response.get_json()
         self.assertEqual(data['track_name'], 'Spa')
         sql, params = mock_cursor.execute.call_args[0]
-        self.assertIn('d.driver_code = %s', sql)
+        # Primary-key lookup on live_state, not a scan of laps.
+        self.assertIn('FROM live_state', sql)
+        self.assertIn('ls.driver_code = %s', sql)
+        self.assertNotIn('JOIN', sql)
         # Live-only: a freshness cutoff is bound after the driver code.
         self.assertIn('captured_at >= %s', sql)
         self.assertEqual(params[0], 'VER')
@@ -250,6 +255,28 @@ class DashboardApiTests(unittest.TestCase):
         # live window), so the frontend can trust the flag.
         self.assertIs(data['live'], True)
 
+    @patch('dashboard.get_db_connection')
+    def test_connection_released_even_when_query_fails(self, mock_db):
+        mock_conn = MagicMock()
+        mock_db.return_value = mock_conn
+        mock_conn.cursor.return_value.execute.side_effect = RuntimeError('lost')
+
+        response = self.client.get('/api/sessions')
+        self.assertEqual(response.status_code, 500)
+        mock_conn.cursor.return_value.close.assert_called_once()
+        mock_conn.rollback.assert_called_once()
+        mock_conn.close.assert_called_once()
+
+    @patch('dashboard.pool_stats')
+    def test_db_pool_metrics(self, mock_stats):
+        mock_stats.return_value = {'size': 5, 'in_use': 1, 'utilization': 0.2,
+                                   'wait_avg_ms': 0.01}
+        data = self.client.get('/api/db/pool').get_json()
+        self.assertTrue(data['pooled'])
+        self.assertEqual(data['size'], 5)
+        mock_stats.return_value = None
+        self.assertEqual(self.client.get('/api/db/pool').get_json(), {'pooled': False})
+
 
 class StrategyFuelNeutralityTests(unittest.TestCase):
     """The stay-out vs pit comparison must not credit the fuel-burn effect
@@ -365,6 +392,164 @@ class StrategyFuelNeutralityTests(unittest.TestCase):
         self.assertTrue(data['recommendation']['action'].startswith('Stay'))
         self.assertIn('Fuel-neutral', data['recommendation']['reason'])
 
+    def test_batched_pricing_matches_per_lap_predictions(self):
+        """Every lap of every scenario is priced in one vectorised call, and
+        the per-scenario sums match the old one-row-per-lap pricing."""
+        import dashboard
+        from feature_pipeline import construct_prediction_input
+
+        self._install_model(age_slope=+0.15, fuel_burn_rate=-0.02)
+        stints = [('Medium', 12, 30), ('Soft', 0, 30), ('Wet', 0, 30),
+                  ('Hard', 0, 0), ('Hard', 3, 7)]
+        expected = []
+        for tyre, start_age, laps in stints:
+            if tyre == 'Wet' or laps == 0:
+                expected.append(0.0)
+                continue
+            expected.append(sum(
+                float(dashboard.model.predict(construct_prediction_input(
+                    age, 0, tyre, self.TRACK, dashboard.feature_names))[0]) + 0.02 * age
+                for age in range(start_age, start_age + laps)))
+        for got, want in zip(dashboard._stint_times(stints, self.TRACK), expected):
+            self.assertAlmostEqual(got, want, places=6)
+
+        # A linear model never reaches sklearn: it is compiled to lookups.
+        with patch.object(dashboard.model, 'predict') as predict:
+            data = self._analyze(cur_age=20).get_json()
+        predict.assert_not_called()
+        self.assertEqual(len(data['strategies']), 2)
+
+    def test_tree_model_is_priced_in_one_predict_call(self):
+        import dashboard
+        import pandas as pd
+        from sklearn.tree import DecisionTreeRegressor
+
+        self._install_model(age_slope=+0.15, fuel_burn_rate=0.0)
+        X = pd.DataFrame([[a, 0, 1, 0, 1] for a in range(40)], columns=dashboard.feature_names)
+        tree = DecisionTreeRegressor().fit(X, 90 + 0.15 * X['tyre_age'])
+        with patch('dashboard.model', tree), \
+             patch.object(tree, 'predict', wraps=tree.predict) as predict:
+            data = self._analyze(cur_age=20).get_json()
+        predict.assert_called_once()
+        # Stay out, fresh Medium and the harder Hard, 30 laps each.
+        self.assertEqual(len(predict.call_args[0][0]), 3 * 30)
+        self.assertEqual(len(data['strategies']), 3)
+
+
+class PredictBatchTests(unittest.TestCase):
+    """/api/predict/batch must predict exactly what /api/predict does, row
+    by row, in one call, and report bad rows without failing the rest."""
+
+    FEATURES = ['tyre_age', 'tyre_Soft', 'tyre_Hard', 'track_Spa', 'track_Monza']
+
+    def setUp(self):
+        import numpy as np
+        from sklearn.linear_model import LinearRegression
+
+        model = LinearRegression()
+        model.coef_ = np.array([0.05, -0.8, 0.0, 25.0, 0.0])
+        model.intercept_ = 81.0
+        patch('dashboard.model', model).start()
+        patch('dashboard.feature_names', self.FEATURES).start()
+        self.addCleanup(patch.stopall)
+        self.client = app.test_client()
+
+    def single(self, age, lap, tyre, track):
+        return self.client.post('/api/predict', json={
+            'tyre_age': age, 'lap_number': lap, 'tyre_compound': tyre,
+            'track_name': track}).get_json()
+
+    def test_rows_and_columns_match_single_predictions(self):
+        rows = [(3, 5, 'Soft', 'Spa'), (12.5, 30, 'Hard', 'monza'), (0, 60, 'Hard', 'Spa')]
+        by_rows = self.client.post('/api/predict/batch', json=[
+            dict(zip(('tyre_age', 'lap_number', 'tyre_compound', 'track_name'), r))
+            for r in rows]).get_json()
+        by_columns = self.client.post('/api/predict/batch', json={
+            'tyre_age': [r[0] for r in rows], 'lap_number': [r[1] for r in rows],
+            'tyre_compound': [r[2] for r in rows], 'track_name': [r[3] for r in rows],
+        }).get_json()
+        self.assertEqual(by_rows, by_columns)
+        self.assertEqual((by_rows['count'], by_rows['predicted'], by_rows['errors']), (3, 3, []))
+        for i, r in enumerate(rows):
+            single = self.single(*r)
+            self.assertAlmostEqual(by_rows['predicted_time'][i], single['predicted_time'], places=9)
+            self.assertEqual(by_rows['fuel_load'][i], single['fuel_load'])
+
+        # A scalar column applies to every row.
+        data = self.client.post('/api/predict/batch', json={
+            'tyre_age': [1, 2], 'lap_number': 10, 'tyre_compound': 'Soft',
+            'track_name': 'Spa'}).get_json()
+        self.assertEqual(data['predicted'], 2)
+
+    def test_bad_rows_are_reported_individually(self):
+        data = self.client.post('/api/predict/batch', json={'rows': [
+            {'tyre_age': 3, 'lap_number': 5, 'tyre_compound': 'Soft', 'track_name': 'Spa'},
+            {'tyre_age': 3, 'lap_number': 5, 'tyre_compound': 'Wet', 'track_name': 'Spa'},
+            {'tyre_age': 'old', 'lap_number': 5, 'tyre_compound': 'Soft', 'track_name': 'Spa'},
+            {'lap_number': 5, 'tyre_compound': 'Soft', 'track_name': 'Spa'},
+            {'tyre_age': 3, 'lap_number': 5, 'tyre_compound': 'Soft', 'track_name': 'Monaco'},
+        ]}).get_json()
+        self.assertEqual((data['count'], data['predicted']), (5, 1))
+        self.assertIsNotNone(data['predicted_time'][0])
+        self.assertEqual(data['predicted_time'][1:], [None] * 4)
+        self.assertEqual([e['row'] for e in data['errors']], [1, 2, 3, 4])
+        self.assertIn("Unknown tyre compound 'Wet'", data['errors'][0]['error'])
+        self.assertIn("tyre_age", data['errors'][2]['error'])
+        self.assertIn("Unknown track 'Monaco'", data['errors'][3]['error'])
+
+    def test_coverage_checked_once_per_distinct_pair(self):
+        import dashboard
+        body = {'tyre_age': list(range(100)), 'lap_number': 1,
+                'tyre_compound': ['Soft', 'Hard'] * 50, 'track_name': 'Spa'}
+        with patch('dashboard.validate_model_inputs',
+                   wraps=dashboard.validate_model_inputs) as validate:
+            data = self.client.post('/api/predict/batch', json=body).get_json()
+        self.assertEqual((data['predicted'], validate.call_count), (100, 2))
+
+    def test_tree_model_predicts_mixed_tracks_in_one_call(self):
+        import pandas as pd
+        from sklearn.tree import DecisionTreeRegressor
+
+        X = pd.DataFrame([[a, 1, 0, s, 1 - s] for a in range(20) for s in (0, 1)],
+                         columns=self.FEATURES)
+        tree = DecisionTreeRegressor().fit(X, 80 + 25 * X['track_Spa'] + 0.1 * X['tyre_age'])
+        with patch('dashboard.model', tree), \
+             patch.object(tree, 'predict', wraps=tree.predict) as predict:
+            data = self.client.post('/api/predict/batch', json={
+                'tyre_age': [4, 4], 'lap_number': 1, 'tyre_compound': 'Soft',
+                'track_name': ['Spa', 'Monza']}).get_json()
+            single = [self.single(4, 1, 'Soft', t)['predicted_time'] for t in ('Spa', 'Monza')]
+        self.assertEqual(predict.call_count, 3)     # the batch, then the two singles
+        self.assertEqual(data['predicted_time'], single)
+
+    def test_request_size_limits(self):
+        with patch('dashboard.PREDICT_BATCH_MAX_ROWS', 2):
+            resp = self.client.post('/api/predict/batch', json={
+                'tyre_age': [1, 2, 3], 'lap_number': 1, 'tyre_compound': 'Soft',
+                'track_name': 'Spa'})
+        self.assertEqual(resp.status_code, 413)
+        with patch('dashboard.PREDICT_BATCH_MAX_BYTES', 10):
+            resp = self.client.post('/api/predict/batch', json=[{'tyre_age': 1}])
+        self.assertEqual(resp.status_code, 413)
+        # Chunked, so no Content-Length: the limit holds while reading.
+        # (The test client always sets one, so it is blanked here; the
+        # WSGI server marks a chunked stream terminated.)
+        body = json.dumps([{'tyre_age': 1, 'lap_number': 1, 'tyre_compound': 'Soft',
+                            'track_name': 'Spa'}] * 50).encode()
+        chunked = {'Content-Type': 'application/json', 'Transfer-Encoding': 'chunked'}
+        terminated = {'CONTENT_LENGTH': '', 'wsgi.input_terminated': True}
+        with patch('dashboard.PREDICT_BATCH_MAX_BYTES', len(body) - 1):
+            resp = self.client.post('/api/predict/batch', input_stream=io.BytesIO(body),
+                                    headers=chunked, environ_overrides=terminated)
+        self.assertEqual(resp.status_code, 413)
+        with patch('dashboard.PREDICT_BATCH_MAX_BYTES', len(body)):
+            resp = self.client.post('/api/predict/batch', input_stream=io.BytesIO(body),
+                                    headers=chunked, environ_overrides=terminated)
+        self.assertEqual((resp.status_code, resp.get_json()['count']), (200, 50))
+        resp = self.client.post('/api/predict/batch', json={
+            'tyre_age': [1, 2], 'lap_number': [1], 'tyre_compound': 'Soft', 'track_name': 'Spa'})
+        self.assertEqual(resp.status_code, 400)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,247 @@
+"""The embedded SQLite backend must run the MySQL code paths unchanged.
+
+Statements are written for MySQL; db_backends translates them on the fly
+and builds the SQLite schema from database/schema.sql.  These tests run
+the real importer and dashboard endpoints against a SQLite file.
+"""
+
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import config
+import db_backends as dbb
+from db_backends import translate_sql
+
+
+class TranslateSqlTests(unittest.TestCase):
+    def test_mysql_passes_through(self):
+        sql = "SELECT YEAR(date) FROM sessions WHERE session_id = %s"
+        self.assertEqual(translate_sql(sql, "mysql"), (sql, None))
+
+    def test_placeholders_year_and_division(self):
+        out, _ = translate_sql(
+            "SELECT DISTINCT YEAR(s.date) AS year, MIN(l.lap_time_ms) / 1000 AS f, "
+            "l.lap_time_ms / 1000.0 AS g FROM laps l WHERE s.x = %s AND y = %s", "sqlite")
+        self.assertIn("CAST(strftime('%Y', s.date) AS INTEGER) AS year", out)
+        self.assertIn("MIN(l.lap_time_ms) / 1000.0 AS f", out)
+        self.assertIn("l.lap_time_ms / 1000.0 AS g", out)
+        self.assertTrue(out.endswith("s.x = ? AND y = ?"))
+
+    def test_duckdb_only_rewrites_placeholders(self):
+        out, _ = translate_sql("SELECT YEAR(date) / 1000 FROM t WHERE a = %s", "duckdb")
+        self.assertEqual(out, "SELECT YEAR(date) / 1000 FROM t WHERE a = ?")
+
+    def test_multi_table_delete(self):
+        out, _ = translate_sql(
+            "DELETE t FROM telemetry t JOIN laps l ON t.lap_id = l.lap_id WHERE l.session_id = %s",
+            "sqlite")
+        self.assertEqual(
+            out,
+            "DELETE FROM telemetry WHERE rowid IN (SELECT t.rowid FROM telemetry t "
+            "JOIN laps l ON t.lap_id = l.lap_id WHERE l.session_id = ?)")
+
+    def test_upsert_with_last_insert_id(self):
+        sql = """INSERT INTO laps (session_id, lap_number, tyre_age) VALUES (%s, %s, %s)
+                 ON DUPLICATE KEY UPDATE
+                   lap_id   = LAST_INSERT_ID(lap_id),
+                   tyre_age = VALUES(tyre_age)"""
+        out, returning = translate_sql(sql, "sqlite")
+        self.assertEqual(returning, "lap_id")
+        self.assertTrue(out.rstrip().endswith(
+            "ON CONFLICT DO UPDATE SET tyre_age = excluded.tyre_age RETURNING lap_id"))
+        out, returning = translate_sql(sql, "sqlite", many=True)
+        self.assertIsNone(returning)
+        self.assertNotIn("RETURNING", out)
+
+
+class SqliteSchemaTests(unittest.TestCase):
+    def setUp(self):
+        self.raw = sqlite3.connect(":memory:")
+        for stmt in dbb.sqlite_schema(dbb.SCHEMA_PATH.read_text(encoding="utf-8")):
+            self.raw.execute(stmt)
+
+    def test_every_table_is_created(self):
+        tables = {r[0] for r in self.raw.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertTrue(set(dbb.TABLE_ORDER) <= tables)
+
+    def test_enum_is_enforced(self):
+        self.raw.execute("INSERT INTO laps (session_id, lap_number, tyre_compound) VALUES (1, 1, 'Soft')")
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.raw.execute("INSERT INTO laps (session_id, lap_number, tyre_compound) VALUES (1, 2, 'Ultra')")
+
+    def test_unique_keys_become_unique_indexes(self):
+        self.raw.execute("INSERT INTO laps (session_id, lap_number) VALUES (1, 1)")
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.raw.execute("INSERT INTO laps (session_id, lap_number) VALUES (1, 1)")
+        # NULLs stay distinct, as in MySQL.
+        self.raw.execute("INSERT INTO laps (session_id, lap_number) VALUES (NULL, 1)")
+        self.raw.execute("INSERT INTO laps (session_id, lap_number) VALUES (NULL, 1)")
+
+
+class SqliteBackendTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "f1.sqlite3"
+
+    def connect(self):
+        return dbb.connect_sqlite(self.path)
+
+    def _import(self, drop_laps=(), **kw):
+        from test_importer import _ImportSession
+        import import_f1_race
+
+        def session(*a, **k):
+            s = _ImportSession()
+            s.laps = s.laps[~s.laps["LapNumber"].isin(drop_laps)]
+            return s
+        with patch("import_f1_race.load_session", side_effect=session), \
+             patch("import_f1_race.get_db_connection", side_effect=self.connect), \
+             patch("import_f1_race.archive_session"), \
+             patch("builtins.print"):
+            return import_f1_race.import_race(2021, "Silverstone", 44, **kw)
+
+    def _count(self, table):
+        conn = self.connect()
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(*) FROM {table}")
+        n = cur.fetchone()[0]
+        conn.close()
+        return n
+
+    def test_import_and_upsert_reimport(self):
+        first = self._import()
+        self.assertIsNotNone(first)
+        counts = {t: self._count(t) for t in ("sessions", "laps", "telemetry", "strategy_events")}
+        self.assertEqual(counts["sessions"], 1)
+        self.assertEqual(counts["laps"], 3)
+        # Upsert re-import: same session id (RETURNING stands in for
+        # LAST_INSERT_ID), children replaced via the translated DELETE.
+        self.assertEqual(self._import(upsert=True), first)
+        self.assertEqual({t: self._count(t) for t in counts}, counts)
+        # A lap the new data no longer has goes, with its telemetry.
+        self._import(drop_laps=(3,), upsert=True)
+        self.assertEqual((self._count("laps"), self._count("lap_telemetry_stats")), (2, 2))
+        self.assertEqual(self._count("telemetry"), counts["telemetry"] * 2 // 3)
+
+    def test_dashboard_endpoints_run_on_sqlite(self):
+        session_id = self._import()
+        import dashboard
+        client = dashboard.app.test_client()
+        with patch("dashboard.get_db_connection", side_effect=self.connect):
+            sessions = client.get("/api/sessions").get_json()
+            self.assertEqual(sessions[0]["date"], "2021-07-18")
+            self.assertEqual(sessions[0]["fastest_lap"], 90.0)
+            laps = client.get(f"/api/session/{session_id}/laps").get_json()
+            self.assertEqual([l["has_pit_stop"] for l in laps], [0, 1, 0])
+            self.assertEqual(client.get("/api/comparison/years").get_json(), {"years": [2021]})
+            drivers = client.get("/api/drivers/list").get_json()["drivers"]
+            self.assertEqual(drivers[0]["last_seen"], "2021-07-18")
+            race = client.get("/api/comparison/race?year=2021&track=Silverstone&drivers=HAM")
+            self.assertEqual(race.status_code, 200)
+            self.assertEqual(len(race.get_json()["drivers"]["HAM"]["laps"]), 3)
+
+    def test_dictionary_cursor_and_types(self):
+        conn = self.connect()
+        cur = conn.cursor(dictionary=True)
+        cur.execute("INSERT INTO sessions (track_name, date) VALUES (%s, %s)",
+                    ("Spa", date(2024, 7, 28)))
+        self.assertEqual(cur.lastrowid, 1)
+        cur.execute("INSERT INTO laps (session_id, lap_number, captured_at) VALUES (%s, %s, %s)",
+                    (1, 1, datetime(2024, 7, 28, 15, 0, 1)))
+        conn.commit()
+        cur.execute("SELECT s.date, MAX(s.date) AS last_seen, l.captured_at "
+                    "FROM sessions s JOIN laps l ON l.session_id = s.session_id")
+        row = cur.fetchone()
+        self.assertEqual(row, {"date": date(2024, 7, 28), "last_seen": date(2024, 7, 28),
+                               "captured_at": datetime(2024, 7, 28, 15, 0, 1)})
+        conn.close()
+
+    def test_capture_insert_lap_upsert_keeps_lap_id(self):
+        from capture_telemetry import ensure_game_driver, insert_lap, insert_telemetry
+        conn = self.connect()
+        cur = conn.cursor()
+        cur.execute("INSERT INTO sessions (track_name) VALUES ('Spa')")
+        conn.commit()
+        with patch("builtins.print"):
+            ensure_game_driver(conn)
+            first = insert_lap(conn, 1, 3, 0, "Soft", 1, 100.0, True, 0)
+            insert_telemetry(conn, first, 250, 1.0, 0.0, 8, 11000, False)
+            again = insert_lap(conn, 1, 3, 0, "Medium", 1, 99.0, True, 0)
+        self.assertEqual(first, again)
+        # The restarted lap does not keep the abandoned attempt's samples.
+        cur.execute("SELECT COUNT(*) FROM telemetry WHERE lap_id = %s", (first,))
+        self.assertEqual(cur.fetchone()[0], 0)
+        cur.execute("SELECT tyre_compound FROM laps WHERE lap_id = %s", (first,))
+        self.assertEqual(cur.fetchone()[0], "Medium")
+        conn.close()
+
+    def test_pooled_sqlite_connection(self):
+        with patch.object(config, "DB_BACKEND", "sqlite"), \
+             patch.object(config, "DB_PATH", self.path), \
+             patch.object(config, "_pool", None):
+            with config.db_cursor() as cur:
+                cur.execute("SELECT COUNT(*) FROM sessions")
+                self.assertEqual(cur.fetchone(), (0,))
+            self.assertEqual(config.pool_stats()["created"], 1)
+
+    def test_copy_database(self):
+        src = self.connect()
+        cur = src.cursor()
+        cur.execute("INSERT INTO drivers (driver_id, driver_code) VALUES (44, 'HAM')")
+        cur.execute("INSERT INTO sessions (driver_id, track_name) VALUES (44, 'Spa')")
+        cur.execute("INSERT INTO laps (session_id, lap_number) VALUES (1, 1)")
+        # A compacted lap: its aggregates are all that is left of the samples.
+        cur.execute("INSERT INTO lap_telemetry_stats (lap_id, samples, avg_speed, retention) "
+                    "VALUES (1, 400, 251.5, 'aggregated')")
+        cur.execute("INSERT INTO live_state (driver_code, session_id, lap_id, captured_at) "
+                    "VALUES ('HAM', 1, 1, %s)", (datetime(2024, 7, 28, 15, 0),))
+        cur.execute("INSERT INTO data_version (scope, version) VALUES ('session:1', 7)")
+        src.commit()
+        dst = dbb.connect_sqlite(Path(self._tmp.name) / "copy.sqlite3")
+        counts = dbb.copy_database(src, dst)
+        self.assertEqual((counts["drivers"], counts["sessions"], counts["laps"]), (1, 1, 1))
+        self.assertEqual([counts[t] for t in dbb.MIGRATED_TABLES], [1, 1, 1])
+        cur = dst.cursor(dictionary=True)
+        cur.execute("SELECT driver_id, track_name FROM sessions")
+        self.assertEqual(cur.fetchall(), [{"driver_id": 44, "track_name": "Spa"}])
+        cur.execute("SELECT samples, avg_speed, retention FROM lap_telemetry_stats")
+        self.assertEqual(cur.fetchall(), [{"samples": 400, "avg_speed": 251.5,
+                                           "retention": "aggregated"}])
+        cur.execute("SELECT driver_code, lap_id FROM live_state")
+        self.assertEqual(cur.fetchall(), [{"driver_code": "HAM", "lap_id": 1}])
+        cur.execute("SELECT scope, version FROM data_version")
+        self.assertEqual(cur.fetchall(), [{"scope": "session:1", "version": 7}])
+        src.close()
+        dst.close()
+
+    def test_copy_from_source_without_migrated_tables(self):
+        src = self.connect()
+        src._raw.execute("DROP TABLE live_state")
+        src._raw.execute("DROP TABLE data_version")
+        dst = dbb.connect_sqlite(Path(self._tmp.name) / "copy.sqlite3")
+        counts = dbb.copy_database(src, dst)
+        self.assertEqual((counts["lap_telemetry_stats"], counts["live_state"],
+                          counts["data_version"]), (0, None, None))
+        src._raw.execute("DROP TABLE laps")
+        with self.assertRaises(sqlite3.OperationalError):
+            dbb.copy_database(src, dst)
+        src.close()
+        dst.close()
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(RuntimeError):
+            config.connect_backend("oracle")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+"""config's connection pool: reuse, health checks, timeouts and metrics.
+
+Every dashboard request and tool goes through get_db_connection(), so the
+pool must hand a connection back on close(), never give one to two
+borrowers at once, and drop connections that died while idle.
+"""
+
+import sys
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import config
+from config import ConnectionPool, PoolTimeout, db_connection, db_cursor
+
+
+def _factory():
+    made = []
+
+    def connect():
+        raw = MagicMock(name=f"raw{len(made)}")
+        raw.in_transaction = False
+        made.append(raw)
+        return raw
+    return connect, made
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def test_close_returns_connection_for_reuse(self):
+        connect, made = _factory()
+        pool = ConnectionPool(connect, size=2, timeout=0.1)
+        conn = pool.acquire()
+        conn.cursor()
+        made[0].cursor.assert_called_once()
+        conn.close()
+        conn.close()                       # idempotent
+        pool.acquire().close()
+        self.assertEqual(len(made), 1)
+        made[0].close.assert_not_called()
+        stats = pool.stats()
+        self.assertEqual((stats['checkouts'], stats['created'], stats['in_use'], stats['idle']),
+                         (2, 1, 0, 1))
+
+    def test_returned_connection_is_unusable(self):
+        connect, _ = _factory()
+        pool = ConnectionPool(connect, size=1, timeout=0.1)
+        conn = pool.acquire()
+        conn.close()
+        with self.assertRaises(AttributeError):
+            conn.cursor()
+
+    def test_exhausted_pool_times_out(self):
+        connect, _ = _factory()
+        pool = ConnectionPool(connect, size=1, timeout=0.05)
+        held = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        held.close()
+        pool.acquire().close()
+
+    def test_waiter_gets_connection_when_one_is_released(self):
+        connect, made = _factory()
+        pool = ConnectionPool(connect, size=1, timeout=2)
+        held = pool.acquire()
+        got = {}
+        t = threading.Thread(target=lambda: got.setdefault('conn', pool.acquire()))
+        t.start()
+        threading.Timer(0.05, held.close).start()
+        t.join(3)
+        self.assertIn('conn', got)
+        self.assertEqual(len(made), 1)
+        stats = pool.stats()
+        self.assertEqual(stats['peak_in_use'], 1)
+        self.assertEqual(stats['peak_utilization'], 1.0)
+        self.assertGreater(stats['wait_max_ms'], 0)
+
+    def test_dead_idle_connection_is_replaced(self):
+        connect, made = _factory()
+        pool = ConnectionPool(connect, size=1, timeout=0.1, ping_after=0)
+        pool.acquire().close()
+        made[0].ping.side_effect = RuntimeError("MySQL server has gone away")
+        conn = pool.acquire()
+        self.assertIs(conn._raw, made[1])
+        made[0].close.assert_called_once()
+        self.assertEqual(pool.stats()['health_failures'], 1)
+
+    def test_recently_returned_connection_is_not_pinged(self):
+        connect, made = _factory()
+        pool = ConnectionPool(connect, size=1, timeout=0.1, ping_after=60)
+        pool.acquire().close()
+        pool.acquire()
+        made[0].ping.assert_not_called()
+
+    def test_open_transaction_rolled_back_on_release(self):
+        connect, made = _factory()
+        pool = ConnectionPool(connect, size=1, timeout=0.1)
+        conn = pool.acquire()
+        made[0].in_transaction = True
+        conn.close()
+        made[0].rollback.assert_called_once()
+
+    def test_failed_rollback_discards_connection(self):
+        connect, made = _factory()
+        pool = ConnectionPool(connect, size=1, timeout=0.1)
+        conn = pool.acquire()
+        made[0].in_transaction = True
+        made[0].rollback.side_effect = RuntimeError("lost")
+        conn.close()
+        made[0].close.assert_called_once()
+        self.assertEqual(pool.stats()['idle'], 0)
+        pool.acquire()          # the slot was still released
+
+    def test_connect_failure_frees_the_slot(self):
+        pool = ConnectionPool(MagicMock(side_effect=RuntimeError("refused")), size=1, timeout=0.05)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 0)
+
+
+class EnvNumberTests(unittest.TestCase):
+    """DB_POOL_* and the dashboard's tuning variables share one parser."""
+
+    def test_blank_invalid_and_negative_fall_back_to_default(self):
+        for raw in ("", "  ", "many", "-3"):
+            with patch.dict("os.environ", {"F1_TEST_N": raw}), patch("builtins.print"):
+                self.assertEqual(config.env_number("F1_TEST_N", 5, int), 5, raw)
+        with patch.dict("os.environ", {"F1_TEST_N": "2.5"}):
+            self.assertEqual(config.env_number("F1_TEST_N", 1.0, float), 2.5)
+
+    def test_dashboard_uses_the_config_parser(self):
+        import dashboard
+        self.assertIs(dashboard.env_number, config.env_number)
+
+
+class ContextManagerTests(unittest.TestCase):
+    def test_db_cursor_closes_cursor_and_connection(self):
+        conn = MagicMock()
+        with db_cursor(dictionary=True, connect=lambda: conn) as cursor:
+            self.assertIs(cursor, conn.cursor.return_value)
+        conn.cursor.assert_called_once_with(dictionary=True)
+        cursor.close.assert_called_once()
+        conn.close.assert_called_once()
+        conn.rollback.assert_not_called()
+
+    def test_error_rolls_back_and_still_closes(self):
+        conn = MagicMock()
+        with self.assertRaises(ValueError):
+            with db_connection(connect=lambda: conn):
+                raise ValueError("boom")
+        conn.rollback.assert_called_once()
+        conn.close.assert_called_once()
+
+    def test_get_db_connection_uses_the_process_pool(self):
+        connect, made = _factory()
+        with patch.object(config, '_pool', None), \
+             patch.object(config, '_connect', connect), \
+             patch.dict(config.DB_CONFIG, {'password': 'secret'}):
+            with db_connection():
+                pass
+            with db_connection():
+                pass
+            self.assertEqual(len(made), 1)
+            self.assertEqual(config.pool_stats()['checkouts'], 2)
+
+    def test_pool_size_zero_disables_pooling(self):
+        connect, made = _factory()
+        with patch.object(config, 'DB_POOL_SIZE', 0), \
+             patch.object(config, '_connect', connect), \
+             patch.dict(config.DB_CONFIG, {'password': 'secret'}):
+            self.assertIs(config.get_db_connection(), made[0])
+            self.assertIsNone(config.pool_stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,15 @@
+import os
 import sys
 import json
 import tempfile
 import unittest
 import datetime
+import zlib
 import joblib
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
+import numpy as np
 import pandas as pd
 from sklearn.linear_model import LinearRegression
 
@@ -92,6 +95,36 @@ class DriverComparisonTests(unittest.TestCase):
         # Hard is only in Bob's model — never compared.
         self.assertNotIn('Hard', [t['tyre'] for t in result['per_track'][0]['tyres']])
 
+    def test_vectorised_grid_matches_per_cell_predictions(self):
+        """Each model predicts once over the shared grid; the payload is
+        exactly what one prediction per (track, tyre, age) cell gave."""
+        from sklearn.ensemble import RandomForestRegressor
+        from compiled_model import compile_model
+
+        model_b, feats_b, _, _ = dc.load_driver_model('BBB', models_dir=self.root)
+        X = pd.DataFrame(np.eye(len(feats_b)) * 3, columns=feats_b)
+        forest = RandomForestRegressor(n_estimators=4, random_state=0).fit(
+            X, 92 + np.arange(len(feats_b)))
+        real_load = dc.load_driver_model
+
+        def loader(code, year=None, models_dir=None):
+            model, feats, info, used = real_load(code, year=year, models_dir=models_dir)
+            return (forest if code == 'BBB' else model), feats, info, used
+
+        with patch('driver_comparison.load_driver_model', side_effect=loader), \
+             patch.object(forest, 'predict', wraps=forest.predict) as predict:
+            result = dc.compare_drivers('AAA', 'BBB', models_dir=self.root)
+        predict.assert_called_once()
+        model_a, feats_a, _, _ = real_load('AAA', models_dir=self.root)
+        for track in result['per_track']:
+            for tyre in track['tyres']:
+                for row in tyre['rows']:
+                    cell = (row['age'], tyre['tyre'], track['track'])
+                    self.assertEqual(row['driver_a'],
+                                     round(compile_model(model_a, feats_a).predict(*cell), 3))
+                    self.assertEqual(row['driver_b'],
+                                     round(compile_model(forest, feats_b).predict(*cell), 3))
+
     def test_delta_sign_and_magnitude(self):
         """Alice is 2 s faster on every input: delta (A - B) == -2 always."""
         result = dc.compare_drivers('AAA', 'BBB', models_dir=self.root)
@@ -286,20 +319,6 @@ class RaceComparisonApiTests(unittest.TestCase):
         resp = self.client.get('/api/comparison/drivers?year=2024')
         self.assertEqual(resp.status_code, 400)
 
-    def test_drivers_duplicate_sessions_pick_best(self):
-        """Two sessions for one driver on the same track/year: most laps wins."""
-        rows = [
-            {'driver_code': 'VER', 'driver_name': 'Max Verstappen', 'session_id': 5,
-             'session_type': 'Race', 'date': datetime.date(2024, 9, 1), 'laps': 30},
-            {'driver_code': 'VER', 'driver_name': 'Max Verstappen', 'session_id': 6,
-             'session_type': 'Race', 'date': datetime.date(2024, 9, 1), 'laps': 53},
-        ]
-        self.cursor.fetchall.return_value = rows
-        resp = self.client.get('/api/comparison/drivers?year=2024&track=Monza')
-        drivers = resp.get_json()['drivers']
-        self.assertEqual(len(drivers), 1)
-        self.assertEqual(drivers[0]['session_id'], 6)
-
     def test_race(self):
         sessions = [
             {'driver_code': 'VER', 'driver_name': 'Max Verstappen', 'session_id': 10,
@@ -342,6 +361,33 @@ class RaceComparisonApiTests(unittest.TestCase):
         self.assertEqual(data['track'], 'Monza')
         self.assertNotIn('missing', data)
 
+    def test_race_columnar_and_deflate(self):
+        sessions = [{'driver_code': 'VER', 'driver_name': 'Max Verstappen', 'session_id': 10,
+                     'session_type': 'Race', 'date': datetime.date(2024, 9, 1), 'laps': 53}]
+        laps = [
+            {'lap_id': 100, 'lap_number': 1, 'lap_time': 81.5, 'tyre_compound': 'Soft',
+             'tyre_age': 1, 'is_valid': 1, 'has_pit_stop': 0},
+            {'lap_id': 101, 'lap_number': 2, 'lap_time': 80.9, 'tyre_compound': 'Soft',
+             'tyre_age': 2, 'is_valid': 0, 'has_pit_stop': 1},
+        ]
+        tel = [{'lap_id': 101, 'avg_speed': 289.2, 'top_speed': 312.0,
+                'avg_gear': 7.8, 'avg_rpm': 10843.5}]
+        self.cursor.fetchall.side_effect = [sessions, laps, tel]
+        with patch('dashboard.COMPRESS_MIN_BYTES', 0):
+            resp = self.client.get('/api/comparison/race?year=2024&track=Monza&drivers=VER'
+                                   '&format=columnar',
+                                   headers={'Accept-Encoding': 'gzip;q=0.5, deflate'})
+        self.assertEqual(resp.headers['Content-Encoding'], 'deflate')
+        cols = json.loads(zlib.decompress(resp.data))['drivers']['VER']['laps']
+        self.assertEqual(cols['lap_number'], [1, 2])
+        self.assertEqual(cols['is_valid'], [True, False])
+        self.assertNotIn('lap_id', cols)
+        self.assertEqual(cols['telemetry'], {'avg_speed': [None, 289], 'top_speed': [None, 312],
+                                             'avg_gear': [None, 7.8], 'avg_rpm': [None, 10844]})
+        resp = self.client.get('/api/comparison/race?year=2024&track=Monza&drivers=VER'
+                               '&format=table')
+        self.assertEqual(resp.status_code, 400)
+
     def test_race_missing_driver(self):
         sessions = [{'driver_code': 'VER', 'driver_name': 'Max Verstappen', 'session_id': 10,
                      'session_type': 'Race', 'date': datetime.date(2024, 9, 1), 'laps': 53}]
@@ -359,6 +405,62 @@ class RaceComparisonApiTests(unittest.TestCase):
         self.assertEqual(resp.status_code, 400)
 
 
+class ModelRegistryTests(unittest.TestCase):
+    """Warm loads must come from memory; a retrained model must replace
+    the cached one."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name)
+        _write_driver(self.root, 'AAA', 'Alice', 90.0, 0.05, ['Spa'], ['Soft'])
+        _write_driver(self.root, 'BBB', 'Bob', 92.0, 0.05, ['Spa'], ['Soft'])
+
+    def test_warm_path_does_no_disk_io(self):
+        registry = dc.ModelRegistry(self.root, recheck_seconds=60)
+        cold = dc.compare_drivers('AAA', 'BBB', models_dir=self.root, registry=registry)
+        drivers = registry.list_drivers()
+        with patch('driver_comparison.joblib.load') as load, \
+             patch.object(Path, 'stat') as stat, \
+             patch.object(Path, 'iterdir') as iterdir:
+            warm = dc.compare_drivers('AAA', 'BBB', models_dir=self.root, registry=registry)
+            self.assertIs(registry.list_drivers(), drivers)
+        load.assert_not_called()
+        stat.assert_not_called()
+        iterdir.assert_not_called()
+        self.assertEqual(warm, cold)
+        self.assertEqual((registry.hits, registry.misses), (3, 3))
+
+    def test_retrained_model_is_reloaded(self):
+        registry = dc.ModelRegistry(self.root, recheck_seconds=0)
+        self.assertIsNone(registry.load('AAA', 2021)[3])          # aggregate fallback
+        self.assertIs(registry.load('AAA'), registry.load('AAA'))
+        self.assertEqual([d['code'] for d in registry.list_drivers()], ['AAA', 'BBB'])
+
+        # Retrain: a season model appears, the aggregate is rewritten,
+        # and a new driver is added.
+        _write_driver(self.root, 'AAA', 'Alice', 89.0, 0.05, ['Spa'], ['Soft'], year=2021)
+        _write_driver(self.root, 'AAA', 'Alice', 88.0, 0.05, ['Spa', 'Monza'], ['Soft'])
+        _write_driver(self.root, 'CCC', 'Carol', 91.0, 0.05, ['Spa'], ['Soft'])
+        for path in (self.root / 'AAA').rglob('*'):
+            stamp = path.stat().st_mtime + 5          # coarse-mtime filesystems
+            os.utime(path, (stamp, stamp))
+
+        self.assertEqual(registry.load('AAA', 2021)[3], 2021)
+        self.assertIn('track_Monza', registry.load('AAA')[1])
+        drivers = {d['code']: d for d in registry.list_drivers()}
+        self.assertEqual((sorted(drivers), drivers['AAA']['years']), (['AAA', 'BBB', 'CCC'], [2021]))
+
+    def test_lru_is_bounded(self):
+        registry = dc.ModelRegistry(self.root, max_entries=1, recheck_seconds=60)
+        first = registry.load('AAA')
+        registry.load('BBB')
+        self.assertIsNot(registry.load('AAA'), first)
+        self.assertEqual(registry.misses, 3)
+        with self.assertRaises(FileNotFoundError):
+            registry.load('ZZZ')
+
+
 class DriverComparisonApiTests(unittest.TestCase):
     def setUp(self):
         self.client = app.test_client()
@@ -417,5 +519,45 @@ class DriverComparisonApiTests(unittest.TestCase):
         self.assertIn('ZZZ', resp.get_json()['error'])
 
 
+class ComparisonSessionPickTests(unittest.TestCase):
+    """Which of a driver's sessions on a track the comparison uses."""
+
+    def setUp(self):
+        import db_backends as dbb
+        from summary_tables import rebuild_session_stats
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "f1.sqlite3"
+        conn = dbb.connect_sqlite(path)
+        cur = conn.cursor()
+        cur.execute("INSERT INTO drivers (driver_id, driver_code, driver_name) "
+                    "VALUES (1, 'VER', 'Max Verstappen'), (16, 'LEC', 'Charles Leclerc')")
+        # (session_id, driver, type, date, timed laps)
+        for sid, driver, kind, day, laps in (
+                (1, 1, 'Qualifying', datetime.date(2024, 9, 14), 20),
+                (2, 1, 'Race', datetime.date(2024, 9, 1), 10),       # double-header,
+                (3, 1, 'Race', datetime.date(2024, 9, 15), 12),      # latest race wins
+                (4, 16, 'Race', datetime.date(2024, 9, 15), 0),      # nothing timed
+                (5, 16, 'Practice', datetime.date(2024, 9, 13), 5)):
+            cur.execute("INSERT INTO sessions (session_id, driver_id, track_name, "
+                        "session_type, date) VALUES (%s, %s, 'Monza', %s, %s)",
+                        (sid, driver, kind, day))
+            cur.executemany("INSERT INTO laps (session_id, lap_number, lap_time_ms) "
+                            "VALUES (%s, %s, 81000)", [(sid, n) for n in range(1, laps + 1)])
+        conn.commit()
+        rebuild_session_stats(conn)
+        conn.close()
+        patcher = patch('dashboard.get_db_connection', side_effect=lambda: dbb.connect_sqlite(path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+
+    def test_race_first_then_latest_and_timed_laps(self):
+        drivers = self.client.get('/api/comparison/drivers?year=2024&track=Monza').get_json()
+        self.assertEqual([(d['code'], d['session_id'], d['laps']) for d in drivers['drivers']],
+                         [('LEC', 5, 5), ('VER', 3, 12)])
+
+
 if __name__ == "__main__":
     unittest.main()
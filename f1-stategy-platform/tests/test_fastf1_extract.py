@@ -0,0 +1,226 @@
+"""The Parquet extract must hand the importer the same frames FastF1 did.
+
+After the first load, imports read laps / car data / track status / race
+control / weather from f1_extract/ without building a FastF1 session, so
+a round trip through the extract has to be lossless for every column the
+importer reads.
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import fastf1_extract as fx
+
+
+def _td(values):
+    return pd.to_timedelta(values, unit="s")
+
+
+class _FakeSession:
+    """Loaded-FastF1-session lookalike with extra columns to project away."""
+
+    def __init__(self):
+        self.laps = pd.DataFrame({
+            "DriverNumber": ["44", "44", "33"],
+            "Driver": ["HAM", "HAM", "VER"],
+            "LapNumber": [1.0, 2.0, 1.0],
+            "LapTime": _td([90.1, 89.7, 90.4]),
+            "Compound": ["SOFT", "SOFT", "MEDIUM"],
+            "TyreLife": [1.0, 2.0, 1.0],
+            "Deleted": [False, None, True],
+            "PitInTime": [pd.NaT, _td([150])[0], pd.NaT],
+            "PitOutTime": [pd.NaT, pd.NaT, pd.NaT],
+            "LapStartTime": _td([0.0, 90.1, 0.0]),
+            "Time": _td([90.1, 179.8, 90.4]),
+            "Sector1Time": _td([30, 30, 30]),   # not used by the importer
+        })
+        self.car_data = {
+            "44": pd.DataFrame({
+                "SessionTime": _td([0.0, 0.25, 0.5]), "Speed": [250.0, 251.0, 252.0],
+                "Throttle": [100.0, 99.0, 98.0], "Brake": [False, False, True],
+                "nGear": [8, 8, 7], "RPM": [11000.0, 11100.0, 10900.0],
+                "DRS": [12, 12, 0], "Source": ["car"] * 3,
+            }),
+            "33": pd.DataFrame({
+                "SessionTime": _td([0.0]), "Speed": [240.0], "Throttle": [100.0],
+                "Brake": [False], "nGear": [8], "RPM": [11500.0], "DRS": [0],
+            }),
+        }
+        self.pos_data = {
+            "44": pd.DataFrame({
+                "SessionTime": _td([0.1, 0.35]), "X": [1.0, 2.0], "Y": [3.0, 4.0],
+                "Status": ["OnTrack"] * 2,
+            }),
+        }
+        self.track_status = pd.DataFrame({
+            "Time": _td([0, 100]), "Status": ["1", "4"],
+            "Message": ["AllClear", "SCDeployed"],
+        })
+        self.race_control_messages = pd.DataFrame({
+            "Time": pd.to_datetime(["2021-07-18 14:00", "2021-07-18 14:05"]),
+            "Message": ["GREEN LIGHT", "SAFETY CAR DEPLOYED"],
+            "Category": ["Flag", "SafetyCar"],
+        })
+        self.weather_data = pd.DataFrame({
+            "Time": _td([0, 60]), "Rainfall": [False, True], "AirTemp": [20.0, 19.5],
+        })
+        self.event = pd.Series({
+            "Location": "Silverstone", "Country": "United Kingdom",
+            "EventDate": pd.Timestamp("2021-07-18"), "EventName": "British Grand Prix",
+            "RoundNumber": 10,
+        })
+        self.load_calls = 0
+
+    def load(self, **kwargs):
+        self.load_calls += 1
+
+
+class ExtractRoundTripTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.session = _FakeSession()
+        fx.write_extract(self.session, 2021, "Silverstone", "r", root=self.root)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_layout_keyed_by_year_round_session(self):
+        d = self.root / "2021" / "round-10_R"
+        self.assertTrue((d / "manifest.json").exists())
+        self.assertTrue((d / "laps.parquet").exists())
+        self.assertTrue((d / "car_data" / "44.parquet").exists())
+        self.assertEqual(fx.extract_path(2021, 10, "R", self.root), d)
+
+    def test_every_name_of_the_event_finds_one_extract(self):
+        # Offline: the typed name and the official EventName are indexed.
+        with patch.object(fx, "fastf1", None):
+            for name in ("Silverstone", "British Grand Prix", "british grand prix"):
+                ex = fx.read_extract(2021, name, "R", root=self.root)
+                self.assertEqual(ex.directory, self.root / "2021" / "round-10_R", name)
+            self.assertIsNone(fx.read_extract(2021, "Britain", "R", root=self.root))
+        # With FastF1, its schedule resolves any name it accepts.
+        fake_fastf1 = MagicMock()
+        fake_fastf1.get_event.return_value = {"RoundNumber": 10}
+        with patch.object(fx, "fastf1", fake_fastf1):
+            self.assertIsNotNone(fx.read_extract(2021, "Britain", "R", root=self.root))
+        fake_fastf1.get_event.assert_called_once_with(2021, "Britain")
+        self.assertEqual(len(list((self.root / "2021").glob("round-*"))), 1)
+
+    def test_laps_round_trip_projected(self):
+        ex = fx.read_extract(2021, "Silverstone", "R", root=self.root)
+        self.assertIsNotNone(ex)
+        self.assertEqual(list(ex.laps.columns), fx.LAP_COLUMNS)
+        expected = self.session.laps[fx.LAP_COLUMNS]
+        for col in fx.LAP_COLUMNS:
+            if col == "Deleted":
+                continue
+            pd.testing.assert_series_equal(ex.laps[col], expected[col], check_names=False)
+        self.assertEqual(ex.laps["Deleted"].tolist()[0], False)
+        self.assertTrue(pd.isna(ex.laps["Deleted"].tolist()[1]))
+        self.assertEqual(ex.laps["Deleted"].tolist()[2], True)
+
+    def test_car_data_per_driver(self):
+        ex = fx.read_extract(2021, "Silverstone", "R", root=self.root)
+        car = ex.car_data["44"]
+        self.assertEqual(list(car.columns), fx.CAR_COLUMNS)
+        pd.testing.assert_frame_equal(car, self.session.car_data["44"][fx.CAR_COLUMNS])
+        self.assertIn("33", ex.car_data)
+        with self.assertRaises(KeyError):
+            ex.car_data["1"]
+
+    def test_pos_data_keeps_only_timestamps(self):
+        ex = fx.read_extract(2021, "Silverstone", "R", root=self.root)
+        pd.testing.assert_frame_equal(ex.pos_data["44"], self.session.pos_data["44"][["SessionTime"]])
+        self.assertNotIn("33", ex.pos_data)
+
+    def test_session_wide_frames_and_event(self):
+        ex = fx.read_extract(2021, "Silverstone", "R", root=self.root)
+        pd.testing.assert_frame_equal(ex.track_status, self.session.track_status)
+        self.assertEqual(list(ex.race_control_messages.columns), ["Time", "Message"])
+        self.assertEqual(list(ex.weather_data.columns), ["Time", "Rainfall"])
+        self.assertEqual(ex.event.get("Location"), "Silverstone")
+        self.assertEqual(ex.event["EventDate"].date(), date(2021, 7, 18))
+
+    def test_stale_version_is_ignored(self):
+        manifest = fx.extract_path(2021, 10, "R", self.root) / "manifest.json"
+        meta = json.loads(manifest.read_text(encoding="utf-8"))
+        meta["version"] = fx.EXTRACT_VERSION - 1
+        manifest.write_text(json.dumps(meta), encoding="utf-8")
+        self.assertIsNone(fx.read_extract(2021, "Silverstone", "R", root=self.root))
+
+    def test_same_day_extract_is_not_trusted(self):
+        self.assertIsNone(fx.read_extract(2021, "Silverstone", "R", root=self.root,
+                                          today=date(2021, 7, 18)))
+
+
+class LoadSessionTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_first_load_writes_extract_then_fastf1_is_skipped(self):
+        fake_fastf1 = MagicMock()
+        fake_fastf1.get_session.return_value = _FakeSession()
+        fake_fastf1.get_event.return_value = {"RoundNumber": 10}
+        with patch.object(fx, "fastf1", fake_fastf1):
+            first = fx.load_session(2021, "Silverstone", "R", root=self.root)
+            self.assertIsInstance(first, _FakeSession)
+            self.assertEqual(first.load_calls, 1)
+            # Another name for the same event reuses the extract.
+            again = fx.load_session(2021, "Great Britain", "R", root=self.root)
+        self.assertIsInstance(again, fx.ExtractSession)
+        fake_fastf1.get_session.assert_called_once()
+
+        with patch.object(fx, "fastf1", None):
+            second = fx.load_session(2021, "Silverstone", "R", root=self.root)
+        self.assertIsInstance(second, fx.ExtractSession)
+        self.assertEqual(len(second.laps), 3)
+
+    def test_refresh_bypasses_extract(self):
+        fx.write_extract(_FakeSession(), 2021, "Silverstone", "R", root=self.root)
+        with patch.object(fx, "fastf1", None):
+            with self.assertRaises(RuntimeError):
+                fx.load_session(2021, "Silverstone", "R", refresh=True, root=self.root)
+
+    def test_no_extract_and_no_fastf1_raises(self):
+        with patch.object(fx, "fastf1", None):
+            with self.assertRaises(RuntimeError):
+                fx.load_session(2021, "Monaco", "R", root=self.root)
+
+
+class ReleaseSessionTests(unittest.TestCase):
+    def test_frames_are_dropped(self):
+        session = _FakeSession()
+        session._car_data = session.car_data   # FastF1 keeps them private
+        fx.release_session(session)
+        for name in ("laps", "car_data", "_car_data", "pos_data", "track_status", "weather_data"):
+            self.assertFalse(hasattr(session, name), name)
+        self.assertTrue(hasattr(session, "event"))
+
+    def test_none_is_ignored(self):
+        fx.release_session(None)
+
+    def test_driver_frames_kept_then_released(self):
+        session = _FakeSession()
+        session._pos_data = {"44": pd.DataFrame(), "33": pd.DataFrame()}
+        fx.keep_driver_frames(session, 44)
+        self.assertEqual((list(session.car_data), list(session._pos_data)), (["44"], ["44"]))
+        fx.release_driver_frames(session, 44)
+        self.assertEqual((session.car_data, session._pos_data), ({}, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
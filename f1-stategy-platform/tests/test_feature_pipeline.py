@@ -8,6 +8,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
 from feature_pipeline import (
     preprocess_laps_dataframe,
     construct_prediction_input,
+    construct_prediction_matrix,
     covered_tracks,
     covered_tyres,
     validate_model_inputs,
@@ -82,6 +83,17 @@ class FeaturePipelineTests(unittest.TestCase):
             feature_names=feature_names)
         self.assertEqual(inp.loc[0, 'track_Circuit De Barcelona-Catalunya'], 1)
 
+    def test_prediction_matrix_matches_single_rows(self):
+        feature_names = ['tyre_age', 'tyre_Soft', 'tyre_Medium', 'track_Spa', 'track_Monza']
+        ages, tyres = [0, 1, 7, 2], ['Soft', 'Soft', 'Medium', 'Hard']
+        matrix = construct_prediction_matrix(ages, tyres, ' spa ', feature_names)
+        self.assertEqual(list(matrix.columns), feature_names)
+        for i, (age, tyre) in enumerate(zip(ages, tyres)):
+            row = construct_prediction_input(age, 0, tyre, ' spa ', feature_names)
+            self.assertEqual(list(matrix.iloc[i]), list(row.iloc[0].astype(float)))
+        # An uncovered compound encodes as all-zero tyre columns, as before.
+        self.assertEqual(list(matrix.iloc[3]), [2.0, 0.0, 0.0, 1.0, 0.0])
+
 
 if __name__ == "__main__":
     unittest.main()
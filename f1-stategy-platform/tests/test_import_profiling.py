@@ -0,0 +1,181 @@
+"""import_profiling must attribute wall/CPU time to the right import stage.
+
+Batch imports are tuned from these reports, so the stage accounting, the
+batch totals and the slowest-race ranking are pinned here.
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import import_profiling as ip
+
+
+class _Clock:
+    """Deterministic stand-in for perf_counter / process_time."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _profile(label, durations, clock):
+    """Run stages with the given wall durations on a fake clock."""
+    p = ip.ImportProfile(label, year=2021)
+    for stage, seconds in durations:
+        p.begin(stage)
+        clock.now += seconds
+    p.finish("imported")
+    return p
+
+
+class ImportProfileTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = patch.multiple(ip.time, perf_counter=self.clock,
+                                 process_time=self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_begin_ends_previous_stage(self):
+        p = _profile("a", [("fastf1_load", 5.0), ("lap_inserts", 1.5)], self.clock)
+        self.assertAlmostEqual(p.stages["fastf1_load"]["wall_s"], 5.0)
+        self.assertAlmostEqual(p.stages["lap_inserts"]["wall_s"], 1.5)
+        self.assertAlmostEqual(p.wall_s, 6.5)
+        self.assertEqual(p.status, "imported")
+
+    def test_repeated_stage_accumulates(self):
+        p = _profile("a", [("commit", 1.0), ("lap_inserts", 1.0), ("commit", 2.0)],
+                     self.clock)
+        self.assertAlmostEqual(p.stages["commit"]["wall_s"], 3.0)
+        self.assertEqual(p.stages["commit"]["calls"], 2)
+
+    def test_report_orders_stages_like_the_importer(self):
+        p = _profile("a", [("commit", 1.0), ("fastf1_load", 1.0)], self.clock)
+        self.assertEqual(list(p.to_dict()["stages"]), ["fastf1_load", "commit"])
+        self.assertEqual(p.to_dict()["year"], 2021)
+
+    def test_end_without_stage_is_noop(self):
+        p = ip.ImportProfile("a")
+        p.end()
+        self.assertEqual(p.stages, {})
+        self.assertEqual(p.wall_s, 0)
+
+    def test_summary_totals_and_slowest_races(self):
+        fast = _profile("fast", [("fastf1_load", 2.0), ("commit", 1.0)], self.clock)
+        slow = _profile("slow", [("fastf1_load", 10.0), ("telemetry_inserts", 20.0)],
+                        self.clock)
+        report = ip.summarize([fast, slow])
+        totals = report["totals"]
+        self.assertEqual(totals["races"], 2)
+        self.assertAlmostEqual(totals["wall_s"], 33.0)
+        self.assertAlmostEqual(totals["stages"]["fastf1_load"]["wall_s"], 12.0)
+        # Stage totals are listed slowest first.
+        self.assertEqual(list(totals["stages"])[0], "telemetry_inserts")
+        self.assertEqual([r["label"] for r in report["slowest_races"]], ["slow", "fast"])
+        self.assertEqual(report["slowest_races"][0]["slowest_stage"], "telemetry_inserts")
+
+    def test_each_race_reports_its_own_max_rss(self):
+        # Boundary samples per race: begin, end of stage 1 / begin of
+        # stage 2, end.  The heavy first race must not carry over.
+        rss = iter([100.0, 900.0, 900.0, 300.0,      # heavy
+                    100.0, 250.0, 250.0, 200.0])     # light
+        with patch.object(ip, "current_rss_mb", side_effect=lambda: next(rss)), \
+             patch.object(ip, "peak_rss_mb", return_value=950.0):
+            heavy = _profile("heavy", [("fastf1_load", 1.0), ("lap_inserts", 1.0)], self.clock)
+            light = _profile("light", [("fastf1_load", 1.0), ("lap_inserts", 1.0)], self.clock)
+            report = ip.summarize([heavy, light])
+        self.assertEqual((heavy.max_rss_mb, light.max_rss_mb), (900.0, 250.0))
+        self.assertEqual(light.to_dict()["stages"]["fastf1_load"],
+                         {"wall_s": 1.0, "cpu_s": 1.0, "calls": 1,
+                          "rss_mb": 250.0, "max_rss_mb": 250.0})
+        self.assertEqual(report["totals"]["max_race_rss_mb"], 900.0)
+        self.assertEqual(report["totals"]["peak_rss_mb"], 950.0)
+
+    def test_report_written_next_to_run_log(self):
+        p = _profile("a", [("fastf1_load", 1.0)], self.clock)
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = Path(tmp) / "import_dataset_20260101_000000.log"
+            out = ip.write_report(log_path, [p])
+            self.assertEqual(out, Path(tmp) / "import_dataset_20260101_000000.timing.json")
+            report = json.loads(out.read_text(encoding="utf-8"))
+            self.assertEqual(report["log"], str(log_path))
+            self.assertEqual(report["races"][0]["label"], "a")
+
+
+class MemoryBudgetTests(unittest.TestCase):
+    def test_unlimited_budget_never_degrades(self):
+        budget = ip.MemoryBudget()
+        with patch.object(ip, "current_rss_mb", return_value=1e9):
+            budget.check()
+        self.assertEqual(budget.chunk, ip.DEFAULT_LAP_CHUNK)
+
+    def test_over_budget_halves_chunk_down_to_minimum(self):
+        budget = ip.MemoryBudget(500, chunk=8)
+        with patch.object(ip, "current_rss_mb", return_value=900.0), \
+             patch.object(ip.gc, "collect") as collect:
+            for _ in range(5):
+                budget.check()
+        self.assertEqual(budget.chunk, 1)
+        self.assertEqual(budget.degradations, 3)   # 8 -> 4 -> 2 -> 1
+        self.assertTrue(collect.called)
+
+    def test_gc_that_frees_enough_keeps_chunk(self):
+        budget = ip.MemoryBudget(500, chunk=8)
+        with patch.object(ip, "current_rss_mb", side_effect=[900.0, 400.0]), \
+             patch.object(ip.gc, "collect"):
+            budget.check()
+        self.assertEqual(budget.chunk, 8)
+
+    def test_under_budget_is_noop(self):
+        budget = ip.MemoryBudget(500, chunk=8)
+        with patch.object(ip, "current_rss_mb", return_value=100.0):
+            budget.check()
+        self.assertEqual(budget.chunk, 8)
+
+    def test_chunk_grows_back_under_budget(self):
+        budget = ip.MemoryBudget(500, chunk=8)
+        with patch.object(ip, "current_rss_mb", return_value=900.0), \
+             patch.object(ip.gc, "collect"):
+            budget.check()
+            budget.check()
+        self.assertEqual(budget.chunk, 2)
+        with patch.object(ip, "current_rss_mb", return_value=300.0):
+            for _ in range(5):
+                budget.check()
+        self.assertEqual(budget.chunk, 8)
+
+    def test_budget_off_without_current_rss(self):
+        # The process peak only rises: it must not stand in for the RSS.
+        with patch.object(ip, "current_rss_mb", return_value=None), \
+             patch.object(ip, "peak_rss_mb", return_value=1e9), \
+             self.assertLogs(level="WARNING"):
+            budget = ip.MemoryBudget(500, chunk=8)
+            budget.check()
+        self.assertIsNone(budget.budget_mb)
+        self.assertEqual(budget.chunk, 8)
+
+    @unittest.skipUnless(Path("/proc/self/statm").exists(), "needs /proc")
+    def test_current_rss_without_psutil(self):
+        with patch.object(ip, "psutil", None):
+            rss = ip.current_rss_mb()
+        self.assertGreater(rss, 1.0)
+
+    def test_from_env(self):
+        with patch.dict(ip.os.environ, {"IMPORT_MEMORY_BUDGET_MB": "2048"}):
+            self.assertEqual(ip.MemoryBudget.from_env().budget_mb, 2048.0)
+        with patch.dict(ip.os.environ, {"IMPORT_MEMORY_BUDGET_MB": "lots"}):
+            self.assertIsNone(ip.MemoryBudget.from_env().budget_mb)
+        with patch.dict(ip.os.environ, {}, clear=True):
+            self.assertIsNone(ip.MemoryBudget.from_env().budget_mb)
+
+
+if __name__ == "__main__":
+    unittest.main()
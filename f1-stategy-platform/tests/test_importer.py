@@ -10,6 +10,7 @@ import time
 import unittest
 from datetime import datetime
 from unittest.mock import MagicMock, patch
+import numpy as np
 import pandas as pd
 import sys
 from pathlib import Path
@@ -27,6 +28,13 @@ from import_f1_race import (
     resolve_race_input,
     classify_weather,
     is_live_import,
+    lap_telemetry_bounds,
+    load_driver_car_data,
+    load_driver_pos_times,
+    merge_lap_telemetry,
+    sample_lap_telemetry,
+    telemetry_rows,
+    import_race,
     RACE_CALENDAR,
 )
 
@@ -809,6 +817,13 @@ class CaptureLapValidityTests(unittest.TestCase):
     path may mark a lap valid.
     """
 
+    def setUp(self):
+        for name in ("refresh_session_stats", "refresh_lap_telemetry_stats",
+                     "refresh_live_state"):
+            patcher = patch(f"capture_telemetry.{name}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     def _insert(self, lap_time_ms, is_valid):
         from capture_telemetry import insert_lap
         conn = MagicMock()
@@ -859,5 +874,373 @@ class CaptureLapValidityTests(unittest.TestCase):
         conn.commit.assert_called_once()
 
 
+class TelemetrySlicingTests(unittest.TestCase):
+    """Per-driver car data is fetched once and cut into laps by SessionTime."""
+
+    @staticmethod
+    def _car_data(n=30):
+        return pd.DataFrame({
+            "SessionTime": pd.to_timedelta(range(n), unit="s"),
+            "Speed": [200.0 + i for i in range(n)],
+            "Throttle": [100.0] * n,
+            "Brake": [False] * n,
+            "nGear": [7] * n,
+            "RPM": [11000.0] * n,
+            "DRS": [12] * n,
+        })
+
+    def test_bounds_are_inclusive_on_both_ends(self):
+        car = self._car_data()
+        lo, hi = lap_telemetry_bounds(
+            car["SessionTime"],
+            pd.to_timedelta([0, 10], unit="s"),
+            pd.to_timedelta([10, 20], unit="s"),
+        )
+        self.assertEqual(lo.tolist(), [0, 10])
+        self.assertEqual(hi.tolist(), [11, 21])
+
+    def test_slices_match_boolean_mask_selection(self):
+        # Same rows FastF1's slice_by_lap selects with a boolean mask.
+        car = self._car_data()
+        starts = pd.to_timedelta([0.5, 9.2, 18.0], unit="s")
+        ends = pd.to_timedelta([9.2, 18.0, 29.5], unit="s")
+        lo, hi = lap_telemetry_bounds(car["SessionTime"], starts, ends)
+        for s, e, a, b in zip(starts, ends, lo, hi):
+            mask = (car["SessionTime"] >= s) & (car["SessionTime"] <= e)
+            pd.testing.assert_frame_equal(car.iloc[a:b], car[mask])
+
+    def test_missing_lap_times_give_empty_window(self):
+        car = self._car_data()
+        lo, hi = lap_telemetry_bounds(
+            car["SessionTime"],
+            pd.Series([pd.NaT, pd.Timedelta(seconds=5)]),
+            pd.Series([pd.Timedelta(seconds=9), pd.NaT]),
+        )
+        self.assertEqual((hi - lo).tolist(), [0, 0])
+
+    @staticmethod
+    def _recorded_lap(seed=3):
+        """A lap of car data on its own ~3.7 Hz clock, the position clock
+        FastF1 merges it with, and get_telemetry()'s merged frame."""
+        rng = np.random.default_rng(seed)
+        car_t = np.cumsum(rng.uniform(0.22, 0.32, 420))
+        pos_t = np.sort(rng.uniform(car_t[0], car_t[-1], 480))
+        car = pd.DataFrame({
+            "SessionTime": pd.to_timedelta(car_t, unit="s"),
+            "Speed": 220 + 80 * np.sin(car_t / 3.1) + rng.normal(0, 4, car_t.size),
+            "Throttle": np.clip(60 + 50 * np.sin(car_t / 2.3), 0, 100),
+            "Brake": np.sin(car_t / 2.3) < -0.6,
+            "nGear": (5 + 3 * np.sin(car_t / 3.1)).round().astype(int),
+            "RPM": 10500 + 1200 * np.sin(car_t / 1.7),
+            "DRS": np.where(np.sin(car_t / 5.0) > 0.7, 12, 8),
+        })
+        start, end = pd.Timedelta(seconds=car_t[40] + 0.11), pd.Timedelta(seconds=car_t[390] - 0.07)
+
+        # Lap.get_telemetry(): car data resampled onto the car + position
+        # timebase (continuous channels interpolated, discrete carried
+        # forward), cut to the lap with rows interpolated at its edges.
+        t = np.union1d(car_t, pos_t)
+        t = np.concatenate([[start.total_seconds()],
+                            t[(t > start.total_seconds()) & (t < end.total_seconds())],
+                            [end.total_seconds()]])
+        prev = np.searchsorted(car_t, t, side="right") - 1
+        merged = pd.DataFrame({"SessionTime": pd.to_timedelta(t, unit="s")})
+        for col in ("Speed", "Throttle", "RPM"):
+            merged[col] = np.interp(t, car_t, car[col].to_numpy(dtype=float))
+        for col in ("Brake", "nGear", "DRS"):
+            merged[col] = car[col].to_numpy()[prev]
+        return car, (pos_t * 1e9).astype(np.int64), merged, start, end
+
+    def test_car_data_slice_matches_get_telemetry(self):
+        car, pos_t, merged, start, end = self._recorded_lap()
+        lo, hi = lap_telemetry_bounds(car["SessionTime"], [start], [end])
+        rebuilt = merge_lap_telemetry(car.iloc[lo[0] - 1:hi[0] + 1], pos_t, start, end)
+        self.assertGreater(len(merged), 1.8 * (hi[0] - lo[0]))
+        self.assertEqual(len(rebuilt), len(merged))
+        self.assertEqual(telemetry_rows(sample_lap_telemetry(rebuilt), 7),
+                         telemetry_rows(sample_lap_telemetry(merged), 7))
+
+        # A row stride over the raw car data picks different samples.
+        self.assertNotEqual(telemetry_rows(sample_lap_telemetry(car.iloc[lo[0]:hi[0]]), 7),
+                            telemetry_rows(sample_lap_telemetry(merged), 7))
+
+    def test_merge_without_position_data_adds_only_the_edges(self):
+        car = self._car_data(31)
+        merged = merge_lap_telemetry(car.iloc[2:24], None,
+                                     pd.Timedelta(seconds=2.5), pd.Timedelta(seconds=22.5))
+        seconds = merged["SessionTime"].dt.total_seconds().tolist()
+        self.assertEqual(seconds, [2.5] + list(range(3, 23)) + [22.5])
+        # Speed interpolated at the edges; DRS from the sample before.
+        self.assertEqual(merged["Speed"].tolist()[::21], [202.5, 222.5])
+        self.assertEqual(merged["DRS"].tolist()[::21], [12, 12])
+
+    def test_samples_every_fifth_of_the_rows(self):
+        car = self._car_data(22)
+        sampled = sample_lap_telemetry(car)
+        self.assertEqual(sampled["SessionTime"].dt.total_seconds().tolist(),
+                         [0, 4, 8, 12, 16, 20])
+        self.assertEqual(len(sample_lap_telemetry(car.iloc[:3])), 3)
+
+    def test_telemetry_rows_conversion(self):
+        car = self._car_data(2)
+        car.loc[1, ["Speed", "DRS"]] = [float("nan"), 8]
+        car.loc[1, "Brake"] = True
+        rows = telemetry_rows(car, lap_id=7)
+        self.assertEqual(rows[0], (7, 200, 1.0, 0.0, 7, 11000, 1))
+        self.assertEqual(rows[1], (7, 0, 1.0, 0.01, 7, 11000, 0))
+
+    def test_load_driver_car_data(self):
+        shuffled = self._car_data(5).iloc[[3, 0, 4, 1, 2]]
+        session = MagicMock()
+        session.car_data = {"44": shuffled}
+        car = load_driver_car_data(session, 44)
+        self.assertTrue(car["SessionTime"].is_monotonic_increasing)
+        self.assertIsNone(load_driver_car_data(session, 1))
+
+    def test_load_driver_pos_times(self):
+        session = MagicMock()
+        session.pos_data = {"44": pd.DataFrame({"SessionTime": pd.to_timedelta([2, 1], unit="s")})}
+        self.assertEqual(load_driver_pos_times(session, 44).tolist(), [1_000_000_000, 2_000_000_000])
+        self.assertIsNone(load_driver_pos_times(session, 1))
+
+
+class _ImportCursor:
+    """Scripted DB cursor for import_race: every dimension already exists."""
+
+    def __init__(self, existing_session=None):
+        self.existing_session = existing_session
+        self.executed = []      # (sql, params)
+        self.executemany_calls = []
+        self.lastrowid = None
+        self._one = None
+        self._all = []
+        self._laps = {}
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self._one, self._all = None, []
+        if "FROM data_sources" in sql:
+            self._one = (1,)
+        elif "FROM regulations" in sql:
+            self._one = (2,)
+        elif "FROM seasons" in sql:
+            self._one = (3,)
+        elif "FROM tracks" in sql:
+            self._one = (4, "Silverstone")
+        elif "SELECT driver_id FROM drivers" in sql:
+            self._one = (44,)
+        elif "SELECT driver_name" in sql:
+            self._one = ("Lewis Hamilton",)
+        elif "SELECT session_id FROM sessions" in sql:
+            self._one = (self.existing_session,) if self.existing_session else None
+        elif "INSERT INTO sessions" in sql:
+            self.lastrowid = self.existing_session or 77
+        elif "SELECT lap_number, lap_id" in sql:
+            self._all = list(self._laps.items())
+
+    def executemany(self, sql, rows):
+        self.executemany_calls.append((sql, list(rows)))
+        if "INSERT INTO laps" in sql:
+            for row in rows:
+                self._laps.setdefault(row[2], 1000 + row[2])
+
+    def fetchone(self):
+        return self._one
+
+    def fetchall(self):
+        return self._all
+
+    def close(self):
+        pass
+
+
+class _ImportSession:
+    """Minimal FastF1 session: three laps, a pit stop on lap 2, car data."""
+
+    def __init__(self):
+        s = lambda v: pd.to_timedelta(v, unit="s")
+        self.laps = pd.DataFrame({
+            "DriverNumber": ["44", "44", "44"],
+            "Driver": ["HAM"] * 3,
+            "LapNumber": [1.0, 2.0, 3.0],
+            "LapTime": s([90.0, 95.0, 110.0]),
+            "Compound": ["SOFT", "SOFT", "HARD"],
+            "TyreLife": [1.0, 2.0, 1.0],
+            "Deleted": [False, False, False],
+            "PitInTime": [pd.NaT, s(180.0), pd.NaT],
+            "PitOutTime": [pd.NaT, pd.NaT, s(202.0)],
+            "LapStartTime": s([0.0, 90.0, 185.0]),
+            "Time": s([90.0, 185.0, 295.0]),
+        })
+        n = 300
+        self.car_data = {"44": pd.DataFrame({
+            "SessionTime": s(range(n)),
+            "Speed": [250.0] * n, "Throttle": [100.0] * n,
+            "Brake": [False] * n, "nGear": [8] * n,
+            "RPM": [11500.0] * n, "DRS": [0] * n,
+        })}
+        self.event = {"Location": "Silverstone", "Country": "UK",
+                      "EventDate": pd.Timestamp("2021-07-18")}
+        self.weather_data = pd.DataFrame({"Rainfall": [False] * 10})
+        self.track_status = pd.DataFrame({
+            "Time": s([0, 100, 160]), "Status": [1, 4, 1],
+            "Message": ["AllClear", "SCDeployed", "AllClear"],
+        })
+        self.race_control_messages = None
+
+
+class ImportRaceUpsertTests(unittest.TestCase):
+    """import_race writes sessions/laps with bulk upserts on their unique keys."""
+
+    def setUp(self):
+        patcher = patch("import_f1_race.archive_session")
+        self.archive_session = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Summary-table refreshes are covered by test_summary_tables.
+        patcher = patch("import_f1_race.refresh_lap_telemetry_stats")
+        self.refresh_lap_stats = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, existing_session=None, upsert=False):
+        cursor = _ImportCursor(existing_session)
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        with patch("import_f1_race.load_session", return_value=_ImportSession()), \
+             patch("import_f1_race.get_db_connection", return_value=conn), \
+             patch("builtins.print"):
+            result = import_race(2021, "Silverstone", 44, upsert=upsert)
+        return result, cursor, conn
+
+    def _sql(self, cursor, fragment):
+        return [(sql, p) for sql, p in cursor.executed if fragment in sql]
+
+    def test_new_session_bulk_upserts_laps_and_telemetry(self):
+        result, cursor, conn = self._run()
+        self.assertEqual(result, 77)
+        conn.commit.assert_called_once()
+        session_sql = self._sql(cursor, "INSERT INTO sessions")[0][0]
+        self.assertIn("ON DUPLICATE KEY UPDATE", session_sql)
+        self.assertIn("LAST_INSERT_ID(session_id)", session_sql)
+
+        laps_sql, lap_rows = cursor.executemany_calls[0]
+        self.assertIn("INSERT INTO laps", laps_sql)
+        self.assertIn("ON DUPLICATE KEY UPDATE", laps_sql)
+        self.assertEqual([r[2] for r in lap_rows], [1, 2, 3])
+
+        telem_sql, telem_rows = cursor.executemany_calls[1]
+        self.assertIn("INSERT INTO telemetry", telem_sql)
+        self.assertEqual({r[0] for r in telem_rows}, {1001, 1002, 1003})
+        # No per-row lap inserts any more.
+        self.assertEqual(self._sql(cursor, "INSERT INTO laps"), [])
+
+        pit = self._sql(cursor, "'PitStop'")
+        self.assertEqual(len(pit), 1)
+        self.assertEqual(pit[0][1], (1002, 77, 22.0))
+        self.assertEqual(self._sql(cursor, "VALUES (NULL, %s, %s, %s)")[0][1][0], 77)
+        self.assertEqual(self._sql(cursor, "DELETE"), [])
+        self.archive_session.assert_called_once_with(conn, 77)
+        # Tooltip aggregates refreshed for the written laps.
+        (_, lap_ids), = [c.args for c in self.refresh_lap_stats.call_args_list]
+        self.assertEqual(sorted(lap_ids), [1001, 1002, 1003])
+
+    def test_laps_and_telemetry_written_in_budgeted_chunks(self):
+        from import_profiling import MemoryBudget
+        cursor = _ImportCursor()
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        session = _ImportSession()
+        with patch("import_f1_race.load_session", return_value=session), \
+             patch("import_f1_race.get_db_connection", return_value=conn), \
+             patch("builtins.print"):
+            import_race(2021, "Silverstone", 44, memory_budget=MemoryBudget(chunk=2))
+        kinds = [("laps" if "INSERT INTO laps" in sql else "telemetry", [r[2] if "laps" in sql else r[0] for r in rows])
+                 for sql, rows in cursor.executemany_calls]
+        # Chunk of 2 laps, its telemetry, then the last lap and its telemetry.
+        self.assertEqual([k for k, _ in kinds], ["laps", "telemetry", "laps", "telemetry"])
+        self.assertEqual(kinds[0][1], [1, 2])
+        self.assertEqual(set(kinds[1][1]), {1001, 1002})
+        self.assertEqual(kinds[2][1], [3])
+        # The pit stop on lap 2 still finds lap 3's PitOutTime.
+        self.assertEqual(self._sql(cursor, "'PitStop'")[0][1], (1002, 77, 22.0))
+        # The session's frames are released once the import is done.
+        self.assertFalse(hasattr(session, "laps"))
+
+    def test_only_the_drivers_car_data_is_held(self):
+        session = _ImportSession()
+        session.car_data["33"] = session.car_data["44"].copy()
+        cursor = _ImportCursor()
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        seen = []
+
+        def load(session, driver_id):
+            seen.append(sorted(session.car_data))
+            return load_driver_car_data(session, driver_id)
+        with patch("import_f1_race.load_session", return_value=session), \
+             patch("import_f1_race.get_db_connection", return_value=conn), \
+             patch("import_f1_race.load_driver_car_data", side_effect=load), \
+             patch("import_f1_race.release_session"), \
+             patch("builtins.print"):
+            import_race(2021, "Silverstone", 44)
+        # The rest of the field is gone before the laps are written, the
+        # driver's own frame once they are.
+        self.assertEqual(seen, [["44"]])
+        self.assertEqual(session.car_data, {})
+
+    def test_profile_records_every_stage(self):
+        from import_profiling import IMPORT_STAGES, ImportProfile
+        profile = ImportProfile("test")
+        cursor = _ImportCursor()
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        with patch("import_f1_race.load_session", return_value=_ImportSession()), \
+             patch("import_f1_race.get_db_connection", return_value=conn), \
+             patch("builtins.print"):
+            import_race(2021, "Silverstone", 44, profile=profile)
+        self.assertEqual(profile.status, "imported")
+        self.assertEqual(list(profile.to_dict()["stages"]), list(IMPORT_STAGES))
+
+    def test_extract_without_car_data_skips_per_lap_fallback(self):
+        from fastf1_extract import ExtractSession
+        session = ExtractSession.__new__(ExtractSession)
+        vars(session).update(vars(_ImportSession()))
+        session.car_data = {}
+        cursor = _ImportCursor()
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        with patch("import_f1_race.load_session", return_value=session), \
+             patch("import_f1_race.get_db_connection", return_value=conn), \
+             patch("builtins.print"), \
+             self.assertLogs(level="WARNING") as logs:
+            self.assertEqual(import_race(2021, "Silverstone", 44), 77)
+        self.assertEqual([sql for sql, _ in cursor.executemany_calls
+                          if "INSERT INTO telemetry" in sql], [])
+        self.assertFalse(any("Telemetry failed" in m for m in logs.output))
+        self.assertTrue(any("without telemetry" in m for m in logs.output))
+
+    def test_existing_session_skipped_without_upsert(self):
+        result, cursor, conn = self._run(existing_session=12)
+        self.assertEqual(result, 12)
+        self.assertEqual(self._sql(cursor, "INSERT INTO sessions"), [])
+        self.assertEqual(cursor.executemany_calls, [])
+        conn.commit.assert_not_called()
+
+    def test_upsert_updates_in_place(self):
+        result, cursor, conn = self._run(existing_session=12, upsert=True)
+        self.assertEqual(result, 12)
+        conn.commit.assert_called_once()
+        # Telemetry + lap-linked and session-wide events are replaced,
+        # laps upserted.
+        deletes = self._sql(cursor, "DELETE")
+        self.assertEqual(len(deletes), 4)
+        self.assertTrue(all(p == (12,) for _, p in deletes[:3]))
+        self.assertIn("lap_id IS NULL", deletes[2][0])
+        # Then laps the new data no longer has.
+        self.assertIn("lap_number NOT IN", deletes[3][0])
+        self.assertEqual(deletes[3][1], (12, 1, 2, 3))
+        self.assertIn("INSERT INTO laps", cursor.executemany_calls[0][0])
+        self.assertEqual(len(self._sql(cursor, "'PitStop'")), 1)
+
+
 if __name__ == "__main__":
     unittest.main()
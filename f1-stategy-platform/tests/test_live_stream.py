@@ -0,0 +1,171 @@
+"""The live stream must push exactly what changed, once, to every tab.
+
+LiveWatcher.poll() is driven by hand against the embedded SQLite backend,
+with the real capture writers producing the changes.
+"""
+
+import json
+import queue
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import db_backends as dbb
+from config import db_cursor
+from live_stream import SUBSCRIBER_QUEUE, LiveWatcher, format_sse
+from summary_tables import refresh_data_version
+
+
+class LiveWatcherTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "f1.sqlite3"
+        self.conn = self.connect()
+        self.addCleanup(self.conn.close)
+        import dashboard
+        self.watcher = LiveWatcher(
+            lambda: db_cursor(dictionary=True, connect=self.connect),
+            dashboard._live_cards, dashboard._session_lap_rows)
+
+        from capture_telemetry import ensure_game_driver, insert_session
+        with patch("builtins.print"):
+            ensure_game_driver(self.conn)
+            self.session = insert_session(self.conn, None, "Monza", "Race", "Dry", 0)
+
+    def connect(self):
+        return dbb.connect_sqlite(self.path)
+
+    def lap(self, lap_number, lap_time_ms):
+        from capture_telemetry import insert_lap, update_lap_time
+        with patch("builtins.print"):
+            lap_id = insert_lap(self.conn, self.session, lap_number, 0, "Soft", lap_number,
+                                100.0, True, 0)
+            update_lap_time(self.conn, lap_id, lap_time_ms, True)
+        return lap_id
+
+    def poll(self):
+        return {event: data for event, data in self.watcher.poll()}
+
+    def test_first_poll_reports_only_the_live_cards(self):
+        self.lap(1, 95_000)
+        out = self.poll()
+        self.assertEqual(list(out), ["live"])
+        self.assertEqual([(c["driver_code"], c["lap_time"]) for c in out["live"]["cards"]],
+                         [("PLY", 95.0)])
+        self.assertEqual(self.poll(), {})
+
+    def test_completed_laps_push_only_the_new_rows(self):
+        self.lap(1, 95_000)
+        self.poll()
+        self.lap(2, 94_000)
+        out = self.poll()
+        self.assertEqual(out["live"]["cards"][0]["lap_number"], 2)
+        # Session unseen since the watcher started: every row, once.
+        self.assertEqual([l["lap_number"] for l in out["laps"]["laps"]], [1, 2])
+        self.assertEqual(out["laps"]["session_id"], self.session)
+
+        self.lap(3, 93_500)
+        out = self.poll()
+        self.assertEqual([(l["lap_number"], l["lap_time"]) for l in out["laps"]["laps"]],
+                         [(3, 93.5)])
+        self.assertEqual(self.poll(), {})
+
+    def test_strategy_events_are_pushed_with_the_flagged_lap(self):
+        from capture_telemetry import insert_strategy_event
+        lap_id = self.lap(1, 95_000)
+        self.poll()
+        self.lap(2, 96_000)
+        self.poll()
+        with patch("builtins.print"):
+            insert_strategy_event(self.conn, lap_id, "PitStop", 21.4)
+        out = self.poll()
+        (event,) = out["events"]["events"]
+        self.assertEqual((event["session_id"], event["lap_number"], event["event_type"],
+                          event["duration_sec"]), (self.session, 1, "PitStop", 21.4))
+        self.assertEqual([(l["lap_number"], l["has_pit_stop"]) for l in out["laps"]["laps"]],
+                         [(1, 1)])
+        self.assertNotIn("live", out)
+
+    def test_race_control_events_carry_their_session(self):
+        self.lap(1, 95_000)
+        self.poll()
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO strategy_events (lap_id, session_id, event_type, duration_sec) "
+                    "VALUES (NULL, %s, 'SafetyCar', 240.0)", (self.session,))
+        refresh_data_version(cur, [self.session])   # as import_race does
+        self.conn.commit()
+        (event,) = self.poll()["events"]["events"]
+        self.assertEqual((event["session_id"], event["lap_number"], event["event_type"]),
+                         (self.session, None, "SafetyCar"))
+
+
+class FanOutTests(unittest.TestCase):
+    def setUp(self):
+        self.watcher = LiveWatcher(None, None, None, max_subscribers=2)
+        # Keep the poller thread out of these tests.
+        self.watcher._thread = object()
+
+    def test_capacity_and_slow_subscribers(self):
+        a = self.watcher.subscribe()
+        b = self.watcher.subscribe()
+        self.assertIsNone(self.watcher.subscribe())
+        for n in range(SUBSCRIBER_QUEUE + 1):
+            self.watcher.publish("live", {"n": n})
+            a.get_nowait()
+        # a kept draining, b never did: b is dropped and told to close.
+        self.assertEqual(self.watcher.subscriber_count(), 1)
+        self.assertIsNone(b.get_nowait())
+        self.assertIsNotNone(self.watcher.subscribe())
+
+    def test_stream_frames_and_unsubscribes(self):
+        q = self.watcher.subscribe()
+        self.watcher.publish("laps", {"session_id": 7, "laps": []})
+        q.put_nowait(None)
+        frames = list(self.watcher.stream(q, heartbeat=0.01))
+        self.assertEqual(frames, ["retry: 3000\n\n",
+                                  format_sse("laps", {"session_id": 7, "laps": []})])
+        self.assertEqual(self.watcher.subscriber_count(), 0)
+
+    def test_idle_stream_sends_keepalives(self):
+        q = self.watcher.subscribe()
+        frames = self.watcher.stream(q, heartbeat=0.01)
+        self.assertEqual((next(frames), next(frames)), ("retry: 3000\n\n", ": keepalive\n\n"))
+        frames.close()
+        self.assertEqual(self.watcher.subscriber_count(), 0)
+
+    def test_sse_frame_is_one_json_line(self):
+        frame = format_sse("live", {"cards": [{"track_name": "Spa\nFrancorchamps"}]})
+        event, data, blank, end = frame.split("\n")
+        self.assertEqual((event, blank, end), ("event: live", "", ""))
+        self.assertEqual(json.loads(data[len("data: "):])["cards"][0]["track_name"],
+                         "Spa\nFrancorchamps")
+
+
+class StreamEndpointTests(unittest.TestCase):
+    def test_falls_back_to_polling_when_unavailable(self):
+        import dashboard
+        client = dashboard.app.test_client()
+        with patch.object(dashboard, "_data_version", return_value=None):
+            self.assertEqual(client.get("/api/stream").status_code, 503)
+        with patch.object(dashboard, "_data_version", return_value=(1, None)), \
+             patch.object(dashboard.live_watcher, "max_subscribers", 0):
+            self.assertEqual(client.get("/api/stream").status_code, 503)
+
+    def test_stream_response(self):
+        import dashboard
+        client = dashboard.app.test_client()
+        with patch.object(dashboard, "_data_version", return_value=(1, None)), \
+             patch.object(dashboard.live_watcher, "subscribe", return_value=queue.Queue()):
+            resp = client.get("/api/stream", buffered=False)
+            self.assertEqual(resp.mimetype, "text/event-stream")
+            self.assertEqual(next(resp.response), b"retry: 3000\n\n")
+            resp.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""The pit-strategy search must find what exhaustive enumeration finds and
+honour the two-compound rule.  Its latency (it runs every lap) is reported
+by scripts/benchmark_advisor.py, not asserted here."""
+
+import itertools
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from pit_strategy import optimal_strategies, satisfies_compound_rule
+
+PIT_LOSS, PIT_LOSS_NOW = 25.0, 15.0
+
+
+def _tables(rng, compounds=('Soft', 'Medium', 'Hard'), ages=40):
+    """Random base pace per compound plus random, non-negative wear."""
+    return {c: 80 + rng.random() * 2 + np.cumsum(rng.random(ages) * rng.random() * 0.8)
+            for c in compounds}
+
+
+def _brute_force(tables, n, tyre, age, max_stops=3):
+    """Every (compound sequence, pit laps) combination, exhaustively."""
+    best = []
+    for stops in range(max_stops + 1):
+        for sequence in itertools.product(tables, repeat=stops):
+            if not satisfies_compound_rule((tyre,) + sequence):
+                continue
+            for pits in itertools.combinations(range(n), stops):
+                bounds = list(pits) + [n]
+                total = tables[tyre][age:age + bounds[0]].sum()
+                for i, compound in enumerate(sequence):
+                    total += tables[compound][:bounds[i + 1] - bounds[i]].sum()
+                    total += PIT_LOSS_NOW if bounds[i] == 0 else PIT_LOSS
+                best.append(total)
+    return min(best)
+
+
+class OptimalStrategyTests(unittest.TestCase):
+    def test_matches_exhaustive_search(self):
+        rng = np.random.default_rng(11)
+        for _ in range(25):
+            tables = _tables(rng)
+            n, age = int(rng.integers(1, 11)), int(rng.integers(0, 15))
+            plans = optimal_strategies(tables, n, 'Medium', age, PIT_LOSS,
+                                       pit_loss_now=PIT_LOSS_NOW)
+            self.assertAlmostEqual(plans[0]['total_time'],
+                                   _brute_force(tables, n, 'Medium', age), places=9)
+            self.assertEqual([p['total_time'] for p in plans],
+                             sorted(p['total_time'] for p in plans))
+
+    def test_plan_shape_adds_up(self):
+        tables = {'Soft': 80 + 0.3 * np.arange(80), 'Hard': 81 + 0.01 * np.arange(80)}
+        (plan,) = optimal_strategies(tables, 50, 'Soft', 20, PIT_LOSS, top_k=1)
+        # Worn softs: box now for hards and run them to the flag.
+        self.assertEqual((plan['compounds'], plan['pit_after']), (['Soft', 'Hard'], [0]))
+        self.assertAlmostEqual(plan['total_time'], tables['Hard'][:50].sum() + PIT_LOSS)
+
+    def test_two_compound_rule(self):
+        tables = {'Soft': np.full(30, 80.0), 'Medium': np.full(30, 81.0)}
+        plans = optimal_strategies(tables, 20, 'Soft', 5, PIT_LOSS, top_k=10)
+        # No wear: staying out would be fastest, but softs alone break the rule.
+        self.assertTrue(all('Medium' in p['compounds'] for p in plans))
+        self.assertEqual(plans[0]['stops'], 1)
+
+        # Mediums were already run earlier in the race: no stop needed.
+        plans = optimal_strategies(tables, 20, 'Soft', 5, PIT_LOSS, used_compounds=['Medium'])
+        self.assertEqual((plans[0]['stops'], plans[0]['total_time']), (0, 1600.0))
+        plans = optimal_strategies(tables, 20, 'Soft', 5, PIT_LOSS,
+                                   require_two_compounds=False)
+        self.assertEqual(plans[0]['stops'], 0)
+        self.assertTrue(satisfies_compound_rule(['Soft', 'Intermediate']))
+
+    def test_seventy_lap_race_with_six_compounds(self):
+        compounds = ('Hypersoft', 'Ultrasoft', 'Supersoft', 'Soft', 'Medium', 'Hard')
+        tables = _tables(np.random.default_rng(5), compounds, ages=100)
+        plans = optimal_strategies(tables, 70, 'Medium', 12, PIT_LOSS, top_k=5)
+        self.assertEqual(len(plans), 5)
+        totals = [p['total_time'] for p in plans]
+        self.assertEqual(totals, sorted(totals))
+        self.assertTrue(all(satisfies_compound_rule(p['compounds']) for p in plans))
+
+
+class OptimizeEndpointTests(unittest.TestCase):
+    def setUp(self):
+        import dashboard
+        from sklearn.linear_model import LinearRegression
+
+        feature_names = ['tyre_age', 'tyre_Soft', 'tyre_Medium', 'tyre_Hard', 'tyre_Wet',
+                         'track_Spa']
+        model = LinearRegression()
+        # No wear; Soft is the quickest compound, Wet 5 s off the pace.
+        model.coef_ = np.array([0.0, -1.0, -0.5, 0.0, 5.0, 0.0])
+        model.intercept_ = 100.0
+        patch.object(dashboard, 'model', model).start()
+        patch.object(dashboard, 'feature_names', feature_names).start()
+        patch.object(dashboard, 'fuel_burn_rate', 0.0).start()
+        self.addCleanup(patch.stopall)
+        self.client = dashboard.app.test_client()
+
+    def optimize(self, **overrides):
+        body = {'current_lap': 20, 'total_laps': 50, 'current_tyre': 'Medium',
+                'current_age': 20, 'track': 'spa', 'event_type': 'None'}
+        body.update(overrides)
+        return self.client.post('/api/strategy/optimize', json=body)
+
+    def test_plans_respect_the_rule_and_the_race(self):
+        data = self.optimize(top_k=3).get_json()
+        self.assertEqual(len(data['strategies']), 3)
+        best = data['strategies'][0]
+        # Flat pace: one stop (the rule), onto the quickest compound.
+        self.assertEqual((best['pit_stops'], [s['compound'] for s in best['stints']]),
+                         (1, ['Medium', 'Soft']))
+        self.assertEqual(sum(s['laps'] for s in best['stints']), 30)
+        self.assertTrue(all(20 <= lap < 50 for lap in best['pit_laps']))
+        # Wet tyres only when it rains.
+        self.assertNotIn('Wet', str(data['strategies']))
+
+    def test_safety_car_discount_applies_to_boxing_now(self):
+        plans = self.optimize(event_type='SafetyCar').get_json()['strategies']
+        self.assertEqual(plans[0]['pit_laps'], [20])
+
+    def test_rejects_uncovered_inputs(self):
+        self.assertEqual(self.optimize(track='Monaco').status_code, 400)
+        self.assertEqual(self.optimize(current_lap='x').status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+"""The race simulator must read neutralisation frequencies from what the
+writers record, reduce to the optimizer's clean-race totals without risk,
+and price a stop under a Safety Car / VSC at the reduced loss."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import db_backends as dbb
+from pit_strategy import optimal_strategies
+from race_simulation import EventRates, _plan_times, load_event_rates, simulate
+
+NO_RISK = EventRates({}, {})
+
+
+def _tables():
+    """Soft quick but wearing, Hard steady: one- and two-stop plans both
+    make sense over 40 laps."""
+    ages = np.arange(80)
+    return {'Soft': 80.0 + 0.08 * ages, 'Medium': 80.5 + 0.04 * ages,
+            'Hard': 81.0 + 0.02 * ages}
+
+
+class EventRateTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "f1.sqlite3"
+        self.conn = dbb.connect_sqlite(self.path)
+        self.addCleanup(self.conn.close)
+
+    def add_race(self, track, *events):
+        """One recorded race: a pit stop plus session-wide ``events``."""
+        from capture_telemetry import (ensure_game_driver, insert_lap, insert_session,
+                                       insert_strategy_event)
+        with patch("builtins.print"):
+            ensure_game_driver(self.conn)
+            sid = insert_session(self.conn, None, track, "Race", "Dry", 0)
+            lap = insert_lap(self.conn, sid, 1, 100000, "Soft", 1, 100.0, True, 0)
+            insert_strategy_event(self.conn, lap, "PitStop", 22.0)
+            for kind, seconds in events:
+                insert_strategy_event(self.conn, None, kind, seconds, session_id=sid)
+        return sid
+
+    def rates(self, track):
+        cursor = self.conn.cursor(dictionary=True)
+        return load_event_rates(cursor, track, lap_time_s=100.0)
+
+    def test_rates_per_recorded_race(self):
+        self.assertEqual(self.rates("Spa").source, "none")
+        self.add_race("Spa", ("SafetyCar", 300.0), ("VSC", None))
+        self.add_race("Spa", ("SafetyCar", 500.0))
+        self.add_race("Spa")
+        self.add_race("Spa")
+        self.add_race("Monza", ("RedFlag", 1800.0))
+
+        spa = self.rates("spa")
+        self.assertEqual((spa.source, spa.races), ("track", 4))
+        self.assertEqual(spa.per_race, {"SafetyCar": 0.5, "VSC": 0.25, "RedFlag": 0.0})
+        # 400 s average at 100 s a lap; no VSC length recorded -> default.
+        self.assertEqual((spa.duration_laps["SafetyCar"], spa.duration_laps["VSC"]), (4, 2))
+
+        # One race at Monza is too few: pooled over every track.
+        monza = self.rates("Monza")
+        self.assertEqual((monza.source, monza.races), ("all tracks", 5))
+        self.assertAlmostEqual(monza.per_race["RedFlag"], 0.2)
+
+    def test_captured_safety_car_laps_are_one_deployment(self):
+        # Capture writes a row per slow lap: a 4-lap SC, a VSC lap, then a
+        # second, 2-lap SC -- three deployments, not seven.
+        laps = [("SafetyCar", 130.0)] * 4 + [("VSC", 110.0)] + [("SafetyCar", 135.0)] * 2
+        for _ in range(3):
+            self.add_race("Baku", *laps)
+        baku = self.rates("Baku")
+        self.assertEqual(baku.per_race, {"SafetyCar": 2.0, "VSC": 1.0, "RedFlag": 0.0})
+        # (520 s + 270 s) / 2 at 100 s a lap.
+        self.assertEqual(baku.duration_laps["SafetyCar"], 4)
+
+    def test_imported_periods_are_not_merged(self):
+        cur = self.conn.cursor()
+        # An import: its laps have no captured_at.
+        cur.execute("INSERT INTO sessions (session_id, track_name) VALUES (90, 'Imola')")
+        cur.execute("INSERT INTO laps (session_id, lap_number) VALUES (90, 1)")
+        cur.executemany("INSERT INTO strategy_events (session_id, event_type, duration_sec) "
+                        "VALUES (90, 'SafetyCar', %s)", [(300.0,), (500.0,)])
+        self.conn.commit()
+        from race_simulation import NEUTRALISATION_EVENTS_QUERY, deployments
+        dcur = self.conn.cursor(dictionary=True)
+        dcur.execute(NEUTRALISATION_EVENTS_QUERY)
+        self.assertEqual(deployments(dcur.fetchall()),
+                         [("Imola", "SafetyCar", 300.0), ("Imola", "SafetyCar", 500.0)])
+
+
+class SimulationTests(unittest.TestCase):
+    def setUp(self):
+        self.tables = _tables()
+        self.plans = optimal_strategies(self.tables, 40, 'Medium', 10, 25.0, top_k=4)
+
+    def run_sim(self, rates, **kwargs):
+        return simulate(self.tables, self.plans, 40, 60, 'Medium', 10, rates, **kwargs)
+
+    def test_no_risk_reproduces_the_optimizer(self):
+        result = self.run_sim(NO_RISK, rollouts=200, seed=1)
+        for plan, stats in zip(self.plans, result['strategies']):
+            self.assertAlmostEqual(stats['mean'], plan['total_time'], places=9)
+            self.assertAlmostEqual(stats['std'], 0.0, places=9)
+            self.assertEqual(stats['discounted_stop_rate'], 0.0)
+        self.assertEqual(result['strategies'][0]['win_probability'], 1.0)
+
+    def test_stop_moves_onto_a_neutralisation(self):
+        plan = {'compounds': ['Medium', 'Hard'], 'pit_after': [10]}
+        n = 40
+        first = np.concatenate(([0.0], np.cumsum(self.tables['Medium'][10:10 + n])))
+        fresh = {c: np.concatenate(([0.0], np.cumsum(t[:n]))) for c, t in self.tables.items()}
+        discounted = np.zeros((3, n + 1), dtype=bool)
+        discounted[1, 8] = True          # within the 3-lap window: box on lap 8
+        discounted[2, 5] = True          # too early: keep the plan
+        times, cheap = _plan_times(plan, discounted, first, fresh, 25.0, 15.0, window=3)
+
+        def cost(stop, loss):
+            return first[stop] + fresh['Hard'][n - stop] + loss
+
+        np.testing.assert_allclose(times, [cost(10, 25), cost(8, 15), cost(10, 25)])
+        self.assertEqual(cheap.tolist(), [False, True, False])
+
+    def test_risk_shifts_the_distributions(self):
+        rates = EventRates({'SafetyCar': 1.5, 'VSC': 1.0}, {'SafetyCar': 4, 'VSC': 2})
+        result = self.run_sim(rates, rollouts=4000, seed=3)
+        wins = [s['win_probability'] for s in result['strategies']]
+        self.assertAlmostEqual(sum(wins), 1.0)
+        # Roughly 1 - (1 - 1.5 / 60) ** 40 of the remainders see a Safety Car.
+        self.assertAlmostEqual(result['neutralisation_probability']['SafetyCar'],
+                               1 - (1 - 1.5 / 60) ** 40, delta=0.03)
+        for plan, stats in zip(self.plans, result['strategies']):
+            if plan['stops']:
+                self.assertGreater(stats['discounted_stop_rate'], 0.0)
+                self.assertLess(stats['mean'], plan['total_time'])
+            self.assertLessEqual(stats['p5'], stats['p50'])
+            self.assertLessEqual(stats['p50'], stats['p95'])
+        self.assertEqual(self.run_sim(rates, rollouts=4000, seed=3), result)
+
+    def test_process_pool_splits_the_rollouts(self):
+        rates = EventRates({'SafetyCar': 1.0}, {})
+        result = self.run_sim(rates, rollouts=1001, seed=5, workers=2)
+        self.assertEqual(result['rollouts'], 1001)
+        self.assertAlmostEqual(sum(s['win_probability'] for s in result['strategies']), 1.0)
+        self.assertEqual(self.run_sim(rates, rollouts=1001, seed=5, workers=2), result)
+
+
+class SimulateEndpointTests(unittest.TestCase):
+    def setUp(self):
+        import dashboard
+        from sklearn.linear_model import LinearRegression
+
+        feature_names = ['tyre_age', 'tyre_Soft', 'tyre_Medium', 'tyre_Hard', 'track_Spa']
+        model = LinearRegression()
+        model.coef_ = np.array([0.05, -1.0, -0.5, 0.0, 0.0])
+        model.intercept_ = 100.0
+        patch.object(dashboard, 'model', model).start()
+        patch.object(dashboard, 'feature_names', feature_names).start()
+        patch.object(dashboard, 'fuel_burn_rate', 0.0).start()
+        self.addCleanup(patch.stopall)
+        self.client = dashboard.app.test_client()
+
+    def simulate(self, **overrides):
+        body = {'current_lap': 20, 'total_laps': 50, 'current_tyre': 'Medium',
+                'current_age': 20, 'track': 'spa', 'event_type': 'None',
+                'top_k': 3, 'rollouts': 500, 'seed': 2}
+        body.update(overrides)
+        return self.client.post('/api/strategy/simulate', json=body)
+
+    @patch('dashboard.get_db_connection', side_effect=RuntimeError("no database"))
+    def test_without_history_matches_the_optimizer(self, _conn):
+        with patch("traceback.print_exc"):
+            data = self.simulate().get_json()
+        self.assertEqual((data['rollouts'], data['event_rates']['source']), (500, 'unavailable'))
+        clean = self.client.post('/api/strategy/optimize', json={
+            'current_lap': 20, 'total_laps': 50, 'current_tyre': 'Medium',
+            'current_age': 20, 'track': 'spa', 'top_k': 3}).get_json()['strategies']
+        self.assertEqual([s['option'] for s in data['strategies']], [s['option'] for s in clean])
+        for sim, plan in zip(data['strategies'], clean):
+            self.assertAlmostEqual(sim['mean'], plan['total_time'], places=6)
+
+    @patch('dashboard.get_db_connection', side_effect=RuntimeError("no database"))
+    def test_no_plans_is_an_empty_answer(self, _conn):
+        # No stop allowed and only mediums run so far: the compound rule
+        # leaves the optimizer nothing, and the simulator races nothing.
+        self.assertEqual(self.client.post('/api/strategy/optimize', json={
+            'current_lap': 20, 'total_laps': 50, 'current_tyre': 'Medium',
+            'current_age': 20, 'track': 'spa', 'max_stops': 0}).get_json()['strategies'], [])
+        with patch("traceback.print_exc"):
+            resp = self.simulate(max_stops=0)
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        self.assertEqual(data['strategies'], [])
+        self.assertEqual(data['neutralisation_probability'],
+                         {'SafetyCar': 0.0, 'VSC': 0.0, 'RedFlag': 0.0})
+
+    @patch('dashboard.get_db_connection')
+    def test_rejects_uncovered_inputs(self, _conn):
+        self.assertEqual(self.simulate(track='Monaco').status_code, 400)
+        self.assertEqual(self.simulate(rollouts='many').status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+"""Cached dashboard answers (and ETags) must go stale the moment a writer
+commits.
+
+Unit tests for the LRU / TTL store, plus end-to-end runs on the embedded
+SQLite backend: the real writers bump data_version and the real endpoints
+must notice.
+"""
+
+import gzip
+import json
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import db_backends as dbb
+from response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_token_mismatch_is_a_miss(self):
+        cache = ResponseCache(max_entries=4)
+        cache.put("k", (1, None), "v1")
+        self.assertEqual(cache.get("k", (1, None)), "v1")
+        self.assertIsNone(cache.get("k", (2, None)))
+        # The stale entry is gone, not resurrected by the old token.
+        self.assertIsNone(cache.get("k", (1, None)))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", 0, 1)
+        cache.put("b", 0, 2)
+        cache.get("a", 0)
+        cache.put("c", 0, 3)
+        self.assertEqual((cache.get("a", 0), cache.get("b", 0), cache.get("c", 0)), (1, None, 3))
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = ResponseCache(max_entries=2, ttl=10, clock=clock)
+        cache.put("k", 0, "v")
+        clock.now = 9.9
+        self.assertEqual(cache.get("k", 0), "v")
+        clock.now = 10.0
+        self.assertIsNone(cache.get("k", 0))
+
+    def test_zero_entries_disables(self):
+        cache = ResponseCache(max_entries=0)
+        cache.put("k", 0, "v")
+        self.assertFalse(cache.enabled)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+class DashboardCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "f1.sqlite3"
+        self.conn = self.connect()
+        self.addCleanup(self.conn.close)
+        import dashboard
+        self.dashboard = dashboard
+        dashboard.response_cache.clear()
+        self.addCleanup(dashboard.response_cache.clear)
+        patcher = patch("dashboard.get_db_connection", side_effect=self.connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = dashboard.app.test_client()
+
+        from capture_telemetry import ensure_game_driver, insert_session
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO drivers (driver_id, driver_code) VALUES (44, 'HAM')")
+        cur.execute("INSERT INTO sessions (driver_id, track_name, date) "
+                    "VALUES (44, 'Spa', %s)", (date(2021, 8, 29),))
+        self.historical = cur.lastrowid
+        cur.executemany("INSERT INTO laps (session_id, driver_id, lap_number, lap_time_ms) "
+                        "VALUES (%s, 44, %s, %s)",
+                        [(self.historical, 1, 120_000), (self.historical, 2, 121_000)])
+        self.conn.commit()
+        from summary_tables import rebuild_session_stats
+        rebuild_session_stats(self.conn)
+        with patch("builtins.print"):
+            ensure_game_driver(self.conn)
+            self.live = insert_session(self.conn, None, "Monza", "Race", "Dry", 0)
+
+    def connect(self):
+        return dbb.connect_sqlite(self.path)
+
+    def get(self, url):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp.headers["X-Cache"], resp.get_json()
+
+    def complete_lap(self, lap_number, lap_time_ms):
+        from capture_telemetry import insert_lap, update_lap_time
+        with patch("builtins.print"):
+            lap_id = insert_lap(self.conn, self.live, lap_number, 0, "Soft", lap_number,
+                                100.0, False, 0)
+            update_lap_time(self.conn, lap_id, lap_time_ms, True)
+        return lap_id
+
+    def test_repeat_requests_are_served_from_memory(self):
+        url = f"/api/session/{self.historical}/laps"
+        state, laps = self.get(url)
+        self.assertEqual((state, len(laps)), ("MISS", 2))
+        self.assertEqual(self.get(url), ("HIT", laps))
+        # Query arguments are part of the key.
+        self.assertEqual(self.get("/api/comparison/tracks?year=2021")[0], "MISS")
+        self.assertEqual(self.get("/api/comparison/tracks?year=2021")[0], "HIT")
+        self.assertEqual(self.get("/api/comparison/tracks?year=2020")[0], "MISS")
+
+    def test_new_laps_refresh_only_what_they_touch(self):
+        historical = f"/api/session/{self.historical}/laps"
+        live = f"/api/session/{self.live}/laps"
+        for url in (historical, live, "/api/drivers/list"):
+            self.get(url)
+
+        self.complete_lap(1, 95_000)
+        self.assertEqual(self.get(historical)[0], "HIT")
+        state, laps = self.get(live)
+        self.assertEqual((state, [l["lap_time"] for l in laps]), ("MISS", [95.0]))
+        state, body = self.get("/api/drivers/list")
+        self.assertEqual(state, "MISS")
+        self.assertEqual({d["code"]: d["laps"] for d in body["drivers"]}, {"HAM": 2, "PLY": 1})
+        self.assertEqual(self.get(live)[0], "HIT")
+
+    def test_pit_events_invalidate_the_session(self):
+        from capture_telemetry import insert_strategy_event
+        lap_id = self.complete_lap(1, 95_000)
+        live = f"/api/session/{self.live}/laps"
+        self.assertEqual(self.get(live)[1][0]["has_pit_stop"], 0)
+        with patch("builtins.print"):
+            insert_strategy_event(self.conn, lap_id, "PitStop", 22.5)
+        state, laps = self.get(live)
+        self.assertEqual((state, laps[0]["has_pit_stop"]), ("MISS", 1))
+
+    def test_unchanged_session_revalidates_with_304(self):
+        for url in (f"/api/session/{self.historical}/laps",
+                    f"/api/session/{self.historical}/tyre-degradation"):
+            first = self.client.get(url)
+            tag = first.headers["ETag"]
+            self.assertFalse(tag.startswith("W/"))
+            self.assertEqual(first.headers["Cache-Control"], "no-cache")
+            # Neither the lap query nor the detrend runs for a 304.
+            with patch("dashboard._session_lap_rows") as laps, \
+                 patch("dashboard.detrend_laps") as detrend, \
+                 patch.object(self.dashboard.response_cache, "max_entries", 0):
+                again = self.client.get(url, headers={"If-None-Match": tag})
+            self.assertEqual((again.status_code, again.data), (304, b""))
+            self.assertEqual(again.headers["ETag"], tag)
+            laps.assert_not_called()
+            detrend.assert_not_called()
+
+    def test_etag_changes_only_for_the_session_that_moved(self):
+        tags = {sid: self.client.get(f"/api/session/{sid}/laps").headers["ETag"]
+                for sid in (self.historical, self.live)}
+        self.complete_lap(1, 95_000)
+        historical = self.client.get(f"/api/session/{self.historical}/laps",
+                                     headers={"If-None-Match": tags[self.historical]})
+        live = self.client.get(f"/api/session/{self.live}/laps",
+                               headers={"If-None-Match": tags[self.live]})
+        self.assertEqual((historical.status_code, live.status_code), (304, 200))
+        self.assertNotEqual(live.headers["ETag"], tags[self.live])
+        self.assertEqual(len(live.get_json()), 1)
+
+    def test_compressed_and_columnar_answers_revalidate(self):
+        url = f"/api/session/{self.historical}/laps"
+        with patch.object(self.dashboard, "COMPRESS_MIN_BYTES", 0):
+            plain = self.client.get(url)
+            packed = self.client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertEqual(packed.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", packed.headers["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(packed.data)), plain.get_json())
+        # The encoded bytes keep the entity's tag, weakened.
+        self.assertEqual(packed.headers["ETag"], "W/" + plain.headers["ETag"])
+        again = self.client.get(url, headers={"If-None-Match": packed.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+
+        columns = self.client.get(url + "?format=columnar")
+        self.assertEqual(columns.get_json()["lap_time"], [120.0, 121.0])
+        self.assertEqual(set(columns.get_json()), set(self.dashboard.SESSION_LAP_FIELDS))
+        self.assertNotEqual(columns.headers["ETag"], plain.headers["ETag"])
+        empty = self.client.get(f"/api/session/{self.live}/laps?format=columnar").get_json()
+        self.assertEqual(empty["lap_number"], [])
+        self.assertEqual(self.client.get(url + "?format=csv").status_code, 400)
+
+    def test_unmigrated_database_serves_uncached(self):
+        cur = self.conn.cursor()
+        cur.execute("DROP TABLE data_version")
+        self.conn.commit()
+        url = f"/api/session/{self.historical}/laps"
+        with patch.object(self.dashboard, "_data_version_warned", False), \
+             patch("builtins.print") as out:
+            self.assertEqual(len(self.client.get(url).get_json()), 2)
+            self.assertEqual(len(self.client.get(url).get_json()), 2)
+        self.assertEqual(out.call_count, 1)
+        self.assertEqual(self.dashboard.response_cache.stats()["entries"], 0)
+        self.assertNotIn("ETag", self.client.get(url).headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
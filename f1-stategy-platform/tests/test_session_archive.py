@@ -0,0 +1,275 @@
+"""The columnar session archive must give the same answers as the SQL.
+
+Analysis paths read archived sessions from memory-mapped .npy columns, so
+the export has to keep NULLs, ordering and per-lap grouping exactly as the
+queries it replaces (get_speed_distribution, comparison_race aggregates,
+the training extract).
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import db_backends as dbb
+import session_archive as sa
+from analyze_performance import get_speed_distribution
+from benchmark_models import TRAINING_QUERY
+from compact_telemetry import Throttle, compact
+from summary_tables import refresh_data_version
+
+
+# (lap_id, lap_number, lap_time_ms, tyre_compound, tyre_age, fuel_load, is_valid, driver_id)
+LAPS = [
+    (11, 1, 91000, "Soft", 1, 100.0, 1, 44),
+    (12, 2, 90500, "Soft", None, 98.2, 1, 44),
+    (13, 3, None, None, 3, None, 0, 44),
+]
+# (lap_id, lap_number, speed, throttle, brake, gear, rpm, drs)
+TELEMETRY = [
+    (11, 1, 250, 1.0, 0.0, 7, 11000, 0),
+    (11, 1, 310, 1.0, 0.0, 8, 12000, 1),
+    (11, 1, 0, 0.0, 1.0, 1, 4000, 0),
+    (12, 2, None, 0.5, 0.0, None, 10000, 0),
+    (12, 2, 280, 0.9, 0.0, 8, None, 0),
+    (13, 3, None, None, None, None, None, None),
+]
+# (lap_id, lap_number, event_type, duration_sec)
+EVENTS = [(12, 2, "PitStop", 22.5)]
+
+
+def _tables():
+    return {
+        "laps": sa.rows_to_columns(LAPS, sa.LAP_COLUMNS),
+        "telemetry": sa.rows_to_columns(TELEMETRY, sa.TELEMETRY_COLUMNS),
+        "events": sa.rows_to_columns(EVENTS, sa.EVENT_COLUMNS),
+    }
+
+
+class _ArchiveCursor:
+    """Answers archive_session's queries from the fixtures above."""
+
+    def __init__(self, session_row=("Silverstone", "Race", None, 44, 3)):
+        self.session_row = session_row
+        self._last = None
+
+    def execute(self, sql, params=None):
+        self._last = sql
+
+    def fetchone(self):
+        if "FROM data_version" in self._last:
+            return (4, datetime(2024, 7, 7, 16, 0))
+        return self.session_row
+
+    def fetchall(self):
+        if "FROM telemetry" in self._last:
+            return TELEMETRY
+        if "FROM strategy_events" in self._last:
+            return EVENTS
+        return LAPS
+
+    def close(self):
+        pass
+
+
+class SessionArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_round_trip_is_memory_mapped_and_keeps_nulls(self):
+        sa.write_archive(7, _tables(), {"track_name": "Silverstone"}, root=self.root)
+        archive = sa.open_archive(7, root=self.root)
+        self.assertIsNotNone(archive)
+        self.assertEqual(archive.rows("telemetry"), len(TELEMETRY))
+        speed = archive.column("telemetry", "speed")
+        self.assertIsInstance(speed, np.memmap)
+        self.assertEqual(speed.dtype, np.float32)
+        self.assertTrue(np.isnan(speed[3]))
+
+        laps = archive.frame("laps")
+        self.assertEqual(laps["lap_id"].tolist(), [11, 12, 13])
+        self.assertEqual(laps["tyre_compound"].tolist(), ["Soft", "Soft", ""])
+        self.assertTrue(np.isnan(laps["lap_time_ms"][2]))
+        self.assertEqual(archive.frame("events")["event_type"].tolist(), ["PitStop"])
+        self.assertEqual(archive.manifest["session"], {"track_name": "Silverstone"})
+
+    def test_empty_tables_are_readable(self):
+        sa.write_archive(8, {"laps": sa.rows_to_columns(LAPS, sa.LAP_COLUMNS)}, root=self.root)
+        archive = sa.open_archive(8, root=self.root)
+        self.assertEqual(archive.rows("telemetry"), 0)
+        self.assertEqual(len(archive.frame("telemetry")), 0)
+        self.assertEqual(sa.lap_telemetry_aggregates(archive), {})
+
+    def test_ragged_columns_rejected_without_leaving_an_archive(self):
+        tables = _tables()
+        tables["laps"]["lap_number"] = tables["laps"]["lap_number"][:2]
+        with self.assertRaises(ValueError):
+            sa.write_archive(9, tables, root=self.root)
+        self.assertFalse(sa.archive_path(9, self.root).exists())
+        self.assertEqual(list(self.root.iterdir()), [])
+
+    def test_missing_or_stale_archive_is_none(self):
+        self.assertIsNone(sa.open_archive(1, root=self.root))
+        target = sa.write_archive(2, _tables(), root=self.root)
+        manifest = json.loads((target / "manifest.json").read_text())
+        manifest["version"] = sa.ARCHIVE_VERSION + 1
+        (target / "manifest.json").write_text(json.dumps(manifest))
+        self.assertIsNone(sa.open_archive(2, root=self.root))
+
+    def test_speed_distribution_matches_sql_filter(self):
+        sa.write_archive(7, _tables(), root=self.root)
+        df = sa.speed_distribution(sa.open_archive(7, root=self.root))
+        # WHERE t.speed > 0 drops the stationary sample and the NULLs.
+        self.assertEqual(df["speed"].tolist(), [250, 310, 280])
+        self.assertEqual(df["lap_number"].tolist(), [1, 1, 2])
+
+    def test_lap_aggregates_match_sql_group_by(self):
+        sa.write_archive(7, _tables(), root=self.root)
+        agg = sa.lap_telemetry_aggregates(sa.open_archive(7, root=self.root))
+        self.assertEqual(sorted(agg), [11, 12, 13])
+        self.assertAlmostEqual(agg[11]["avg_speed"], (250 + 310 + 0) / 3)
+        self.assertEqual(agg[11]["top_speed"], 310)
+        self.assertAlmostEqual(agg[11]["avg_rpm"], 9000)
+        # AVG/MAX skip NULLs ...
+        self.assertEqual(agg[12]["avg_speed"], 280)
+        self.assertEqual(agg[12]["top_speed"], 280)
+        self.assertEqual(agg[12]["avg_gear"], 8)
+        self.assertEqual(agg[12]["avg_rpm"], 10000)
+        # ... and are NULL when every sample is.
+        self.assertEqual(agg[13], {"avg_speed": None, "top_speed": None,
+                                   "avg_gear": None, "avg_rpm": None})
+
+    def test_archive_session_exports_from_db(self):
+        conn = MagicMock()
+        conn.cursor.return_value = _ArchiveCursor()
+        target = sa.archive_session(conn, 5, root=self.root)
+        self.assertEqual(target, sa.archive_path(5, self.root))
+        archive = sa.open_archive(5, root=self.root)
+        self.assertEqual(archive.manifest["rows"], {"laps": 3, "telemetry": 6, "events": 1})
+        self.assertEqual(archive.manifest["session"]["driver_id"], 44)
+        self.assertEqual(archive.manifest["data_version"], [4, "2024-07-07T16:00:00"])
+
+    def test_archive_session_failure_is_non_fatal(self):
+        conn = MagicMock()
+        conn.cursor.side_effect = RuntimeError("connection lost")
+        self.assertIsNone(sa.archive_session(conn, 5, root=self.root))
+        conn = MagicMock()
+        conn.cursor.return_value = _ArchiveCursor(session_row=None)
+        self.assertIsNone(sa.archive_session(conn, 5, root=self.root))
+
+
+class ArchiveFreshnessTests(unittest.TestCase):
+    """An archive is only read while the session is unchanged since export."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name) / "archive"
+        self.conn = dbb.connect_sqlite(Path(self._tmp.name) / "f1.sqlite3")
+        self.addCleanup(self.conn.close)
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO sessions (session_id, track_name, date) VALUES (1, 'Spa', %s)",
+                    (date(2025, 1, 1),))
+        cur.execute("INSERT INTO laps (session_id, lap_number) VALUES (1, 1)")
+        cur.executemany("INSERT INTO telemetry (lap_id, speed) VALUES (%s, %s)",
+                        [(cur.lastrowid, 200 + i) for i in range(30)])
+        refresh_data_version(cur, [1])
+        self.conn.commit()
+        sa.archive_session(self.conn, 1, root=self.root)
+
+    def open(self):
+        cur = self.conn.cursor()
+        try:
+            return sa.open_archive(1, root=self.root, cursor=cur)
+        finally:
+            cur.close()
+
+    def test_current_archive_is_used(self):
+        self.assertIsNotNone(self.open())
+        with patch.object(sa, "ARCHIVE_DIR", self.root), \
+             patch("analyze_performance.pd.read_sql") as read_sql:
+            df = get_speed_distribution(self.conn, 1)
+        read_sql.assert_not_called()
+        self.assertEqual(len(df), 30)
+
+    def test_any_later_write_makes_it_stale(self):
+        cur = self.conn.cursor()
+        refresh_data_version(cur)           # e.g. cleanup_pit_events --apply
+        self.conn.commit()
+        self.assertIsNone(self.open())
+        # Without a cursor the freshness check is skipped.
+        self.assertIsNotNone(sa.open_archive(1, root=self.root))
+
+    def test_compaction_falls_back_to_sql(self):
+        compact(self.conn, 30, 180, grid=10, apply=True, throttle=Throttle(1.0),
+                today=date(2026, 6, 1))
+        self.assertIsNone(self.open())
+        sql = pd.DataFrame({"speed": [], "lap_number": []})
+        with patch.object(sa, "ARCHIVE_DIR", self.root), \
+             patch("analyze_performance.pd.read_sql", return_value=sql) as read_sql:
+            self.assertIs(get_speed_distribution(self.conn, 1), sql)
+        read_sql.assert_called_once()
+
+    def test_archive_without_version_is_stale(self):
+        sa.write_archive(1, _tables(), root=self.root)
+        self.assertIsNone(self.open())
+
+
+class TrainingLapsTests(unittest.TestCase):
+    """training_laps keeps exactly the rows of the training query."""
+
+    def test_same_laps_as_training_query(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        conn = dbb.connect_sqlite(Path(tmp.name) / "f1.sqlite3")
+        self.addCleanup(conn.close)
+        cur = conn.cursor()
+        cur.execute("INSERT INTO drivers (driver_id, driver_code) VALUES (44, 'HAM')")
+        cur.execute("INSERT INTO sessions (session_id, driver_id, track_name) VALUES (1, 44, 'Spa')")
+        # (lap_number, lap_time_ms, tyre_compound, tyre_age, is_valid, pit stop seconds)
+        laps = [
+            (1, 95000, "Soft", 1, 1, None),
+            (2, 91000, None, 2, 1, None),
+            (3, 90000, "Soft", 3, 0, None),      # invalid
+            (4, 185000, "Soft", 4, 1, None),     # too slow
+            (5, 110000, "Soft", 5, 1, 22.5),     # in-lap
+            (6, 93000, "Hard", 1, 1, None),      # out-lap: kept, as by the query
+            (7, 92000, "Hard", 2, 1, 2.3),       # glitch "stop": kept
+            (8, 92500, "Hard", 3, 1, None),
+            (9, 112000, "Hard", None, 1, "unknown"),
+            (10, 94000, "Medium", 1, 1, None),
+            (11, None, "Medium", 2, 1, None),
+        ]
+        for number, ms, compound, age, valid, stop in laps:
+            cur.execute("INSERT INTO laps (session_id, driver_id, lap_number, lap_time_ms, "
+                        "tyre_compound, tyre_age, is_valid) VALUES (1, 44, %s, %s, %s, %s, %s)",
+                        (number, ms, compound, age, valid))
+            if stop is not None:
+                cur.execute("INSERT INTO strategy_events (lap_id, session_id, event_type, "
+                            "duration_sec) VALUES (%s, 1, 'PitStop', %s)",
+                            (cur.lastrowid, None if stop == "unknown" else stop))
+        conn.commit()
+        sa.archive_session(conn, 1, root=Path(tmp.name))
+
+        got = sa.training_laps(sa.open_archive(1, root=Path(tmp.name)))
+        cur.execute(TRAINING_QUERY)
+        sql = sorted(cur.fetchall(), key=lambda row: row[1])
+        self.assertEqual(got["lap_number"].tolist(), [1, 2, 6, 7, 8, 10])
+        self.assertEqual(got[["lap_time", "lap_number", "tyre_age"]].values.tolist(),
+                         [list(row[:3]) for row in sql])
+        self.assertEqual(got["tyre_compound"].tolist(), ["Soft", None, "Hard", "Hard", "Hard", "Medium"])
+        self.assertEqual(got["driver_id"].tolist(), [44] * 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
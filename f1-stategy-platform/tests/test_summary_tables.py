@@ -0,0 +1,301 @@
+"""The summary tables must always equal a fresh aggregate of the raw rows.
+
+The writers (capture, import) refresh them incrementally and
+``summary_tables rebuild`` backfills them; the dashboard sidebar, the
+analysis report, the race comparison and the live cards read nothing
+else.  Run against the embedded SQLite backend so the real SQL is
+exercised.
+"""
+
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import db_backends as dbb
+import summary_tables
+from summary_tables import (
+    rebuild_lap_telemetry_stats,
+    rebuild_live_state,
+    rebuild_session_stats,
+    refresh_session_stats,
+)
+
+STATS_COLUMNS = ("session_id, driver_code, session_date, total_laps, valid_laps, "
+                 "invalid_laps, fastest_lap_ms, best_timed_ms, avg_lap_ms, last_captured_at")
+
+
+class SessionStatsTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "f1.sqlite3"
+        self.conn = self.connect()
+        self.addCleanup(self.conn.close)
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO drivers (driver_id, driver_code) VALUES (44, 'HAM'), (1, 'VER')")
+        self.conn.commit()
+
+    def connect(self):
+        return dbb.connect_sqlite(self.path)
+
+    def stats(self, session_id):
+        cur = self.conn.cursor(dictionary=True)
+        cur.execute(f"SELECT {STATS_COLUMNS} FROM session_stats WHERE session_id = %s",
+                    (session_id,))
+        return cur.fetchone()
+
+    def fresh_aggregate(self, session_id):
+        cur = self.conn.cursor(dictionary=True)
+        cur.execute(summary_tables.SESSION_STATS_QUERY.format(ids="%s"), (session_id,))
+        return cur.fetchone()
+
+    def add_session(self, driver_id, day, laps):
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO sessions (driver_id, track_name, date) VALUES (%s, 'Spa', %s)",
+                    (driver_id, day))
+        sid = cur.lastrowid
+        cur.executemany(
+            "INSERT INTO laps (session_id, driver_id, lap_number, lap_time_ms, is_valid) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(sid, driver_id, n, ms, valid) for n, (ms, valid) in enumerate(laps, 1)])
+        self.conn.commit()
+        return sid
+
+    def test_capture_writes_keep_stats_current(self):
+        from capture_telemetry import ensure_game_driver, insert_lap, insert_session, update_lap_time
+        with patch("builtins.print"):
+            ensure_game_driver(self.conn)
+            sid = insert_session(self.conn, None, "Spa", "Race", "Dry", 0)
+            self.assertEqual(self.stats(sid)["total_laps"], 0)
+
+            lap1 = insert_lap(self.conn, sid, 1, 0, "Soft", 1, 100.0, False, 0)
+            row = self.stats(sid)
+            self.assertEqual((row["total_laps"], row["invalid_laps"], row["fastest_lap_ms"]),
+                             (1, 1, None))
+            self.assertEqual(row["driver_code"], "PLY")
+            self.assertIsNotNone(row["last_captured_at"])
+
+            update_lap_time(self.conn, lap1, 91_500, True)
+            lap2 = insert_lap(self.conn, sid, 2, 0, "Soft", 2, 98.0, False, 0)
+            update_lap_time(self.conn, lap2, 93_000, False)
+        row = self.stats(sid)
+        self.assertEqual((row["total_laps"], row["valid_laps"], row["invalid_laps"]), (2, 1, 1))
+        self.assertEqual((row["fastest_lap_ms"], row["best_timed_ms"]), (91_500, 91_500))
+        self.assertAlmostEqual(row["avg_lap_ms"], 92_250.0)
+        self.assertEqual(row, self.fresh_aggregate(sid))
+
+    def test_rebuild_backfills_and_drops_orphans(self):
+        a = self.add_session(44, date(2024, 7, 28), [(0, 0), (92_000, 1), (90_000, 0)])
+        b = self.add_session(1, date(2024, 8, 25), [])
+        cur = self.conn.cursor()
+        cur.execute("DELETE FROM session_stats")
+        self.conn.commit()
+
+        self.assertEqual(rebuild_session_stats(self.conn, batch=1), 2)
+        row = self.stats(a)
+        self.assertEqual(row, self.fresh_aggregate(a))
+        # fastest counts valid laps only, best_timed any timed lap, and the
+        # 0 ms in-progress lap neither.
+        self.assertEqual((row["fastest_lap_ms"], row["best_timed_ms"], row["avg_lap_ms"]),
+                         (92_000, 90_000, 91_000.0))
+        self.assertEqual((self.stats(b)["total_laps"], self.stats(b)["fastest_lap_ms"]), (0, None))
+
+        self.conn._raw.execute("PRAGMA foreign_keys = OFF")
+        cur.execute("INSERT INTO session_stats (session_id, total_laps) VALUES (999, 5)")
+        self.conn.commit()
+        rebuild_session_stats(self.conn)
+        self.assertIsNone(self.stats(999))
+
+    def test_refresh_is_non_fatal_without_the_table(self):
+        sid = self.add_session(44, date(2024, 7, 28), [(92_000, 1)])
+        cur = self.conn.cursor()
+        cur.execute("DROP TABLE session_stats")
+        with patch.object(summary_tables, "_warned", set()), patch("builtins.print") as out:
+            self.assertFalse(refresh_session_stats(cur, sid))
+            self.assertFalse(refresh_session_stats(cur, sid))
+        self.assertEqual(out.call_count, 1)
+
+    def test_sessions_endpoint_reads_stats_in_index_order(self):
+        old = self.add_session(44, date(2023, 7, 2), [(91_000, 1)])
+        new = self.add_session(1, date(2024, 7, 28), [(95_000, 1), (0, 0)])
+        undated = self.add_session(44, None, [(99_000, 1)])
+        rebuild_session_stats(self.conn)
+        import dashboard
+        client = dashboard.app.test_client()
+        with patch("dashboard.get_db_connection", side_effect=self.connect):
+            rows = client.get("/api/sessions").get_json()
+            self.assertEqual([r["session_id"] for r in rows], [new, old, undated])
+            self.assertEqual((rows[0]["driver_code"], rows[0]["total_laps"], rows[0]["fastest_lap"]),
+                             ("VER", 2, 95.0))
+            rows = client.get("/api/sessions?driver=HAM&limit=1&offset=1").get_json()
+            self.assertEqual([r["session_id"] for r in rows], [undated])
+
+    def test_analysis_summary_reads_stats(self):
+        from analyze_performance import get_session_summary
+        sid = self.add_session(44, date(2024, 7, 28), [(0, 0), (92_000, 1), (90_000, 0)])
+        rebuild_session_stats(self.conn, [sid])
+        df = get_session_summary(self.conn._raw)
+        self.assertEqual(df.loc[0, "fastest_lap"], 90.0)
+        self.assertEqual(df.loc[0, "avg_lap_time"], 91.0)
+        self.assertEqual((df.loc[0, "valid_laps"], df.loc[0, "invalid_laps"]), (1, 2))
+
+
+
+class LapTelemetryStatsTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "f1.sqlite3"
+        self.conn = self.connect()
+        self.addCleanup(self.conn.close)
+
+    def connect(self):
+        return dbb.connect_sqlite(self.path)
+
+    def rows(self):
+        cur = self.conn.cursor()
+        cur.execute("SELECT lap_id, samples, avg_speed, top_speed, avg_gear, avg_rpm "
+                    "FROM lap_telemetry_stats ORDER BY lap_id")
+        return cur.fetchall()
+
+    def test_capture_lap_completion_aggregates_its_telemetry(self):
+        from capture_telemetry import (ensure_game_driver, insert_lap, insert_session,
+                                       insert_telemetry, update_lap_time)
+        with patch("builtins.print"):
+            ensure_game_driver(self.conn)
+            sid = insert_session(self.conn, None, "Spa", "Race", "Dry", 0)
+            lap = insert_lap(self.conn, sid, 1, 0, "Soft", 1, 100.0, False, 0)
+            for speed, gear, rpm in ((200, 6, 10000), (300, 8, 11000), (250, 7, None)):
+                insert_telemetry(self.conn, lap, speed, 1.0, 0.0, gear, rpm, False)
+            self.assertEqual(self.rows(), [])       # lap still running
+            update_lap_time(self.conn, lap, 91_000, True)
+        self.assertEqual(self.rows(), [(lap, 3, 250.0, 300, 7.0, 10500.0)])
+
+    def test_rebuild_backfills_and_forgets_laps_without_telemetry(self):
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO sessions (track_name) VALUES ('Spa')")
+        cur.executemany("INSERT INTO laps (session_id, lap_number) VALUES (%s, %s)",
+                        [(1, 1), (1, 2)])
+        cur.executemany("INSERT INTO telemetry (lap_id, speed, gear, rpm) VALUES (%s, %s, %s, %s)",
+                        [(1, 100, 3, 9000), (1, 120, 4, 9500), (2, 310, 8, 11800)])
+        self.conn.commit()
+        self.assertEqual(rebuild_lap_telemetry_stats(self.conn, batch=1), 2)
+        self.assertEqual(self.rows(), [(1, 2, 110.0, 120, 3.5, 9250.0),
+                                       (2, 1, 310.0, 310, 8.0, 11800.0)])
+        cur.execute("DELETE FROM telemetry WHERE lap_id = 2")
+        self.conn.commit()
+        self.assertEqual(rebuild_lap_telemetry_stats(self.conn, [1]), 1)
+        self.assertEqual(len(self.rows()), 1)
+
+    def test_comparison_race_never_reads_raw_telemetry(self):
+        from test_importer import _ImportSession
+        import dashboard
+        import import_f1_race
+        with patch("import_f1_race.load_session", side_effect=lambda *a, **k: _ImportSession()), \
+             patch("import_f1_race.get_db_connection", side_effect=self.connect), \
+             patch("import_f1_race.archive_session"), \
+             patch("builtins.print"):
+            import_f1_race.import_race(2021, "Silverstone", 44)
+        expected = {lap_id: speed for lap_id, _, speed, *_ in self.rows()}
+        self.assertEqual(len(expected), 3)
+
+        cur = self.conn.cursor()
+        cur.execute("DELETE FROM telemetry")
+        self.conn.commit()
+        client = dashboard.app.test_client()
+        with patch("dashboard.get_db_connection", side_effect=self.connect):
+            race = client.get("/api/comparison/race?year=2021&track=Silverstone&drivers=HAM")
+        laps = race.get_json()["drivers"]["HAM"]["laps"]
+        self.assertEqual([l["telemetry"]["avg_speed"] for l in laps],
+                         [int(round(expected[k])) for k in sorted(expected)])
+
+
+class LiveStateTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "f1.sqlite3"
+        self.conn = self.connect()
+        self.addCleanup(self.conn.close)
+
+    def connect(self):
+        return dbb.connect_sqlite(self.path)
+
+    def state(self):
+        cur = self.conn.cursor()
+        cur.execute("SELECT driver_code, lap_id, lap_number, lap_time_ms, tyre_compound "
+                    "FROM live_state ORDER BY driver_code")
+        return cur.fetchall()
+
+    def latest(self, query=""):
+        import dashboard
+        with patch("dashboard.get_db_connection", side_effect=self.connect):
+            return dashboard.app.test_client().get(f"/api/latest-lap{query}").get_json()
+
+    def test_capture_lap_completion_publishes_the_lap(self):
+        from capture_telemetry import ensure_game_driver, insert_lap, insert_session, update_lap_time
+        with patch("builtins.print"):
+            ensure_game_driver(self.conn)
+            sid = insert_session(self.conn, None, "Spa", "Race", "Dry", 0)
+            lap1 = insert_lap(self.conn, sid, 1, 0, "Soft", 1, 100.0, False, 0)
+            self.assertEqual(self.state(), [])          # lap still running
+            update_lap_time(self.conn, lap1, 91_500, True)
+            lap2 = insert_lap(self.conn, sid, 2, 0, "Medium", 2, 98.0, False, 0)
+            self.assertEqual(self.state(), [("PLY", lap1, 1, 91_500, "Soft")])
+            update_lap_time(self.conn, lap2, 93_000, False)
+        self.assertEqual(self.state(), [("PLY", lap2, 2, 93_000, "Medium")])
+
+        card = self.latest("?driver=ply")
+        self.assertEqual((card["lap_number"], card["lap_time"], card["track_name"]),
+                         (2, 93.0, "Spa"))
+        self.assertIs(card["live"], True)
+        self.assertEqual(self.latest()["session_id"], sid)
+        self.assertEqual(self.latest("?driver=HAM"), {})
+
+    def test_live_window_still_applies(self):
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO drivers (driver_id, driver_code) VALUES (44, 'HAM')")
+        cur.execute("INSERT INTO sessions (driver_id, track_name) VALUES (44, 'Spa')")
+        cur.execute("INSERT INTO laps (session_id, driver_id, lap_number, lap_time_ms, captured_at) "
+                    "VALUES (1, 44, 1, 90000, %s)", (datetime.now() - timedelta(days=1),))
+        self.conn.commit()
+        self.assertEqual(rebuild_live_state(self.conn), 1)
+        self.assertEqual(len(self.state()), 1)
+        self.assertEqual(self.latest(), {})
+
+    def test_rebuild_seeds_each_drivers_newest_live_lap(self):
+        cur = self.conn.cursor()
+        cur.execute("INSERT INTO drivers (driver_id, driver_code) VALUES (44, 'HAM'), (1, 'VER')")
+        cur.execute("INSERT INTO sessions (driver_id, track_name) VALUES (44, 'Spa'), (1, 'Spa')")
+        now = datetime.now()
+        cur.executemany(
+            "INSERT INTO laps (session_id, driver_id, lap_number, lap_time_ms, captured_at) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(1, 44, 1, 90_000, now), (1, 44, 2, 91_000, now), (1, 44, 3, 0, now),
+             (2, 1, 1, 89_000, now), (2, 1, 2, 88_000, None)])
+        self.conn.commit()
+        self.assertEqual(rebuild_live_state(self.conn), 2)
+        self.assertEqual(self.state(), [("HAM", 2, 2, 91_000, None), ("VER", 4, 1, 89_000, None)])
+
+    def test_same_day_import_feeds_the_live_cards(self):
+        from test_importer import _ImportSession
+        import import_f1_race
+        with patch("import_f1_race.load_session", side_effect=lambda *a, **k: _ImportSession()), \
+             patch("import_f1_race.get_db_connection", side_effect=self.connect), \
+             patch("import_f1_race.archive_session"), \
+             patch("import_f1_race.is_live_import", return_value=True), \
+             patch("builtins.print"):
+            import_f1_race.import_race(2021, "Silverstone", 44)
+        (code, lap_id, lap_number, _, _), = self.state()
+        self.assertEqual((code, lap_number), ("HAM", 3))
+        self.assertEqual(self.latest("?driver=HAM")["lap_number"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()